@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''ControlContainer控件缓存的性能测试
+
+页面对象中的控件以'@dialog' -> '@panel' -> 按钮三层定义，反复通过Controls[...]获取按钮并使用，
+统计缓存关闭/开启时的QPath查找次数和子控件枚举次数::
+
+    python benchmarks/bench_controlcontainer.py
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c import control
+from qt4c.qpath import QPath
+
+
+class FakeWindow(object):
+    enum_calls = 0
+
+    def __init__(self, classname, children=()):
+        self.ClassName = classname
+        self._children = list(children)
+
+    @property
+    def Children(self):
+        FakeWindow.enum_calls += 1
+        return self._children
+
+
+class LazyControl(control.Control):
+    '''第一次使用时才用QPath查找的控件
+    '''
+    searches = 0
+
+    def __init__(self, root=None, locator=None):
+        self._root = root
+        self._locator = locator
+        self._found = None
+
+    @property
+    def Children(self):
+        if self._found is None:
+            LazyControl.searches += 1
+            self._found = self._locator.search(self._root, limit=2)[0]
+        return self._found.Children
+
+
+def build(width=20):
+    noise = [FakeWindow('Noise', [FakeWindow('Noise') for _ in range(width)]) for _ in range(width)]
+    button = FakeWindow('Button')
+    panel = FakeWindow('Panel', noise[:5] + [button])
+    return FakeWindow('Desktop', noise + [FakeWindow('Dialog', noise[5:] + [panel])])
+
+
+def main(accesses=300):
+    root = build()
+    print("%-8s %10s %10s %10s" % ("memoize", "accesses", "searches", "enum"))
+    for memoize in (False, True):
+        container = control.ControlContainer()
+        container._memoize_controls = memoize
+        container.updateLocator({
+            'dialog': {'type': LazyControl, 'root': root, 'locator': QPath("/ClassName='Dialog'")},
+            'panel': {'type': LazyControl, 'root': '@dialog', 'locator': QPath("/ClassName='Panel'")},
+            'button': {'type': LazyControl, 'root': '@panel', 'locator': QPath("/ClassName='Button'")},
+        })
+        LazyControl.searches = FakeWindow.enum_calls = 0
+        for _ in range(accesses):
+            container.Controls['button'].Children
+        print("%-8s %10d %10d %10d" % (memoize, accesses, LazyControl.searches, FakeWindow.enum_calls))
+
+
+if __name__ == '__main__':
+    main()
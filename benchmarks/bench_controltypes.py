@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''控件类型注册表的性能测试
+
+对比导入pkg_resources与导入qt4c.controltypes的耗时，以及旧版每次构造QPath
+都扫描一遍入口点与使用进程级注册表的QPath构造吞吐::
+
+    python benchmarks/bench_controltypes.py
+'''
+
+import os
+import subprocess
+import sys
+import timeit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from qt4c import controltypes, qpathplan
+
+QPATH = "/ClassName='Shell_TrayWnd'/ClassName='TrayNotifyWnd'/ClassName='ToolbarWindow32' && MaxDepth='5'"
+
+
+class FakeEntryPoint(object):
+    def __init__(self, name):
+        self.name = name
+
+    def load(self):
+        return type(self.name, (object,), {})
+
+
+def fake_entry_points(group, count=20):
+    return [FakeEntryPoint('Plugin%d' % i) for i in range(count)]
+
+
+def import_time(module):
+    '''在新进程中导入module，返回耗时(毫秒)
+    '''
+    code = "import time; t = time.time(); import %s; print((time.time() - t) * 1000)" % module
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=ROOT_DIR)
+    return float(output.strip())
+
+
+def main(number=5000):
+    for module in ("pkg_resources", "qt4c.controltypes"):
+        try:
+            print("import %-22s %10.1f ms" % (module, import_time(module)))
+        except subprocess.CalledProcessError:
+            print("import %-22s %10s" % (module, "n/a"))
+
+    def legacy_construct():
+        types = {}
+        for ep in fake_entry_points("qt4c.controls"):
+            types[ep.name] = ep.load()
+        qpathplan.compile_qpath(QPATH)
+
+    registry = controltypes.ControlTypeRegistry(entry_point_loader=fake_entry_points)
+
+    def registry_construct():
+        registry.get('Win')
+        qpathplan.compile_qpath(QPATH)
+
+    for name, func in (("QPath(): entry-point scan", legacy_construct),
+                       ("QPath(): registry", registry_construct)):
+        elapsed = timeit.timeit(func, number=number)
+        print("%-29s %10.0f QPath/s" % (name, number / elapsed))
+
+
+if __name__ == '__main__':
+    main()
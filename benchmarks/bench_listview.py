@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''ListView批量读取与查找的性能测试
+
+在本进程的消息循环线程中创建一个有rows项的SysListView32，比较逐项读取ListViewItem.Text查找最后一行、
+ListView.snapshot一次读出全部文本、以及ListView[text]查找最后一行的耗时::
+
+    python benchmarks/bench_listview.py
+'''
+
+import ctypes
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import commctrl
+import win32con
+import win32gui
+
+from qt4c import wintypes
+from qt4c.wincontrols import ListView
+
+
+def create_listview(rows):
+    '''在新线程中创建并填充ListView，返回其窗口句柄
+    '''
+    created = []
+    ready = threading.Event()
+    lvitem = wintypes.LVITEMW64 if ctypes.sizeof(ctypes.c_void_p) == 8 else wintypes.LVITEMW32
+
+    def run():
+        ctypes.windll.comctl32.InitCommonControls()
+        hwnd = win32gui.CreateWindow('SysListView32', 'bench', win32con.WS_OVERLAPPEDWINDOW | commctrl.LVS_LIST,
+                                     0, 0, 400, 300, 0, 0, 0, None)
+        for row in range(rows):
+            text = ctypes.create_unicode_buffer(u'row%d' % row)
+            item = lvitem(mask=commctrl.LVIF_TEXT, iItem=row, pszText=ctypes.addressof(text))
+            ctypes.windll.user32.SendMessageW(hwnd, commctrl.LVM_INSERTITEMW, 0, ctypes.byref(item))
+        created.append(hwnd)
+        ready.set()
+        win32gui.PumpMessages()
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    ready.wait()
+    return created[0]
+
+
+def timed(func):
+    start = time.time()
+    result = func()
+    return result, (time.time() - start) * 1000
+
+
+def main(rows=5000):
+    listview = ListView(root=create_listview(rows))
+    target = 'row%d' % (rows - 1)
+    print("%d rows" % rows)
+    _, elapsed = timed(lambda: [item for item in listview if item.Text == target.encode('utf8')])
+    print("%-36s %10.1f ms" % ("ListViewItem.Text for every row", elapsed))
+    snapshot, elapsed = timed(listview.snapshot)
+    print("%-36s %10.1f ms" % ("snapshot()", elapsed))
+    _, elapsed = timed(lambda: snapshot.index(target))
+    print("%-36s %10.3f ms" % ("snapshot.index(text)", elapsed))
+    item, elapsed = timed(lambda: listview[target])
+    assert item.item_index == rows - 1
+    print("%-36s %10.1f ms" % ("ListView[text] (LVM_FINDITEM)", elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''控件定位提示缓存的性能测试
+
+在界面不变的情况下反复以limit=2查找对话框中的若干控件(与控件初始化时相同)，统计
+子控件枚举次数和属性读取次数。不启用提示时每次都完整遍历，启用后稳定状态下只校验控件链::
+
+    python benchmarks/bench_locatorhint.py
+'''
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c.locatorhint import LocatorHintCache
+from qt4c.qpath import QPath
+
+
+class FakeWindow(object):
+    enum_calls = 0
+    reads = 0
+
+    def __init__(self, hwnd, classname, name, parent=None):
+        self.hwnd = hwnd
+        self._classname = classname
+        self._name = name
+        self._parent = parent
+        self._children = []
+
+    @property
+    def Children(self):
+        FakeWindow.enum_calls += 1
+        return self._children
+
+    @property
+    def Parent(self):
+        FakeWindow.reads += 1
+        return self._parent
+
+    @property
+    def ClassName(self):
+        FakeWindow.reads += 1
+        return self._classname
+
+    @property
+    def Name(self):
+        FakeWindow.reads += 1
+        return self._name
+
+    @property
+    def IdentityKey(self):
+        return ('Win', self.hwnd)
+
+
+def build_dialog(count):
+    rnd = random.Random(1)
+    root = FakeWindow(1, 'Dialog', 'root')
+    nodes = [root]
+    for i in range(count):
+        parent = nodes[i // 4]
+        node = FakeWindow(i + 2, rnd.choice(['Panel', 'Button', 'Edit']), 'item%d' % i, parent)
+        parent._children.append(node)
+        nodes.append(node)
+    return root, nodes
+
+
+def main(rounds=20):
+    print("%8s %-6s %10s %10s %6s %6s" % ("nodes", "mode", "enum", "reads", "hits", "stale"))
+    for count in (500, 5000):
+        root, nodes = build_dialog(count)
+        targets = random.Random(2).sample(nodes[1:], 20)
+        qpaths = [QPath("/ClassName='%s' && Name='%s' && MaxDepth='10'" % (n._classname, n._name)) for n in targets]
+        for mode in ('search', 'hint'):
+            QPath.hint_cache = LocatorHintCache() if mode == 'hint' else None
+            FakeWindow.enum_calls = FakeWindow.reads = 0
+            for _ in range(rounds):
+                for qp in qpaths:
+                    assert len(qp.search(root, limit=2)) == 1
+            cache = QPath.hint_cache or LocatorHintCache()
+            print("%8d %-6s %10d %10d %6d %6d" % (count, mode, FakeWindow.enum_calls, FakeWindow.reads,
+                                                 cache.hits, cache.stale))
+        QPath.hint_cache = None
+
+
+if __name__ == '__main__':
+    main()
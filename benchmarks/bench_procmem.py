@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''跨进程内存池的性能测试
+
+以本进程为目标，模拟读取托盘图标的过程(每个图标写入并读回一个TBBUTTON大小的块，再读取一个指针指向的
+TRAYDATA)，比较每次新建util.ProcessMem与使用procmem.ProcessArena的耗时及句柄、远程分配次数::
+
+    python benchmarks/bench_procmem.py
+'''
+
+import ctypes
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c import procmem
+from qt4c import util
+from qt4c import wintypes
+
+
+def with_process_mem(pid, count):
+    tb = wintypes.TBBUTTON()
+    td = wintypes.TRAYDATA()
+    pm = util.ProcessMem(pid, buffer_size=ctypes.sizeof(tb))
+    for _ in range(count):
+        pm.write(ctypes.byref(tb), ctypes.sizeof(tb))
+        pm.read(ctypes.byref(tb), ctypes.sizeof(tb))
+        pmtmp = util.ProcessMem(pid, remote_buffer=pm.Buffer)
+        pmtmp.read(ctypes.byref(td), min(ctypes.sizeof(td), ctypes.sizeof(tb)))
+
+
+def with_arena(pid, count):
+    tb = wintypes.TBBUTTON()
+    td = wintypes.TRAYDATA()
+    arena = procmem.get_arena(pid)
+    with arena.allocate(ctypes.sizeof(tb)) as block:
+        for _ in range(count):
+            block.write(tb)
+            block.read_into(tb)
+            arena.read_at(block.Address, td, min(ctypes.sizeof(td), ctypes.sizeof(tb)))
+
+
+def main(count=2000):
+    pid = os.getpid()
+    print("%d items" % count)
+    for name, func in (("util.ProcessMem", with_process_mem), ("procmem.ProcessArena", with_arena)):
+        start = time.time()
+        for _ in range(5):
+            func(pid, count)
+        print("%-22s %10.1f ms" % (name, (time.time() - start) * 1000 / 5))
+    print(procmem.get_arena(pid).stats)
+
+
+if __name__ == '__main__':
+    main()
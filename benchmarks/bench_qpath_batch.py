@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''多个QPath批量查找的性能测试
+
+模拟页面对象在同一个对话框下声明20/50个定位符，对比逐个调用QPath.search与
+QPath.search_many一次遍历时的子控件枚举次数、属性读取次数和耗时::
+
+    python benchmarks/bench_qpath_batch.py
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c.qpath import QPath
+
+
+class FakeWindow(object):
+    '''子控件枚举和属性读取带计数的合成控件
+    '''
+    enum_calls = 0
+    reads = 0
+
+    def __init__(self, classname, name):
+        self._classname = classname
+        self._name = name
+        self._children = []
+
+    @property
+    def Children(self):
+        FakeWindow.enum_calls += 1
+        return self._children
+
+    @property
+    def ClassName(self):
+        FakeWindow.reads += 1
+        return self._classname
+
+    @property
+    def Name(self):
+        FakeWindow.reads += 1
+        return self._name
+
+
+def build_dialog(count, seed=1):
+    rnd = random.Random(seed)
+    root = FakeWindow('Dialog', 'root')
+    nodes = [root]
+    for i in range(count):
+        node = FakeWindow(rnd.choice(['Panel', 'Button', 'Edit', 'Static']), 'item%d' % i)
+        nodes[i // 4]._children.append(node) #每个节点4个子节点
+        nodes.append(node)
+    return root, nodes
+
+
+def main():
+    print("%8s %8s %-6s %10s %10s %10s" % ("nodes", "locators", "mode", "enum", "reads", "time(ms)"))
+    for count, locators in ((500, 20), (2000, 50)):
+        root, nodes = build_dialog(count)
+        targets = random.Random(2).sample(nodes[1:], locators)
+        qpaths = [QPath("/ClassName='%s' && Name='%s' && MaxDepth='20'" % (n._classname, n._name))
+                  for n in targets]
+        for mode in ('single', 'batch'):
+            FakeWindow.enum_calls = FakeWindow.reads = 0
+            start = time.time()
+            if mode == 'single':
+                results = [qp.search(root) for qp in qpaths]
+            else:
+                results = QPath.search_many(root, qpaths)
+            elapsed = time.time() - start
+            assert all(len(r) == 1 for r in results)
+            print("%8d %8d %-6s %10d %10d %10.1f" % (count, locators, mode, FakeWindow.enum_calls,
+                                                     FakeWindow.reads, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
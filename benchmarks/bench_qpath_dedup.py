@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''QPath查找结果去重的性能测试
+
+多级QPath的查找结果需要去重。对比旧版逐个调用Control.equal的O(n²)去重与
+基于IdentityKey的集合去重在1k/10k/50k个候选节点下的耗时和HWnd读取次数::
+
+    python benchmarks/bench_qpath_dedup.py
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c.qpath import QPath
+
+LEGACY_MAX_NODES = 1000 #旧版去重在1万个节点时已需要约100秒，更大规模只给出估算的HWnd读取次数
+
+
+class FakeWindow(object):
+    '''读取HWnd带计数的合成窗口，用于模拟跨进程读取标识的代价
+    '''
+    hwnd_reads = 0
+
+    def __init__(self, hwnd, classname, children=()):
+        self._hwnd = hwnd
+        self.ClassName = classname
+        self._children = list(children)
+
+    @property
+    def Children(self):
+        return self._children
+
+    @property
+    def HWnd(self):
+        FakeWindow.hwnd_reads += 1
+        return self._hwnd
+
+    @property
+    def IdentityKey(self):
+        return ('Win', self.HWnd)
+
+    def equal(self, other):
+        return isinstance(other, FakeWindow) and self.HWnd == other.HWnd
+
+    def __eq__(self, other):
+        return self.equal(other)
+
+    def __ne__(self, other):
+        return not self.equal(other)
+
+    def __hash__(self):
+        return hash(self.IdentityKey)
+
+
+def build_tree(count):
+    '''两层嵌套的Panel下共count个Item，每个Item会被两个Panel各找到一次
+    '''
+    items = [FakeWindow(100 + i, 'Item') for i in range(count)]
+    inner = FakeWindow(2, 'Panel', items)
+    outer = FakeWindow(1, 'Panel', [inner])
+    return FakeWindow(0, 'Root', [outer])
+
+
+class LegacyQPath(QPath):
+    '''使用旧版O(n²)去重的QPath
+    '''
+    def search(self, root=None, limit=None):
+        from qt4c.qpathengine import QPathEngine, ObjectTreeProvider, SearchContext
+        engine = QPathEngine(ObjectTreeProvider())
+        found = list(engine.iter_controls(root, self._plan.steps, SearchContext()))
+        controls = []
+        for ctrl in found:
+            if ctrl not in controls:
+                controls.append(ctrl)
+        return controls
+
+
+def main():
+    qpath = "/ClassName='Panel' && MaxDepth='2'/ClassName='Item' && MaxDepth='2'"
+    print("%8s %-8s %12s %14s" % ("nodes", "dedup", "ms/search", "HWnd reads"))
+    for count in (1000, 10000, 50000):
+        root = build_tree(count)
+        for name, cls in (("legacy", LegacyQPath), ("hash", QPath)):
+            if cls is LegacyQPath and count > LEGACY_MAX_NODES:
+                print("%8d %-8s %12s %14s" % (count, name, "skipped", "~%d" % (count * (count - 1) * 2)))
+                continue
+            FakeWindow.hwnd_reads = 0
+            start = time.time()
+            found = cls(qpath).search(root)
+            elapsed = (time.time() - start) * 1000
+            assert len(found) == count
+            print("%8d %-8s %12.1f %14d" % (count, name, elapsed, FakeWindow.hwnd_reads))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''QPath编译缓存的性能测试
+
+对比旧版每次构造都重新解析QPath、每层递归都重建大写属性字典的开销，
+与编译后共享QPathPlan的开销::
+
+    python benchmarks/bench_qpath_plan.py
+'''
+
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c import qpathplan
+
+QPATHS = [
+    "/ClassName='Shell_TrayWnd'/ClassName='TrayNotifyWnd'/ClassName='SysPager'/ClassName='ToolbarWindow32' && MaxDepth='5'",
+    "/ClassName='IEFrame' && Visible='True'/ClassName='Internet Explorer_Server' && MaxDepth='10'",
+    "/classname='AssistWnd' && processid='1234'",
+    "/ClassName='CalcFrame' && Text='计算器' && Visible='True' /ClassName='Button' && MaxDepth='3' && ControlId='0x83'",
+    "/ClassName='TxGuiFoundation' && Caption~='QQ\\d+' && Instance='-1' / UIType='UIA' && name='mainpanel' && MaxDepth='10'",
+]
+
+
+def legacy_parse(qpath_string):
+    '''旧版QPath._parse的实现
+    '''
+    qpath_string = qpath_string.strip()
+    seperator = qpath_string[0]
+    parsed_qpath = []
+    for locator in qpath_string[1:].split(seperator):
+        parsed_locators = {}
+        for prop_str in locator.split('&&'):
+            prop_str = prop_str.strip()
+            match_object = re.match("(\\w+)\\s*([=~!<>]+)\\s*[\"'](.*)[\"']", prop_str)
+            prop_name, operator, prop_value = match_object.groups()
+            parsed_locators[prop_name] = [operator, prop_value]
+        parsed_qpath.append(parsed_locators)
+    return seperator, parsed_qpath
+
+
+def legacy_search_setup(parsed_qpath, nodes_per_step):
+    '''旧版_find_controls_recur和_match_control中每个节点都要做的属性预处理
+    '''
+    for props in parsed_qpath:
+        for _ in range(nodes_per_step):
+            props = dict((entry[0].upper(), entry[1]) for entry in props.items())
+            props.pop('MAXDEPTH', None)
+            props.pop('INSTANCE', None)
+            props.pop('UITYPE', None)
+            for operator, value in props.values():
+                if value.upper() in ('TRUE', 'FALSE'):
+                    continue
+                if re.search('^0x', value) != None:
+                    int(value, 16)
+                elif value.isdigit():
+                    int(value)
+                elif operator == '~=':
+                    re.compile(value)
+
+
+def plan_search_setup(plan, nodes_per_step):
+    '''编译后的查询计划在每个节点上只需读取预处理好的属性条件
+    '''
+    for step in plan.steps:
+        for _ in range(nodes_per_step):
+            for predicate in step.predicates:
+                predicate.key, predicate.int_value, predicate.bool_value
+
+
+def main(number=2000, nodes_per_step=50):
+    def legacy_construct():
+        for s in QPATHS:
+            legacy_parse(s)
+
+    def plan_construct():
+        for s in QPATHS:
+            qpathplan.compile_qpath(s)
+
+    def uncached_construct():
+        for s in QPATHS:
+            qpathplan._build_plan(s)
+
+    parsed = [legacy_parse(s)[1] for s in QPATHS]
+    plans = [qpathplan.compile_qpath(s) for s in QPATHS]
+
+    def legacy_setup():
+        for p in parsed:
+            legacy_search_setup(p, nodes_per_step)
+
+    def plan_setup():
+        for p in plans:
+            plan_search_setup(p, nodes_per_step)
+
+    rows = [
+        ("construct: legacy parse", legacy_construct, number),
+        ("construct: compile (no cache)", uncached_construct, number),
+        ("construct: compile (cached)", plan_construct, number),
+        ("search setup: legacy", legacy_setup, number // 20),
+        ("search setup: plan", plan_setup, number // 20),
+    ]
+    print("%-32s %12s" % ("case", "us/QPath"))
+    for name, func, n in rows:
+        elapsed = timeit.timeit(func, number=n)
+        print("%-32s %12.2f" % (name, elapsed * 1e6 / n / len(QPATHS)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''QPath属性匹配顺序的性能测试
+
+在合成的控件树上统计每次查找获取各属性的次数，对比旧版按QPath书写顺序匹配并对每个
+节点调用dir()，与按属性代价排序并按类缓存属性名映射的匹配方式::
+
+    python benchmarks/bench_qpath_predicates.py
+'''
+
+import collections
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c.qpath import QPath
+
+FETCHES = collections.Counter()
+COSTS = {'ClassName': 1, 'Visible': 2, 'Caption': 100}
+
+
+class FakeWindow(object):
+    '''属性带有计数的合成窗口，Caption模拟两次跨进程SendMessageTimeout
+    '''
+    _property_costs = COSTS
+
+    def __init__(self, classname, caption, visible, children=()):
+        self._classname = classname
+        self._caption = caption
+        self._visible = visible
+        self._children = list(children)
+
+    @property
+    def Children(self):
+        return self._children
+
+    @property
+    def ClassName(self):
+        FETCHES['ClassName'] += 1
+        return self._classname
+
+    @property
+    def Caption(self):
+        FETCHES['Caption'] += 1
+        return self._caption
+
+    @property
+    def Visible(self):
+        FETCHES['Visible'] += 1
+        return self._visible
+
+
+def build_tree(width=30, depth=3, seed=0):
+    rng = random.Random(seed)
+    classes = ['Button', 'Static', 'Edit', 'ListBox', 'Dialog']
+
+    def build(level):
+        if level == depth:
+            return []
+        return [FakeWindow(rng.choice(classes), 'text%d' % rng.randint(0, 50),
+                           rng.random() < 0.8, build(level + 1))
+                for _ in range(width if level == 0 else width // 5)]
+    return FakeWindow('#32769', '', True, build(0))
+
+
+class LegacyQPath(QPath):
+    '''按QPath书写顺序匹配属性，并对每个节点调用dir()的旧版实现
+    '''
+    def _match_control(self, control, step):
+        attrs = dict((attr.upper(), attr) for attr in dir(control))
+        for predicate in step.predicates:
+            if not predicate.key in attrs:
+                return False
+            if not predicate.match(getattr(control, attrs[predicate.key])):
+                return False
+        return True
+
+
+def main():
+    root = build_tree()
+    qpath = "/Caption~='text1' && Visible='True' && ClassName='Dialog' && MaxDepth='3'"
+    print("%-8s %10s %10s %10s %10s %12s" % ("matcher", "ClassName", "Visible", "Caption", "cost", "ms/search"))
+    for name, cls in (("legacy", LegacyQPath), ("ordered", QPath)):
+        qp = cls(qpath)
+        FETCHES.clear()
+        start = time.time()
+        found = qp.search(root)
+        elapsed = (time.time() - start) * 1000
+        cost = sum(COSTS[k] * v for k, v in FETCHES.items())
+        print("%-8s %10d %10d %10d %10d %12.2f (%d found)" % (
+            name, FETCHES['ClassName'], FETCHES['Visible'], FETCHES['Caption'], cost, elapsed, len(found)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''QPath重试续查的性能测试
+
+6层QPath的最后一层控件在第N次重试时才出现，统计每次都从root完整查找与
+search(resume=True)从已匹配前缀继续查找时的子控件枚举次数和属性读取次数::
+
+    python benchmarks/bench_qpath_resume.py
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c.qpath import QPath
+
+
+class FakeWindow(object):
+    enum_calls = 0
+    reads = 0
+    next_id = 0
+
+    def __init__(self, classname, parent=None):
+        FakeWindow.next_id += 1
+        self.id = FakeWindow.next_id
+        self._classname = classname
+        self._parent = parent
+        self._children = []
+        if parent is not None:
+            parent._children.append(self)
+
+    @property
+    def Children(self):
+        FakeWindow.enum_calls += 1
+        return self._children
+
+    @property
+    def Parent(self):
+        FakeWindow.reads += 1
+        return self._parent
+
+    @property
+    def ClassName(self):
+        FakeWindow.reads += 1
+        return self._classname
+
+    @property
+    def IdentityKey(self):
+        return ('Win', self.id)
+
+
+def build(width):
+    '''每层有width个干扰控件，目标路径为Level0/Level1/.../Level4，最后一层Target稍后出现
+    '''
+    root = FakeWindow('Desktop')
+    parent = root
+    for level in range(5):
+        for _ in range(width):
+            noise = FakeWindow('Noise', parent)
+            for _ in range(width):
+                FakeWindow('Noise', noise)
+        parent = FakeWindow('Level%d' % level, parent)
+    return root, parent
+
+
+def main(retries=10):
+    qpath = "".join("/ClassName='Level%d'" % level for level in range(5)) + "/ClassName='Target'"
+    print("%6s %-7s %10s %10s" % ("width", "mode", "enum", "reads"))
+    for width in (10, 30):
+        for resume in (False, True):
+            root, last = build(width)
+            qp = QPath(qpath)
+            FakeWindow.enum_calls = FakeWindow.reads = 0
+            for attempt in range(retries):
+                if attempt == retries - 1:
+                    FakeWindow('Target', last)
+                controls = qp.search(root, limit=2, resume=resume)
+            assert len(controls) == 1
+            print("%6d %-7s %10d %10d" % (width, 'resume' if resume else 'full', FakeWindow.enum_calls,
+                                          FakeWindow.reads))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''QPath查找引擎在内存控件树上的性能测试
+
+qpathengine不依赖Win32，可在任何平台上运行。在1万/10万个节点的合成控件树上统计几种典型QPath
+完整查找、limit=1提前结束和多个QPath批量查找的耗时及属性读取次数::
+
+    python benchmarks/bench_qpathengine.py
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c import qpathplan
+from qt4c.qpathengine import QPathEngine, TreeProvider, PropertyUnavailable
+
+
+class ArrayTreeProvider(TreeProvider):
+    '''节点为整数序号，子节点和属性保存在列表中的控件树
+    '''
+    def __init__(self, count, width=8, seed=1):
+        rnd = random.Random(seed)
+        self.children_of = [[] for _ in range(count)]
+        self.classnames = ['Root']
+        self.names = ['root']
+        for node in range(1, count):
+            self.children_of[(node - 1) // width].append(node)
+            self.classnames.append(rnd.choice(['Panel', 'Button', 'Edit', 'Static']))
+            self.names.append('item%d' % node)
+        self.reads = 0
+
+    def children(self, node, step=None):
+        return self.children_of[node]
+
+    def get_property(self, node, key):
+        self.reads += 1
+        if key == 'CLASSNAME':
+            return self.classnames[node]
+        if key == 'NAME':
+            return self.names[node]
+        raise PropertyUnavailable(key)
+
+    def identity(self, node):
+        return node
+
+
+def main():
+    print("%8s %-40s %-6s %8s %10s %10s" % ("nodes", "qpath", "mode", "found", "reads", "time(ms)"))
+    for count in (10000, 100000):
+        provider = ArrayTreeProvider(count)
+        engine = QPathEngine(provider)
+        last = count - 1
+        cases = [
+            "/ClassName='Button' && MaxDepth='20'",
+            "/ClassName='Panel' && MaxDepth='3'/ClassName='Edit' && MaxDepth='20'",
+            "/Name='item%d' && MaxDepth='20'" % last,
+        ]
+        for qpath in cases:
+            steps = qpathplan.compile_qpath(qpath).steps
+            for mode, limit in (('all', None), ('first', 1)):
+                provider.reads = 0
+                start = time.time()
+                found = engine.search(0, steps, limit)
+                elapsed = time.time() - start
+                print("%8d %-40s %-6s %8d %10d %10.1f" % (count, qpath[:40], mode, len(found),
+                                                         provider.reads, elapsed * 1000))
+        steps_list = [qpathplan.compile_qpath("/Name='item%d' && MaxDepth='20'" % node).steps
+                      for node in random.Random(2).sample(range(1, count), 20)]
+        provider.reads = 0
+        start = time.time()
+        engine.search_many(0, steps_list)
+        print("%8d %-40s %-6s %8d %10d %10.1f" % (count, "20 x /Name='itemN'", 'batch', 20,
+                                                 provider.reads, (time.time() - start) * 1000))
+
+
+if __name__ == '__main__':
+    main()
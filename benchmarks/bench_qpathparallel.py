@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''QPath并行查找的性能测试
+
+控件树的每次子控件枚举和属性读取都用time.sleep模拟跨进程调用的延迟(会释放GIL)，
+比较QPathEngine顺序查找与不同线程数的ParallelQPathEngine的耗时，并校验结果相同::
+
+    python benchmarks/bench_qpathparallel.py
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c import qpathplan
+from qt4c.qpathengine import QPathEngine, ObjectTreeProvider
+from qt4c.qpathparallel import ParallelQPathEngine, WorkerPool
+
+
+class SlowNode(object):
+    latency = 0.0005 #每次跨进程调用的延迟(秒)
+
+    def __init__(self, classname, children=()):
+        self._classname = classname
+        self._children = list(children)
+
+    @property
+    def Children(self):
+        time.sleep(self.latency)
+        return self._children
+
+    @property
+    def ClassName(self):
+        time.sleep(self.latency)
+        return self._classname
+
+
+def build(depth, width):
+    if depth == 0:
+        return SlowNode('Button')
+    classname = 'Dialog' if depth == 3 else 'Panel'
+    return SlowNode(classname, [build(depth - 1, width) for _ in range(width)])
+
+
+def main():
+    root = SlowNode('Desktop', [build(3, 6) for _ in range(6)])
+    cases = [
+        ("/ClassName='Dialog'/ClassName='Button' && MaxDepth='3'", None),
+        ("/ClassName='Dialog' && Instance='-1'/ClassName='Panel'/ClassName='Button'", None),
+        ("/ClassName='Button' && MaxDepth='4'", 1),
+    ]
+    print("%-70s %-6s %8s %10s %8s" % ("qpath", "limit", "engine", "time(ms)", "speedup"))
+    for qpath, limit in cases:
+        steps = qpathplan.compile_qpath(qpath).steps
+        start = time.time()
+        expected = QPathEngine(ObjectTreeProvider()).search(root, steps, limit)
+        sequential = time.time() - start
+        print("%-70s %-6s %8s %10.1f %8s" % (qpath, limit, 'seq', sequential * 1000, '1.0x'))
+        for width in (2, 4, 8, 16):
+            pool = WorkerPool(width)
+            start = time.time()
+            found = ParallelQPathEngine(ObjectTreeProvider(), pool).search(root, steps, limit)
+            elapsed = time.time() - start
+            pool.shutdown()
+            assert found == expected
+            print("%-70s %-6s %8s %10.1f %7.1fx" % ('', '', 'par-%d' % width, elapsed * 1000, sequential / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''快照向量化匹配的性能测试
+
+在1万/10万个节点的合成UIA控件树快照上，比较QPathEngine逐个节点匹配与snapshotmatch向量化匹配的耗时，
+并校验两者结果相同。需要安装NumPy::
+
+    python benchmarks/bench_snapshotmatch.py
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c import snapshotmatch
+from qt4c import uisnapshot
+
+
+def build(count, width=8, seed=1):
+    rnd = random.Random(seed)
+    builder = uisnapshot.SnapshotBuilder()
+    builder.add(-1, 'UIA', {'ClassName': 'Root', 'Name': 'root'})
+    for node in range(1, count):
+        builder.add((node - 1) // width, 'UIA', {
+            'ClassName': rnd.choice(['Panel', 'Button', 'Edit', 'Static']),
+            'ControlType': rnd.choice(['Pane', 'Button', 'Edit', 'Text', 'DataItem']),
+            'Name': 'item%d' % node,
+            'Enabled': rnd.random() < 0.9,
+        })
+    return builder.build()
+
+
+def main():
+    if not snapshotmatch.is_available():
+        print("NumPy is not installed")
+        return
+    print("%8s %-50s %8s %10s %10s %8s" % ("nodes", "qpath", "found", "loop(ms)", "vector(ms)", "speedup"))
+    for count in (10000, 100000):
+        snapshot = build(count)
+        snapshot.search_indices("/Name='root'", vectorized=True) #计算先序编号
+        cases = [
+            "/ClassName='Button' && Enabled='True' && MaxDepth='20'",
+            "/ClassName='Panel' && MaxDepth='3'/ControlType='DataItem' && MaxDepth='20'",
+            "/Name~='7$' && ControlType='Edit' && MaxDepth='20'",
+            "/Name='item%d' && MaxDepth='20'" % (count - 1),
+        ]
+        for qpath in cases:
+            start = time.time()
+            expected = snapshot.search_indices(qpath, vectorized=False)
+            loop_time = time.time() - start
+            start = time.time()
+            found = snapshot.search_indices(qpath, vectorized=True)
+            vector_time = time.time() - start
+            assert found == expected
+            print("%8d %-50s %8d %10.1f %10.1f %7.1fx" % (count, qpath[:50], len(found), loop_time * 1000,
+                                                         vector_time * 1000, loop_time / vector_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''通知区域图标查找与刷新的性能测试
+
+对当前系统的通知区域，比较每次遍历Items按进程ID查找全部图标、使用TrayNotifyBar索引查找，
+以及只移过所属进程已退出图标的refresh(stale_only=True)的耗时::
+
+    python benchmarks/bench_traynotify.py
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c.wincontrols import TrayNotifyBar
+
+
+def timed(func):
+    start = time.time()
+    result = func()
+    return result, (time.time() - start) * 1000
+
+
+def main():
+    bar = TrayNotifyBar()
+    pids = [icon.ProcessId for icon in bar.Items]
+    print("%d icons" % len(pids))
+
+    def scan():
+        for pid in pids:
+            for icon in bar.Items:
+                if icon.ProcessId == pid:
+                    break
+
+    _, elapsed = timed(scan)
+    print("%-34s %10.1f ms" % ("Items scan per pid", elapsed))
+    _, elapsed = timed(lambda: [bar[pid] for pid in pids])
+    print("%-34s %10.1f ms" % ("TrayNotifyBar[pid] (index)", elapsed))
+    _, elapsed = timed(lambda: TrayNotifyBar()[0x7fffffff])
+    print("%-34s %10.1f ms" % ("new TrayNotifyBar, missing pid", elapsed))
+    probed, elapsed = timed(lambda: bar.refresh(stale_only=True))
+    print("%-34s %10.1f ms (%d probed)" % ("refresh(stale_only=True)", elapsed, probed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''窗口句柄到UIA元素转换的性能测试
+
+模拟混合Win32/UIA的QPath在若干窗口上反复从Win32切换到UIA。旧版find_UIAElm每次都在
+整个桌面下FindFirst(TreeScope_Descendants)按NativeWindowHandle查找，统计桌面扫描次数和
+扫描过的元素数；UIAElementBridge每个窗口只调用一次ElementFromHandle::
+
+    python benchmarks/bench_uiabridge.py
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c.uiabridge import UIAElementBridge
+
+
+class FakeUIAClient(object):
+    def __init__(self, desktop_elements, windows):
+        self.desktop_elements = desktop_elements
+        self.windows = windows
+        self.desktop_scans = 0
+        self.visited = 0
+        self.calls = 0
+
+    def find_first_by_handle(self, hwnd):
+        '''旧版：在桌面下按NativeWindowHandle查找第一个元素
+        '''
+        self.desktop_scans += 1
+        self.calls += 1
+        index = self.windows.index(hwnd)
+        self.visited += (index + 1) * self.desktop_elements // len(self.windows)
+        return ('element', hwnd)
+
+    def ElementFromHandle(self, hwnd):
+        self.calls += 1
+        return ('element', hwnd)
+
+
+def main(searches=200):
+    print("%8s %8s %-8s %8s %12s %14s" % ("elements", "windows", "mode", "calls", "desktop scans", "elements read"))
+    for desktop_elements, window_count in ((2000, 20), (20000, 50)):
+        windows = list(range(1000, 1000 + window_count))
+        targets = [windows[(i * 7) % window_count] for i in range(searches)]
+
+        client = FakeUIAClient(desktop_elements, windows)
+        for hwnd in targets:
+            client.find_first_by_handle(hwnd)
+        print("%8d %8d %-8s %8d %12d %14d" % (desktop_elements, window_count, "legacy",
+                                              client.calls, client.desktop_scans, client.visited))
+
+        client = FakeUIAClient(desktop_elements, windows)
+        bridge = UIAElementBridge(client, window_identity=lambda hwnd: (1, 1))
+        for hwnd in targets:
+            bridge.element_from_handle(hwnd)
+        print("%8d %8d %-8s %8d %12d %14d" % (desktop_elements, window_count, "bridge",
+                                              client.calls, client.desktop_scans, client.visited))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''UIA属性缓存的性能测试
+
+在5000个元素的模拟树上做一次全树遍历，匹配Name和ClassName两个属性，统计跨进程调用次数。
+旧版每个元素要调用GetNextSiblingElement、CurrentName(有效性验证)以及每个属性一次；
+缓存模式下每展开一个元素只需一次BuildUpdatedCache，缓存整棵子树时整次查找只需两次::
+
+    python benchmarks/bench_uiacache.py
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c.uiacache import UIACacheConfig, CachedElement
+
+
+class UIA(object):
+    TreeScope_Element = 1
+    TreeScope_Children = 2
+    TreeScope_Descendants = 4
+    UIA_BoundingRectanglePropertyId = 30001
+    UIA_ProcessIdPropertyId = 30002
+    UIA_ControlTypePropertyId = 30003
+    UIA_NamePropertyId = 30005
+    UIA_IsEnabledPropertyId = 30010
+    UIA_ClassNamePropertyId = 30012
+
+
+class Node(object):
+    def __init__(self, index):
+        self.properties = {
+            UIA.UIA_BoundingRectanglePropertyId: (0, 0, 1, 1),
+            UIA.UIA_ProcessIdPropertyId: 1,
+            UIA.UIA_ControlTypePropertyId: 50000,
+            UIA.UIA_NamePropertyId: 'item%d' % index,
+            UIA.UIA_IsEnabledPropertyId: True,
+            UIA.UIA_ClassNamePropertyId: 'ListViewItem' if index % 10 else 'Group',
+        }
+        self.children = []
+
+
+class Request(object):
+    def __init__(self):
+        self.properties = []
+        self.TreeScope = self.TreeFilter = None
+
+    def AddProperty(self, property_id):
+        self.properties.append(property_id)
+
+
+class Client(object):
+    RawViewCondition = 'RawView'
+
+    def CreateCacheRequest(self):
+        return Request()
+
+
+class Array(object):
+    def __init__(self, elements):
+        self.elements = elements
+        self.Length = len(elements)
+
+    def GetElement(self, i):
+        return self.elements[i]
+
+
+class Element(object):
+    calls = 0
+
+    def __init__(self, node, cache=None, children=None):
+        self.node = node
+        self.cache = cache
+        self.children = children
+
+    def BuildUpdatedCache(self, request):
+        Element.calls += 1
+        return self._build(self.node, request)
+
+    @staticmethod
+    def _build(node, request):
+        props = request.properties
+        children = None
+        if request.TreeScope & UIA.TreeScope_Descendants:
+            children = [Element._build(c, request) for c in node.children]
+        elif request.TreeScope & UIA.TreeScope_Children:
+            children = [Element(c, dict((p, c.properties[p]) for p in props)) for c in node.children]
+        return Element(node, dict((p, node.properties[p]) for p in props), children)
+
+    def GetCachedPropertyValue(self, property_id):
+        return self.cache[property_id]
+
+    def GetCachedChildren(self):
+        return Array(self.children) if self.children else None
+
+
+def build_tree(count, width=10):
+    root = Node(0)
+    level = [root]
+    created = 0
+    while created < count:
+        next_level = []
+        for parent in level:
+            for _ in range(min(width, count - created)):
+                created += 1
+                child = Node(created)
+                parent.children.append(child)
+                next_level.append(child)
+        level = next_level
+    return root
+
+
+def legacy_calls(node):
+    '''RawWalker遍历：每个子元素GetNextSiblingElement、CurrentName验证，各匹配属性一次
+    '''
+    calls = 1 #GetFirstChildElement
+    for child in node.children:
+        calls += 2
+        calls += 1 if child.properties[UIA.UIA_ClassNamePropertyId] != 'ListViewItem' else 2
+        calls += legacy_calls(child)
+    return calls
+
+
+def cached_search(element, found):
+    for child in element.children():
+        if child.get_property('ClassName') == 'ListViewItem' and child.get_property('Name') == 'item7':
+            found.append(child)
+        cached_search(child, found)
+
+
+def main():
+    print("%8s %-8s %10s" % ("elements", "mode", "calls"))
+    for count in (500, 5000):
+        root = build_tree(count)
+        print("%8d %-8s %10d" % (count, "legacy", legacy_calls(root)))
+        for mode, subtree in (("cached", False), ("subtree", True)):
+            config = UIACacheConfig(Client(), UIA, subtree=subtree)
+            Element.calls = 0
+            found = []
+            cached_search(CachedElement(config, Element(root)), found)
+            assert len(found) == 1
+            print("%8d %-8s %10d" % (count, mode, Element.calls))
+
+
+if __name__ == '__main__':
+    main()
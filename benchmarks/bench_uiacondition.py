@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''UIA条件下推的性能测试
+
+在模拟的UIA元素树上统计一次查找的跨进程COM调用次数。旧版用RawWalker逐个遍历元素，
+每个元素取一次CurrentName验证有效性，再逐个获取要匹配的属性；下推后一次FindAll由
+Provider过滤，只有剩余条件需要额外的调用。
+
+MaxDepth大于1的定位符不下推，表中同时列出按子孙控件查找再沿父元素检查深度的调用次数，
+条件较宽(如只按ControlType匹配)时高于逐层遍历::
+
+    python benchmarks/bench_uiacondition.py
+'''
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c import qpathplan
+from qt4c.uiacondition import ConditionTranslator
+
+CONTROL_TYPES = {50000: 'Button', 50020: 'Text', 50029: 'DataItem', 50033: 'Pane'}
+
+
+class UIA(object):
+    TreeScope_Children = 2
+    TreeScope_Descendants = 4
+    UIA_ControlTypePropertyId = 30003
+    UIA_NamePropertyId = 30005
+    UIA_ClassNamePropertyId = 30012
+
+
+class Element(object):
+    def __init__(self, props, children=()):
+        self.props = props
+        self.parent = None
+        self.children = list(children)
+        for child in self.children:
+            child.parent = self
+
+    def descendants(self):
+        for child in self.children:
+            yield child
+            for elm in child.descendants():
+                yield elm
+
+    def FindAllBuildCache(self, scope, condition, cache_request):
+        Client.calls += 1
+        elements = self.children if scope == UIA.TreeScope_Children else self.descendants()
+        return Array([e for e in elements if Client.evaluate(condition, e)])
+
+
+class Array(object):
+    def __init__(self, elements):
+        self.elements = elements
+        self.Length = len(elements)
+
+    def GetElement(self, i):
+        return self.elements[i]
+
+
+class Client(object):
+    calls = 0
+    RawViewCondition = 'RawView'
+
+    class RawViewWalker(object):
+        @staticmethod
+        def GetParentElement(element):
+            Client.calls += 1
+            return element.parent
+
+    class CacheRequest(object):
+        TreeFilter = None
+
+    def CreatePropertyCondition(self, property_id, value):
+        return ('prop', property_id, value)
+
+    def CreateAndCondition(self, left, right):
+        return ('and', left, right)
+
+    def CreateCacheRequest(self):
+        return self.CacheRequest()
+
+    def CompareElements(self, left, right):
+        return left is right
+
+    @staticmethod
+    def evaluate(condition, element):
+        if condition[0] == 'and':
+            return Client.evaluate(condition[1], element) and Client.evaluate(condition[2], element)
+        return element.props.get(condition[1]) == condition[2]
+
+
+def build_tree(count, width=8, seed=0):
+    '''按层生成count个元素、每个元素width个子元素的树
+    '''
+    rng = random.Random(seed)
+    root = Element({})
+    level = [root]
+    created = 0
+    while created < count:
+        next_level = []
+        for parent in level:
+            for _ in range(min(width, count - created)):
+                child = Element({
+                    UIA.UIA_NamePropertyId: 'row%d' % rng.randint(0, count),
+                    UIA.UIA_ClassNamePropertyId: rng.choice(['ListViewItem', 'TextBlock', 'Border']),
+                    UIA.UIA_ControlTypePropertyId: rng.choice(list(CONTROL_TYPES)),
+                })
+                child.parent = parent
+                parent.children.append(child)
+                next_level.append(child)
+                created += 1
+        level = next_level
+    return root
+
+
+def legacy_calls(root, step, depth=1):
+    '''RawWalker逐个遍历，每个元素验证有效性后逐个获取属性
+    '''
+    keys = {'NAME': UIA.UIA_NamePropertyId, 'CLASSNAME': UIA.UIA_ClassNamePropertyId,
+            'CONTROLTYPE': UIA.UIA_ControlTypePropertyId}
+    calls = 1 #GetFirstChildElement
+    for child in root.children:
+        calls += 2 #CurrentName、GetNextSiblingElement
+        for predicate in step.predicates:
+            calls += 1
+            value = child.props[keys[predicate.key]]
+            if predicate.key == 'CONTROLTYPE':
+                value = CONTROL_TYPES[value]
+            if not predicate.match(value):
+                break
+        if depth < step.max_depth:
+            calls += legacy_calls(child, step, depth + 1)
+    return calls
+
+
+def descendants_calls(root, step):
+    '''按子孙控件一次FindAll，再对每个结果沿父元素向上检查深度
+    '''
+    matched = [e for e in root.descendants()
+               if all(p.match(CONTROL_TYPES[e.props[UIA.UIA_ControlTypePropertyId]]) for p in step.predicates)]
+    calls = 1
+    for element in matched:
+        parent, depth = element.parent, 1
+        while parent is not root and depth <= step.max_depth:
+            parent, depth = parent.parent, depth + 1
+        calls += depth * 2 #GetParentElement、CompareElements
+    return calls
+
+
+def main():
+    translator = ConditionTranslator(Client(), UIA, CONTROL_TYPES)
+    qpaths = ["/ClassName='ListViewItem' && Name='row7'",
+              "/ControlType='DataItem' && Name~='^row1'",
+              "/ClassName='Border'"]
+    print("%-60s %8s %10s %10s" % ("qpath", "elements", "legacy", "pushdown"))
+    for count in (500, 5000):
+        root = build_tree(count)
+        for qpath in qpaths:
+            step = qpathplan.compile_qpath(qpath).steps[0]
+            legacy = legacy_calls(root, step)
+            Client.calls = 0
+            elements, residual = translator.find_all(root, step)
+            Client.calls += len(elements) * len(residual.predicates)
+            print("%-60s %8d %10d %10d" % (qpath, count, legacy, Client.calls))
+    print("")
+    print("%-60s %8s %10s %12s" % ("qpath (deep)", "elements", "legacy", "descendants"))
+    for count in (500, 5000):
+        root = build_tree(count)
+        step = qpathplan.compile_qpath("/ControlType='DataItem' && MaxDepth='3'").steps[0]
+        print("%-60s %8d %10d %12d" % (step, count, legacy_calls(root, step), descendants_calls(root, step)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''控件树快照的性能测试
+
+在1万/10万个节点的合成控件树上统计快照的文件大小(与逐节点保存属性的JSON对比)、
+mmap加载时间、离线QPath查找时间和两个快照的diff时间::
+
+    python benchmarks/bench_uisnapshot.py
+'''
+
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c import uisnapshot
+
+
+def build(count, width=8, seed=1):
+    rnd = random.Random(seed)
+    builder = uisnapshot.SnapshotBuilder()
+    builder.add(-1, 'UIA', {'ClassName': 'Root', 'Name': 'root'})
+    for node in range(1, count):
+        builder.add((node - 1) // width, 'UIA', {
+            'ClassName': rnd.choice(['Panel', 'Button', 'Edit', 'Static']),
+            'ControlType': rnd.choice(['Pane', 'Button', 'Edit', 'Text', 'DataItem']),
+            'Name': 'item%d' % node,
+            'Enabled': rnd.random() < 0.9,
+            'ProcessId': 1234,
+        })
+    return builder.build()
+
+
+def main():
+    tempdir = tempfile.mkdtemp()
+    print("%8s %10s %10s %10s %10s %10s" % ("nodes", "size(KB)", "json(KB)", "load(ms)", "search(ms)", "diff(ms)"))
+    try:
+        for count in (10000, 100000):
+            snapshot = build(count)
+            path = os.path.join(tempdir, 'tree.uisnap')
+            snapshot.save(path)
+            json_size = len(json.dumps([node.to_dict() for node in snapshot]))
+            start = time.time()
+            loaded = uisnapshot.UISnapshot.load(path)
+            load_time = time.time() - start
+            start = time.time()
+            found = loaded.search("/ClassName='Panel' && MaxDepth='3'/ControlType='DataItem' && Name~='9$' && MaxDepth='20'")
+            search_time = time.time() - start
+            assert found
+            start = time.time()
+            assert not loaded.diff(snapshot)
+            diff_time = time.time() - start
+            loaded.close()
+            print("%8d %10.1f %10.1f %10.2f %10.1f %10.1f" % (count, os.path.getsize(path) / 1024.0, json_size / 1024.0,
+                                                             load_time * 1000, search_time * 1000, diff_time * 1000))
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''控件等待的性能测试
+
+若干个等待者同时等待各自顶层窗口中的控件出现，控件在随机时间后出现，期间其他窗口中不断
+产生事件。统计按0.5秒轮询和基于WinEvent唤醒两种方式下重新查找的次数和平均等待延迟::
+
+    python benchmarks/bench_winevent.py
+'''
+
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from testbase.util import Timeout
+from qt4c import winevent
+from qt4c.winevent import WaiterService, SyntheticEventSource
+
+
+class Target(object):
+    def __init__(self, appear_at):
+        self.appear_at = appear_at
+        self.searches = 0
+        self.found_at = None
+
+    def search(self):
+        self.searches += 1
+        if time.time() >= self.appear_at:
+            self.found_at = time.time()
+            return True
+        return False
+
+
+def run(mode, waiters=20, duration=1.5, interval=0.5, seed=1):
+    rnd = random.Random(seed)
+    start = time.time()
+    targets = [Target(start + rnd.uniform(0.1, duration)) for _ in range(waiters)]
+    source = SyntheticEventSource()
+    service = WaiterService(source, root_of=lambda hwnd: hwnd)
+
+    def wait(index, target):
+        if mode == 'poll':
+            Timeout(10, interval).retry(target.search, (), (), bool)
+        else:
+            service.wait(target.search, 10, interval, [index + 1])
+
+    threads = [threading.Thread(target=wait, args=(i, t)) for i, t in enumerate(targets)]
+    for thread in threads:
+        thread.start()
+    pending = set(range(waiters))
+    noise = 0
+    while pending:
+        now = time.time()
+        for i in list(pending):
+            if now >= targets[i].appear_at:
+                source.emit(winevent.EVENT_OBJECT_CREATE, i + 1)
+                pending.discard(i)
+        source.emit(winevent.EVENT_OBJECT_NAMECHANGE, 1000 + noise % 50) #无关窗口的事件
+        noise += 1
+        time.sleep(0.005)
+    for thread in threads:
+        thread.join()
+    searches = sum(t.searches for t in targets)
+    latency = sum(t.found_at - t.appear_at for t in targets) / waiters
+    return searches, latency
+
+
+def main():
+    print("%-6s %8s %12s" % ("mode", "searches", "latency(ms)"))
+    for mode in ('poll', 'event'):
+        searches, latency = run(mode)
+        print("%-6s %8d %12.1f" % (mode, searches, latency * 1000))
+
+
+if __name__ == '__main__':
+    main()
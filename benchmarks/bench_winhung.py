@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''无响应窗口登记的性能测试
+
+在一个线程中创建顶层窗口后不再处理消息，使其无响应，然后反复以Caption正则在桌面顶层窗口中查找一个不存在的
+窗口，比较关闭/开启无响应窗口登记(winhung.get_registry().enabled)时每次查找的耗时::
+
+    python benchmarks/bench_winhung.py
+'''
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win32api
+import win32gui
+
+from qt4c import winhung
+from qt4c.qpath import QPath
+
+
+def make_hung_window():
+    '''在新线程中创建一个窗口，之后该线程不再处理消息
+    '''
+    created = []
+    ready = threading.Event()
+
+    def run():
+        wc = win32gui.WNDCLASS()
+        wc.lpszClassName = 'QT4CHungWindowBench'
+        wc.lpfnWndProc = {}
+        wc.hInstance = win32api.GetModuleHandle(None)
+        win32gui.RegisterClass(wc)
+        created.append(win32gui.CreateWindow(wc.lpszClassName, 'hung', 0, 0, 0, 10, 10, 0, 0, wc.hInstance, None))
+        ready.set()
+        time.sleep(3600)
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    ready.wait()
+    return created[0]
+
+
+def main(searches=5):
+    hwnd = make_hung_window()
+    qpath = QPath("/Caption~='^QT4C no such window$'") #正则匹配不会下推给FindWindowEx，需要逐个读取标题
+    registry = winhung.get_registry()
+    print("hung window: 0x%X" % hwnd)
+    print("%-10s %10s %14s" % ("registry", "searches", "time/search(ms)"))
+    for enabled in (False, True):
+        registry.enabled = enabled
+        registry.clear()
+        start = time.time()
+        for _ in range(searches):
+            qpath.search()
+        elapsed = time.time() - start
+        print("%-10s %10d %14.1f" % (enabled, searches, elapsed * 1000 / searches))
+    registry.enabled = True
+
+
+if __name__ == '__main__':
+    main()
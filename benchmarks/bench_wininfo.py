@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''Win32窗口属性批量读取的性能测试
+
+对当前桌面的顶层窗口，统计几种典型操作中每个窗口的user32/DPI调用次数及耗时：逐个读取属性、
+QPath匹配多个窗口属性、MetisView.rect及计算点击坐标，比较逐个读取与使用WindowInfo的差别::
+
+    python benchmarks/bench_wininfo.py
+'''
+
+import ctypes
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win32gui
+import win32process
+
+from qt4c import qpath
+from qt4c import qpathengine
+from qt4c import qpathplan
+from qt4c import util
+from qt4c import wininfo
+from qt4c.wincontrols import Control
+
+CALLS = [0]
+PROPERTIES = ['ClassName', 'Style', 'ExStyle', 'Visible', 'Enabled', 'ProcessId', 'ThreadId', 'BoundingRect']
+
+
+def count_calls(owner, name):
+    func = getattr(owner, name)
+
+    def wrapper(*args):
+        CALLS[0] += 1
+        return func(*args)
+    setattr(owner, name, wrapper)
+
+
+def instrument():
+    for name in ('GetClassName', 'GetWindowLong', 'GetWindowRect', 'IsWindow', 'IsWindowVisible',
+                 'IsWindowEnabled', 'GetDesktopWindow'):
+        count_calls(win32gui, name)
+    count_calls(win32process, 'GetWindowThreadProcessId')
+    for name in ('GetWindowInfo', 'GetDpiForWindow'):
+        count_calls(ctypes.windll.user32, name)
+
+
+def read_all(ctrl):
+    for name in PROPERTIES:
+        getattr(ctrl, name)
+
+
+def legacy_metis_rect(ctrl):
+    '''修改前的MetisView.rect：读取4次BoundingRect
+    '''
+    abs(ctrl.BoundingRect.Right - ctrl.BoundingRect.Left)
+    abs(ctrl.BoundingRect.Top - ctrl.BoundingRect.Bottom)
+
+
+def legacy_click_xy(ctrl):
+    '''修改前的click：hover和_getClickXY各读取2次BoundingRect
+    '''
+    for _ in range(2):
+        if ctrl.BoundingRect:
+            ctrl.BoundingRect.All
+
+
+def main():
+    hwnds = []
+    win32gui.EnumWindows(lambda hwnd, _: hwnds.append(hwnd), None)
+    controls = [Control(root=hwnd) for hwnd in hwnds]
+    instrument()
+    step = qpathplan.compile_qpath("/ClassName='Dialog' && Visible='True' && Enabled='True' && "
+                                   "ProcessId='4' && ThreadId='1'").steps[0]
+    old_engine = qpathengine.QPathEngine(qpathengine.ObjectTreeProvider())
+
+    def new_match(ctrl):
+        qpathengine.QPathEngine(qpath.ControlTreeProvider(qpath.QPath.CONTROL_TYPES)).match(ctrl, step)
+
+    def scoped(func):
+        def run(ctrl):
+            with wininfo.scope():
+                func(ctrl)
+        return run
+
+    def click_xy(ctrl):
+        with ctrl._property_scope():
+            ctrl._getClickXY(None, None)
+            ctrl._getClickXY(None, None)
+
+    cases = [
+        ('read 8 properties', read_all, scoped(read_all)),
+        ('QPath match 5 properties', lambda ctrl: old_engine.match(ctrl, step), new_match),
+        ('MetisView.rect', legacy_metis_rect, lambda ctrl: util.MetisView(ctrl).rect),
+        ('hover + click position', legacy_click_xy, click_xy),
+    ]
+    print("%d windows" % len(controls))
+    print("%-26s %14s %14s %12s %12s" % ("case", "calls/window", "(WindowInfo)", "time(us)", "(WindowInfo)"))
+    for name, before, after in cases:
+        row = []
+        for func in (before, after):
+            CALLS[0] = 0
+            start = time.time()
+            for ctrl in controls:
+                try:
+                    func(ctrl)
+                except win32gui.error: #窗口已销毁
+                    pass
+            elapsed = time.time() - start
+            row.append((CALLS[0] / max(len(controls), 1), elapsed * 1e6 / max(len(controls), 1)))
+        print("%-26s %14.1f %14.1f %12.1f %12.1f" % (name, row[0][0], row[1][0], row[0][1], row[1][1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''Win32条件下推的性能测试
+
+模拟一个有数百个顶层窗口的桌面，统计常见定位符的系统调用次数。旧版枚举全部顶层窗口，
+再逐个读取属性(GetClassName、GetWindowThreadProcessId各计一次)；下推后由FindWindowEx
+直接返回候选窗口，不能下推的定位符(如只有ProcessId)与旧版相同::
+
+    python benchmarks/bench_winpushdown.py
+'''
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c import qpathplan
+from qt4c.winpushdown import find_children
+from qt4c.wintree import WindowBackend
+
+DESKTOP = 1
+
+
+class FakeDesktop(WindowBackend):
+    def __init__(self, count, seed=0):
+        rng = random.Random(seed)
+        classes = ['Chrome_WidgetWin_1', 'IME', 'MSCTFIME UI', 'tooltips_class32', 'TxGuiFoundation']
+        self.windows = []
+        for i in range(count):
+            tid = rng.randint(1, count // 4)
+            self.windows.append((1000 + i, rng.choice(classes), tid, tid % 40))
+        self.windows.insert(count // 2, (999, 'Shell_TrayWnd', 1, 1))
+        self.windows.insert(count // 3, (998, 'AssistWnd', 7, 7))
+        self.calls = 0
+
+    def desktop_window(self):
+        return DESKTOP
+
+    def top_level_windows(self):
+        self.calls += len(self.windows)
+        return [w[0] for w in self.windows]
+
+    def find_window_ex(self, parent, after, classname=None, caption=None):
+        self.calls += 1
+        start = 0
+        if after:
+            start = [w[0] for w in self.windows].index(after) + 1
+        for w in self.windows[start:]:
+            if w[1].upper() == classname.upper():
+                return w[0]
+        return 0
+
+
+def legacy_calls(desktop, step):
+    '''枚举全部顶层窗口，逐个读取属性
+    '''
+    desktop.calls = 0
+    for hwnd, classname, tid, pid in desktop.windows:
+        values = {'CLASSNAME': classname, 'PROCESSID': pid}
+        for predicate in step.predicates:
+            desktop.calls += 1
+            if not predicate.match(values[predicate.key]):
+                break
+    return desktop.calls + len(desktop.windows) #EnumWindows回调
+
+
+def main():
+    qpaths = ["/ClassName='Shell_TrayWnd'", "/classname='AssistWnd' && processid='7'", "/ProcessId='7'"]
+    print("%-45s %8s %10s %10s" % ("qpath", "windows", "legacy", "pushdown"))
+    for count in (200, 1000):
+        desktop = FakeDesktop(count)
+        for qpath in qpaths:
+            step = qpathplan.compile_qpath(qpath).steps[0]
+            legacy = legacy_calls(desktop, step)
+            desktop.calls = 0
+            if find_children(desktop, DESKTOP, step) is None:
+                pushdown = legacy_calls(desktop, step)
+            else:
+                pushdown = desktop.calls
+            print("%-45s %8d %10d %10d" % (qpath, count, legacy, pushdown))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''窗口树快照的性能测试
+
+在合成的窗口树上做一次MaxDepth覆盖整棵树的深度优先遍历，统计跨进程调用次数
+(EnumChildWindows回调和GetAncestor各计一次)。旧版每一层都重新枚举全部子孙窗口，
+快照对整棵子树只枚举一次::
+
+    python benchmarks/bench_wintree.py
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qt4c.wintree import WindowBackend, WindowTreeSnapshot
+
+
+class FakeWindowBackend(WindowBackend):
+    '''按层级生成的窗口树，每个子孙窗口计一次枚举回调和一次GetAncestor
+    '''
+    DESKTOP = 1
+
+    def __init__(self, width, depth):
+        self.tree = {}
+        self.calls = 0
+        next_hwnd = [100]
+        def build(parent, level):
+            if level == depth:
+                return
+            children = []
+            for _ in range(width):
+                next_hwnd[0] += 1
+                children.append(next_hwnd[0])
+            self.tree[parent] = children
+            for child in children:
+                build(child, level + 1)
+        build(self.DESKTOP + 1, 0)
+
+    def desktop_window(self):
+        return self.DESKTOP
+
+    def top_level_windows(self):
+        return [self.DESKTOP + 1]
+
+    def enum_descendants(self, hwnd):
+        result = []
+        def walk(parent):
+            for child in self.tree.get(parent, []):
+                result.append((child, parent))
+                walk(child)
+        walk(hwnd)
+        self.calls += 2 * len(result)
+        return result
+
+    def legacy_children(self, hwnd):
+        '''旧版Control.Children：枚举全部子孙后逐个调用GetAncestor过滤
+        '''
+        return [child for child, parent in self.enum_descendants(hwnd) if parent == hwnd]
+
+
+def walk(children, hwnd):
+    count = 0
+    for child in children(hwnd):
+        count += 1 + walk(children, child)
+    return count
+
+
+def main():
+    print("%6s %6s %8s %-9s %12s %10s" % ("width", "depth", "windows", "mode", "calls", "ms"))
+    for width, depth in ((10, 2), (10, 3), (5, 5), (4, 7)):
+        backend = FakeWindowBackend(width, depth)
+        root = FakeWindowBackend.DESKTOP + 1
+        for name in ("legacy", "snapshot"):
+            backend.calls = 0
+            start = time.time()
+            if name == "legacy":
+                count = walk(backend.legacy_children, root)
+            else:
+                count = walk(WindowTreeSnapshot(backend).children, root)
+            elapsed = (time.time() - start) * 1000
+            print("%6d %6d %8d %-9s %12d %10.1f" % (width, depth, count, name, backend.calls, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,7 @@
 控件基类模块
 '''
 from __future__ import division
+import contextlib
 import six
 
 from testbase.util import Timeout
@@ -16,6 +17,10 @@ from qt4c.mouse import Mouse, MouseFlag, MouseClickType
 from qt4c.keyboard import Keyboard
 from qt4c.util import MetisView
 #__all__=['Control']
+
+@contextlib.contextmanager
+def _no_scope():
+    yield
     
 #===============================================================================
 # 基础控件类定义
@@ -83,9 +88,10 @@ class Control(object):
                                                                默认值为None，代表控件区域y轴上的中点；
                                                               如果为负值，代表距离控件区域上边的绝对值偏移；
         '''
-        if not self.BoundingRect:
+        rect = self.BoundingRect
+        if not rect:
             return
-        (l, t, r, b) = self.BoundingRect.All
+        (l, t, r, b) = rect.All
         if xOffset is None:
             x = (l + r) // 2
         else:
@@ -116,16 +122,18 @@ class Control(object):
         :type yOffset: int
         :param yOffset: 距离控件区域左上角的偏移。 默认值为None，代表控件区域y轴上的中点。如果为负值，代表距离控件区域右上角的y轴上的绝对值偏移。
         '''
-        self.hover()
-        x, y = self._getClickXY(xOffset, yOffset)
+        with self._property_scope():
+            self.hover()
+            x, y = self._getClickXY(xOffset, yOffset)
         Mouse.click(x, y, mouseFlag, clickType)
         
     def _getClickXY(self, xOffset, yOffset):
         '''通过指定的偏移值确定具体要点击的x,y坐标
         '''
-        if not self.BoundingRect:
+        rect = self.BoundingRect
+        if not rect:
             return
-        (l, t, r, b) = self.BoundingRect.All
+        (l, t, r, b) = rect.All
         if xOffset is None:
             x = (l + r) // 2
         else:
@@ -150,7 +158,8 @@ class Control(object):
     def hover(self):
         """鼠标移动到该控件上
         """
-        if not self.BoundingRect:
+        rect = self.BoundingRect
+        if not rect:
             return
 #        (l, t, r, b) = (self.BoundingRect.Left, 
 #                        self.BoundingRect.Top,
@@ -158,7 +167,7 @@ class Control(object):
 #                        self.BoundingRect.Bottom
 #                        )
 
-        x, y = self.BoundingRect.Center.All
+        x, y = rect.Center.All
         Mouse.move(x, y)
         
     def rightClick(self, xOffset=None, yOffset=None):
@@ -173,13 +182,10 @@ class Control(object):
     def drag(self, toX, toY):
         '''拖拽控件到指定位置
         '''
-        if not self.BoundingRect:
+        rect = self.BoundingRect
+        if not rect:
             return
-        (l, t, r, b) = (self.BoundingRect.Left, 
-                        self.BoundingRect.Top,
-                        self.BoundingRect.Right,
-                        self.BoundingRect.Bottom
-                        )
+        (l, t, r, b) = rect.All
         x, y = (l + r) // 2, (t + b) // 2
         Mouse.drag(x, y, toX, toY)
 
@@ -224,6 +230,40 @@ class Control(object):
         :param other: 本对象实例
         '''
         raise NotImplementedError("please implement in sub class")
+    
+    @property
+    def IdentityKey(self):
+        '''返回控件的标识，两个控件equal时标识相同。未实现!
+        '''
+        raise NotImplementedError("please implement in sub class")
+    
+    def _is_stale(self):
+        '''控件已定位且已失效时返回True，供ControlContainer判断缓存的控件能否复用
+        
+        尚未定位的控件返回False，使用时才会查找。子类应使用低代价的检查，如窗口句柄是否有效。
+        '''
+        return False
+    
+    def _is_resolved(self):
+        '''控件是否已定位，未定位的控件计算哈希值时不会为读取IdentityKey而查找
+        
+        默认认为已定位。
+        '''
+        return True
+    
+    def _bind_prefetched(self):
+        '''ControlContainer.resolve_all批量查找后调用，子类可直接使用定位符中的预取结果完成定位
+        
+        默认不处理，控件仍在使用时才查找。
+        '''
+        pass
+    
+    def _property_scope(self):
+        '''返回一次操作内复用控件属性的上下文，如wincontrols.Control在其中每个窗口的属性只读取一次
+        
+        默认不复用属性。
+        '''
+        return _no_scope()
         
     def __eq__(self, other):
         """重载对象恒等操作符(==)
@@ -235,6 +275,22 @@ class Control(object):
         """
         return (not self.equal(other))
     
+    def __hash__(self):
+        """与equal一致的哈希值，由已定位控件的IdentityKey计算；控件尚未定位或子类未实现IdentityKey时按对象本身计算
+        
+        哈希值第一次计算后不再改变，控件之后定位也不影响已放入set或dict中的控件。
+        """
+        value = self.__dict__.get('_hash_value')
+        if value is None:
+            value = id(self)
+            if self._is_resolved():
+                try:
+                    value = hash(self.IdentityKey)
+                except NotImplementedError:
+                    pass
+            self._hash_value = value
+        return value
+    
     def get_metis_view(self):
         '''返回MetisView
         '''
@@ -254,14 +310,34 @@ class ControlContainer(object):
     则SysSettingWin().Controls['常规页']返回设置窗口上常规页的uia.Control实例,
     而SysSettingWin().Controls['退出程序单选框']，返回设置窗口的常规页下的退出程序单选框实例。
     其中'root'='@常规页'中的'@常规页'表示参数'root'的值不是这个字符串，而是key'常规页'指定的控件。
+    
+    默认每次获取都重新创建控件。子类将_memoize_controls设为True时，创建的控件(control.Control的实例)
+    会被缓存，再次获取时只要该控件及其'@'依赖的控件都没有失效(见Control._is_stale)就直接返回，
+    失效的控件及依赖它的控件在下次获取时重新创建。缓存的控件一直绑定已定位的窗口，定位符之后匹配到的
+    新窗口(如同一对话框的另一个实例)不会被发现，需要时可调用invalidate主动使缓存失效。
     '''
     
+    _memoize_controls = False #是否缓存创建的控件
+    
     def __init__(self):
         self._locators = {}
+        self.__resolved = {}
+    
+    def __resolved_controls(self):
+        '''控件名 => 已创建的控件
+        '''
+        try:
+            return self.__resolved
+        except AttributeError: #子类未调用ControlContainer.__init__
+            self.__resolved = {}
+            return self.__resolved
     
     def __findctrl_recur(self, ctrlkey):
         if not (ctrlkey in self._locators.keys()):
             raise NameError("%s没有名为'%s'的子控件！" % (type(self), ctrlkey))
+        ctrl = self.__reuse(ctrlkey)
+        if ctrl is not None:
+            return ctrl
         params = self._locators[ctrlkey].copy()
         ctrltype = params['type']
         del params['type']
@@ -269,6 +345,65 @@ class ControlContainer(object):
             value = params[key]
             if isinstance(value, six.string_types) and value.startswith('@'):
                 params[key] = self.__findctrl_recur(value[1:])
+        ctrl = self.__create_ctrl(ctrlkey, ctrltype, params)
+        self.__remember(ctrlkey, ctrl)
+        return ctrl
+    
+    def __remember(self, ctrlkey, ctrl):
+        if self._memoize_controls and isinstance(ctrl, Control):
+            self.__resolved_controls()[ctrlkey] = ctrl
+    
+    def __reuse(self, ctrlkey):
+        '''返回缓存的控件，控件或其依赖的控件已失效时使其失效并返回None
+        '''
+        if not self._memoize_controls:
+            return None
+        resolved = self.__resolved_controls()
+        ctrl = resolved.get(ctrlkey)
+        if ctrl is None:
+            return None
+        stale = self.__find_stale(ctrlkey, resolved, set())
+        if stale is not None:
+            self.invalidate(stale)
+            return None
+        return ctrl
+    
+    def __find_stale(self, ctrlkey, resolved, checked):
+        '''返回ctrlkey及其依赖中未缓存或已失效的控件名，都有效时返回None
+        '''
+        if ctrlkey in checked:
+            return None
+        checked.add(ctrlkey)
+        ctrl = resolved.get(ctrlkey)
+        if ctrl is None or ctrlkey not in self._locators or ctrl._is_stale():
+            return ctrlkey
+        for dep in self.__dependencies(self._locators[ctrlkey]):
+            stale = self.__find_stale(dep, resolved, checked)
+            if stale is not None:
+                return stale
+        return None
+    
+    def invalidate(self, ctrlkey=None):
+        '''使缓存的控件失效，下次获取时重新创建；以'@ctrlkey'为参数的控件也一并失效
+        
+        :type ctrlkey: string
+        :param ctrlkey: 控件名，默认为全部控件
+        '''
+        resolved = self.__resolved_controls()
+        if ctrlkey is None:
+            resolved.clear()
+            return
+        pending = [ctrlkey]
+        invalidated = set(pending)
+        while pending:
+            key = pending.pop()
+            resolved.pop(key, None)
+            for other, params in self._locators.items():
+                if other not in invalidated and key in self.__dependencies(params):
+                    invalidated.add(other)
+                    pending.append(other)
+    
+    def __create_ctrl(self, ctrlkey, ctrltype, params):
         if issubclass(ctrltype, Control):
             return ctrltype(**params)
         else:
@@ -278,6 +413,94 @@ class ControlContainer(object):
             return ctrltype(root, ctrlkey, **params)
         
         
+    @staticmethod
+    def __dependencies(params):
+        return [value[1:] for value in params.values() 
+                if isinstance(value, six.string_types) and value.startswith('@')]
+    
+    def __locator_levels(self, keys):
+        '''按'@key'依赖关系将控件分层，每个控件只依赖前面层中的控件
+        '''
+        depths = {}
+        def get_depth(ctrlkey, visiting):
+            if ctrlkey in depths:
+                return depths[ctrlkey]
+            if not (ctrlkey in self._locators.keys()):
+                raise NameError("%s没有名为'%s'的子控件！" % (type(self), ctrlkey))
+            if ctrlkey in visiting:
+                raise ValueError("%s的子控件'%s'的定位参数存在循环依赖" % (type(self), ctrlkey))
+            visiting.add(ctrlkey)
+            deps = self.__dependencies(self._locators[ctrlkey])
+            depths[ctrlkey] = max([get_depth(dep, visiting) + 1 for dep in deps] or [0])
+            visiting.discard(ctrlkey)
+            return depths[ctrlkey]
+        for ctrlkey in keys:
+            get_depth(ctrlkey, set())
+        levels = [[] for _ in range(max(depths.values()) + 1)] if depths else []
+        for ctrlkey in sorted(depths, key=lambda k: str(k)):
+            levels[depths[ctrlkey]].append(ctrlkey)
+        return levels
+        
+    def resolve_all(self, keys=None):
+        '''批量获取控件，同一个root下的多个QPath只遍历一次控件树
+        
+        按'@key'依赖的拓扑顺序逐层处理，同一层中root相同的QPath定位符由QPath.search_many一起查找，
+        查找结果预取到各QPath中，创建控件时立即绑定；没有绑定的预取结果在返回前丢弃，
+        之后的查找不会用到过期的结果。控件类没有实现_bind_prefetched时(如uiacontrols.Control)
+        其定位符不参与批量查找，控件仍在使用时才查找，避免同一定位符查找两次。
+        
+        :type keys: list
+        :param keys: 要获取的控件名列表，默认为全部控件
+        :rtype: dict
+        :return: 控件名到控件实例的字典，_memoize_controls为True时控件同时被缓存
+        '''
+        if keys is None:
+            keys = list(self._locators.keys())
+        controls = {}
+        prefetched = []
+        try:
+            self.__resolve_levels(keys, controls, prefetched)
+        finally:
+            for locator in prefetched:
+                locator.clear_prefetched()
+        return dict((ctrlkey, controls[ctrlkey]) for ctrlkey in keys)
+    
+    @staticmethod
+    def __binds_prefetched(ctrltype):
+        '''控件类是否会使用预取的查找结果
+        '''
+        if not issubclass(ctrltype, Control):
+            return False
+        return six.get_unbound_function(ctrltype._bind_prefetched) is not six.get_unbound_function(Control._bind_prefetched)
+    
+    def __resolve_levels(self, keys, controls, prefetched):
+        for level in self.__locator_levels(keys):
+            entries = []
+            groups = {} #id(root) -> (root, [locator])
+            for ctrlkey in level:
+                params = self._locators[ctrlkey].copy()
+                ctrltype = params.pop('type')
+                for key in params:
+                    value = params[key]
+                    if isinstance(value, six.string_types) and value.startswith('@'):
+                        params[key] = controls[value[1:]]
+                entries.append((ctrlkey, ctrltype, params))
+                locator = params.get('locator')
+                if self.__binds_prefetched(ctrltype) and hasattr(locator, 'search_many'):
+                    root = params.get('root')
+                    groups.setdefault(id(root), (root, []))[1].append(locator)
+            for root, locators in groups.values():
+                if len(locators) > 1:
+                    results = type(locators[0]).search_many(root, locators)
+                    for locator, found in zip(locators, results):
+                        locator.prefetch(root, found)
+                        prefetched.append(locator)
+            for ctrlkey, ctrltype, params in entries:
+                controls[ctrlkey] = self.__create_ctrl(ctrlkey, ctrltype, params)
+                if isinstance(controls[ctrlkey], Control):
+                    controls[ctrlkey]._bind_prefetched()
+                self.__remember(ctrlkey, controls[ctrlkey])
+        
     def __getitem__(self, index):
         '''获取index指定控件
         
@@ -290,6 +513,7 @@ class ControlContainer(object):
         '''清空控件定位参数
         '''
         self._locators = {}
+        self.invalidate()
     
     def hasControlKey(self, control_key):
         '''是否包含控件control_key
@@ -304,7 +528,9 @@ class ControlContainer(object):
         :type locators: dict
         :param locators: 定位参数，格式是 {'控件名':{'type':控件类, 控件类的参数dict列表}, ...}
         '''
-        self._locators.update(locators)    
+        self._locators.update(locators)
+        for ctrlkey in locators:
+            self.invalidate(ctrlkey)    
      
     def isChildCtrlExist(self, childctrlname):
         '''判断指定名字的子控件是否存在
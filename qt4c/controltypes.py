@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+控件类型注册模块
+
+QPath中的UIType取值与控件类的对应关系在进程内只维护一份。"qt4c.controls"入口点
+只在第一次查询时加载一次，之后的QPath构造和查找不再扫描入口点。
+
+插件可以通过入口点注册控件类型::
+
+    entry_points={'qt4c.controls': ['Html = mypkg.htmlcontrols:Control']}
+
+也可以在代码中直接注册::
+
+    from qt4c.controltypes import register_control_type
+    register_control_type('Html', htmlcontrols.Control)
+'''
+
+import threading
+
+
+ENTRY_POINT_GROUP = "qt4c.controls"
+
+
+def iter_entry_points(group):
+    '''遍历group下的入口点，优先使用importlib.metadata，避免导入pkg_resources
+
+    :return: 可调用load()的入口点对象列表
+    '''
+    try:
+        from importlib import metadata
+    except ImportError:
+        try:
+            import importlib_metadata as metadata
+        except ImportError:
+            metadata = None
+    if metadata is not None:
+        eps = metadata.entry_points()
+        if hasattr(eps, 'select'):
+            return list(eps.select(group=group))
+        return list(eps.get(group, []))
+    import pkg_resources
+    return list(pkg_resources.iter_entry_points(group))
+
+
+class ControlTypeRegistry(object):
+    '''UIType到控件类的进程级注册表
+
+    查找顺序为：register注册的类型 > 入口点注册的类型 > 内置类型
+    '''
+
+    def __init__(self, group=ENTRY_POINT_GROUP, entry_point_loader=iter_entry_points):
+        '''Constructor
+
+        :param group: 入口点分组名
+        :param entry_point_loader: 入口点遍历函数，参数为分组名
+        '''
+        self._group = group
+        self._entry_point_loader = entry_point_loader
+        self._lock = threading.RLock()
+        self._builtin = {}
+        self._registered = {}
+        self._plugins = None
+        self._types = None
+
+    def _ensure_loaded(self):
+        types = self._types
+        if types is not None:
+            return types
+        with self._lock:
+            if self._types is None:
+                if self._plugins is None:
+                    plugins = {}
+                    for ep in self._entry_point_loader(self._group):
+                        plugins[ep.name] = ep.load()
+                    self._plugins = plugins
+                types = dict(self._builtin)
+                types.update(self._plugins)
+                types.update(self._registered)
+                self._types = types
+            return self._types
+
+    def register_builtin(self, uitype, control_class):
+        '''注册内置控件类型，优先级低于入口点和register注册的类型
+        '''
+        with self._lock:
+            self._builtin[uitype] = control_class
+            self._types = None
+
+    def register(self, uitype, control_class):
+        '''注册控件类型
+
+        :param uitype: QPath中的UIType取值
+        :param control_class: 控件类，构造函数需支持control_class(root)
+        '''
+        with self._lock:
+            self._registered[uitype] = control_class
+            self._types = None
+
+    def unregister(self, uitype):
+        '''取消register注册的控件类型
+        '''
+        with self._lock:
+            self._registered.pop(uitype, None)
+            self._types = None
+
+    def refresh(self):
+        '''重新加载入口点，用于运行时安装了新的插件的情况
+        '''
+        with self._lock:
+            self._plugins = None
+            self._types = None
+        self._ensure_loaded()
+
+    def __getitem__(self, uitype):
+        return self._ensure_loaded()[uitype]
+
+    def __setitem__(self, uitype, control_class):
+        self.register(uitype, control_class)
+
+    def __contains__(self, uitype):
+        return uitype in self._ensure_loaded()
+
+    def __iter__(self):
+        return iter(self._ensure_loaded())
+
+    def __len__(self):
+        return len(self._ensure_loaded())
+
+    def get(self, uitype, default=None):
+        return self._ensure_loaded().get(uitype, default)
+
+    def keys(self):
+        return list(self._ensure_loaded().keys())
+
+    def items(self):
+        return list(self._ensure_loaded().items())
+
+
+registry = ControlTypeRegistry()
+
+def register_control_type(uitype, control_class):
+    '''注册QPath可用的控件类型，详见ControlTypeRegistry.register
+    '''
+    registry.register(uitype, control_class)
+
+def refresh():
+    '''重新加载"qt4c.controls"入口点
+    '''
+    registry.refresh()
@@ -36,19 +36,18 @@ class FileDialog(win.Window, ControlContainer):
         '''
         import ctypes
         import win32con, win32gui
-        import qt4c.util as util
+        from qt4c import procmem
         
         hwnd = self.HWnd
         size = win32con.MAX_PATH
         pid = self.ProcessId
-        pm = util.ProcessMem(pid, size)
         msgid = win32con.CDM_GETFILEPATH
-        rdsize = win32gui.SendMessage(hwnd, msgid, size, pm.Buffer)
-        if rdsize <= 0:
-            return None
-        else:
-            buff = ctypes.create_unicode_buffer(rdsize)
-            pm.read(buff, ctypes.sizeof(buff))
+        with procmem.get_arena(pid).allocate(size * ctypes.sizeof(ctypes.c_wchar)) as block:
+            rdsize = win32gui.SendMessage(hwnd, msgid, size, block.Address)
+            if rdsize <= 0:
+                return None
+            buff = ctypes.create_unicode_buffer(min(rdsize, size))
+            block.read_into(buff)
             if six.PY2:
                 return buff.value.encode('utf8')
             return buff.value
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+控件定位提示缓存模块
+
+界面稳定时，同一个root下的同一个QPath每次都找到同一个控件。LocatorHintCache以(root标识, QPath)
+为键，记录上一次查找时各层定位符匹配到的控件链(Win32控件记录窗口句柄，UIA控件记录元素)。
+下一次查找先重新校验控件链：各控件仍匹配对应定位符的属性，且在上一层控件的MaxDepth层子孙之内；
+校验通过即直接返回，否则再完整查找。
+
+启用后对整个进程中的QPath生效::
+
+    from qt4c.qpath import QPath
+    from qt4c.locatorhint import LocatorHintCache
+    QPath.hint_cache = LocatorHintCache()
+
+:attention: 只有按limit查找(如控件初始化时limit=2)、且只找到一个控件的结果会被记录；提示命中时不再检查
+            是否出现了新的同样匹配的控件。含Instance或UIType的QPath不使用提示。
+'''
+
+import threading
+from collections import OrderedDict
+
+
+class LocatorHintCache(object):
+    '''控件定位提示缓存
+    '''
+
+    def __init__(self, capacity=1024):
+        '''Constructor
+
+        :param capacity: 最多缓存的提示个数
+        '''
+        if capacity < 1:
+            raise ValueError("capacity=%s应该>=1" % capacity)
+        self._capacity = capacity
+        self._lock = threading.Lock()
+        self._hints = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    @property
+    def Capacity(self):
+        '''最多缓存的提示个数
+        '''
+        return self._capacity
+
+    def __len__(self):
+        return len(self._hints)
+
+    def clear(self):
+        '''清空缓存，计数不变
+        '''
+        with self._lock:
+            self._hints.clear()
+
+    def lookup(self, key, validate):
+        '''查找并校验提示
+
+        :param key: (root标识, QPath字符串)
+        :param validate: 校验函数，参数为记录的控件链，返回目标控件，已失效时返回None
+        :return: 目标控件，没有提示或提示已失效时返回None
+        '''
+        with self._lock:
+            chain = self._hints.get(key)
+            if chain is None:
+                self.misses += 1
+                return None
+        try:
+            target = validate(chain)
+        except Exception:
+            target = None
+        with self._lock:
+            if target is None:
+                self.stale += 1
+                if self._hints.get(key) is chain:
+                    del self._hints[key]
+                return None
+            self.hits += 1
+            if key in self._hints:
+                self._hints[key] = self._hints.pop(key) #移到最近使用的位置
+        return target
+
+    def store(self, key, chain):
+        '''记录提示
+
+        :param key: (root标识, QPath字符串)
+        :param chain: 各层定位符匹配到的控件列表
+        '''
+        with self._lock:
+            self._hints.pop(key, None)
+            self._hints[key] = list(chain)
+            while len(self._hints) > self._capacity:
+                self._hints.popitem(last=False)
+
+    def discard(self, key):
+        '''删除提示
+        '''
+        with self._lock:
+            self._hints.pop(key, None)
@@ -0,0 +1,461 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+跨进程内存池模块
+
+util.ProcessMem每个对象都以PROCESS_ALL_ACCESS打开一次目标进程、分配一块远程内存，并依赖__del__释放。
+ProcessArena为每个进程缓存一个只有内存读写权限的句柄，远程内存按2的幂分级从slab中切分，
+用完的块放回空闲链表，下次分配同级大小时直接复用；块以with语句管理生命周期，读取时可直接写入
+bytearray/memoryview或ctypes对象，不经过中间缓冲。
+
+get_arena返回的共用内存池按(进程ID, 进程创建时间)区分，进程ID被复用时不会取到旧进程的内存池；
+每隔SWEEP_INTERVAL秒检查一次所有共用的内存池，关闭进程已退出的内存池。
+
+使用示例::
+
+    arena = procmem.get_arena(pid)
+    rect = wintypes.RECT()
+    with arena.allocate(ctypes.sizeof(rect)) as block:
+        win32gui.SendMessage(hwnd, msg, wparam, block.Address)
+        block.read_into(rect)
+'''
+
+import ctypes
+import threading
+import time
+
+import six
+import win32con
+
+SLAB_SIZE = 64 * 1024 #每个slab的字节数
+PAGE_SIZE = 4096 #大块内存按页对齐
+MIN_BLOCK_SIZE = 64 #最小的分级大小
+STILL_ACTIVE = 259
+SWEEP_INTERVAL = 5.0 #get_arena检查共用内存池的进程是否退出的间隔秒数
+
+
+def _as_local(data, size=None):
+    '''返回(可传给ReadProcessMemory/WriteProcessMemory的本地缓冲, 字节数)
+
+    :param data: ctypes对象、bytes、bytearray或memoryview，除bytes外都不复制数据
+    :param size: 字节数，默认为data的大小
+    '''
+    if isinstance(data, six.binary_type):
+        local, length = ctypes.c_char_p(data), len(data)
+    else:
+        try:
+            length = ctypes.sizeof(data)
+            local = ctypes.byref(data)
+        except TypeError:
+            view = memoryview(data)
+            length = view.nbytes if hasattr(view, 'nbytes') else len(view) * view.itemsize
+            if view.readonly:
+                local = ctypes.c_char_p(view.tobytes())
+            else:
+                local = (ctypes.c_char * length).from_buffer(data)
+    if size is None:
+        size = length
+    elif size > length:
+        raise ValueError("本地缓冲只有%d字节，不足%d字节" % (length, size))
+    return local, size
+
+
+class MemoryBackend(object):
+    '''ProcessArena访问目标进程的接口，测试时可以替换为在本地模拟的实现
+    '''
+
+    def open_process(self, pid):
+        '''打开进程，返回句柄
+        '''
+        raise NotImplementedError()
+
+    def close_handle(self, handle):
+        raise NotImplementedError()
+
+    def is_alive(self, handle):
+        '''句柄对应的进程是否仍在运行
+        '''
+        raise NotImplementedError()
+
+    def create_time(self, pid):
+        '''返回进程的创建时间，与进程ID一起唯一标识进程；进程不存在或无法访问时返回None
+        '''
+        raise NotImplementedError()
+
+    def alloc(self, handle, size):
+        '''在进程中分配size字节的可读写内存，返回地址
+        '''
+        raise NotImplementedError()
+
+    def free(self, handle, address):
+        raise NotImplementedError()
+
+    def read(self, handle, address, local, size):
+        '''从进程的address处读取size字节到本地缓冲local
+        '''
+        raise NotImplementedError()
+
+    def write(self, handle, address, local, size):
+        '''将本地缓冲local的size字节写入进程的address处
+        '''
+        raise NotImplementedError()
+
+
+class Win32MemoryBackend(MemoryBackend):
+    '''以OpenProcess/VirtualAllocEx/ReadProcessMemory/WriteProcessMemory实现的MemoryBackend
+    '''
+    ACCESS = (win32con.PROCESS_VM_OPERATION | win32con.PROCESS_VM_READ | win32con.PROCESS_VM_WRITE
+              | win32con.PROCESS_QUERY_INFORMATION)
+    QUERY_ACCESS = 0x1000 #PROCESS_QUERY_LIMITED_INFORMATION
+
+    def __init__(self):
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        kernel32.OpenProcess.restype = ctypes.c_void_p
+        kernel32.VirtualAllocEx.restype = ctypes.c_void_p
+        kernel32.VirtualAllocEx.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t,
+                                            ctypes.c_ulong, ctypes.c_ulong]
+        kernel32.VirtualFreeEx.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_ulong]
+        for name in ('ReadProcessMemory', 'WriteProcessMemory'):
+            getattr(kernel32, name).argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p,
+                                                ctypes.c_size_t, ctypes.c_void_p]
+        kernel32.GetProcessTimes.argtypes = [ctypes.c_void_p] + [ctypes.c_void_p] * 4
+        self._kernel32 = kernel32
+
+    def open_process(self, pid):
+        handle = self._kernel32.OpenProcess(self.ACCESS, False, pid)
+        if not handle:
+            raise RuntimeError("Fail to open process %d, error %d" % (pid, ctypes.get_last_error()))
+        return handle
+
+    def close_handle(self, handle):
+        self._kernel32.CloseHandle(ctypes.c_void_p(handle))
+
+    def is_alive(self, handle):
+        code = ctypes.c_ulong(0)
+        if not self._kernel32.GetExitCodeProcess(ctypes.c_void_p(handle), ctypes.byref(code)):
+            return False
+        return code.value == STILL_ACTIVE
+
+    def create_time(self, pid):
+        handle = self._kernel32.OpenProcess(self.QUERY_ACCESS, False, pid)
+        if not handle:
+            return None
+        try:
+            times = [ctypes.c_ulonglong(0) for _ in range(4)]
+            if not self._kernel32.GetProcessTimes(handle, *[ctypes.byref(t) for t in times]):
+                return None
+            return times[0].value
+        finally:
+            self._kernel32.CloseHandle(ctypes.c_void_p(handle))
+
+    def alloc(self, handle, size):
+        address = self._kernel32.VirtualAllocEx(handle, None, size, win32con.MEM_COMMIT | win32con.MEM_RESERVE,
+                                                win32con.PAGE_READWRITE)
+        if not address:
+            raise RuntimeError("Fail to alloc remote memory, error %d" % ctypes.get_last_error())
+        return address
+
+    def free(self, handle, address):
+        self._kernel32.VirtualFreeEx(handle, address, 0, win32con.MEM_RELEASE)
+
+    def read(self, handle, address, local, size):
+        if not self._kernel32.ReadProcessMemory(handle, address, local, size, None):
+            raise RuntimeError('Fail to read from remote process memory, error %d' % ctypes.get_last_error())
+
+    def write(self, handle, address, local, size):
+        if not self._kernel32.WriteProcessMemory(handle, address, local, size, None):
+            raise RuntimeError("Fail to write to remote process memory, error %d" % ctypes.get_last_error())
+
+
+class ArenaStats(object):
+    '''ProcessArena的计数器
+    '''
+    __slots__ = ('handles_opened', 'handles_closed', 'remote_allocs', 'remote_frees', 'bytes_reserved',
+                 'blocks_allocated', 'blocks_reused', 'blocks_in_use', 'reads', 'writes')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def as_dict(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __repr__(self):
+        return '<ArenaStats %s>' % ' '.join('%s=%d' % (name, getattr(self, name)) for name in self.__slots__)
+
+
+class RemoteBlock(object):
+    '''ProcessArena分配的一块远程内存，离开with语句或调用release后归还给内存池
+    '''
+    __slots__ = ('Address', 'Size', '_arena', '_capacity', '_generation', '_released')
+
+    def __init__(self, arena, address, size, capacity, generation):
+        self.Address = address
+        self.Size = size
+        self._arena = arena
+        self._capacity = capacity
+        self._generation = generation
+        self._released = False
+
+    def _check(self, offset, size):
+        if self._released:
+            raise RuntimeError("远程内存块已释放")
+        if offset < 0 or offset + size > self.Size:
+            raise ValueError("访问范围[%d, %d)超出了%d字节的内存块" % (offset, offset + size, self.Size))
+
+    def write(self, data, size=None, offset=0):
+        '''将本地数据写入内存块
+
+        :param data: ctypes对象、bytes、bytearray或memoryview
+        :param size: 写入的字节数，默认为data的大小
+        :param offset: 在内存块中的偏移
+        '''
+        local, size = _as_local(data, size)
+        self._check(offset, size)
+        self._arena._write(self.Address + offset, local, size)
+
+    def read_into(self, target, size=None, offset=0):
+        '''将内存块的数据直接读入target
+
+        :param target: ctypes对象、bytearray或可写的memoryview
+        :param size: 读取的字节数，默认为target的大小
+        :param offset: 在内存块中的偏移
+        '''
+        local, size = _as_local(target, size)
+        self._check(offset, size)
+        self._arena._read(self.Address + offset, local, size)
+
+    def read(self, size=None, offset=0):
+        '''读取内存块的数据
+
+        :rtype: bytearray
+        '''
+        if size is None:
+            size = self.Size - offset
+        buf = bytearray(size)
+        self.read_into(buf, size, offset)
+        return buf
+
+    def release(self):
+        '''归还给内存池，可重复调用
+        '''
+        if not self._released:
+            self._released = True
+            self._arena._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def __repr__(self):
+        return '<RemoteBlock 0x%X size=%d>' % (self.Address, self.Size)
+
+
+class ProcessArena(object):
+    '''一个进程的句柄和远程内存池
+
+    不超过slab_size/4字节的请求按2的幂分级，从该级的slab中切分；更大的请求单独分配按页对齐的内存。
+    归还的块按级放入空闲链表，下次分配时优先复用。所有远程内存在close时才释放。
+    '''
+
+    def __init__(self, pid, backend=None, slab_size=SLAB_SIZE):
+        '''Constructor
+
+        :param pid: 进程ID
+        :type backend: MemoryBackend
+        :param backend: 访问进程的实现，默认为Win32MemoryBackend
+        :param slab_size: 每个slab的字节数
+        '''
+        self.ProcessId = pid
+        self.stats = ArenaStats()
+        self._backend = backend or default_backend()
+        self._slab_size = slab_size
+        self._max_small = slab_size // 4
+        self._lock = threading.RLock()
+        self._handle = None
+        self._generation = 0
+        self._reset()
+
+    def _reset(self):
+        self._regions = [] #所有远程分配的地址
+        self._slabs = {} #分级大小 -> [当前slab地址, 已切分的字节数]
+        self._free = {} #分级大小 -> 空闲块地址列表
+
+    @property
+    def Handle(self):
+        '''进程句柄，第一次访问时打开
+        '''
+        with self._lock:
+            if self._handle is None:
+                self._handle = self._backend.open_process(self.ProcessId)
+                self.stats.handles_opened += 1
+            return self._handle
+
+    def is_alive(self):
+        '''进程是否仍在运行，尚未打开句柄时认为在运行
+        '''
+        handle = self._handle
+        return handle is None or self._backend.is_alive(handle)
+
+    def _size_class(self, size):
+        if size > self._max_small:
+            return (size + PAGE_SIZE - 1) // PAGE_SIZE * PAGE_SIZE
+        size_class = MIN_BLOCK_SIZE
+        while size_class < size:
+            size_class *= 2
+        return size_class
+
+    def _remote_alloc(self, size):
+        address = self._backend.alloc(self.Handle, size)
+        self._regions.append(address)
+        self.stats.remote_allocs += 1
+        self.stats.bytes_reserved += size
+        return address
+
+    def _carve(self, size_class):
+        slab = self._slabs.get(size_class)
+        if slab is None or slab[1] + size_class > self._slab_size:
+            slab = self._slabs[size_class] = [self._remote_alloc(self._slab_size), 0]
+        address = slab[0] + slab[1]
+        slab[1] += size_class
+        return address
+
+    def allocate(self, size):
+        '''分配至少size字节的远程内存
+
+        :rtype: RemoteBlock
+        '''
+        if size <= 0:
+            raise ValueError("size必须大于0")
+        size_class = self._size_class(size)
+        with self._lock:
+            free = self._free.get(size_class)
+            if free:
+                address = free.pop()
+                self.stats.blocks_reused += 1
+            elif size_class > self._max_small:
+                address = self._remote_alloc(size_class)
+            else:
+                address = self._carve(size_class)
+            self.stats.blocks_allocated += 1
+            self.stats.blocks_in_use += 1
+            return RemoteBlock(self, address, size, size_class, self._generation)
+
+    def _release(self, block):
+        with self._lock:
+            if block._generation != self._generation: #close之后归还的块已随slab释放
+                return
+            self._free.setdefault(block._capacity, []).append(block.Address)
+            self.stats.blocks_in_use -= 1
+
+    def _read(self, address, local, size):
+        self._backend.read(self.Handle, address, local, size)
+        self.stats.reads += 1
+
+    def _write(self, address, local, size):
+        self._backend.write(self.Handle, address, local, size)
+        self.stats.writes += 1
+
+    def read_at(self, address, target, size=None):
+        '''从任意远程地址(如其他结构体中的指针)直接读入target
+
+        :param address: 远程地址
+        :param target: ctypes对象、bytearray或可写的memoryview
+        :param size: 读取的字节数，默认为target的大小
+        '''
+        local, size = _as_local(target, size)
+        self._read(address, local, size)
+
+    def write_at(self, address, data, size=None):
+        '''将本地数据写入任意远程地址
+
+        :param address: 远程地址
+        :param data: ctypes对象、bytes、bytearray或memoryview
+        :param size: 写入的字节数，默认为data的大小
+        '''
+        local, size = _as_local(data, size)
+        self._write(address, local, size)
+
+    def close(self):
+        '''释放所有远程内存并关闭句柄，之后仍可继续使用(会重新打开句柄)
+        '''
+        with self._lock:
+            if self._handle is not None:
+                for address in self._regions:
+                    try:
+                        self._backend.free(self._handle, address)
+                    except Exception: #进程已退出
+                        pass
+                    self.stats.remote_frees += 1
+                self._backend.close_handle(self._handle)
+                self.stats.handles_closed += 1
+                self._handle = None
+            self.stats.bytes_reserved = 0
+            self.stats.blocks_in_use = 0
+            self._generation += 1
+            self._reset()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return '<ProcessArena pid=%s %r>' % (self.ProcessId, self.stats)
+
+
+_default_backend = None
+_arenas = {} #(进程ID, 进程创建时间) -> ProcessArena
+_arenas_lock = threading.Lock()
+_last_sweep = [0]
+
+def default_backend():
+    '''返回共用的Win32MemoryBackend
+    '''
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = Win32MemoryBackend()
+    return _default_backend
+
+def get_arena(pid):
+    '''返回进程共用的ProcessArena
+
+    进程已退出或进程ID被复用时返回新的内存池；距上次检查超过SWEEP_INTERVAL秒时，关闭所有进程已退出的内存池。
+
+    :rtype: ProcessArena
+    '''
+    key = (pid, default_backend().create_time(pid))
+    with _arenas_lock:
+        now = time.time()
+        dead = []
+        if now - _last_sweep[0] >= SWEEP_INTERVAL:
+            _last_sweep[0] = now
+            for other_key, arena in list(_arenas.items()):
+                if not arena.is_alive():
+                    dead.append(_arenas.pop(other_key))
+        arena = _arenas.get(key)
+        if arena is not None and not arena.is_alive():
+            dead.append(arena)
+            arena = None
+        if arena is None:
+            arena = _arenas[key] = ProcessArena(pid)
+    for other in dead:
+        other.close()
+    return arena
+
+def close_all():
+    '''关闭所有共用的ProcessArena
+    '''
+    with _arenas_lock:
+        arenas = list(_arenas.values())
+        _arenas.clear()
+    for arena in arenas:
+        arena.close()
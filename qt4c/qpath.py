@@ -11,32 +11,67 @@ qpath模块
 详见QPath类说明
 '''
 
-import re
+import threading
+
 import pythoncom
 import win32gui
 import winerror
-from pkg_resources import iter_entry_points
 
 from qt4c import wincontrols
+from qt4c import winhung
+from qt4c import wininfo
 from qt4c import uiacontrols
 from qt4c import util
+from qt4c import controltypes
+from qt4c import qpathplan
+from qt4c import wintree
+from qt4c import winpushdown
+from qt4c import qpathprofile
+from qt4c import qpathengine
+from qt4c import qpathparallel
+from qt4c.qpathplan import EnumQPathKey, EnumUIType, QPathError
 from qt4c.exceptions import ControlExpiredError,ControlAmbiguousError,ControlNotFoundError
 import testbase.logger as logger
 import six
 
-class EnumQPathKey(object):
-    MAX_DEPTH = "MAXDEPTH"
-    INSTANCE = "INSTANCE"
-    UI_TYPE = "UITYPE"
+RESUME_MAX_FRONTIER = 16 #续查时最多保留的已匹配前缀个数
+RESUME_FULL_INTERVAL = 4 #续查时每隔几次仍做一次完整查找，以发现新出现的前缀
+PARALLEL_WIDTH = 4 #search(parallel=True)使用的线程数
 
-class EnumUIType(object):
-    WIN = 'Win'
-    UIA = 'UIA'
 
-class QPathError(Exception):
-    """QPath异常类定义
-    """
-    pass
+def _is_alive(ctrl):
+    '''控件的窗口是否仍有效，没有窗口句柄的控件视为有效
+    '''
+    try:
+        hwnd = ctrl.HWnd
+    except Exception:
+        return not hasattr(type(ctrl), 'HWnd')
+    if not isinstance(hwnd, six.integer_types):
+        return True
+    return bool(win32gui.IsWindow(hwnd))
+
+_parallel_pool = None
+_parallel_lock = threading.Lock()
+_window_info_keys = {} #Win32控件类到可从wininfo.WindowInfo读取的属性名(大写)
+
+
+def _co_initialize_mta():
+    '''并行查找的线程以多线程套间(MTA)调用UIA等COM接口
+    '''
+    pythoncom.CoInitializeEx(pythoncom.COINIT_MULTITHREADED)
+
+def get_parallel_pool():
+    '''返回search(parallel=True)共用的线程池，PARALLEL_WIDTH改变后重新创建
+
+    :rtype: qpathparallel.WorkerPool
+    '''
+    global _parallel_pool
+    with _parallel_lock:
+        if _parallel_pool is None or _parallel_pool.Width != PARALLEL_WIDTH:
+            if _parallel_pool is not None:
+                _parallel_pool.shutdown()
+            _parallel_pool = qpathparallel.WorkerPool(PARALLEL_WIDTH, _co_initialize_mta)
+        return _parallel_pool
 
 
 class QPath(object):
@@ -64,15 +99,10 @@ class QPath(object):
             / UIType='UIA' && name='mainpanel' && MaxDepth='10'"
     '''
     
-    PROPERTY_SEP = '&&'
-    OPERATORS = ["=", "~="]
-    MATCH_FUNCS = {}
-    MATCH_FUNCS["="]=lambda x, y: x == y
-    MATCH_FUNCS["~="]= lambda string, pattern: re.search(pattern, string) != None
-    CONTROL_TYPES = {
-                   EnumUIType.WIN: wincontrols.Control,
-                   EnumUIType.UIA: uiacontrols.Control
-                   }
+    PROPERTY_SEP = qpathplan.PROPERTY_SEP
+    OPERATORS = qpathplan.OPERATORS
+    CONTROL_TYPES = controltypes.registry #UIType到控件类的映射，"qt4c.controls"入口点只加载一次
+    hint_cache = None #控件定位提示缓存(locatorhint.LocatorHintCache)，默认不启用
     
     def __init__(self, qpath_string):
         """Contructor
@@ -80,167 +110,35 @@ class QPath(object):
         :type qpath_string: string
         :param qpath_string: QPath字符串   
         """
-        self.update_control_type()
         if not isinstance(qpath_string, six.string_types):
             raise QPathError("输入的QPath(%s)不是字符串!"  % (qpath_string) )
         self._strqpath = qpath_string
-        self._path_sep, self._parsed_qpath = self._parse(qpath_string)
+        self._plan = qpathplan.compile_qpath(qpath_string)
+        self._path_sep = self._plan.separator
+        self._hintable = all(step.instance is None and step.uitype is None for step in self._plan.steps)
         self._error_qpath = None
+        self._profile = None
+        self._prefetched = None
+        self._resume_state = None
 
-    def update_control_type(self):
-        for ep in iter_entry_points("qt4c.controls"):
-            control_class = ep.load()
-            self.CONTROL_TYPES[ep.name] = control_class
-     
-
-    def _find_controls_recur(self, root, qpath):
-        '''递归查找控件
-        
-        :param root: 根控件
-        :param qpath: 解析后的qpath结构
-        :return: 返回(found_controls, remain_qpath)， 其中found_controls是找到的控件，remain_qpath
-        是未能找到控件时剩下的未能匹配的qpath。
-        '''
-        qpath = qpath[:]
-        props = qpath[0]
-        props = dict((entry[0].upper(), entry[1]) for entry in props.items()) #使属性值大小写不敏感
-        max_depth = 1 #默认depth是1
-        if ( EnumQPathKey.MAX_DEPTH in props):
-            max_depth = int(props[EnumQPathKey.MAX_DEPTH][1])
-            if max_depth <= 0 :
-                raise QPathError("MaxDepth=%s应该>=1" % max_depth)
-            del props[EnumQPathKey.MAX_DEPTH]
-        
-        instance = None #默认没有index属性
-        if (EnumQPathKey.INSTANCE in props):
-            instance = int(props[EnumQPathKey.INSTANCE][1])
-            del props[EnumQPathKey.INSTANCE]
-            
-        children = None
-        if EnumQPathKey.UI_TYPE in props:
-            uitype = props[EnumQPathKey.UI_TYPE][1]
-            del props[EnumQPathKey.UI_TYPE]  
-            child_ctrl_type = self.CONTROL_TYPES[uitype]
-            if not isinstance(root, child_ctrl_type):
-                try:
-                    children = [child_ctrl_type(root)]
-                except:
-                    children = []
-        if children is None:
-            try:
-                children = root.Children
-            except ControlExpiredError:
-                children = []
-                
-        found_child_controls = []
-        for ctrl in children:
-            if(self._match_control(ctrl, props)):
-                found_child_controls.append(ctrl)
-            
-            if(max_depth > 1): 
-                props_copy = props.copy()
-                props_copy[EnumQPathKey.MAX_DEPTH] = ['=', str(max_depth - 1)]
-                _controls, _ = self._find_controls_recur(ctrl, [props_copy])
-                found_child_controls += _controls
-        if not found_child_controls:
-            return [], qpath
-        
-        if instance != None:
-            try:
-                found_child_controls = [found_child_controls[instance]]
-            except IndexError:
-                return [], qpath
-        
-        qpath.pop(0)
-        
-        if not qpath: #找到控件
-            return found_child_controls, qpath
-            
-        else: #在子孙中继续寻找
-            found_ctrls = []
-            error_path = qpath
-            for root in found_child_controls:
-                ctrls, remain_qpath = self._find_controls_recur(root, qpath)
-                found_ctrls += ctrls
-                if len(remain_qpath) < len(error_path):
-                    error_path = remain_qpath
-            # remove same control
-            cpy_found_ctrls = found_ctrls[:]
-            found_ctrls = []
-            for ctrl in cpy_found_ctrls:
-                if ctrl not in found_ctrls:
-                    found_ctrls.append(ctrl)
-                    
-            return found_ctrls, error_path
-    
+    @property
+    def _parsed_qpath(self):
+        """解析后的qpath结构，详见_parse
+        """
+        return self._plan.to_parsed()
 
-    def _match_control(self, control, props):
-        """控件是否匹配给定的属性
-        
-        :param control: 控件
-        :param props: 要匹配的控件属性字典，如{'classname':['=', 'window']}
+    def update_control_type(self):
+        """重新加载"qt4c.controls"入口点注册的控件类型
         """
-        attrs = dict((attr.upper(), attr) for attr in dir(control))
-        for propname in props:
-            if not propname in attrs:
-                return False
-            
-            try: 
-                act_prop_value = getattr(control, attrs[propname])
-            except pythoncom.com_error as e: 
-                return False
-            except win32gui.error as e:
-                if e.winerror == winerror.ERROR_INVALID_WINDOW_HANDLE: #无效窗口句柄
-                    return False
-                else:
-                    raise e
-            except ControlExpiredError as e:
-                return False
-                                   
-            operator, exp_prop_value = props[propname]
-            if act_prop_value is None:
-                return False
-            
-            if isinstance(act_prop_value, bool):
-                if exp_prop_value.upper() == 'TRUE':
-                    exp_prop_value = True
-                elif exp_prop_value.upper() == 'FALSE':
-                    exp_prop_value = False
-                else:
-                    raise QPathError('不正确的bool属性值:%s' % exp_prop_value)
-                if act_prop_value != exp_prop_value:
-                    return False
-            
-            elif isinstance(act_prop_value, six.integer_types):
-                if re.search('^0x', exp_prop_value) != None:
-                    exp_prop_value = int(exp_prop_value, 16)
-                else:
-                    exp_prop_value = int(exp_prop_value)
-                if act_prop_value != exp_prop_value:
-                    return False
-            
-            elif isinstance(exp_prop_value, six.string_types):
-                if not self.MATCH_FUNCS[operator](util.myEncode(act_prop_value), util.myEncode(exp_prop_value)):
-                    return False
-                    
-            else:
-                raise QPathError('不支持控件属性值类型：%s' % type(act_prop_value))
-            
-        return True            
+        controltypes.refresh()
+     
 
     def _parse_property(self, prop_str):
         """解析property字符串，返回解析后结构
         
         例如将 "ClassName='Dialog' " 解析返回 {ClassName: ['=', 'Dialog']}
         """
-        
-        parsed_pattern = "(\w+)\s*([=~!<>]+)\s*[\"'](.*)[\"']"
-        match_object = re.match(parsed_pattern, prop_str)
-        if match_object is None:
-            raise QPathError("属性(%s)不符合QPath语法" % prop_str)
-        prop_name, operator, prop_value = match_object.groups()
-        if not operator in self.OPERATORS:
-            raise QPathError("QPath不支持操作符：%s"  % operator) 
+        prop_name, operator, prop_value = qpathplan.parse_property(prop_str)
         return {prop_name: [operator, prop_value]}
         
     def _parse(self, qpath_string):
@@ -252,33 +150,13 @@ class QPath(object):
         :param qpath_string: qpath 字符串
         :return: (seperator, parsed_qpath)
         """
-        qpath_string = qpath_string.strip()
-        seperator = qpath_string[0]
-        locators = qpath_string[1:].split(seperator)
-        
-        parsed_qpath = []
-        for locator in locators:
-            props = locator.split(self.PROPERTY_SEP)
-            parsed_locators = {}
-            for prop_str in props:
-                prop_str = prop_str.strip()
-                if len(prop_str) == 0: 
-                    raise QPathError("%s 中含有空的属性。" % locator)
-                parsed_props = self._parse_property(prop_str)
-                parsed_locators.update(parsed_props)
-            parsed_qpath.append(parsed_locators)
-        return seperator, parsed_qpath
+        plan = qpathplan.compile_qpath(qpath_string)
+        return plan.separator, plan.to_parsed()
        
     def __str__(self):
         '''返回格式化后的QPath字符串
         '''
-        qpath_str = ""
-        for locator in self._parsed_qpath:
-            qpath_str += self._path_sep + " "
-            delimit_str = " " + self.PROPERTY_SEP + " "
-            locator_str = delimit_str.join(["%s %s '%s'"  % (key, locator[key][0], locator[key][1]) for key in locator])
-            qpath_str += locator_str
-        return qpath_str
+        return str(self._plan)
 
     def getErrorPath(self):
         """返回最后一次QPath.search搜索未能匹配的路径
@@ -286,29 +164,349 @@ class QPath(object):
         :rtype: string
         """
         if self._error_qpath:
-            props = self._error_qpath[0]
-            delimit_str = " " + self.PROPERTY_SEP + " "
-            return delimit_str.join(["%s %s '%s'" % (key, props[key][0], props[key][1]) for key in props]) 
+            return str(self._error_qpath[0])
+        
+    def getProfile(self):
+        """返回最后一次QPath.search(profile=True)的查找统计
+        
+        :rtype: qpathprofile.SearchProfile
+        """
+        return self._profile
         
-    def search(self, root=None):
+    def search(self, root=None, limit=None, snapshot=None, profile=False, resume=False, parallel=False):
         """根据qpath和root查找控件
         
         :type root: 实例类型
         :param root:  查找开始的控件
+        :type limit: int
+        :param limit: 最多返回的控件个数，找到limit个控件后即停止遍历；默认为None，返回全部控件。
+                      只需判断控件是否唯一时，传入limit=2即可。
+        :type snapshot: bool|wintree.WindowTreeSnapshot
+        :param snapshot: Win32控件的子窗口从窗口树快照中读取，每棵子树只枚举一次。
+                         为True时使用本次查找专用的快照；传入WindowTreeSnapshot时按其失效策略复用。
+                         默认为None，每层都重新枚举子窗口。
+        :type profile: bool
+        :param profile: 是否记录查找统计，之后可由getProfile()取得；在qpathprofile.collect()中时总是记录
+        :type resume: bool
+        :param resume: 重试查找时使用。查找失败时记录匹配到最深一层定位符的控件链，下一次同一root的查找
+                       校验这些控件链仍有效后，只在其下查找剩余的定位符；控件链失效、剩余定位符找到了控件、
+                       或每隔RESUME_FULL_INTERVAL次时仍做完整查找，因此返回结果与完整查找相同。
+                       含Instance或UIType的QPath总是完整查找。
+        :type parallel: bool|qpathparallel.WorkerPool
+        :param parallel: 是否将兄弟子树和同一层的多个父控件分发给线程池并行查找，返回结果及顺序与顺序查找相同。
+                         为True时使用get_parallel_pool()，也可传入指定线程数的WorkerPool。
+                         记录查找统计或续查时仍顺序查找。
         :return: 返回找到的控件列表
         """
-        
+        if limit is not None and limit < 1:
+            raise ValueError("limit=%s应该>=1" % limit)
+        prefetched = self._take_prefetched(root)
+        if prefetched is not None and not profile:
+            return prefetched[:limit] if limit else prefetched
         if root is None:
             root = wincontrols.Control() # desktop Control
-        controls, self._error_qpath = self._find_controls_recur(root, self._parsed_qpath)
+        if snapshot is True:
+            snapshot = wintree.WindowTreeSnapshot()
+        elif snapshot is False:
+            snapshot = None
+        if snapshot is not None:
+            snapshot.ensure_fresh()
+        steps = self._plan.steps
+        provider = ControlTreeProvider(self.CONTROL_TYPES, snapshot, first_only=(limit == 1 and len(steps) == 1))
+        if parallel:
+            if not isinstance(parallel, qpathparallel.WorkerPool):
+                parallel = get_parallel_pool()
+            engine = qpathparallel.ParallelQPathEngine(provider, parallel)
+        else:
+            engine = qpathengine.QPathEngine(provider)
+        collectors = qpathprofile.active_collectors()
+        resume_key = None
+        if resume and self._hintable and snapshot is None and not (profile or collectors):
+            resume_key = provider.identity(root)
+            if resume_key is not None:
+                resumed = self._resume_search(engine, root, resume_key)
+                if resumed is not None:
+                    return resumed
+        hint_key = None
+        if limit is not None and snapshot is None and not (profile or collectors):
+            hint_key = self._get_hint_key(provider, root)
+            if hint_key is not None:
+                target = self.hint_cache.lookup(hint_key, lambda chain: engine.validate_chain(root, steps, chain))
+                if target is not None:
+                    self._error_qpath = []
+                    return [target]
+        context = qpathengine.SearchContext()
+        if hint_key is not None or resume_key is not None:
+            context.path = []
+        if resume_key is not None:
+            context.frontier = []
+            context.max_frontier = RESUME_MAX_FRONTIER
+        if profile or collectors:
+            context.profile = qpathprofile.SearchProfile(self._strqpath, steps, limit)
+            start = qpathprofile.timer()
+        controls = engine.search(root, steps, limit, context)
+        self._error_qpath = context.error_qpath
+        if context.profile is not None:
+            context.profile.elapsed = qpathprofile.timer() - start
+            context.profile.found = len(controls)
+            context.profile.error_path = self.getErrorPath()
+            self._profile = context.profile
+            for collector in collectors:
+                collector.add(context.profile)
+        if hint_key is not None and len(controls) == 1 and limit > 1: #遍历完整棵树确认控件唯一后才记录
+            self.hint_cache.store(hint_key, context.first_chain)
+        if resume_key is not None:
+            self._resume_state = None
+            if not controls and context.frontier and len(context.frontier) <= RESUME_MAX_FRONTIER:
+                self._resume_state = _ResumeState(resume_key, context.frontier)
+        return controls
+    
+    def _resume_search(self, engine, root, root_key):
+        '''从上次查找失败时匹配到的最深前缀继续查找
+        
+        :return: 仍未找到时返回空列表；需要完整查找时返回None
+        '''
+        state = self._resume_state
+        if state is None or state.root_key != root_key:
+            return None
+        state.attempts += 1
+        if state.attempts % RESUME_FULL_INTERVAL == 0:
+            return None
+        context = qpathengine.SearchContext()
+        controls = engine.resume(root, self._plan.steps, state.frontier, context)
+        if controls is not None:
+            self._error_qpath = context.error_qpath
         return controls
     
+    def _get_hint_key(self, provider, root):
+        '''返回定位提示缓存的键，不使用提示时返回None
+        '''
+        if self.hint_cache is None or not self._hintable:
+            return None
+        root_key = provider.identity(root)
+        if root_key is None:
+            return None
+        return (root_key, str(self._plan))
+    
+    def prefetch(self, root, controls):
+        '''设置下一次在root下查找的结果，由search_many批量查到结果后使用
+        
+        结果只使用一次：下一次以同一个root对象(或都为None)调用search时，若其中的窗口仍都有效则直接返回，
+        之后恢复正常查找。未使用的结果应调用clear_prefetched丢弃。
+        
+        :param root: 查找开始的控件
+        :param controls: 查找结果
+        '''
+        self._prefetched = (root, list(controls))
+    
+    def _take_prefetched(self, root):
+        '''取出root对应的预取结果，没有时返回None
+        '''
+        if self._prefetched is None:
+            return None
+        prefetched_root, controls = self._prefetched
+        self._prefetched = None
+        if prefetched_root is not root:
+            return None
+        if all(_is_alive(ctrl) for ctrl in controls):
+            return controls
+        return None #窗口已关闭，重新查找
+    
+    def clear_prefetched(self):
+        '''丢弃未使用的预取结果
+        '''
+        self._prefetched = None
+        
+    @classmethod
+    def search_many(cls, root, qpaths, limit=None, snapshot=None):
+        """在同一个root下一次查找多个QPath，控件树只遍历一次
+        
+        所有QPath的定位符在遍历中同时推进，每个节点的属性只获取一次；返回结果与逐个调用search相同。
+        定位符含UIType或负数Instance的QPath仍单独调用search查找。
+        
+        :param root: 查找开始的控件
+        :type qpaths: list
+        :param qpaths: QPath对象列表
+        :param limit: 每个QPath最多返回的控件个数
+        :param snapshot: 窗口树快照，详见search
+        :rtype: list
+        :return: 与qpaths一一对应的控件列表
+        """
+        if limit is not None and limit < 1:
+            raise ValueError("limit=%s应该>=1" % limit)
+        if root is None:
+            root = wincontrols.Control() # desktop Control
+        if snapshot is True:
+            snapshot = wintree.WindowTreeSnapshot()
+        elif snapshot is False:
+            snapshot = None
+        results = [None] * len(qpaths)
+        batch = []
+        for index, qp in enumerate(qpaths):
+            if all(step.uitype is None and (step.instance is None or step.instance >= 0) 
+                   for step in qp._plan.steps):
+                batch.append(index)
+            else:
+                results[index] = qp.search(root, limit, snapshot)
+        if batch:
+            if snapshot is not None:
+                snapshot.ensure_fresh()
+            engine = qpathengine.QPathEngine(ControlTreeProvider(cls.CONTROL_TYPES, snapshot))
+            found, error_paths = engine.search_many(root, [qpaths[index]._plan.steps for index in batch])
+            for index, controls, error_qpath in zip(batch, found, error_paths):
+                qpaths[index]._error_qpath = error_qpath
+                results[index] = controls[:limit] if limit else controls
+        return results
+    
+    def search_first(self, root=None, snapshot=None):
+        """根据qpath和root查找第一个匹配的控件，找到后即停止遍历
+        
+        :type root: 实例类型
+        :param root:  查找开始的控件
+        :param snapshot: 窗口树快照，详见search
+        :return: 返回找到的控件，找不到时返回None
+        """
+        controls = self.search(root, limit=1, snapshot=snapshot)
+        if controls:
+            return controls[0]
+    
+
+class ControlTreeProvider(qpathengine.ObjectTreeProvider):
+    '''控件树，节点为wincontrols、uiacontrols及"qt4c.controls"入口点注册的控件
+    
+    Win32控件有窗口树快照时从快照中读取子窗口；否则尝试将定位符中的属性下推给系统API，只返回可能匹配的
+    子窗口，详见winpushdown模块。控件类实现了_qpath_find(step)方法时由其一次找出候选控件，
+    如uiacontrols.Control将定位符转换为UIA的FindAll条件。
+    
+    定位符要匹配Win32控件的多个窗口属性(ClassName、Style、Visible等)且一次读出比逐个读取代价更低时，
+    匹配前先读出该窗口的wininfo.WindowInfo，本次查找中这些属性都从中读取。
+    
+    Caption/Text的代价最高，总是在其他属性都匹配后才读取；窗口已被登记为无响应(winhung模块)时
+    视为无法读取，该窗口不匹配，不再等待消息超时。
+    '''
+    unavailable_errors = (pythoncom.com_error, ControlExpiredError)
+    
+    def __init__(self, control_types, snapshot=None, first_only=False, backend=None):
+        '''Constructor
+        
+        :param control_types: UIType到控件类的映射
+        :param snapshot: 窗口树快照(wintree.WindowTreeSnapshot)
+        :param first_only: 是否只需要第一个匹配的控件
+        :param backend: 条件下推使用的窗口枚举后端(wintree.WindowBackend)，默认为Win32实现
+        '''
+        self._control_types = control_types
+        self.snapshot = snapshot
+        self.first_only = first_only
+        self._backend = backend
+        self._window_infos = wininfo.WindowInfoCache()
+        self._fetch_steps = {}
+        
+    def children(self, control, step=None):
+        try:
+            if type(control).Children is wincontrols.Control.Children:
+                if self.snapshot is not None:
+                    self.children_source = 'snapshot'
+                    return [wincontrols.Window(root=hwnd) for hwnd in self.snapshot.children(control.HWnd)]
+                if step is not None:
+                    if self._backend is None:
+                        self._backend = wintree.get_default_backend()
+                    hwnds = winpushdown.find_children(self._backend, control.HWnd, step,
+                                                      self.first_only or step.instance == 0)
+                    if hwnds is not None:
+                        self.children_source = 'pushdown'
+                        return [wincontrols.Window(root=hwnd) for hwnd in hwnds]
+            self.children_source = 'children'
+            return control.Children
+        except ControlExpiredError:
+            return []
+        
+    def switch_uitype(self, control, uitype):
+        child_ctrl_type = self._control_types[uitype]
+        if isinstance(control, child_ctrl_type):
+            return None
+        try:
+            return [child_ctrl_type(control)]
+        except:
+            return []
+        
+    def find(self, control, step):
+        finder = getattr(type(control), '_qpath_find', None)
+        if finder is None:
+            return None
+        return finder(control, step)
+        
+    @staticmethod
+    def _window_info_keys(control_class):
+        '''返回控件类未重载、可从WindowInfo读取的属性名(大写)
+        '''
+        keys = _window_info_keys.get(control_class)
+        if keys is None:
+            keys = frozenset(key for key, attr in wininfo.FIELDS.items()
+                             if getattr(control_class, attr, None) is getattr(wincontrols.Control, attr))
+            _window_info_keys[control_class] = keys
+        return keys
+        
+    def _should_fetch(self, control_class, step):
+        '''匹配step时是否先一次读出WindowInfo，按(控件类, 定位符)缓存
+        '''
+        fetch = self._fetch_steps.get((control_class, step))
+        if fetch is None:
+            keys = self._window_info_keys(control_class)
+            fetch = wininfo.worth_fetching(qpathplan.get_property_costs(control_class),
+                                           [p.key for p in step.predicates if p.key in keys])
+            self._fetch_steps[(control_class, step)] = fetch
+        return fetch
+        
+    def ordered_predicates(self, control, step):
+        if isinstance(control, wincontrols.Control) and self._should_fetch(type(control), step):
+            try:
+                self._window_infos.get(control.HWnd)
+            except win32gui.error: #窗口已失效时逐个读取属性，按原来的方式处理
+                pass
+        return qpathengine.ObjectTreeProvider.ordered_predicates(self, control, step)
+        
+    def get_property(self, control, key):
+        if key in wininfo.FIELDS and isinstance(control, wincontrols.Control):
+            info = self._window_infos.peek(control.HWnd)
+            if info is not None and key in self._window_info_keys(type(control)):
+                return getattr(info, wininfo.FIELDS[key])
+        try:
+            if key in ('CAPTION', 'TEXT') and isinstance(control, wincontrols.Control) and \
+                    type(control).Caption is wincontrols.Control.Caption and type(control).Text is wincontrols.Control.Text:
+                text = control._read_text(winhung.get_registry())
+                if text is None: #窗口无响应
+                    raise qpathengine.PropertyUnavailable(key)
+                return text
+            return qpathengine.ObjectTreeProvider.get_property(self, control, key)
+        except win32gui.error as e:
+            if e.winerror == winerror.ERROR_INVALID_WINDOW_HANDLE: #无效窗口句柄
+                raise qpathengine.PropertyUnavailable(key)
+            raise e
+        
+    def is_alive(self, control):
+        if isinstance(control, wincontrols.Control):
+            return control.Valid
+        return True
+    
+
+class _ResumeState(object):
+    '''QPath.search(resume=True)保存的续查状态
+    '''
+    
+    def __init__(self, root_key, frontier):
+        self.root_key = root_key
+        self.frontier = frontier
+        self.attempts = 0
+    
+controltypes.registry.register_builtin(EnumUIType.WIN, wincontrols.Control)
+controltypes.registry.register_builtin(EnumUIType.UIA, uiacontrols.Control)
+
 def _find_by_name(root, name):
     qp = QPath("/Name='%s'&&MaxDepth='50'" % name)
-    controls = qp.search(root)
+    controls = qp.search(root, limit=2)
     count = len(controls)
     if count > 1:
-        logger.warning("根据qpath<%s>找到%d个控件，请优化qpath" % (qp._strqpath,count))
+        logger.warning("根据qpath<%s>找到不止一个控件，请优化qpath" % qp._strqpath)
         return controls[0]
     elif count == 0:
         print(qp._strqpath)
@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+QPath查找引擎模块
+
+QPathEngine在编译后的QPath定位符(qpathplan.QPathStep)上查找节点，不依赖具体的UI类型。
+节点的子节点、属性、标识等都通过TreeProvider获取：
+
+    * qpath.ControlTreeProvider：Win32/UIA及"qt4c.controls"入口点注册的控件，包括窗口树快照、
+      条件下推和UIA条件查找等优化
+    * ObjectTreeProvider：以属性访问节点的内存对象树，可在任何平台上运行和测试
+
+使用示例::
+
+    engine = QPathEngine(ObjectTreeProvider())
+    nodes = engine.search(root, qpathplan.compile_qpath("/ClassName='Dialog'").steps)
+'''
+
+import itertools
+
+from qt4c import qpathplan
+from qt4c import qpathprofile
+
+
+class PropertyUnavailable(Exception):
+    '''节点属性无法读取(如节点已失效)，视为不匹配
+    '''
+
+
+class TreeProvider(object):
+    '''控件树接口
+    '''
+    children_source = 'children' #最近一次children的子节点来源，用于查找统计
+
+    def children(self, node, step=None):
+        '''返回节点的子节点
+
+        :param node: 节点
+        :param step: 要在子节点中匹配的定位符，可据此只返回可能匹配的子节点；为None时返回全部子节点
+        :rtype: list
+        '''
+        raise NotImplementedError("请在%s类中实现children" % type(self))
+
+    def switch_uitype(self, node, uitype):
+        '''将节点转换为uitype类型的节点，节点已是该类型时返回None
+
+        :return: 转换后的节点列表，转换失败时为空列表
+        '''
+        return None
+
+    def find(self, node, step):
+        '''一次找出node下匹配定位符step的节点，不支持时返回None
+
+        :return: (按深度优先顺序排列的候选节点列表, 候选节点还需匹配的定位符)
+        '''
+        return None
+
+    def ordered_predicates(self, node, step):
+        '''返回按获取代价从低到高排列的属性条件
+        '''
+        return step.ordered_predicates(type(node))
+
+    def get_property(self, node, key):
+        '''返回节点属性
+
+        :param key: 大写的属性名
+        :raises PropertyUnavailable: 属性不存在或无法读取
+        '''
+        raise NotImplementedError("请在%s类中实现get_property" % type(self))
+
+    def identity(self, node):
+        '''返回节点标识，两个节点标识相同即为同一节点；不支持时返回None
+        '''
+        return None
+
+    def parent(self, node):
+        '''返回父节点，没有时返回None
+        '''
+        return None
+
+    def is_alive(self, node):
+        '''节点是否仍然存在
+        '''
+        return True
+
+
+def _get_instance_attribute(node, key):
+    '''查找节点实例上（而非类上）定义的属性名
+    '''
+    for attr in getattr(node, '__dict__', ()):
+        if attr.upper() == key:
+            return attr
+
+
+class ObjectTreeProvider(TreeProvider):
+    '''以属性访问节点的对象树：子节点为Children属性，标识为IdentityKey属性，父节点为Parent属性
+    '''
+    unavailable_errors = (PropertyUnavailable,) #读取属性时视为属性不可用的异常
+
+    def children(self, node, step=None):
+        return node.Children
+
+    def get_property(self, node, key):
+        attr = qpathplan.get_attribute_names(type(node)).get(key)
+        if attr is None:
+            attr = _get_instance_attribute(node, key)
+            if attr is None:
+                raise PropertyUnavailable(key)
+        try:
+            return getattr(node, attr)
+        except self.unavailable_errors:
+            raise PropertyUnavailable(key)
+
+    def identity(self, node):
+        try:
+            return node.IdentityKey
+        except (AttributeError, NotImplementedError):
+            return None
+
+    def parent(self, node):
+        return node.Parent
+
+
+class SearchContext(object):
+    '''一次查找的状态
+    '''
+
+    def __init__(self):
+        self.error_qpath = None
+        self.profile = None #查找统计(qpathprofile.SearchProfile)
+        self.path = None #记录控件链时为当前各层定位符匹配到的节点
+        self.frontier = None #续查时记录匹配到最深一层定位符的节点链
+        self.max_frontier = None #frontier最多记录的节点链个数
+        self.first_chain = None #记录控件链时为第一个结果对应的节点链
+
+    def record_frontier(self):
+        '''记录当前节点链，只保留匹配层数最多的节点链
+        '''
+        if not self.frontier or len(self.path) > len(self.frontier[0]):
+            self.frontier = [list(self.path)]
+        elif len(self.path) == len(self.frontier[0]) and (self.max_frontier is None or
+                                                           len(self.frontier) <= self.max_frontier):
+            self.frontier.append(list(self.path))
+
+    def record_error_path(self, remain_qpath):
+        '''记录未能匹配的qpath，保留剩余定位符最少的一个
+        '''
+        if self.error_qpath is None or len(remain_qpath) < len(self.error_qpath):
+            self.error_qpath = list(remain_qpath)
+
+
+class QPathEngine(object):
+    '''QPath查找引擎
+    '''
+
+    def __init__(self, provider):
+        '''Constructor
+
+        :type provider: TreeProvider
+        :param provider: 控件树
+        '''
+        self.provider = provider
+
+    def search(self, root, steps, limit=None, context=None):
+        '''按深度优先的顺序查找匹配steps的节点，多层定位符时按标识去重
+
+        :param root: 根节点
+        :param steps: 定位符列表(qpathplan.QPathStep)
+        :param limit: 最多返回的节点个数
+        :type context: SearchContext
+        :param context: 查找状态
+        :rtype: list
+        '''
+        if context is None:
+            context = SearchContext()
+        controls = []
+        found_keys = set()
+        unkeyed_controls = []
+        for ctrl in self.iter_controls(root, steps, context):
+            if len(steps) > 1: # remove same control
+                key = self.provider.identity(ctrl)
+                if key is not None:
+                    if key in found_keys:
+                        continue
+                    found_keys.add(key)
+                elif ctrl in unkeyed_controls:
+                    continue
+                else:
+                    unkeyed_controls.append(ctrl)
+            if context.path is not None and not controls:
+                context.first_chain = list(context.path)
+            controls.append(ctrl)
+            if limit is not None and len(controls) >= limit:
+                if context.profile is not None:
+                    context.profile.early_exit = True
+                break
+        return controls
+
+    def iter_controls(self, root, qpath, context):
+        '''递归查找节点，按深度优先的顺序逐个返回找到的节点
+
+        使用生成器实现，调用方停止迭代时不再遍历剩余的控件树。
+
+        :param root: 根节点
+        :param qpath: 编译后的qpath定位符列表(qpathplan.QPathStep)
+        :param context: 本次查找的状态(SearchContext)，用于记录未能匹配的qpath
+        '''
+        step = qpath[0]
+        found_child_controls = self._iter_step_controls(root, step, step.max_depth, True, context)
+        if step.instance != None:
+            found_child_controls = self._select_instance(found_child_controls, step.instance)
+
+        remain_qpath = qpath[1:]
+        found = False
+        for ctrl in found_child_controls:
+            found = True
+            if context.profile is not None and step.instance is not None:
+                context.profile.step(step).instance_selected += 1
+            if context.path is not None:
+                context.path.append(ctrl)
+                if context.frontier is not None:
+                    context.record_frontier()
+            if not remain_qpath: #找到控件
+                context.record_error_path(remain_qpath)
+                yield ctrl
+            else: #在子孙中继续寻找
+                for child_ctrl in self.iter_controls(ctrl, remain_qpath, context):
+                    yield child_ctrl
+            if context.path is not None:
+                context.path.pop()
+        if not found:
+            context.record_error_path(qpath)
+
+    @staticmethod
+    def _select_instance(controls, instance):
+        '''从controls中选出第instance个节点，非负的instance找到后即停止遍历
+        '''
+        if instance >= 0:
+            return itertools.islice(controls, instance, instance + 1)
+        controls = list(controls)
+        try:
+            return [controls[instance]]
+        except IndexError:
+            return []
+
+    def _iter_step_controls(self, root, step, max_depth, switch_uitype, context):
+        '''按深度优先的顺序返回root的max_depth层子孙中匹配定位符step的节点
+
+        :param root: 根节点
+        :param step: 定位符(qpathplan.QPathStep)
+        :param max_depth: 剩余的搜索深度
+        :param switch_uitype: 是否按定位符的UIType转换root的类型，只在定位符的第一层生效
+        :param context: 本次查找的状态(SearchContext)
+        '''
+        stats = context.profile.step(step) if context.profile is not None else None
+        if stats is not None:
+            start = qpathprofile.timer()
+        children = None
+        source = 'uitype'
+        if switch_uitype and step.uitype is not None:
+            children = self.provider.switch_uitype(root, step.uitype)
+        if children is None and switch_uitype:
+            found = self._find_step_controls(root, step, stats)
+            if found is not None:
+                if stats is not None:
+                    stats.add_children('find', qpathprofile.timer() - start, 1)
+                for ctrl in found:
+                    yield ctrl
+                return
+        if children is None:
+            children = self.provider.children(root, step if max_depth == step.max_depth else None)
+            source = self.provider.children_source
+        if stats is not None:
+            stats.add_children(source, qpathprofile.timer() - start, step.max_depth - max_depth + 1)
+
+        for ctrl in children:
+            if stats is not None:
+                stats.visited += 1
+            if(self.match(ctrl, step, stats)):
+                if stats is not None:
+                    stats.matched += 1
+                yield ctrl
+
+            if(max_depth > 1):
+                for child_ctrl in self._iter_step_controls(ctrl, step, max_depth - 1, False, context):
+                    yield child_ctrl
+
+    def _find_step_controls(self, root, step, stats=None):
+        '''由控件树一次找出root下匹配定位符step的节点，不支持时返回None
+
+        :param root: 根节点
+        :param step: 定位符(qpathplan.QPathStep)
+        :param stats: 定位符的查找统计(qpathprofile.StepProfile)，不统计时为None
+        '''
+        result = self.provider.find(root, step)
+        if result is None:
+            return None
+        controls, residual = result
+        if stats is None:
+            return (ctrl for ctrl in controls if self.match(ctrl, residual))
+        return self._iter_matched(controls, residual, stats)
+
+    def _iter_matched(self, controls, step, stats):
+        '''逐个匹配controls并记录统计
+        '''
+        for ctrl in controls:
+            stats.visited += 1
+            if self.match(ctrl, step, stats):
+                stats.matched += 1
+                yield ctrl
+
+    def match(self, node, step, stats=None, values=None):
+        """节点是否匹配给定的属性
+
+        属性按控件树给出的代价从低到高匹配，跨进程的高代价属性(如Caption)最后获取。
+
+        :param node: 节点
+        :param step: 要匹配的定位符(qpathplan.QPathStep)
+        :param stats: 定位符的查找统计(qpathprofile.StepProfile)，不统计时为None
+        :param values: 属性名到属性值的字典，用于在多个定位符之间共享已获取的属性值
+        """
+        get_property = self.provider.get_property
+        for predicate in self.provider.ordered_predicates(node, step):
+            key = predicate.key
+            if values is not None and key in values:
+                act_prop_value = values[key]
+            else:
+                try:
+                    if stats is None:
+                        act_prop_value = get_property(node, key)
+                    else:
+                        act_prop_value = stats.fetch_property(get_property, node, key)
+                except PropertyUnavailable:
+                    return False
+                if values is not None:
+                    values[key] = act_prop_value
+
+            if stats is not None:
+                if not stats.match_predicate(predicate, act_prop_value):
+                    return False
+            elif not predicate.match(act_prop_value):
+                return False
+
+        return True
+
+    def validate_chain(self, root, steps, chain):
+        '''校验之前查找记录的节点链，仍有效时返回链中最后一个节点，否则返回None
+
+        节点链可以只包含前几层定位符匹配到的节点。各节点需仍然存在、匹配对应定位符，
+        且在上一个节点的MaxDepth层子孙之内。
+        '''
+        parent = root
+        for step, ctrl in zip(steps, chain):
+            if (not self.provider.is_alive(ctrl) or not self.match(ctrl, step)
+                or not self.is_descendant(ctrl, parent, step.max_depth)):
+                return None
+            parent = ctrl
+        return chain[-1]
+
+    def is_descendant(self, node, ancestor, max_depth):
+        '''node是否在ancestor的max_depth层子孙之内
+        '''
+        ancestor_key = self.provider.identity(ancestor)
+        for _ in range(max_depth):
+            node = self.provider.parent(node)
+            if node is None:
+                return False
+            if self.provider.identity(node) == ancestor_key:
+                return True
+        return False
+
+    def resume(self, root, steps, frontier, context):
+        '''从之前查找失败时匹配到的最深前缀继续查找
+
+        :param frontier: 前缀节点链列表，长度相同
+        :return: 仍未找到时返回空列表；需要完整查找(前缀失效或找到了节点)时返回None
+        '''
+        for chain in frontier:
+            if self.validate_chain(root, steps, chain) is None: #前缀已失效
+                return None
+        remain_qpath = steps[len(frontier[0]):]
+        for chain in frontier:
+            for _ in self.iter_controls(chain[-1], remain_qpath, context):
+                return None #找到了节点，由完整查找返回与search相同的结果
+        return []
+
+    def search_many(self, root, steps_list):
+        '''在同一个root下一次查找多组定位符，控件树只遍历一次，详见_BatchSearch
+
+        定位符不能含UIType或负数Instance。
+
+        :return: (与steps_list一一对应的节点列表, 与steps_list一一对应的未能匹配的定位符列表)
+        '''
+        return _BatchSearch(self, steps_list).run(root)
+
+
+class _BatchSearch(object):
+    '''QPathEngine.search_many的一次查找
+
+    遍历控件树时为每个节点维护一组状态(查询序号, 定位符序号, 剩余深度, 匹配链)，匹配链为
+    各层定位符匹配到的节点的先序序号。逐个调用search的结果顺序即匹配链的字典序，
+    因此最后按匹配链排序并去重即可得到相同的结果。
+    '''
+
+    def __init__(self, engine, steps_list):
+        self._engine = engine
+        self._steps = steps_list
+        self._order = 0
+        self._instance_counts = {}
+        self._found = [[] for _ in steps_list]
+        self._reached = [-1] * len(steps_list)
+
+    def run(self, root):
+        states = [(index, 0, steps[0].max_depth, ()) for index, steps in enumerate(self._steps)]
+        self._walk(root, states)
+        results = []
+        error_paths = []
+        for index, steps in enumerate(self._steps):
+            found = sorted(self._found[index], key=lambda item: item[0])
+            controls = [ctrl for _, ctrl in found]
+            if len(steps) > 1:
+                controls = self._unique(controls)
+            error_paths.append([] if controls else list(steps[self._reached[index] + 1:]))
+            results.append(controls)
+        return results, error_paths
+
+    def _unique(self, controls):
+        '''按标识去除重复的节点，与QPathEngine.search相同
+        '''
+        result = []
+        found_keys = set()
+        for ctrl in controls:
+            key = self._engine.provider.identity(ctrl)
+            if key is not None:
+                if key in found_keys:
+                    continue
+                found_keys.add(key)
+            elif ctrl in result:
+                continue
+            result.append(ctrl)
+        return result
+
+    def _walk(self, node, states):
+        for child in self._engine.provider.children(node):
+            self._order += 1
+            order = self._order
+            values = {}
+            child_states = []
+            for index, step_index, depth, chain in states:
+                steps = self._steps[index]
+                step = steps[step_index]
+                if self._engine.match(child, step, values=values) and self._select(index, step_index, chain):
+                    if step_index > self._reached[index]:
+                        self._reached[index] = step_index
+                    matched_chain = chain + (order,)
+                    if step_index == len(steps) - 1:
+                        self._found[index].append((matched_chain, child))
+                    else:
+                        child_states.append((index, step_index + 1, steps[step_index + 1].max_depth, matched_chain))
+                if depth > 1:
+                    child_states.append((index, step_index, depth - 1, chain))
+            if child_states:
+                self._walk(child, child_states)
+
+    def _select(self, index, step_index, chain):
+        '''处理Instance：只保留同一起点下的第instance个匹配
+        '''
+        instance = self._steps[index][step_index].instance
+        if instance is None:
+            return True
+        key = (index, step_index, chain)
+        count = self._instance_counts.get(key, 0)
+        self._instance_counts[key] = count + 1
+        return count == instance
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+QPath并行查找模块
+
+查找的大部分时间阻塞在跨进程调用上(SendMessageTimeout、UIA的COM调用)，这些调用会释放GIL。
+ParallelQPathEngine按定位符逐层查找：同一层的各个父节点的子节点枚举、以及各个子节点的子树匹配
+分发给WorkerPool中的线程并行执行，再按深度优先的顺序合并结果，因此结果及Instance的语义与
+QPathEngine完全相同。有limit时，最后一层找到足够的节点后即取消尚未完成的子树。
+
+使用示例::
+
+    pool = WorkerPool(width=8)
+    engine = ParallelQPathEngine(ObjectTreeProvider(), pool)
+    nodes = engine.search(root, qpathplan.compile_qpath("/ClassName='Dialog'").steps)
+'''
+
+import sys
+import threading
+
+import six
+from six.moves import queue
+
+from qt4c import qpathengine
+
+
+class TaskCancelledError(Exception):
+    '''任务已被取消
+    '''
+
+
+class Task(object):
+    '''提交给WorkerPool的任务
+    '''
+
+    def __init__(self, func, args):
+        self._func = func
+        self._args = args
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._started = False
+        self._cancelled = False
+        self._result = None
+        self._exc_info = None
+
+    def _run(self):
+        with self._lock:
+            if self._cancelled:
+                return
+            self._started = True
+        try:
+            self._result = self._func(*self._args)
+        except:
+            self._exc_info = sys.exc_info()
+        finally:
+            self._done.set()
+
+    def cancel(self):
+        '''取消尚未开始执行的任务
+
+        :return: 是否取消成功
+        '''
+        with self._lock:
+            if self._started:
+                return False
+            self._cancelled = True
+        self._done.set()
+        return True
+
+    @property
+    def Cancelled(self):
+        return self._cancelled
+
+    def result(self):
+        '''等待任务结束并返回结果，任务抛出的异常在此重新抛出
+
+        :raises TaskCancelledError: 任务已被取消
+        '''
+        self._done.wait()
+        if self._cancelled:
+            raise TaskCancelledError()
+        if self._exc_info is not None:
+            six.reraise(*self._exc_info)
+        return self._result
+
+
+class WorkerPool(object):
+    '''固定宽度的线程池，线程在第一次提交任务时才创建
+    '''
+
+    def __init__(self, width=4, initializer=None):
+        '''Constructor
+
+        :param width: 线程数
+        :param initializer: 每个线程开始时调用的函数，如初始化COM
+        '''
+        if width < 1:
+            raise ValueError("width=%s应该>=1" % width)
+        self._width = width
+        self._initializer = initializer
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    @property
+    def Width(self):
+        return self._width
+
+    def _ensure_started(self):
+        with self._lock:
+            while len(self._threads) < self._width:
+                thread = threading.Thread(target=self._worker, name="QPathWorker-%d" % len(self._threads))
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker(self):
+        if self._initializer is not None:
+            self._initializer()
+        while True:
+            task = self._queue.get()
+            if task is None:
+                break
+            task._run()
+
+    def submit(self, func, *args):
+        '''提交任务
+
+        :rtype: Task
+        '''
+        self._ensure_started()
+        task = Task(func, args)
+        self._queue.put(task)
+        return task
+
+    def shutdown(self):
+        '''结束所有线程，已提交的任务执行完后线程才退出
+        '''
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
+
+
+class ParallelQPathEngine(qpathengine.QPathEngine):
+    '''使用WorkerPool并行查找的QPath查找引擎
+
+    需要记录查找统计或续查前缀时按QPathEngine顺序查找。控件树的children、get_property等方法
+    会在多个线程中同时调用。
+    '''
+
+    def __init__(self, provider, pool):
+        '''Constructor
+
+        :type provider: qpathengine.TreeProvider
+        :param provider: 控件树
+        :type pool: WorkerPool
+        :param pool: 执行查找的线程池
+        '''
+        super(ParallelQPathEngine, self).__init__(provider)
+        self.pool = pool
+
+    def search(self, root, steps, limit=None, context=None):
+        if context is None:
+            context = qpathengine.SearchContext()
+        if context.profile is not None or context.frontier is not None:
+            return super(ParallelQPathEngine, self).search(root, steps, limit, context)
+        chains = [(root,)]
+        for level, step in enumerate(steps):
+            last = level + 1 == len(steps)
+            chains = self._search_level(chains, step, steps[level:], context, limit if last else None,
+                                        last and len(steps) > 1)
+            if not chains:
+                return []
+        context.record_error_path(())
+        if context.path is not None:
+            context.first_chain = list(chains[0][1:])
+        return [chain[-1] for chain in chains]
+
+    def _step_children(self, node, step):
+        '''返回(要逐个匹配的子节点列表, None)或(None, 已匹配的节点列表)，与_iter_step_controls的第一层一致
+        '''
+        children = None
+        if step.uitype is not None:
+            children = self.provider.switch_uitype(node, step.uitype)
+        if children is None:
+            found = self._find_step_controls(node, step)
+            if found is not None:
+                return None, list(found)
+            children = self.provider.children(node, step)
+        return list(children), None
+
+    def _match_subtree(self, node, step, max_depth, cancel_event, limit):
+        '''按深度优先的顺序返回node及其max_depth - 1层子孙中匹配step的节点
+
+        :param limit: 找到limit个节点后即停止，为None时不限制
+        '''
+        found = []
+        if self.match(node, step):
+            found.append(node)
+        if max_depth > 1:
+            for ctrl in self._iter_step_controls(node, step, max_depth - 1, False, qpathengine.SearchContext()):
+                if cancel_event.is_set() or (limit is not None and len(found) >= limit):
+                    break
+                found.append(ctrl)
+        return found
+
+    def _search_level(self, chains, step, remain_qpath, context, limit, dedupe):
+        '''在各节点链的最后一个节点下查找step，按深度优先的顺序返回延长后的节点链
+
+        :param limit: 最多返回的节点链个数，只在最后一层使用
+        :param dedupe: 是否按最后一个节点的标识去重，多层定位符的最后一层使用
+        '''
+        submit = self.pool.submit
+        children_tasks = [submit(self._step_children, chain[-1], step) for chain in chains]
+        cancel_event = threading.Event()
+        #Instance需要全部候选节点，去重时后面的节点可能补上重复的节点，这两种情况下子树不能提前结束
+        task_limit = limit if step.instance is None and not dedupe else None
+        groups = []
+        for chain, task in zip(chains, children_tasks):
+            children, found = task.result()
+            if found is not None:
+                groups.append((chain, None, found))
+            else:
+                groups.append((chain, [submit(self._match_subtree, child, step, step.max_depth, cancel_event,
+                                              task_limit)
+                                       for child in children], None))
+        result = []
+        seen = set()
+        unkeyed = []
+        try:
+            for chain, tasks, found in groups:
+                if tasks is not None:
+                    found = []
+                    for task in tasks:
+                        found.extend(task.result())
+                if step.instance is not None:
+                    found = list(self._select_instance(found, step.instance))
+                if not found:
+                    context.record_error_path(remain_qpath)
+                    continue
+                for ctrl in found:
+                    if dedupe and not self._first_seen(ctrl, seen, unkeyed):
+                        continue
+                    result.append(chain + (ctrl,))
+                    if limit is not None and len(result) >= limit:
+                        return result
+            return result
+        finally:
+            cancel_event.set()
+            for _, tasks, _ in groups:
+                for task in tasks or ():
+                    task.cancel()
+
+    def _first_seen(self, ctrl, seen, unkeyed):
+        '''按标识去重，ctrl第一次出现时返回True
+        '''
+        key = self.provider.identity(ctrl)
+        if key is not None:
+            if key in seen:
+                return False
+            seen.add(key)
+        elif ctrl in unkeyed:
+            return False
+        else:
+            unkeyed.append(ctrl)
+        return True
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+QPath编译模块
+
+将QPath字符串解析为不可变的查询计划(QPathPlan)，并按QPath字符串缓存编译结果，
+相同的QPath字符串在进程内只解析一次。
+'''
+
+import re
+import threading
+from collections import OrderedDict
+
+import six
+
+
+class EnumQPathKey(object):
+    MAX_DEPTH = "MAXDEPTH"
+    INSTANCE = "INSTANCE"
+    UI_TYPE = "UITYPE"
+
+class EnumUIType(object):
+    WIN = 'Win'
+    UIA = 'UIA'
+
+class QPathError(Exception):
+    """QPath异常类定义
+    """
+    pass
+
+
+PROPERTY_SEP = '&&'
+OPERATORS = ["=", "~="]
+_PROPERTY_PATTERN = re.compile(r"(\w+)\s*([=~!<>]+)\s*[\"'](.*)[\"']")
+_HEX_PATTERN = re.compile('^0x')
+
+
+def _to_text(s):
+    '''将字符串转换为unicode，与util.myEncode(s)的行为保持一致
+    '''
+    if isinstance(s, six.binary_type):
+        for encoding in ('utf-8', 'gbk'):
+            try:
+                return s.decode(encoding)
+            except UnicodeDecodeError:
+                pass
+    return s
+
+
+class QPathPredicate(object):
+    '''QPath中单个属性的匹配条件，属性值在编译时预先转换为bool/int/正则表达式
+    '''
+    __slots__ = ('name', 'key', 'operator', 'value', 'bool_value', 'int_value', 'regex')
+
+    def __init__(self, name, operator, value):
+        '''Constructor
+
+        :param name: 属性名，保留QPath中的大小写
+        :param operator: 操作符，'='或'~='
+        :param value: 期望的属性值字符串
+        '''
+        self.name = name
+        self.key = name.upper()
+        self.operator = operator
+        self.value = value
+        upper_value = value.upper()
+        if upper_value == 'TRUE':
+            self.bool_value = True
+        elif upper_value == 'FALSE':
+            self.bool_value = False
+        else:
+            self.bool_value = None
+        try:
+            if _HEX_PATTERN.search(value) != None:
+                self.int_value = int(value, 16)
+            else:
+                self.int_value = int(value)
+        except ValueError:
+            self.int_value = None
+        self.regex = None
+        if operator == '~=':
+            try:
+                self.regex = re.compile(_to_text(value))
+            except re.error as e:
+                raise QPathError("属性%s的正则表达式(%s)不合法：%s" % (name, value, e))
+
+    def match(self, actual):
+        '''判断实际属性值是否满足此条件
+
+        :param actual: 控件的实际属性值
+        :rtype: bool
+        '''
+        if actual is None:
+            return False
+        if isinstance(actual, bool):
+            if self.bool_value is None:
+                raise QPathError('不正确的bool属性值:%s' % self.value)
+            return actual == self.bool_value
+        if isinstance(actual, six.integer_types):
+            if self.int_value is None:
+                raise ValueError("不正确的整数属性值:%s" % self.value)
+            return actual == self.int_value
+        if self.regex is not None:
+            return self.regex.search(_to_text(actual)) != None
+        return _to_text(actual) == _to_text(self.value)
+
+    def __str__(self):
+        return "%s %s '%s'" % (self.name, self.operator, self.value)
+
+
+class QPathStep(object):
+    '''QPath中的一级定位符，MaxDepth/Instance/UIType在编译时已被提取
+    '''
+    __slots__ = ('items', 'predicates', 'max_depth', 'instance', 'uitype', '_ordered')
+
+    def __init__(self, items):
+        '''Constructor
+
+        :param items: 定位符中的属性列表，如[('ClassName', '=', 'Dialog'), ...]
+        '''
+        self.items = tuple(items)
+        props = OrderedDict()
+        for name, operator, value in self.items:
+            props[name.upper()] = (name, operator, value)
+
+        self.max_depth = 1 #默认depth是1
+        if EnumQPathKey.MAX_DEPTH in props:
+            value = props.pop(EnumQPathKey.MAX_DEPTH)[2]
+            try:
+                self.max_depth = int(value)
+            except ValueError:
+                raise QPathError("MaxDepth=%s不是整数" % value)
+            if self.max_depth <= 0:
+                raise QPathError("MaxDepth=%s应该>=1" % self.max_depth)
+
+        self.instance = None #默认没有index属性
+        if EnumQPathKey.INSTANCE in props:
+            value = props.pop(EnumQPathKey.INSTANCE)[2]
+            try:
+                self.instance = int(value)
+            except ValueError:
+                raise QPathError("Instance=%s不是整数" % value)
+
+        self.uitype = None
+        if EnumQPathKey.UI_TYPE in props:
+            self.uitype = props.pop(EnumQPathKey.UI_TYPE)[2]
+
+        self.predicates = tuple(QPathPredicate(*entry) for entry in props.values())
+        self._ordered = {}
+
+    def ordered_predicates(self, control_class):
+        '''按control_class的属性代价从低到高排列的属性条件，代价相同时精确匹配优先
+
+        :param control_class: 控件类
+        :rtype: tuple
+        '''
+        entry = self._ordered.get(control_class)
+        if entry is None or entry[0] != _cost_generation[0]:
+            costs = get_property_costs(control_class)
+            ordered = tuple(sorted(self.predicates,
+                                   key=lambda p: (costs.get(p.key, DEFAULT_PROPERTY_COST), p.regex is not None)))
+            entry = (_cost_generation[0], ordered)
+            self._ordered[control_class] = entry
+        return entry[1]
+
+    def to_dict(self):
+        '''返回与旧版QPath._parse相同的字典结构，如{'ClassName': ['=', 'Dialog']}
+        '''
+        return dict((name, [operator, value]) for name, operator, value in self.items)
+
+    def __str__(self):
+        delimit_str = " " + PROPERTY_SEP + " "
+        return delimit_str.join(["%s %s '%s'" % item for item in self.items])
+
+
+class QPathPlan(object):
+    '''编译后的QPath查询计划，创建后不再修改，可在多个QPath实例间共享
+    '''
+    __slots__ = ('qpath_string', 'separator', 'steps')
+
+    def __init__(self, qpath_string, separator, steps):
+        self.qpath_string = qpath_string
+        self.separator = separator
+        self.steps = tuple(steps)
+
+    def to_parsed(self):
+        '''返回旧版的解析结构：[{'ClassName': ['=', 'Dialog']}, ...]
+        '''
+        return [step.to_dict() for step in self.steps]
+
+    def __str__(self):
+        qpath_str = ""
+        for step in self.steps:
+            qpath_str += self.separator + " " + str(step)
+        return qpath_str
+
+
+#===============================================================================
+# 属性代价模型
+#===============================================================================
+DEFAULT_PROPERTY_COST = 10 #未声明代价的属性的默认代价
+
+_cost_overrides = {}
+_cost_cache = {}
+_cost_generation = [0] #代价表变化时递增，使各定位符重新排序
+_attribute_cache = {}
+
+def get_property_costs(control_class):
+    '''返回控件类的属性代价表，如{'CLASSNAME': 1, 'CAPTION': 100}
+
+    代价由控件类及其基类的_property_costs属性声明，子类覆盖基类；
+    register_property_costs注册的代价优先级最高。
+    '''
+    costs = _cost_cache.get(control_class)
+    if costs is None:
+        costs = {}
+        for cls in reversed(control_class.__mro__):
+            for name, cost in getattr(cls, '__dict__', {}).get('_property_costs', {}).items():
+                costs[name.upper()] = cost
+            for name, cost in _cost_overrides.get(cls, {}).items():
+                costs[name] = cost
+        _cost_cache[control_class] = costs
+    return costs
+
+def register_property_costs(control_class, costs):
+    '''为控件类注册属性代价，供插件调整内置控件类的代价
+
+    :param control_class: 控件类，对其子类同样生效
+    :param costs: 属性名到代价的字典，代价越小越先匹配
+    '''
+    overrides = _cost_overrides.setdefault(control_class, {})
+    for name, cost in costs.items():
+        overrides[name.upper()] = cost
+    _cost_cache.clear()
+    _cost_generation[0] += 1
+
+def get_attribute_names(control_class):
+    '''返回控件类的属性名映射，如{'CLASSNAME': 'ClassName'}，按类缓存，避免每个控件都调用dir()
+    '''
+    attrs = _attribute_cache.get(control_class)
+    if attrs is None:
+        attrs = dict((attr.upper(), attr) for attr in dir(control_class))
+        _attribute_cache[control_class] = attrs
+    return attrs
+
+
+def parse_property(prop_str):
+    """解析property字符串，返回(属性名, 操作符, 属性值)
+
+    例如将 "ClassName='Dialog' " 解析返回 ('ClassName', '=', 'Dialog')
+    """
+    match_object = _PROPERTY_PATTERN.match(prop_str)
+    if match_object is None:
+        raise QPathError("属性(%s)不符合QPath语法" % prop_str)
+    prop_name, operator, prop_value = match_object.groups()
+    if not operator in OPERATORS:
+        raise QPathError("QPath不支持操作符：%s"  % operator)
+    return prop_name, operator, prop_value
+
+def parse_qpath(qpath_string):
+    """解析qpath，返回(路径分隔符, [[(属性名, 操作符, 属性值), ...], ...])
+
+    :param qpath_string: qpath 字符串
+    """
+    qpath_string = qpath_string.strip()
+    seperator = qpath_string[0]
+    locators = qpath_string[1:].split(seperator)
+
+    parsed_qpath = []
+    for locator in locators:
+        items = OrderedDict()
+        for prop_str in locator.split(PROPERTY_SEP):
+            prop_str = prop_str.strip()
+            if len(prop_str) == 0:
+                raise QPathError("%s 中含有空的属性。" % locator)
+            name, operator, value = parse_property(prop_str)
+            items[name] = (name, operator, value) #同名属性以最后一个为准
+        parsed_qpath.append(list(items.values()))
+    return seperator, parsed_qpath
+
+def _build_plan(qpath_string):
+    seperator, parsed_qpath = parse_qpath(qpath_string)
+    return QPathPlan(qpath_string, seperator, [QPathStep(items) for items in parsed_qpath])
+
+
+class QPathPlanCache(object):
+    '''按QPath字符串缓存QPathPlan，超出容量时淘汰最久未使用的项
+    '''
+
+    def __init__(self, capacity=1024):
+        '''Constructor
+
+        :param capacity: 最多缓存的QPath数量
+        '''
+        self._capacity = capacity
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @capacity.setter
+    def capacity(self, capacity):
+        with self._lock:
+            self._capacity = capacity
+            self._evict()
+
+    def _evict(self):
+        while len(self._plans) > self._capacity:
+            self._plans.popitem(last=False)
+
+    def get(self, qpath_string):
+        '''返回qpath_string对应的QPathPlan，未缓存时编译并缓存
+
+        :rtype: QPathPlan
+        '''
+        with self._lock:
+            plan = self._plans.pop(qpath_string, None)
+            if plan is not None:
+                self._plans[qpath_string] = plan
+                self.hits += 1
+                return plan
+        plan = _build_plan(qpath_string) #编译失败时抛出QPathError，不缓存
+        with self._lock:
+            self.misses += 1
+            self._plans[qpath_string] = plan
+            self._evict()
+        return plan
+
+    def clear(self):
+        '''清空缓存
+        '''
+        with self._lock:
+            self._plans.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._plans)
+
+
+plan_cache = QPathPlanCache()
+
+def compile_qpath(qpath_string):
+    '''编译QPath字符串，返回共享的QPathPlan
+
+    :type qpath_string: string
+    :rtype: QPathPlan
+    '''
+    return plan_cache.get(qpath_string)
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+QPath查找统计模块
+
+QPath.search(profile=True)会按定位符记录查找过程，查找结束后由QPath.getProfile()取得报告：
+
+    * 遍历的节点数、匹配的节点数、按属性名统计的属性获取次数
+    * 获取属性、匹配属性值和枚举子控件各自花费的时间
+    * 到达的最大搜索深度、子控件的来源(快照、条件下推等)
+    * Instance的选择情况，以及是否因limit提前结束
+
+也可以用collect()统计一段代码中的所有查找::
+
+    with qpathprofile.collect() as collector:
+        run_test()
+    print(collector.format_table())
+    open('qpath_profile.json', 'w').write(collector.to_json())
+'''
+
+import json
+import threading
+from collections import OrderedDict
+from timeit import default_timer as timer
+
+
+class StepProfile(object):
+    '''单个定位符的查找统计
+    '''
+
+    def __init__(self, index, step):
+        '''Constructor
+
+        :param index: 定位符在QPath中的序号，从0开始
+        :param step: 定位符字符串
+        '''
+        self.index = index
+        self.step = step
+        self.visited = 0 #参与匹配的节点数
+        self.matched = 0
+        self.fetches = {} #属性名 -> 获取次数
+        self.fetch_time = 0.0
+        self.match_time = 0.0
+        self.children_calls = 0
+        self.children_time = 0.0
+        self.sources = {} #子控件来源 -> 次数
+        self.max_depth = 0
+        self.instance = None
+        self.instance_selected = 0
+
+    def fetch_property(self, get_property, node, key):
+        '''调用get_property(node, key)获取节点属性并计时
+        '''
+        self.fetches[key] = self.fetches.get(key, 0) + 1
+        start = timer()
+        try:
+            return get_property(node, key)
+        finally:
+            self.fetch_time += timer() - start
+
+    def match_predicate(self, predicate, value):
+        '''匹配属性值并计时
+        '''
+        start = timer()
+        try:
+            return predicate.match(value)
+        finally:
+            self.match_time += timer() - start
+
+    def add_children(self, source, elapsed, depth):
+        '''记录一次子控件枚举
+        '''
+        self.children_calls += 1
+        self.children_time += elapsed
+        self.sources[source] = self.sources.get(source, 0) + 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def to_dict(self):
+        return OrderedDict([
+            ('index', self.index),
+            ('step', self.step),
+            ('visited', self.visited),
+            ('matched', self.matched),
+            ('fetches', dict(self.fetches)),
+            ('fetch_time', self.fetch_time),
+            ('match_time', self.match_time),
+            ('children_calls', self.children_calls),
+            ('children_time', self.children_time),
+            ('sources', dict(self.sources)),
+            ('max_depth', self.max_depth),
+            ('instance', self.instance),
+            ('instance_selected', self.instance_selected),
+        ])
+
+
+class SearchProfile(object):
+    '''一次QPath.search的查找统计
+    '''
+
+    def __init__(self, qpath, steps, limit=None):
+        '''Constructor
+
+        :param qpath: QPath字符串
+        :param steps: 定位符列表(qpathplan.QPathStep)
+        :param limit: 查找的limit参数
+        '''
+        self.qpath = qpath
+        self.limit = limit
+        self.steps = []
+        self._by_step = {}
+        for index, step in enumerate(steps):
+            step_profile = StepProfile(index, str(step))
+            step_profile.instance = step.instance
+            self.steps.append(step_profile)
+            self._by_step[id(step)] = step_profile
+        self.found = 0
+        self.elapsed = 0.0
+        self.early_exit = False #是否因找到limit个控件而提前结束
+        self.error_path = None
+
+    def step(self, step):
+        '''返回定位符对应的统计
+        '''
+        return self._by_step[id(step)]
+
+    @property
+    def Visited(self):
+        '''遍历的节点总数
+        '''
+        return sum(s.visited for s in self.steps)
+
+    @property
+    def Fetches(self):
+        '''属性获取总次数
+        '''
+        return sum(sum(s.fetches.values()) for s in self.steps)
+
+    def to_dict(self):
+        return OrderedDict([
+            ('qpath', self.qpath),
+            ('limit', self.limit),
+            ('found', self.found),
+            ('elapsed', self.elapsed),
+            ('early_exit', self.early_exit),
+            ('error_path', self.error_path),
+            ('steps', [s.to_dict() for s in self.steps]),
+        ])
+
+    def to_json(self, indent=2):
+        '''返回JSON格式的报告
+        '''
+        return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False)
+
+    def format_table(self):
+        '''返回表格形式的报告
+        '''
+        lines = ["%s  found=%d elapsed=%.1fms early_exit=%s" % (self.qpath, self.found,
+                                                               self.elapsed * 1000, self.early_exit)]
+        if self.error_path:
+            lines.append("error path: %s" % self.error_path)
+        lines.append("%4s %8s %8s %8s %10s %10s %10s %6s %9s  %s" % ('step', 'visited', 'matched', 'fetches',
+                                                                      'fetch(ms)', 'match(ms)', 'enum(ms)',
+                                                                      'depth', 'instance', 'properties'))
+        for s in self.steps:
+            instance = '-' if s.instance is None else '%s/%d' % (s.instance, s.instance_selected)
+            properties = ', '.join('%s:%d' % item for item in sorted(s.fetches.items()))
+            lines.append("%4d %8d %8d %8d %10.2f %10.2f %10.2f %6d %9s  %s" % (
+                s.index, s.visited, s.matched, sum(s.fetches.values()), s.fetch_time * 1000,
+                s.match_time * 1000, s.children_time * 1000, s.max_depth, instance, properties))
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.format_table()
+
+
+class ProfileCollector(object):
+    '''收集一段代码中所有QPath查找的统计
+    '''
+
+    def __init__(self):
+        self.profiles = []
+
+    def add(self, profile):
+        self.profiles.append(profile)
+
+    def slowest(self, count=10):
+        '''返回耗时最多的count次查找
+        '''
+        return sorted(self.profiles, key=lambda p: p.elapsed, reverse=True)[:count]
+
+    def summary(self):
+        '''按QPath汇总，返回[(qpath, 查找次数, 总耗时, 遍历节点数, 属性获取次数)]，按总耗时降序排列
+        '''
+        totals = OrderedDict()
+        for profile in self.profiles:
+            total = totals.setdefault(profile.qpath, [0, 0.0, 0, 0])
+            total[0] += 1
+            total[1] += profile.elapsed
+            total[2] += profile.Visited
+            total[3] += profile.Fetches
+        rows = [(qpath,) + tuple(total) for qpath, total in totals.items()]
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows
+
+    def to_json(self, indent=2):
+        '''返回JSON格式的全部查找统计
+        '''
+        return json.dumps([p.to_dict() for p in self.profiles], indent=indent, ensure_ascii=False)
+
+    def format_table(self, count=20):
+        '''返回按QPath汇总的表格，只列出总耗时最多的count个
+        '''
+        lines = ["%8s %10s %10s %10s  %s" % ('searches', 'time(ms)', 'visited', 'fetches', 'qpath')]
+        for qpath, searches, elapsed, visited, fetches in self.summary()[:count]:
+            lines.append("%8d %10.1f %10d %10d  %s" % (searches, elapsed * 1000, visited, fetches, qpath))
+        return '\n'.join(lines)
+
+
+_local = threading.local()
+
+def active_collectors():
+    '''返回当前线程中正在收集统计的ProfileCollector列表
+    '''
+    return getattr(_local, 'collectors', ())
+
+class collect(object):
+    '''上下文管理器，统计其中当前线程的所有QPath查找，返回ProfileCollector
+    '''
+
+    def __init__(self):
+        self._collector = ProfileCollector()
+
+    def __enter__(self):
+        _local.collectors = active_collectors() + (self._collector,)
+        return self._collector
+
+    def __exit__(self, *exc_info):
+        _local.collectors = tuple(c for c in active_collectors() if c is not self._collector)
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+控件树快照的向量化QPath匹配模块
+
+在uisnapshot.UISnapshot的列上用NumPy布尔掩码一次匹配所有节点，而不是逐个节点调用QPathEngine.match：
+
+    * 精确匹配转换为与值表序号的整数比较
+    * 正则表达式等其他条件对列中每个不同的值只匹配一次，再按值表序号查表
+    * 节点按先序排列，每个节点的子孙是一段连续的区间(Euler tour)，MaxDepth用深度数组限制
+
+返回的节点及顺序与QPathEngine.search相同。未安装NumPy、需要记录查找统计或控件链、
+或属性值会使匹配抛出异常时，退回QPathEngine逐个节点查找。
+'''
+
+import six
+
+from qt4c import qpathplan
+from qt4c import qpathengine
+
+try:
+    import numpy
+except ImportError: #NumPy是可选依赖
+    numpy = None
+
+
+VECTORIZE_MIN_NODES = 2000 #UISnapshot.search自动使用向量化匹配的最少节点数
+
+
+def is_available():
+    '''是否可以使用向量化匹配
+    '''
+    return numpy is not None
+
+
+class _Fallback(Exception):
+    '''无法向量化匹配，需要退回逐个节点匹配
+    '''
+
+
+class VectorizedMatcher(object):
+    '''快照的向量化匹配器，先序编号和各列在第一次使用时才计算
+    '''
+
+    def __init__(self, snapshot):
+        '''Constructor
+
+        :type snapshot: uisnapshot.UISnapshot
+        '''
+        self.snapshot = snapshot
+        self._order = None #先序位置 => 节点序号
+        self._positions = None #节点序号 => 先序位置
+        self._ends = None #节点序号 => 子树在先序中的结束位置(不含)
+        self._depths = None #先序位置 => 深度
+        self._columns = {}
+        self._value_index = None
+        self._value_types = {}
+        self.fallbacks = 0
+
+    def _build_tour(self):
+        snapshot = self.snapshot
+        count = len(snapshot)
+        order = []
+        depths = []
+        ends = [0] * count
+        positions = [0] * count
+        for root in range(count):
+            if snapshot.parent(root) is not None:
+                continue
+            stack = [(root, 0, False)]
+            while stack:
+                node, depth, leaving = stack.pop()
+                if leaving:
+                    ends[node] = len(order)
+                    continue
+                positions[node] = len(order)
+                order.append(node)
+                depths.append(depth)
+                stack.append((node, depth, True))
+                for child in reversed(snapshot.children(node)):
+                    stack.append((child, depth + 1, False))
+        self._order = numpy.array(order, dtype=numpy.int32)
+        self._positions = positions
+        self._ends = ends
+        self._depths = numpy.array(depths, dtype=numpy.int32)
+
+    def _column(self, key):
+        '''返回按先序排列的属性值序号列，属性不存在时为None
+        '''
+        if key not in self._columns:
+            column = None
+            if self.snapshot.has_property(key):
+                column = numpy.frombuffer(self.snapshot.property_column(key), dtype=numpy.int32)[self._order]
+            self._columns[key] = column
+        return self._columns[key]
+
+    def _column_types(self, key, column):
+        '''返回列中出现的值类型
+        '''
+        types = self._value_types.get(key)
+        if types is None:
+            ids = numpy.unique(column)
+            values = self.snapshot.Values
+            types = set(type(values[value_id]) for value_id in ids[ids >= 0])
+            self._value_types[key] = types
+        return types
+
+    def _lookup(self, value):
+        if self._value_index is None:
+            self._value_index = dict(((type(value), value), index)
+                                     for index, value in enumerate(self.snapshot.Values))
+        return self._value_index.get((type(value), value))
+
+    @staticmethod
+    def _may_raise(predicate, types):
+        '''列中是否有使predicate.match抛出异常的值
+        '''
+        return ((bool in types and predicate.bool_value is None) or
+                (int in types and predicate.int_value is None) or
+                (predicate.regex is not None and float in types))
+
+    def _exact_ids(self, predicate, types):
+        '''精确匹配的条件可能匹配的值表序号，条件不是精确匹配时返回None
+        '''
+        if predicate.regex is not None:
+            return None
+        candidates = [(six.text_type, qpathplan._to_text(predicate.value))]
+        if predicate.int_value is not None:
+            candidates.append((int, predicate.int_value))
+        if predicate.bool_value is not None:
+            candidates.append((bool, predicate.bool_value))
+        ids = []
+        for value_type, value in candidates:
+            if value_type in types and isinstance(value, value_type):
+                index = self._lookup(value)
+                if index is not None:
+                    ids.append(index)
+        return ids
+
+    def _value_table(self, predicate, ids, types):
+        '''对每个不同的值匹配一次，返回以值表序号+1为下标的匹配结果，第0项对应属性不存在(-1)
+        '''
+        values = self.snapshot.Values
+        table = numpy.zeros(len(values) + 1, dtype=bool)
+        if predicate.regex is not None and types <= set([six.text_type, type(None)]):
+            search = predicate.regex.search
+            for value_id in ids.tolist():
+                value = values[value_id]
+                table[value_id + 1] = value is not None and search(value) is not None
+            return table
+        for value_id in ids.tolist():
+            try:
+                table[value_id + 1] = predicate.match(values[value_id])
+            except Exception:
+                raise _Fallback()
+        return table
+
+    def _step_positions(self, step, cache):
+        '''返回匹配定位符各属性条件的先序位置(升序)
+
+        先用精确匹配的条件过滤，其他条件只对剩余节点中出现的值匹配。逐个节点匹配时会抛出异常的
+        条件(如bool属性与非bool值比较)不做向量化，由QPathEngine按原来的顺序匹配。
+        '''
+        positions = cache.get(id(step))
+        if positions is not None:
+            return positions
+        columns = []
+        for predicate in step.predicates:
+            column = self._column(predicate.key)
+            if column is None: #属性不存在时不匹配
+                columns = None
+                break
+            types = self._column_types(predicate.key, column)
+            if self._may_raise(predicate, types):
+                raise _Fallback()
+            columns.append((predicate, column, types))
+        if columns is None:
+            positions = numpy.zeros(0, dtype=numpy.intp)
+        else:
+            mask = None
+            deferred = []
+            for predicate, column, types in columns:
+                ids = self._exact_ids(predicate, types)
+                if ids is None:
+                    deferred.append((predicate, column, types))
+                    continue
+                matched = column == ids[0] if len(ids) == 1 else numpy.isin(column, ids)
+                mask = matched if mask is None else mask & matched
+            for predicate, column, types in deferred:
+                ids = numpy.unique(column if mask is None else column[mask])
+                matched = self._value_table(predicate, ids[ids >= 0], types)[column + 1]
+                mask = matched if mask is None else mask & matched
+            if mask is None:
+                positions = numpy.arange(len(self._order))
+            else:
+                positions = numpy.flatnonzero(mask)
+        cache[id(step)] = positions
+        return positions
+
+    def _step_matches(self, root, step, cache):
+        '''按先序返回root的step.max_depth层子孙中匹配step的节点，与QPathEngine._iter_step_controls一致
+        '''
+        max_depth = step.max_depth
+        start = root
+        if step.uitype is not None and self.snapshot.uitype(root) != step.uitype: #与SnapshotTreeProvider.switch_uitype一致
+            start = self.snapshot.link(root)
+            if start is None or self.snapshot.uitype(start) != step.uitype:
+                return numpy.zeros(0, dtype=numpy.int32)
+            max_depth -= 1 #转换后的节点作为第一层子节点
+        begin = self._positions[start]
+        if start == root:
+            begin += 1
+        end = self._ends[start]
+        positions = self._step_positions(step, cache)
+        lo, hi = numpy.searchsorted(positions, (begin, end))
+        positions = positions[lo:hi]
+        depth_limit = self._depths[self._positions[start]] + max_depth
+        if len(positions):
+            positions = positions[self._depths[positions] <= depth_limit]
+        return self._order[positions]
+
+    def _iter(self, root, steps, level, results, context, cache):
+        step = steps[level]
+        found = self._step_matches(root, step, cache)
+        if step.instance is not None:
+            try:
+                found = found[step.instance:step.instance + 1] if step.instance >= 0 else found[[step.instance]]
+            except IndexError:
+                found = found[:0]
+        if not len(found):
+            context.record_error_path(steps[level:])
+        elif level + 1 == len(steps):
+            context.record_error_path(())
+            results.append(found)
+        else:
+            for node in found.tolist():
+                self._iter(node, steps, level + 1, results, context, cache)
+
+    def search(self, root, steps, limit=None, context=None):
+        '''查找结果与QPathEngine(SnapshotTreeProvider(snapshot)).search相同
+
+        :param root: 根节点序号
+        :param steps: 定位符列表(qpathplan.QPathStep)
+        :param limit: 最多返回的节点个数
+        :type context: qpathengine.SearchContext
+        :param context: 查找状态，只记录error_qpath
+        :return: 节点序号列表；不能向量化匹配时返回None，由调用方逐个节点查找
+        '''
+        if numpy is None or (context is not None and (context.profile is not None or context.path is not None)):
+            return None
+        if self._order is None:
+            self._build_tour()
+        results = []
+        trial = qpathengine.SearchContext()
+        try:
+            self._iter(root, steps, 0, results, trial, {})
+        except _Fallback:
+            self.fallbacks += 1
+            return None
+        if not results:
+            found = numpy.zeros(0, dtype=numpy.int32)
+        elif len(results) == 1:
+            found = results[0]
+        else:
+            found = numpy.concatenate(results)
+        if len(steps) > 1 and len(found) > 1: #按标识去重，保留第一次出现的节点
+            _, first = numpy.unique(found, return_index=True)
+            found = found[numpy.sort(first)]
+        if context is not None and trial.error_qpath is not None:
+            context.record_error_path(trial.error_qpath)
+        found = found.tolist()
+        return found[:limit] if limit is not None else found
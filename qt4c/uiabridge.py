@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+Win32窗口与UIA元素的转换模块
+
+QPath从Win32控件切换到UIType='UIA'时，需要由窗口句柄得到对应的UIA元素。UIAElementBridge
+直接调用IUIAutomation.ElementFromHandle，不再在整个桌面下按NativeWindowHandle查找，
+并在两个方向上缓存转换结果：
+
+    * 句柄 -> 元素：以IsWindow和窗口所属的线程/进程ID校验，句柄被复用时重新获取
+    * 元素 -> 句柄：以元素对象本身为键，读取时同样校验窗口仍然存在
+
+缓存有容量上限，按最近最少使用的顺序淘汰。
+'''
+
+import threading
+from collections import OrderedDict
+
+
+def _win32_window_identity(hwnd):
+    '''返回窗口的(线程ID, 进程ID)，窗口不存在时返回None
+    '''
+    import win32gui
+    import win32process
+    if not win32gui.IsWindow(hwnd):
+        return None
+    return tuple(win32process.GetWindowThreadProcessId(hwnd))
+
+
+class _BridgeEntry(object):
+    __slots__ = ('hwnd', 'element', 'identity')
+
+    def __init__(self, hwnd, element, identity):
+        self.hwnd = hwnd
+        self.element = element
+        self.identity = identity
+
+
+class UIAElementBridge(object):
+    '''窗口句柄与UIA元素的双向缓存
+    '''
+
+    def __init__(self, client, capacity=256, window_identity=_win32_window_identity):
+        '''Constructor
+
+        :param client: IUIAutomation对象
+        :param capacity: 最多缓存的窗口个数
+        :param window_identity: 返回窗口标识的函数，参数为窗口句柄，窗口不存在时返回None；
+                                用于在不产生跨进程调用的情况下校验缓存
+        '''
+        if capacity < 1:
+            raise ValueError("capacity=%s应该>=1" % capacity)
+        self._client = client
+        self._capacity = capacity
+        self._window_identity = window_identity
+        self._lock = threading.Lock()
+        self._by_hwnd = OrderedDict()
+        self._by_element = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def Capacity(self):
+        '''最多缓存的窗口个数
+        '''
+        return self._capacity
+
+    def __len__(self):
+        return len(self._by_hwnd)
+
+    def clear(self):
+        '''清空缓存
+        '''
+        with self._lock:
+            self._by_hwnd.clear()
+            self._by_element.clear()
+
+    def _remove(self, entry):
+        self._by_hwnd.pop(entry.hwnd, None)
+        self._by_element.pop(id(entry.element), None)
+
+    def _add(self, hwnd, element, identity):
+        old = self._by_hwnd.get(hwnd)
+        if old is not None:
+            self._remove(old)
+        entry = _BridgeEntry(hwnd, element, identity)
+        self._by_hwnd[hwnd] = entry
+        self._by_element[id(element)] = entry
+        while len(self._by_hwnd) > self._capacity:
+            _, oldest = self._by_hwnd.popitem(last=False)
+            self._by_element.pop(id(oldest.element), None)
+
+    def _get_valid(self, entry):
+        '''校验缓存项，窗口已不存在或句柄被复用时删除并返回None
+        '''
+        if self._window_identity(entry.hwnd) != entry.identity:
+            self._remove(entry)
+            return None
+        self._by_hwnd[entry.hwnd] = self._by_hwnd.pop(entry.hwnd) #移到最近使用的位置
+        return entry
+
+    def element_from_handle(self, hwnd):
+        '''返回窗口句柄对应的UIA元素
+
+        :param hwnd: 窗口句柄
+        :return: IUIAutomationElement
+        '''
+        with self._lock:
+            entry = self._by_hwnd.get(hwnd)
+            if entry is not None and self._get_valid(entry) is not None:
+                self.hits += 1
+                return entry.element
+            self.misses += 1
+        identity = self._window_identity(hwnd)
+        element = self._client.ElementFromHandle(hwnd)
+        if identity is not None:
+            with self._lock:
+                self._add(hwnd, element, identity)
+        return element
+
+    def handle_from_element(self, element):
+        '''返回UIA元素对应的窗口句柄，元素不对应窗口时返回0
+
+        :param element: IUIAutomationElement
+        '''
+        with self._lock:
+            entry = self._by_element.get(id(element))
+            if entry is not None and entry.element is element and self._get_valid(entry) is not None:
+                self.hits += 1
+                return entry.hwnd
+            self.misses += 1
+        hwnd = element.CurrentNativeWindowHandle
+        if hwnd:
+            identity = self._window_identity(hwnd)
+            if identity is not None:
+                with self._lock:
+                    self._add(hwnd, element, identity)
+        return hwnd
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+UIA属性缓存模块
+
+uiacontrols.Control的每个属性都是一次Current*跨进程调用。缓存模式下，元素及其子元素
+通过IUIAutomationCacheRequest一次取回配置的属性，之后读取Cached*属性，不再产生跨进程
+调用；需要最新的值时显式调用refresh。
+
+缓存模式通过uiacontrols.CachedControl使用::
+
+    root = uiacontrols.CachedControl(root=uia_window)
+    QPath("/ClassName='ListViewItem' && MaxDepth='5'").search(root)
+'''
+
+
+#控件属性名 -> UIA属性ID常量名
+PROPERTY_IDS = {
+    'Name': 'UIA_NamePropertyId',
+    'ClassName': 'UIA_ClassNamePropertyId',
+    'ControlType': 'UIA_ControlTypePropertyId',
+    'Type': 'UIA_LocalizedControlTypePropertyId',
+    'BoundingRect': 'UIA_BoundingRectanglePropertyId',
+    'Enabled': 'UIA_IsEnabledPropertyId',
+    'ProcessId': 'UIA_ProcessIdPropertyId',
+    'HWnd': 'UIA_NativeWindowHandlePropertyId',
+    'HasKeyboardFocus': 'UIA_HasKeyboardFocusPropertyId',
+}
+
+DEFAULT_PROPERTIES = ('Name', 'ClassName', 'ControlType', 'BoundingRect', 'Enabled', 'ProcessId')
+
+
+class UIACacheConfig(object):
+    '''缓存模式的配置：缓存哪些属性，以及对应的CacheRequest
+    '''
+
+    def __init__(self, client, uia_module, properties=DEFAULT_PROPERTIES, subtree=False):
+        '''Constructor
+
+        :param client: IUIAutomation对象
+        :param uia_module: 提供UIA_*PropertyId和TreeScope_*常量的模块
+        :param properties: 要缓存的控件属性名，取值见PROPERTY_IDS
+        :param subtree: 为True时第一次读取子元素就缓存整棵子树，适合元素不多但需要遍历多层的查找；
+                        默认为False，每展开一个元素缓存一层子元素
+        '''
+        for name in properties:
+            if name not in PROPERTY_IDS:
+                raise ValueError("不支持缓存的属性：%s" % name)
+        self._client = client
+        self._uia = uia_module
+        self._property_ids = dict((name, getattr(uia_module, PROPERTY_IDS[name])) for name in properties)
+        self._subtree = subtree
+        self._element_request = None
+        self._children_request = None
+
+    @property
+    def Properties(self):
+        '''缓存的控件属性名
+        '''
+        return sorted(self._property_ids)
+
+    def property_id(self, name):
+        '''返回缓存的属性对应的UIA属性ID，未缓存时返回None
+        '''
+        return self._property_ids.get(name)
+
+    def uia_property_id(self, name):
+        '''返回控件属性对应的UIA属性ID
+        '''
+        return getattr(self._uia, PROPERTY_IDS[name])
+
+    def _create_request(self, scope):
+        request = self._client.CreateCacheRequest()
+        for property_id in self._property_ids.values():
+            request.AddProperty(property_id)
+        request.TreeScope = scope
+        request.TreeFilter = self._client.RawViewCondition
+        return request
+
+    @property
+    def ElementRequest(self):
+        '''只缓存元素自身属性的CacheRequest，也用于FindAllBuildCache
+        '''
+        if self._element_request is None:
+            self._element_request = self._create_request(self._uia.TreeScope_Element)
+        return self._element_request
+
+    @property
+    def Subtree(self):
+        '''读取子元素时是否缓存整棵子树
+        '''
+        return self._subtree
+
+    @property
+    def ChildrenRequest(self):
+        '''同时缓存元素的子元素(或整棵子树)及其属性的CacheRequest
+        '''
+        if self._children_request is None:
+            scope = self._uia.TreeScope_Element | self._uia.TreeScope_Children
+            if self._subtree:
+                scope |= self._uia.TreeScope_Descendants
+            self._children_request = self._create_request(scope)
+        return self._children_request
+
+
+class CachedElement(object):
+    '''带有属性缓存的UIA元素
+    '''
+
+    def __init__(self, config, element, cached=False, has_children=False):
+        '''Constructor
+
+        :type config: UIACacheConfig
+        :param config: 缓存配置
+        :param element: IUIAutomationElement
+        :param cached: element是否已经按config缓存了属性，为False时立即缓存
+        :param has_children: element是否已经缓存了子元素
+        '''
+        self._config = config
+        self._element = element if cached else element.BuildUpdatedCache(config.ElementRequest)
+        self._has_children = has_children
+
+    @property
+    def Element(self):
+        '''IUIAutomationElement
+        '''
+        return self._element
+
+    def refresh(self):
+        '''重新获取缓存的属性，子元素在下一次读取时重新获取
+        '''
+        self._element = self._element.BuildUpdatedCache(self._config.ElementRequest)
+        self._has_children = False
+
+    def get_property(self, name):
+        '''读取属性值，已缓存的属性不产生跨进程调用
+
+        :param name: 控件属性名，见PROPERTY_IDS
+        '''
+        property_id = self._config.property_id(name)
+        if property_id is not None:
+            return self._element.GetCachedPropertyValue(property_id)
+        return self._element.GetCurrentPropertyValue(self._config.uia_property_id(name))
+
+    def children(self):
+        '''返回子元素列表，子元素及其属性通过一次跨进程调用取回
+
+        :rtype: list
+        '''
+        if not self._has_children:
+            self._element = self._element.BuildUpdatedCache(self._config.ChildrenRequest)
+            self._has_children = True
+        elements = self._element.GetCachedChildren()
+        children = []
+        if elements:
+            for i in range(elements.Length):
+                children.append(CachedElement(self._config, elements.GetElement(i), cached=True,
+                                              has_children=self._config.Subtree))
+        return children
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+UIA QPath条件下推模块
+
+将UIA定位符中精确匹配的属性编译为CreatePropertyCondition/CreateAndCondition，
+用一次FindAll查找子控件，由UIA Provider在目标进程内完成过滤，不必逐个遍历元素再逐个获取属性。
+
+    * 正则(~=)匹配以及无法转换为UIA属性的条件作为剩余条件，由QPath在Python中匹配
+    * 只下推MaxDepth为1的定位符：按子孙控件查找会搜索整棵子树，每个结果还要沿父元素向上检查深度，
+      条件较宽时代价高于逐层遍历
+    * 查找使用原始视图(RawViewCondition)，与Control.Children使用的RawViewWalker一致
+    * 编译结果按定位符缓存，定位符来自QPathPlan缓存，重复查找时不再创建条件对象和剩余条件
+'''
+
+import threading
+from collections import OrderedDict
+
+from qt4c import qpathplan
+
+
+#QPath属性名(大写) -> (UIA属性ID常量名, 值类型)
+PROPERTY_MAP = {
+    'NAME': ('UIA_NamePropertyId', 'text'),
+    'CLASSNAME': ('UIA_ClassNamePropertyId', 'text'),
+    'TYPE': ('UIA_LocalizedControlTypePropertyId', 'text'),
+    'CONTROLTYPE': ('UIA_ControlTypePropertyId', 'control_type'),
+    'PROCESSID': ('UIA_ProcessIdPropertyId', 'int'),
+    'HWND': ('UIA_NativeWindowHandlePropertyId', 'int'),
+    'ENABLED': ('UIA_IsEnabledPropertyId', 'bool'),
+    'HASKEYBOARDFOCUS': ('UIA_HasKeyboardFocusPropertyId', 'bool'),
+}
+
+
+class StepCondition(object):
+    '''一级定位符编译后的UIA查找条件
+    '''
+    __slots__ = ('condition', 'scope', 'residual')
+
+    def __init__(self, condition, scope, residual):
+        '''Constructor
+
+        :param condition: UIA条件对象
+        :param scope: TreeScope
+        :type residual: qpathplan.QPathStep
+        :param residual: 需要在Python中匹配的剩余条件
+        '''
+        self.condition = condition
+        self.scope = scope
+        self.residual = residual
+
+
+class ConditionTranslator(object):
+    '''将QPath定位符转换为UIA条件
+    '''
+
+    def __init__(self, client, uia_module, control_types, capacity=1024):
+        '''Constructor
+
+        :param client: IUIAutomation对象
+        :param uia_module: 提供UIA_*PropertyId和TreeScope_*常量的模块(UIAutomationCore.dll的类型库)
+        :param control_types: 控件类型ID到名称的映射，如{50000: 'Button'}
+        :param capacity: 最多缓存的定位符编译结果数量
+        '''
+        self._client = client
+        self._uia = uia_module
+        self._control_type_ids = dict((name, type_id) for type_id, name in control_types.items())
+        self._cache_request = None
+        self._capacity = capacity
+        self._step_conditions = OrderedDict() #(id(step), uitype) -> (step, StepCondition)
+        self._lock = threading.Lock()
+
+    def _convert_value(self, predicate, value_type):
+        '''返回UIA条件使用的属性值，无法转换时返回None
+        '''
+        if value_type == 'text':
+            value = predicate.value
+            if isinstance(value, bytes):
+                value = value.decode('utf8')
+            return value
+        elif value_type == 'int':
+            return predicate.int_value
+        elif value_type == 'bool':
+            return predicate.bool_value
+        elif value_type == 'control_type':
+            return self._control_type_ids.get(qpathplan._to_text(predicate.value))
+
+    def translate(self, step):
+        '''编译定位符，结果按定位符缓存
+
+        :type step: qpathplan.QPathStep
+        :rtype: StepCondition
+        :return: MaxDepth不为1或没有可下推的属性时返回None
+        '''
+        key = (id(step), step.uitype) #缓存项持有step，id不会被其他对象复用
+        with self._lock:
+            entry = self._step_conditions.pop(key, None)
+            if entry is not None:
+                self._step_conditions[key] = entry
+                return entry[1]
+        step_condition = self._translate(step)
+        with self._lock:
+            self._step_conditions[key] = (step, step_condition)
+            while len(self._step_conditions) > self._capacity:
+                self._step_conditions.popitem(last=False)
+        return step_condition
+
+    def _translate(self, step):
+        if step.max_depth != 1:
+            return None
+        conditions = []
+        pushed = set()
+        for predicate in step.predicates:
+            if predicate.operator != '=' or predicate.key not in PROPERTY_MAP:
+                continue
+            id_name, value_type = PROPERTY_MAP[predicate.key]
+            value = self._convert_value(predicate, value_type)
+            if value is None:
+                continue
+            conditions.append(self._client.CreatePropertyCondition(getattr(self._uia, id_name), value))
+            pushed.add(predicate.key)
+        if not conditions:
+            return None
+        condition = conditions[0]
+        for other in conditions[1:]:
+            condition = self._client.CreateAndCondition(condition, other)
+        residual = qpathplan.QPathStep([item for item in step.items if item[0].upper() not in pushed])
+        return StepCondition(condition, self._uia.TreeScope_Children, residual)
+
+    def _get_cache_request(self):
+        if self._cache_request is None:
+            cache_request = self._client.CreateCacheRequest()
+            cache_request.TreeFilter = self._client.RawViewCondition
+            self._cache_request = cache_request
+        return self._cache_request
+
+    def find_all(self, root, step, cache_request=None):
+        '''按定位符查找root的子元素，顺序与逐层遍历一致
+
+        :param root: 开始查找的UIA元素
+        :type step: qpathplan.QPathStep
+        :param cache_request: 查找时同时缓存属性的CacheRequest，TreeFilter应为RawViewCondition
+        :return: (元素列表, 剩余条件)，无法下推时返回None
+        '''
+        step_condition = self.translate(step)
+        if step_condition is None:
+            return None
+        found = root.FindAllBuildCache(step_condition.scope, step_condition.condition,
+                                       cache_request or self._get_cache_request())
+        elements = []
+        if found:
+            for i in range(found.Length):
+                elements.append(found.GetElement(i))
+        return elements, step_condition.residual
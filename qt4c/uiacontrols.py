@@ -11,6 +11,7 @@
 
 import time
 import six
+from comtypes import COMError
 from comtypes.client import CreateObject, GetModule
 from ctypes import *
 
@@ -22,6 +23,9 @@ from qt4c import control
 from qt4c.util import Rectangle,Timeout
 from qt4c.mouse import Mouse,MouseFlag,MouseClickType
 from qt4c.keyboard import Keyboard
+from qt4c.uiacondition import ConditionTranslator
+from qt4c.uiacache import UIACacheConfig, CachedElement
+from qt4c.uiabridge import UIAElementBridge
 from qt4c.exceptions import ControlAmbiguousError, ControlNotFoundError, ControlExpiredError, TimeoutError
 
 
@@ -71,6 +75,10 @@ UIAControlType={50000: 'Button',
                  50039: 'SemanticZoom', 
                  50040: 'AppBar'}
 
+_condition_translator = ConditionTranslator(UIAutomationClient, IUIAutomation, UIAControlType)
+_cache_config = UIACacheConfig(UIAutomationClient, IUIAutomation)
+_uia_bridge = UIAElementBridge(UIAutomationClient)
+
 def find_UIAElm(Condition,timeout=10):
     start = time.time()
     try_count = 0
@@ -86,12 +94,42 @@ def find_UIAElm(Condition,timeout=10):
             try_count += 1
     raise TimeoutError("在%d秒里尝试了%d次" %(timeout,try_count))
 
+def element_from_handle(hwnd, timeout=10):
+    '''返回窗口句柄对应的UIA元素，结果会被缓存，详见uiabridge模块
+    
+    :param hwnd: 窗口句柄
+    :param timeout: 窗口暂时无法获取UIA元素时的重试时间
+    '''
+    try:
+        return Timeout(timeout, 0.5).retry(_uia_bridge.element_from_handle, (hwnd,), (COMError, ValueError))
+    except TimeoutError as e:
+        raise TimeoutError("无法获取窗口(0x%X)的UIA元素：%s" % (hwnd, e))
+
 
 
 class Control(control.Control):
     '''
     UIA方式访问控件基类
     '''
+    
+    #QPath匹配属性时的相对代价：每个属性都是一次跨进程COM调用
+    _property_costs = {
+        'ClassName': 20,
+        'ControlType': 20,
+        'ProcessId': 20,
+        'Enabled': 20,
+        'Valid': 20,
+        'HasKeyboardFocus': 20,
+        'HWnd': 20,
+        'Name': 25,
+        'Type': 25,
+        'BoundingRect': 25,
+        'Width': 25,
+        'Height': 25,
+        'Parent': 30,
+        'Value': 40,
+        'Children': 100,
+    }
     def __init__(self,root=None,locator=None):
         '''构造函数        
         :type root: UIA.Control or None
@@ -121,8 +159,7 @@ class Control(control.Control):
                 if not pid or not self._root.Valid:
                     raise ControlExpiredError("父控件/父窗口已经失效，查找中止！")
                 if self._locator is None:
-                    cnd = UIAutomationClient.CreatePropertyCondition(IUIAutomation.UIA_NativeWindowHandlePropertyId,self._root.HWnd)
-                    self._root = find_UIAElm(cnd)
+                    self._root = element_from_handle(self._root.HWnd)
                             
         if self._locator is None:
             if isinstance(self._root, Control):
@@ -147,7 +184,7 @@ class Control(control.Control):
                     raise TypeError("root应为uiacontrols.Control类型，实际类型为：%s" % type(self._root))
             else:
                 try:
-                    kwargs = {'root':self._root}
+                    kwargs = {'root':self._root, 'limit':2, 'resume':True} #只需判断控件是否唯一，重试时从已匹配的前缀继续
                     foundctrls =  self._timeout.retry(self._locator.search, kwargs, (), lambda x: len(x)>0)
                 except TimeoutError as erro:
                     raise ControlNotFoundError("<%s>中的%s查找超时：%s" % (self._root,self._locator.getErrorPath(),erro))
@@ -254,6 +291,22 @@ class Control(control.Control):
                 child= None
         return children
     
+    def _qpath_find(self, step):
+        '''QPath查找时调用：将定位符编译为UIA条件，用一次FindAll找到可能匹配的控件，详见uiacondition模块
+        
+        :type step: qpathplan.QPathStep
+        :param step: 定位符
+        :return: (控件列表, 需要在Python中匹配的剩余条件)，无法下推时返回None
+        '''
+        if type(self).Children is not Control.Children:
+            return None
+        self.empty_invoke()
+        result = _condition_translator.find_all(self._uiaobj, step)
+        if result is None:
+            return None
+        elements, residual = result
+        return [Control(root=elm) for elm in elements], residual
+    
     @property
     def Parent(self):
         self.empty_invoke()
@@ -286,9 +339,38 @@ class Control(control.Control):
     def equal(self, other):
         if not isinstance(other, Control):
             return False
-        if self.ProcessId != other.ProcessId:
+        return self.IdentityKey == other.IdentityKey
+    
+    @property
+    def RuntimeId(self):
+        """返回UIA元素的RuntimeId
+        
+        :rtype: tuple
+        """
+        return tuple(self._uiaobj.GetRuntimeId())
+    
+    @property
+    def IdentityKey(self):
+        """控件标识，即UIA元素的RuntimeId
+        """
+        return (wincontrols.EnumIdentityType.UIA, self.RuntimeId)
+    
+    def _is_resolved(self):
+        """UIA元素是否已定位，未定位时计算哈希值不调用GetRuntimeId
+        """
+        return not isinstance(self.__dict__.get('_uiaobj'), LazyInit)
+    
+    def _is_stale(self):
+        """已定位的UIA元素是否已失效，以获取RuntimeId探测
+        """
+        uiaobj = self.__dict__.get('_uiaobj')
+        if uiaobj is None or isinstance(uiaobj, LazyInit):
             return False
-        return self._uiaobj == other._uiaobj
+        try:
+            uiaobj.GetRuntimeId()
+        except (COMError, ValueError):
+            return True
+        return False
     
     def exist(self):
         """判断控件是否存在
@@ -319,7 +401,7 @@ class Control(control.Control):
 
     @property
     def hwnd(self):
-        return self._uiaobj.CurrentNativeWindowHandle
+        return _uia_bridge.handle_from_element(self._uiaobj)
     
     @property
     def HasKeyboardFocus(self):
@@ -337,9 +419,118 @@ class Control(control.Control):
         
         
             
+class CachedControl(Control):
+    '''缓存模式的UIA控件，详见uiacache模块
+    
+    属性和子控件通过CacheRequest批量获取，读取时不再产生跨进程调用。缓存的属性在控件构造、
+    查找时获取，之后不会自动更新，需要最新的值时调用refresh。子控件和查找结果同样为缓存模式。
+    '''
+    
+    _property_costs = {
+        'Name': 1,
+        'ClassName': 1,
+        'ControlType': 1,
+        'BoundingRect': 1,
+        'Width': 1,
+        'Height': 1,
+        'Enabled': 1,
+        'ProcessId': 1,
+    }
+    
+    def __init__(self, root=None, locator=None, cache_config=None):
+        '''构造函数
+        
+        :type root: UIA.Control or None
+        :param root: 开始查找的UIA控件或包含UIA的win32control.Window
+        :param locator: UIA控件的name属性或QPath
+        :type cache_config: qt4c.uiacache.UIACacheConfig
+        :param cache_config: 缓存配置，默认缓存uiacache.DEFAULT_PROPERTIES中的属性
+        '''
+        if isinstance(root, CachedElement):
+            self._cached_root = root
+            root = root.Element
+        else:
+            self._cached_root = None
+        Control.__init__(self, root=root, locator=locator)
+        self._cache_config = cache_config or _cache_config
+        self._cached = LazyInit(self, '_cached', self._init_cached)
+        
+    def _init_cached(self):
+        if self._cached_root is not None and self._locator is None:
+            return self._cached_root
+        return CachedElement(self._cache_config, self._uiaobj)
+    
+    def refresh(self):
+        '''重新获取缓存的属性和子控件
+        '''
+        self._cached.refresh()
+        
+    def empty_invoke(self):
+        self._cached
+        
+    @property
+    def Valid(self):
+        return Control.Enabled.fget(self)
+    
+    def _getrect(self):
+        rect = {'Left':0,'Top':0,'Width':0,'Height':0}
+        ( rect['Left'], rect['Top'], rect['Width'], rect['Height'])=self._cached.get_property('BoundingRect')
+        return rect
+    
+    @property
+    def ProcessId(self):
+        return self._cached.get_property('ProcessId')
+    
+    @property
+    def ControlType(self):
+        return UIAControlType[self._cached.get_property('ControlType')]
+    
+    @property
+    def Enabled(self):
+        return self._cached.get_property('Enabled')
+    
+    @property
+    def Children(self):
+        return [CachedControl(root=child, cache_config=self._cache_config) for child in self._cached.children()]
+    
+    def _qpath_find(self, step):
+        result = _condition_translator.find_all(self._uiaobj, step, self._cache_config.ElementRequest)
+        if result is None:
+            return None
+        elements, residual = result
+        return [CachedControl(root=CachedElement(self._cache_config, elm, cached=True), cache_config=self._cache_config)
+                for elm in elements], residual
+    
+    @property
+    def Name(self):
+        return self._cached.get_property('Name')
+    
+    @property
+    def Type(self):
+        return self._cached.get_property('Type')
+    
+    @property
+    def hwnd(self):
+        return self._cached.get_property('HWnd')
+    
+    @property
+    def HasKeyboardFocus(self):
+        return self._cached.get_property('HasKeyboardFocus')
+    
+    @property
+    def ClassName(self):
+        return self._cached.get_property('ClassName')
+    
+    
 class UIAWindows(Control, control.ControlContainer):
     '''UIA控件窗体定义
     '''
+    
+    _property_costs = {
+        'Visible': 45,
+        'Minimized': 45,
+    }
+    
     def __init__(self,root=None, locator=None):
         Control.__init__(self,root=root,locator=locator)
         control.ControlContainer.__init__(self)
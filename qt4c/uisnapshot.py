@@ -0,0 +1,627 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+UI控件树快照模块
+
+将窗口的Win32和/或UIA控件树及选定的属性保存为紧凑的列式格式：
+
+    * 所有属性值放在一个去重的值表中，每个属性是一列值表序号(int32，-1表示属性不存在)
+    * 树结构保存为父节点序号数组，子节点按序号顺序排列，与抓取时Children的顺序一致
+    * Win32节点与其UIA控件树之间的UIType切换保存为链接数组
+
+快照文件可以用mmap打开，各列在第一次访问时才解码。快照可以离线执行QPath查找、比较两个快照的差异，
+也可作为单元测试的数据。
+
+使用示例::
+
+    snapshot = uisnapshot.capture(window, uia_depth=0)
+    snapshot.save('qq.uisnap')
+
+    snapshot = uisnapshot.UISnapshot.load('qq.uisnap')
+    nodes = snapshot.search("/ClassName='TXGuiFoundation'/UIType='UIA' && Name='mainpanel' && MaxDepth='10'")
+    print(snapshot.diff(uisnapshot.UISnapshot.load('qq_new.uisnap')).format())
+'''
+
+import array
+import json
+import mmap
+import struct
+import sys
+from collections import OrderedDict
+
+import six
+
+from qt4c import qpathplan
+from qt4c import qpathengine
+from qt4c import snapshotmatch
+
+
+MAGIC = b'QT4CSNAP'
+VERSION = 1
+_PREAMBLE = struct.Struct('<8sII') #MAGIC、版本号、文件头长度
+
+#默认抓取的属性，控件没有的属性记为不存在
+DEFAULT_PROPERTIES = ('ClassName', 'Caption', 'ControlId', 'Visible', 'Enabled', 'ProcessId', 'HWnd',
+                      'Name', 'ControlType', 'Type')
+#diff时用于识别同一节点的属性
+DEFAULT_KEY_PROPERTIES = ('ClassName', 'ControlId', 'Name', 'ControlType')
+
+_VALUE_TYPES = (six.text_type, bool, float, type(None)) + six.integer_types
+
+
+def _new_array(values=()):
+    return array.array('i', values)
+
+def _array_to_bytes(arr):
+    if sys.byteorder != 'little':
+        arr = _new_array(arr)
+        arr.byteswap()
+    return arr.tobytes() if hasattr(arr, 'tobytes') else arr.tostring()
+
+def _array_from_bytes(data):
+    arr = _new_array()
+    if hasattr(arr, 'frombytes'):
+        arr.frombytes(data)
+    else:
+        arr.fromstring(data)
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr
+
+def _normalize_value(value):
+    '''转换为可保存的属性值，bytes按qpathplan的规则解码，其他类型保存为文本
+    '''
+    if isinstance(value, six.binary_type):
+        value = qpathplan._to_text(value)
+        if isinstance(value, six.binary_type):
+            value = value.decode('latin-1')
+    if not isinstance(value, _VALUE_TYPES):
+        value = six.text_type(value)
+    return value
+
+
+class SnapshotBuilder(object):
+    '''逐个添加节点构建快照，父节点必须先于子节点添加
+    '''
+
+    def __init__(self):
+        self._parents = _new_array()
+        self._uitypes = _new_array()
+        self._links = _new_array()
+        self._names = []
+        self._columns = {} #大写属性名 => 值序号列
+        self._values = []
+        self._value_index = {}
+
+    def __len__(self):
+        return len(self._parents)
+
+    def _intern(self, value):
+        value = _normalize_value(value)
+        key = (type(value), value) #避免True和1、1和1.0被当成同一个值
+        index = self._value_index.get(key)
+        if index is None:
+            index = len(self._values)
+            self._values.append(value)
+            self._value_index[key] = index
+        return index
+
+    def add(self, parent, uitype=None, properties=None):
+        '''添加节点
+
+        :param parent: 父节点序号，根节点为-1
+        :param uitype: 节点的UIType，如'Win'、'UIA'
+        :param properties: 属性名到属性值的字典
+        :return: 节点序号
+        '''
+        index = len(self._parents)
+        if parent >= index:
+            raise ValueError("父节点%d应该先于节点%d添加" % (parent, index))
+        self._parents.append(parent)
+        self._uitypes.append(-1 if uitype is None else self._intern(uitype))
+        self._links.append(-1)
+        for name, value in (properties or {}).items():
+            key = name.upper()
+            column = self._columns.get(key)
+            if column is None:
+                column = self._columns[key] = _new_array([-1] * index)
+                self._names.append(name)
+            column.append(self._intern(value))
+        for column in self._columns.values():
+            if len(column) == index:
+                column.append(-1)
+        return index
+
+    def link(self, node, target):
+        '''记录node切换UIType后对应的节点
+        '''
+        self._links[node] = target
+
+    def build(self):
+        '''
+        :rtype: UISnapshot
+        '''
+        header = {'version': VERSION, 'count': len(self._parents), 'properties': list(self._names),
+                  'sections': {}}
+        sections = [('parents', _array_to_bytes(self._parents)),
+                    ('uitypes', _array_to_bytes(self._uitypes)),
+                    ('links', _array_to_bytes(self._links))]
+        for name in self._names:
+            sections.append(('property:' + name.upper(), _array_to_bytes(self._columns[name.upper()])))
+        sections.append(('values', json.dumps(self._values, ensure_ascii=False).encode('utf-8')))
+        offset = 0
+        for name, data in sections:
+            header['sections'][name] = [offset, len(data)]
+            offset += len(data)
+        header_data = json.dumps(header, sort_keys=True).encode('utf-8')
+        data = b''.join([_PREAMBLE.pack(MAGIC, VERSION, len(header_data)), header_data] +
+                        [data for _, data in sections])
+        return UISnapshot(data)
+
+
+class UISnapshot(object):
+    '''UI控件树快照，节点为整数序号，各列在第一次访问时才从数据中解码
+    '''
+
+    def __init__(self, data, closer=None):
+        '''Constructor
+
+        :param data: 快照数据，bytes或mmap
+        :param closer: close()时调用的函数
+        '''
+        magic, version, header_len = _PREAMBLE.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("不是控件树快照数据")
+        if version != VERSION:
+            raise ValueError("不支持的快照版本:%d" % version)
+        start = _PREAMBLE.size
+        header = json.loads(data[start:start + header_len].decode('utf-8'))
+        self._data = data
+        self._closer = closer
+        self._base = start + header_len
+        self._sections = header['sections']
+        self._count = header['count']
+        self._names = OrderedDict((name.upper(), name) for name in header['properties'])
+        self._columns = {}
+        self._values = None
+        self._children = None
+        self._matcher = None
+
+    @classmethod
+    def load(cls, path, use_mmap=True):
+        '''从文件加载快照
+
+        :param use_mmap: 是否用mmap打开，为False时一次读入全部数据
+        '''
+        with open(path, 'rb') as fd:
+            if not use_mmap:
+                return cls(fd.read())
+            data = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(data, data.close)
+
+    def save(self, path):
+        with open(path, 'wb') as fd:
+            fd.write(self.to_bytes())
+
+    def to_bytes(self):
+        return bytes(self._data[:])
+
+    def close(self):
+        '''释放mmap，之后不能再访问未解码的列
+        '''
+        if self._closer is not None:
+            self._closer()
+            self._closer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _section(self, name):
+        offset, length = self._sections[name]
+        start = self._base + offset
+        return self._data[start:start + length]
+
+    def _column(self, name):
+        column = self._columns.get(name)
+        if column is None:
+            column = self._columns[name] = _array_from_bytes(self._section(name))
+        return column
+
+    @property
+    def Values(self):
+        '''去重后的属性值表
+        '''
+        if self._values is None:
+            self._values = json.loads(self._section('values').decode('utf-8'))
+        return self._values
+
+    @property
+    def PropertyNames(self):
+        return list(self._names.values())
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return (SnapshotNode(self, index) for index in range(self._count))
+
+    def node(self, index):
+        '''
+        :rtype: SnapshotNode
+        '''
+        if not 0 <= index < self._count:
+            raise IndexError("节点序号%d超出范围" % index)
+        return SnapshotNode(self, index)
+
+    def has_property(self, key):
+        return key.upper() in self._names
+
+    def property_column(self, key):
+        '''返回属性的值序号列(array)，属性不存在的节点为-1
+
+        :raises KeyError: 快照中没有该属性
+        '''
+        key = key.upper()
+        if key not in self._names:
+            raise KeyError(key)
+        return self._column('property:' + key)
+
+    @property
+    def Parents(self):
+        '''父节点序号列，根节点为-1
+        '''
+        return self._column('parents')
+
+    def parent(self, index):
+        parent = self.Parents[index]
+        return None if parent < 0 else parent
+
+    def children(self, index):
+        if self._children is None:
+            children = [[] for _ in range(self._count)]
+            for node, parent in enumerate(self.Parents):
+                if parent >= 0:
+                    children[parent].append(node)
+            self._children = children
+        return self._children[index]
+
+    def uitype(self, index):
+        value = self._column('uitypes')[index]
+        return None if value < 0 else self.Values[value]
+
+    def link(self, index):
+        '''返回切换UIType后对应的节点序号，没有时返回None
+        '''
+        target = self._column('links')[index]
+        return None if target < 0 else target
+
+    def get_property(self, index, key):
+        '''
+        :raises KeyError: 节点没有该属性
+        '''
+        key = key.upper()
+        if key in self._names:
+            value = self._column('property:' + key)[index]
+            if value >= 0:
+                return self.Values[value]
+        raise KeyError(key)
+
+    def get(self, index, key, default=None):
+        try:
+            return self.get_property(index, key)
+        except KeyError:
+            return default
+
+    def search(self, qpath, root=0, limit=None, context=None, vectorized=None):
+        '''离线执行QPath查找，根节点相当于QPath.search的root，参数见search_indices
+
+        :rtype: list
+        '''
+        found = self.search_indices(qpath, root, limit, context, vectorized)
+        return [SnapshotNode(self, index) for index in found]
+
+    def search_indices(self, qpath, root=0, limit=None, context=None, vectorized=None):
+        '''离线执行QPath查找，返回节点序号
+
+        :param qpath: QPath字符串或qpath.QPath实例
+        :param root: 开始查找的节点序号
+        :param limit: 最多返回的节点个数
+        :type context: qpathengine.SearchContext
+        :param context: 查找状态，查找失败时可从context.error_qpath取得未能匹配的定位符
+        :param vectorized: 是否使用snapshotmatch向量化匹配，结果相同；默认在安装了NumPy且节点数不少于
+                           snapshotmatch.VECTORIZE_MIN_NODES时使用
+        :rtype: list
+        '''
+        plan = getattr(qpath, '_plan', None)
+        if plan is None:
+            plan = qpathplan.compile_qpath(qpath)
+        if vectorized is None:
+            vectorized = snapshotmatch.is_available() and self._count >= snapshotmatch.VECTORIZE_MIN_NODES
+        found = None
+        if vectorized:
+            if self._matcher is None:
+                self._matcher = snapshotmatch.VectorizedMatcher(self)
+            found = self._matcher.search(root, plan.steps, limit, context)
+        if found is None:
+            engine = qpathengine.QPathEngine(SnapshotTreeProvider(self))
+            found = engine.search(root, plan.steps, limit, context)
+        return found
+
+    def diff(self, other, key_properties=DEFAULT_KEY_PROPERTIES):
+        '''比较本快照(旧)与other(新)的差异
+
+        :rtype: SnapshotDiff
+        '''
+        return diff(self, other, key_properties)
+
+
+class SnapshotNode(object):
+    '''快照中的节点，属性可以用node.ClassName或node['ClassName']读取
+    '''
+    __slots__ = ('snapshot', 'index')
+
+    def __init__(self, snapshot, index):
+        self.snapshot = snapshot
+        self.index = index
+
+    def __getitem__(self, key):
+        return self.snapshot.get_property(self.index, key)
+
+    def __getattr__(self, name):
+        try:
+            return self.snapshot.get_property(self.index, name)
+        except KeyError:
+            raise AttributeError(name)
+
+    def get(self, key, default=None):
+        return self.snapshot.get(self.index, key, default)
+
+    @property
+    def UIType(self):
+        return self.snapshot.uitype(self.index)
+
+    @property
+    def Parent(self):
+        parent = self.snapshot.parent(self.index)
+        return None if parent is None else SnapshotNode(self.snapshot, parent)
+
+    @property
+    def Children(self):
+        return [SnapshotNode(self.snapshot, index) for index in self.snapshot.children(self.index)]
+
+    def to_dict(self):
+        '''返回节点存在的属性
+        '''
+        result = OrderedDict()
+        for name in self.snapshot.PropertyNames:
+            try:
+                result[name] = self.snapshot.get_property(self.index, name)
+            except KeyError:
+                pass
+        return result
+
+    def __eq__(self, other):
+        return isinstance(other, SnapshotNode) and other.snapshot is self.snapshot and other.index == self.index
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((id(self.snapshot), self.index))
+
+    def __repr__(self):
+        props = " && ".join("%s='%s'" % item for item in self.to_dict().items())
+        return "<SnapshotNode %d %s>" % (self.index, props)
+
+
+class SnapshotTreeProvider(qpathengine.TreeProvider):
+    '''快照中的控件树，节点为快照中的节点序号
+    '''
+
+    def __init__(self, snapshot):
+        '''Constructor
+
+        :type snapshot: UISnapshot
+        '''
+        self.snapshot = snapshot
+
+    def children(self, node, step=None):
+        return self.snapshot.children(node)
+
+    def switch_uitype(self, node, uitype):
+        if self.snapshot.uitype(node) == uitype:
+            return None
+        target = self.snapshot.link(node)
+        if target is not None and self.snapshot.uitype(target) == uitype:
+            return [target]
+        return []
+
+    def get_property(self, node, key):
+        try:
+            return self.snapshot.get_property(node, key)
+        except KeyError:
+            raise qpathengine.PropertyUnavailable(key)
+
+    def identity(self, node):
+        return node
+
+    def parent(self, node):
+        return self.snapshot.parent(node)
+
+
+def _uitype_of(node, control_types):
+    for uitype, control_class in control_types.items():
+        if isinstance(node, control_class):
+            return uitype
+
+
+def capture(root, properties=DEFAULT_PROPERTIES, max_depth=None, uia_depth=None, provider=None,
+            control_types=None):
+    '''抓取root及其子孙控件的快照
+
+    :param root: 根控件
+    :param properties: 要保存的属性名，控件没有或读取失败的属性记为不存在
+    :param max_depth: 最多抓取的子孙层数，默认不限制
+    :param uia_depth: 不为None时，对深度不超过uia_depth的Win32控件(root的深度为0)同时抓取其UIA控件树，
+                      离线查找时可以用UIType='UIA'切换
+    :type provider: qpathengine.TreeProvider
+    :param provider: 控件树，默认为qpath.ControlTreeProvider
+    :param control_types: UIType到控件类的映射，默认为qpath.QPath.CONTROL_TYPES
+    :rtype: UISnapshot
+    '''
+    if control_types is None or provider is None:
+        from qt4c import qpath
+        if control_types is None:
+            control_types = qpath.QPath.CONTROL_TYPES
+        if provider is None:
+            provider = qpath.ControlTreeProvider(control_types)
+    keys = [(name, name.upper()) for name in properties]
+    builder = SnapshotBuilder()
+    links = []
+
+    def add_tree(control, parent, depth):
+        stack = [(control, parent, depth)]
+        while stack:
+            control, parent, depth = stack.pop()
+            uitype = _uitype_of(control, control_types)
+            values = OrderedDict()
+            for name, key in keys:
+                try:
+                    values[name] = provider.get_property(control, key)
+                except Exception: #抓取时属性读取失败只记为不存在
+                    pass
+            index = builder.add(parent, uitype, values)
+            if uia_depth is not None and depth <= uia_depth and uitype == qpathplan.EnumUIType.WIN and \
+                    qpathplan.EnumUIType.UIA in control_types:
+                links.append((index, control, depth))
+            if max_depth is None or depth < max_depth:
+                try:
+                    children = provider.children(control)
+                except Exception:
+                    children = []
+                for child in reversed(list(children)):
+                    stack.append((child, index, depth + 1))
+
+    add_tree(root, -1, 0)
+    linked = 0
+    while linked < len(links): #UIA控件树放在Win32控件树之后，各自作为独立的树
+        index, control, depth = links[linked]
+        linked += 1
+        switched = provider.switch_uitype(control, qpathplan.EnumUIType.UIA)
+        if switched:
+            builder.link(index, len(builder))
+            add_tree(switched[0], -1, depth)
+    return builder.build()
+
+
+class SnapshotDiff(object):
+    '''两个快照的差异
+    '''
+
+    def __init__(self, added, removed, changed):
+        self.added = added #新快照中增加的节点
+        self.removed = removed #旧快照中被删除的节点
+        self.changed = changed #[(旧节点, 新节点, {属性名: (旧值, 新值)})]
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    __nonzero__ = __bool__
+
+    def format(self):
+        '''返回文本格式的差异报告
+        '''
+        lines = []
+        for node in self.removed:
+            lines.append("- %r" % node)
+        for node in self.added:
+            lines.append("+ %r" % node)
+        for old, new, changes in self.changed:
+            lines.append("* %d => %d" % (old.index, new.index))
+            for name, (old_value, new_value) in changes.items():
+                lines.append("    %s: %r => %r" % (name, old_value, new_value))
+        return "\n".join(lines)
+
+
+_MISSING = object()
+
+def _resolved_columns(snapshot, names):
+    '''返回各属性按节点排列的属性值，属性不存在时为_MISSING
+    '''
+    values = snapshot.Values
+    columns = []
+    for name in names:
+        if snapshot.has_property(name):
+            columns.append([_MISSING if value < 0 else values[value] for value in snapshot.property_column(name)])
+        else:
+            columns.append([_MISSING] * len(snapshot))
+    return columns
+
+
+def _node_paths(snapshot, key_properties, path_ids):
+    '''计算各节点的路径编号
+
+    路径从根开始每层为(UIType, 识别属性值, 同一父节点下相同识别属性的序号)，相同的路径在path_ids中
+    对应相同的编号，两个快照共用path_ids即可按编号对应节点
+    '''
+    count = len(snapshot)
+    links = snapshot._column('links')
+    linked_from = dict((target, index) for index, target in enumerate(links) if target >= 0)
+    uitypes = [snapshot.uitype(index) for index in range(count)]
+    signatures = list(zip(uitypes, *_resolved_columns(snapshot, key_properties)))
+    paths = [0] * count
+    ordinals = {}
+    for index, parent in enumerate(snapshot.Parents):
+        if parent >= 0:
+            prefix = paths[parent]
+        elif index in linked_from:
+            prefix = ('->', paths[linked_from[index]])
+        else:
+            prefix = -1
+        counter_key = (prefix, signatures[index])
+        ordinal = ordinals.get(counter_key, 0)
+        ordinals[counter_key] = ordinal + 1
+        paths[index] = path_ids.setdefault(counter_key + (ordinal,), len(path_ids))
+    return paths
+
+
+def diff(old, new, key_properties=DEFAULT_KEY_PROPERTIES):
+    '''比较两个快照的差异，节点按从根开始的路径对应，每层以UIType、key_properties属性值及同名兄弟中的序号识别
+
+    :type old: UISnapshot
+    :type new: UISnapshot
+    :param key_properties: 识别同一节点的属性
+    :rtype: SnapshotDiff
+    '''
+    path_ids = {}
+    old_paths = dict((path, index) for index, path in enumerate(_node_paths(old, key_properties, path_ids)))
+    new_paths = _node_paths(new, key_properties, path_ids)
+    names = list(OrderedDict((name.upper(), name) for name in old.PropertyNames + new.PropertyNames).values())
+    old_columns = _resolved_columns(old, names)
+    new_columns = _resolved_columns(new, names)
+    added, changed = [], []
+    for index, path in enumerate(new_paths):
+        old_index = old_paths.pop(path, None)
+        if old_index is None:
+            added.append(new.node(index))
+            continue
+        changes = OrderedDict()
+        for name, old_column, new_column in zip(names, old_columns, new_columns):
+            old_value = old_column[old_index]
+            new_value = new_column[index]
+            if old_value is not new_value and (old_value is _MISSING or new_value is _MISSING or
+                                               type(old_value) != type(new_value) or old_value != new_value):
+                changes[name] = (None if old_value is _MISSING else old_value,
+                                 None if new_value is _MISSING else new_value)
+        if changes:
+            changed.append((old.node(old_index), new.node(index), changes))
+    removed = [old.node(index) for index in sorted(old_paths.values())]
+    return SnapshotDiff(added, removed, changed)
@@ -152,6 +152,8 @@ class Rectangle(object):
         
 class ProcessMem(object):
     '''跨进程数据读写
+    
+    每个对象都会打开一次进程并分配一块远程内存，反复读写时请使用procmem.get_arena返回的内存池
     '''
     def __init__(self, processId, buffer_size=None, remote_buffer=None):
         '''构造函数。如果remote_buffer不为None，直接使用此远程进程的内存块，否则在远程进程中创建一个字节数为buffer_size的内存块。 
@@ -339,7 +341,7 @@ class MsgSyncer(object):
             self._syncwnd, self._eventobj = MsgSyncer.pid_event_map[self._pid]
         else:
             qp = qpath.QPath("/classname='AssistWnd' && processid='%d'" % self._pid)
-            wnds = qp.search(None)
+            wnds = qp.search(None, limit=2)
             if len(wnds) >1 :
                 raise RuntimeError("在一个进程中发现两个SyncWnd")
             elif len(wnds) == 1:
@@ -510,10 +512,12 @@ class Process(object):
         self._adjustProcessPrivileges()
         try:
             hProcess = win32api.OpenProcess(win32con.PROCESS_TERMINATE, False, self._pid).Detach()
+            try:
+                item = TrayNotifyBar()[self._pid] #进程退出后图标所属窗口已销毁，无法再按进程ID查找
+            except:
+                item = None
             win32process.TerminateProcess(hProcess, 0)
             win32api.CloseHandle(hProcess)
-            tb = TrayNotifyBar()
-            item = tb[self._pid]
             if item:
                 item.destroy()
         except:
@@ -561,8 +565,9 @@ class MetisView(object):
         '''
         x = 0
         y = 0
-        w = abs(self._control.BoundingRect.Right - self._control.BoundingRect.Left)
-        h = abs(self._control.BoundingRect.Top - self._control.BoundingRect.Bottom)
+        rect = self._control.BoundingRect
+        w = abs(rect.Right - rect.Left)
+        h = abs(rect.Top - rect.Bottom)
         return x, y, w, h
 
     @property
@@ -574,9 +579,7 @@ class MetisView(object):
     def screenshot(self):
         '''当前容器的区域截图
         '''
-        
-        bbox =(self._control.BoundingRect.Left,self._control.BoundingRect.Top,
-               self._control.BoundingRect.Right,self._control.BoundingRect.Bottom)
+        bbox = self._control.BoundingRect.All
         im = ImageGrab.grab(bbox)
         return im
 
@@ -588,11 +591,14 @@ class MetisView(object):
         :param offset_y: 相对于该控件的坐标offset_y，百分比( 0 -> 1 )，不传入则默认该控件的中央
         :type offset_y: float|None
         '''
-        if offset_x != None:
-            offset_x = int(offset_x*abs(self._control.BoundingRect.Right - self._control.BoundingRect.Left))
-        if offset_y != None:
-            offset_y = int(offset_y*abs(self._control.BoundingRect.Top - self._control.BoundingRect.Bottom))
-        self._control.click(xOffset=offset_x, yOffset=offset_y)
+        with self._control._property_scope():
+            if offset_x != None or offset_y != None:
+                rect = self._control.BoundingRect
+                if offset_x != None:
+                    offset_x = int(offset_x*abs(rect.Right - rect.Left))
+                if offset_y != None:
+                    offset_y = int(offset_y*abs(rect.Top - rect.Bottom))
+            self._control.click(xOffset=offset_x, yOffset=offset_y)
 
     def send_keys(self, text):
         Keyboard.inputKeys(text)
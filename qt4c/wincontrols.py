@@ -26,12 +26,19 @@ import six
 
 from testbase.util import LazyInit, Timeout
 
-from qt4c.util import ProcessMem, Rectangle
+from qt4c.util import Rectangle
 from qt4c.mouse import Mouse, MouseFlag, MouseClickType
 from qt4c.exceptions import ControlAmbiguousError, ControlNotFoundError, TimeoutError
-from qt4c import accessible, control, wintypes, util
+from qt4c import accessible, control, wintypes, util, winevent, winhung, wininfo, procmem
 from qt4c.keyboard import Keyboard
 
+class EnumIdentityType(object):
+    '''控件标识(Control.IdentityKey)的类型
+    '''
+    WIN = 'Win'
+    UIA = 'UIA'
+    TRAY_ICON = 'TrayIcon'
+    
 class _CWindow(object):
     '''
     Win32 Window类（bridge）
@@ -57,6 +64,28 @@ class Control(control.Control):
     '''
     Win32 Window类，实现Win32窗口常用属性。
     '''
+    
+    #QPath匹配属性时的相对代价：本地user32调用代价低，发送跨进程窗口消息的属性代价高
+    _property_costs = {
+        'HWnd': 0,
+        'ClassName': 1,
+        'ControlId': 1,
+        'Style': 1,
+        'ExStyle': 1,
+        'Valid': 1,
+        'Enabled': 1,
+        'ProcessId': 1,
+        'ThreadId': 1,
+        'Visible': 2,
+        'BoundingRect': 3,
+        'Parent': 3,
+        'TopLevelWindow': 5,
+        'Width': 6,
+        'Height': 6,
+        'AccessibleObject': 50,
+        'Caption': 100,
+        'Text': 100,
+    }
 
     def __init__(self, root=None, locator=None):
         '''Constructor
@@ -94,8 +123,10 @@ class Control(control.Control):
                 wndobj = self._root
         else:
             try:
-                kwargs = {'root': self._root}
-                foundctrls =  self._timeout.retry(self._locator.search, kwargs, (), lambda x: len(x)>0 )
+                kwargs = {'root': self._root, 'limit': 2, 'resume': True} #只需判断控件是否唯一，重试时从已匹配的前缀继续
+                foundctrls = winevent.wait_for(lambda: self._locator.search(**kwargs),
+                                               self._timeout.timeout, self._timeout.interval, self._event_scope(),
+                                               processes=self._event_processes())
             except TimeoutError as erro:
                 raise ControlNotFoundError("<%s>中的%s查找超时：%s" % (self._locator, self._locator.getErrorPath(), erro))
             nctrl = len(foundctrls)
@@ -104,6 +135,43 @@ class Control(control.Control):
             wndobj = _CWindow(foundctrls[0].HWnd)
         return wndobj
     
+    def _bind_prefetched(self):
+        '''预取结果唯一且窗口仍有效时直接定位到该窗口
+        '''
+        take = getattr(self._locator, '_take_prefetched', None)
+        if take is None or not isinstance(self.__dict__.get('_wndobj'), LazyInit):
+            return
+        found = take(self._root)
+        if found is not None and len(found) == 1:
+            self._wndobj = _CWindow(found[0].HWnd)
+    
+    def _event_scope(self):
+        '''等待本控件出现或消失时关注的窗口，None表示关注所有窗口
+        '''
+        try:
+            if isinstance(self._root, six.integer_types):
+                hwnd = self._root
+            elif isinstance(self._root, (Control, _CWindow)):
+                hwnd = self._root.HWnd
+            else:
+                return None
+        except Exception:
+            return None
+        if not hwnd or hwnd == win32gui.GetDesktopWindow():
+            return None
+        return [hwnd]
+    
+    def _event_processes(self):
+        '''在桌面下等待本控件时关注的进程，由定位符第一级的ProcessId确定，None表示所有进程
+        '''
+        plan = getattr(self._locator, '_plan', None)
+        if plan is None or not plan.steps:
+            return None
+        for predicate in plan.steps[0].predicates:
+            if predicate.key == 'PROCESSID' and predicate.operator == '=' and predicate.int_value is not None:
+                return [predicate.int_value]
+        return None
+    
     @staticmethod
     def __enum_childwin_callback(hwnd, hwnds):
         parent = hwnds[0]
@@ -127,6 +195,41 @@ class Control(control.Control):
             return False
         return (self.HWnd == other.HWnd)
     
+    @property
+    def IdentityKey(self):
+        '''控件标识，即窗口句柄
+        '''
+        return (EnumIdentityType.WIN, self.HWnd)
+    
+    def _is_resolved(self):
+        '''窗口已定位，或由窗口句柄直接创建
+        '''
+        if self._locator is None and isinstance(self._root, six.integer_types):
+            return True
+        return not isinstance(self.__dict__.get('_wndobj'), LazyInit)
+    
+    def _is_stale(self):
+        '''已定位的窗口句柄是否已失效
+        '''
+        wndobj = self.__dict__.get('_wndobj')
+        if wndobj is None or isinstance(wndobj, LazyInit):
+            return False
+        return not win32gui.IsWindow(wndobj.HWnd)
+    
+    def _property_scope(self):
+        return wininfo.scope()
+    
+    def _scoped_window_info(self):
+        '''在wininfo.scope()内返回按窗口句柄缓存的WindowInfo，否则返回None
+        '''
+        cache = wininfo.current_cache()
+        if cache is None:
+            return None
+        try:
+            return cache.get(self.HWnd)
+        except win32gui.error: #窗口已失效时由各属性按原来的方式处理
+            return None
+    
     def exist(self):
         '''判断控件是否存在
         '''
@@ -143,7 +246,7 @@ class Control(control.Control):
             if isinstance(self._root, Control):
                 if not self._root.exist():
                     return False
-            foundctrls = self._locator.search(root=self._root)
+            foundctrls = self._locator.search(root=self._root, limit=2)
             nctrl = len(foundctrls)
             if (nctrl > 1):
                 raise ControlAmbiguousError("<%s>找到%d个控件" % (self._locator, nctrl))
@@ -155,22 +258,24 @@ class Control(control.Control):
     def wait_for_exist(self, timeout, interval ):
         '''等待控件存在
         '''
-        Timeout(timeout, interval).retry(self.exist, (), (), lambda x:x==True)
+        winevent.wait_for(self.exist, timeout, interval, self._event_scope(), winevent.APPEAR_EVENTS,
+                          self._event_processes())
         
     def waitForExist(self, timeout, interval ):
         '''等待控件存在
         '''
-        Timeout(timeout, interval).retry(self.exist, (), (), lambda x:x==True)
+        self.wait_for_exist(timeout, interval)
         
     def wait_for_invalid(self, timeout=10.0, interval=0.5 ):
         '''等待控件失效
         '''
-        Timeout(timeout, interval).retry(self.exist, (), (), lambda x:x==False)
+        winevent.wait_for(lambda: not self.exist(), timeout, interval, self._event_scope(),
+                          processes=self._event_processes())
         
     def waitForInvalid(self, timeout=10.0, interval=0.5 ):
         '''等待控件失效
         '''
-        Timeout(timeout, interval).retry(self.exist, (), (), lambda x:x==False) 
+        self.wait_for_invalid(timeout, interval)
         
     @property
     def BoundingRect(self):
@@ -179,6 +284,9 @@ class Control(control.Control):
         :rtype: util.Rectangle
         :return: util.Rectangle实例
         """
+        info = self._scoped_window_info()
+        if info is not None:
+            return info.BoundingRect
         scale = util.getDpi()
         rect = win32gui.GetWindowRect(self.HWnd)
         rect = [it * scale for it in rect]
@@ -188,26 +296,45 @@ class Control(control.Control):
     def Caption(self):
         """返回窗口标题
         
+        读取文本的每条消息最多等待winhung.TEXT_TIMEOUT毫秒，超时时返回空字符串。
+        
         :rtype: StringType
         :return: 窗口标题
         """
-        buf_size = 0
-        try:
-            textlength = ctypes.c_long(0)
-            hr = ctypes.windll.user32.SendMessageTimeoutA(self.HWnd, win32con.WM_GETTEXTLENGTH, 0, 0, 0, 200, ctypes.byref(textlength))
-            if hr == 0 or textlength.value < 0:
-                return ""
-            buf_size = textlength.value + 1
-        except win32gui.error:
+        text = self._read_text()
+        if text is None:
             return ""
-
-        if buf_size <= 0:
+        return text
+    
+    def _read_text(self, registry=None):
+        '''读取窗口文本，窗口无响应时返回None
+        
+        :type registry: winhung.HungWindowRegistry
+        :param registry: 为None时总是读取，窗口已销毁时返回空字符串；否则跳过已登记为无响应的窗口，
+                         登记读取超时的窗口，窗口已销毁时抛出win32gui.error
+        '''
+        hwnd = self.HWnd
+        thread_id = None
+        if registry is not None:
+            thread_id = self.ThreadId #窗口已销毁时抛出win32gui.error，与空标题区分
+            if registry.is_hung(hwnd, thread_id):
+                return None
+        textlength, timed_out = winhung.send_message_timeout(hwnd, win32con.WM_GETTEXTLENGTH, 0, 0)
+        if textlength is None:
+            if timed_out:
+                if registry is not None:
+                    registry.record_timeout(hwnd, thread_id)
+                return None
+            if registry is not None and not win32gui.IsWindow(hwnd):
+                raise win32gui.error(winerror.ERROR_INVALID_WINDOW_HANDLE, 'SendMessageTimeout', '无效的窗口句柄')
             return ""
-        # pybuffer = win32gui.PyMakeBuffer(buf_size)
-        # ret = win32gui.SendMessage(self.HWnd, win32con.WM_GETTEXT, buf_size, pybuffer)
-
+        buf_size = textlength + 1
         pybuffer = ctypes.create_unicode_buffer(buf_size)
-        ret = ctypes.windll.user32.SendMessageW(self.HWnd, win32con.WM_GETTEXT, buf_size, ctypes.byref(pybuffer))
+        ret, timed_out = winhung.send_message_timeout(hwnd, win32con.WM_GETTEXT, buf_size, ctypes.byref(pybuffer))
+        if ret is None and timed_out:
+            if registry is not None:
+                registry.record_timeout(hwnd, thread_id)
+            return None
         if ret:
             text = pybuffer.value
             try:
@@ -247,6 +374,9 @@ class Control(control.Control):
     def ClassName(self):
         '''返回窗口类名
         '''
+        info = self._scoped_window_info()
+        if info is not None:
+            return info.ClassName
         text = win32gui.GetClassName(self.HWnd)
         os_encoding = locale.getdefaultlocale(None)[1]
         try:
@@ -266,6 +396,9 @@ class Control(control.Control):
     def Enabled(self):
         '''此控件是否可用
         '''
+        info = self._scoped_window_info()
+        if info is not None:
+            return info.Enabled
         bEnable = win32gui.IsWindowEnabled(self.HWnd)
         if bEnable == 1:
             return True
@@ -276,6 +409,9 @@ class Control(control.Control):
     def ExStyle(self):
         """此控件的扩展样式
         """
+        info = self._scoped_window_info()
+        if info is not None:
+            return info.ExStyle
         return win32gui.GetWindowLong(self.HWnd, win32con.GWL_EXSTYLE)
         
     @property
@@ -307,6 +443,9 @@ class Control(control.Control):
         
     @property
     def ProcessId(self):
+        info = self._scoped_window_info()
+        if info is not None:
+            return info.ProcessId
         pid = win32process.GetWindowThreadProcessId(self.HWnd)[1]
         return pid
     
@@ -314,6 +453,9 @@ class Control(control.Control):
     def Style(self):
         """此控件的样式
         """
+        info = self._scoped_window_info()
+        if info is not None:
+            return info.Style
         return win32gui.GetWindowLong(self.HWnd, win32con.GWL_STYLE)
         
     @property
@@ -337,6 +479,9 @@ class Control(control.Control):
     def ThreadId(self):
         '''窗口线程ID
         '''
+        info = self._scoped_window_info()
+        if info is not None:
+            return info.ThreadId
         tid = win32process.GetWindowThreadProcessId(self.HWnd)[0]
         return tid
     
@@ -364,6 +509,9 @@ class Control(control.Control):
     def Visible(self):
         '''此控件是否可见
         '''
+        info = self._scoped_window_info()
+        if info is not None:
+            return info.Visible
         if not self.Valid:
             return False
         bVisible = win32gui.IsWindowVisible(self.HWnd)
@@ -372,6 +520,17 @@ class Control(control.Control):
         else:
             return False
         
+    @property
+    def WindowInfo(self):
+        '''一次读取的窗口属性记录，在wininfo.scope()内按窗口句柄复用
+        
+        :rtype: wininfo.WindowInfo
+        '''
+        cache = wininfo.current_cache()
+        if cache is not None:
+            return cache.get(self.HWnd)
+        return wininfo.WindowInfo.fetch(self.HWnd)
+        
     @property
     def AccessibleObject(self):
         """返回AccessibleObject
@@ -384,16 +543,18 @@ class Control(control.Control):
     def Width(self):
         """宽度
         """
-        if self.BoundingRect:
-            return self.BoundingRect.Right - self.BoundingRect.Left
+        rect = self.BoundingRect
+        if rect:
+            return rect.Right - rect.Left
         return 0
     
     @property
     def Height(self):
         """高度
         """
-        if self.BoundingRect:
-            return self.BoundingRect.Bottom - self.BoundingRect.Top
+        rect = self.BoundingRect
+        if rect:
+            return rect.Bottom - rect.Top
         return 0
         
     def click(self, mouseFlag=MouseFlag.LeftButton, 
@@ -446,21 +607,20 @@ class ListViewItem(control.Control):
         """获取ListView的某项Item的文本
         """
         rect = wintypes.RECT()
-        rcsize = ctypes.sizeof(wintypes.RECT)
-        pm = util.ProcessMem(self._parent.ProcessId, buffer_size=rcsize)
         rect.left = commctrl.LVIR_SELECTBOUNDS
-        pm.write(ctypes.byref(rect), rcsize)
-        
-        # Fill in the requested item
-        retval = win32gui.SendMessage(self._parent.HWnd,
-                                      commctrl.LVM_GETITEMRECT,
-                                      self.item_index,
-                                      pm.Buffer)
-    
-        # if it succeeded
-        if not retval:
-            raise RuntimeError("Did not succeed in getting rectangle")
-        pm.read(ctypes.byref(rect), rcsize)
+        with procmem.get_arena(self._parent.ProcessId).allocate(ctypes.sizeof(rect)) as block:
+            block.write(rect)
+            
+            # Fill in the requested item
+            retval = win32gui.SendMessage(self._parent.HWnd,
+                                          commctrl.LVM_GETITEMRECT,
+                                          self.item_index,
+                                          block.Address)
+        
+            # if it succeeded
+            if not retval:
+                raise RuntimeError("Did not succeed in getting rectangle")
+            block.read_into(rect)
         parentRC = self._parent.BoundingRect
         
         return util.Rectangle((parentRC.Left+rect.left,
@@ -472,38 +632,185 @@ class ListViewItem(control.Control):
     def Text(self):
         """获取ListView的某项Item的文本
         """
-        dwPid = win32process.GetWindowThreadProcessId(self._parent.HWnd)[1]
-        hProcess = win32api.OpenProcess(win32con.PROCESS_ALL_ACCESS, False, dwPid).Detach()
-        
         if 'PROGRAMFILES(X86)' in os.environ:
             lvi = wintypes.LVITEM64()
         else:
             lvi = wintypes.LVITEM()
-        pTextBuf = ctypes.c_char_p(six.b('\0') * win32con.MAX_PATH)
-    
-        plvi = ctypes.windll.kernel32.VirtualAllocEx(hProcess, None, ctypes.sizeof(wintypes.LVITEM), win32con.MEM_COMMIT, win32con.PAGE_READWRITE)  # @UndefinedVariable
-        pBuf = ctypes.windll.kernel32.VirtualAllocEx(hProcess, None, win32con.MAX_PATH, win32con.MEM_COMMIT, win32con.PAGE_READWRITE) # @UndefinedVariable
-        lvi.iSubItem = 0
-        lvi.pszText = pBuf
-        lvi.cchTextMax = win32con.MAX_PATH
-        lvi.mask = commctrl.LVIF_TEXT
-        ctypes.windll.kernel32.WriteProcessMemory(hProcess, plvi, ctypes.byref(lvi), ctypes.sizeof(wintypes.LVITEM), None) # @UndefinedVariable
-        ctypes.windll.kernel32.WriteProcessMemory(hProcess, pBuf, 0, win32con.MAX_PATH, None) # @UndefinedVariable
-        win32gui.SendMessage(self._parent.HWnd, commctrl.LVM_GETITEMTEXT, self.item_index, plvi)
-        ctypes.windll.kernel32.ReadProcessMemory(hProcess, pBuf, pTextBuf, win32con.MAX_PATH, None) # @UndefinedVariable
-        ctypes.windll.kernel32.VirtualFreeEx(hProcess, plvi, ctypes.sizeof(wintypes.LVITEM), win32con.MEM_DECOMMIT) # @UndefinedVariable
-        ctypes.windll.kernel32.VirtualFreeEx(hProcess, pBuf, win32con.MAX_PATH, win32con.MEM_DECOMMIT) # @UndefinedVariable
-        win32api.CloseHandle(hProcess)
-        pTextBuf = pTextBuf.value.decode('gbk').encode('utf8')
-        return pTextBuf
+        text = ctypes.create_string_buffer(win32con.MAX_PATH)
+        arena = procmem.get_arena(self._parent.ProcessId)
+        with arena.allocate(ctypes.sizeof(lvi)) as lvi_block, arena.allocate(win32con.MAX_PATH) as text_block:
+            text_block.write(text) #复用的内存块可能留有上次的文本
+            lvi.iSubItem = 0
+            lvi.pszText = text_block.Address
+            lvi.cchTextMax = win32con.MAX_PATH
+            lvi.mask = commctrl.LVIF_TEXT
+            lvi_block.write(lvi)
+            win32gui.SendMessage(self._parent.HWnd, commctrl.LVM_GETITEMTEXT, self.item_index, lvi_block.Address)
+            text_block.read_into(text)
+        return text.value.decode('gbk').encode('utf8')
+    
+def _native_text(text):
+    '''转换为与Caption相同的字符串类型：Python 2为utf8编码的str，Python 3为str
+    '''
+    if six.PY2 and isinstance(text, six.text_type):
+        return text.encode('utf8')
+    if six.PY3 and isinstance(text, six.binary_type):
+        return text.decode('utf8')
+    return text
+
+class ListViewSnapshot(object):
+    """ListView各行指定列的文本，由ListView.snapshot一次读出
+    """
+    def __init__(self, columns, rows):
+        '''Constructor
+        
+        :param columns: 列(子项)序号列表
+        :param rows: 每行一个元组，依次为各列的文本
+        '''
+        self.Columns = tuple(columns)
+        self._rows = rows
+        self._indexes = {}
+        
+    def __len__(self):
+        return len(self._rows)
+    
+    def __iter__(self):
+        return iter(self._rows)
+    
+    def __getitem__(self, row):
+        return self._rows[row]
     
+    def _position(self, column):
+        try:
+            return self.Columns.index(column)
+        except ValueError:
+            raise ValueError("快照中没有第%s列，已读取的列为%s" % (column, self.Columns))
+    
+    def text(self, row, column=0):
+        '''返回第row行第column列的文本
+        '''
+        return self._rows[row][self._position(column)]
+    
+    def index(self, text, column=0):
+        '''返回第column列文本等于text的第一行的序号，没有时返回-1
+        
+        每列第一次查找时建立文本到行序号的映射，之后的查找不再遍历各行。
+        '''
+        position = self._position(column)
+        index = self._indexes.get(position)
+        if index is None:
+            index = {}
+            for row, texts in enumerate(self._rows):
+                index.setdefault(texts[position], row)
+            self._indexes[position] = index
+        return index.get(_native_text(text), -1)
+
 class ListView(Control):
     """sysLisView32 控件类型
     """
+    TEXT_SIZE = 1024 #读取每项文本时的最大字符数
+    
     @property
     def ItemCount(self):
         "The number of items in the ListView"
         return win32gui.SendMessage(self.HWnd,commctrl.LVM_GETITEMCOUNT)
+    
+    @property
+    def ColumnCount(self):
+        '''列数，没有表头时为1
+        '''
+        header = win32gui.SendMessage(self.HWnd, commctrl.LVM_GETHEADER, 0, 0)
+        if not header:
+            return 1
+        return max(win32gui.SendMessage(header, commctrl.HDM_GETITEMCOUNT, 0, 0), 1)
+    
+    def _read_rows(self, rows, columns):
+        '''逐行读取各列的文本，所有行共用同一块远程内存
+        
+        :param rows: 行序号列表
+        :param columns: 列(子项)序号列表
+        :return: 每行一个文本元组的生成器
+        '''
+        hwnd = self.HWnd
+        lvi = wintypes.LVITEMW64() if 'PROGRAMFILES(X86)' in os.environ else wintypes.LVITEMW32()
+        lvi_size = ctypes.sizeof(lvi)
+        char_size = ctypes.sizeof(ctypes.c_wchar)
+        text_buf = ctypes.create_unicode_buffer(self.TEXT_SIZE)
+        arena = procmem.get_arena(self.ProcessId)
+        with arena.allocate(lvi_size) as item_block, arena.allocate(self.TEXT_SIZE * char_size) as text_block:
+            lvi.pszText = text_block.Address
+            lvi.cchTextMax = self.TEXT_SIZE
+            for row in rows:
+                texts = []
+                for column in columns:
+                    lvi.iSubItem = column
+                    item_block.write(lvi)
+                    length = min(win32gui.SendMessage(hwnd, commctrl.LVM_GETITEMTEXTW, row, item_block.Address),
+                                 self.TEXT_SIZE - 1)
+                    if length > 0:
+                        text_block.read_into(text_buf, length * char_size)
+                        texts.append(_native_text(text_buf[:length]))
+                    else:
+                        texts.append(_native_text(u''))
+                yield tuple(texts)
+    
+    def snapshot(self, columns=None):
+        '''一次读出所有行指定列的文本
+        
+        所有行和列共用同一块远程内存，每个单元格只需写入LVITEM、发送一次消息和读取文本。
+        
+        :type columns: list
+        :param columns: 要读取的列(子项)序号，默认为全部列
+        :rtype: ListViewSnapshot
+        '''
+        if columns is None:
+            columns = range(self.ColumnCount)
+        columns = list(columns)
+        return ListViewSnapshot(columns, list(self._read_rows(range(self.ItemCount), columns)))
+    
+    def find_item(self, text, start=-1):
+        '''以LVM_FINDITEM查找文本与text相同(不区分大小写)的项，owner-data列表由其父窗口完成查找
+        
+        :param text: 项的文本
+        :param start: 从start的下一项开始查找，-1表示从第一项开始
+        :return: 项的序号，没有时返回-1
+        '''
+        if isinstance(text, six.binary_type):
+            text = text.decode('utf8')
+        info = wintypes.LVFINDINFOW64() if 'PROGRAMFILES(X86)' in os.environ else wintypes.LVFINDINFOW32()
+        info_size = ctypes.sizeof(info)
+        data = text.encode('utf-16-le') + b'\0\0'
+        with procmem.get_arena(self.ProcessId).allocate(info_size + len(data)) as block:
+            info.flags = commctrl.LVFI_STRING
+            info.psz = block.Address + info_size
+            block.write(info)
+            block.write(data, offset=info_size)
+            return win32gui.SendMessage(self.HWnd, commctrl.LVM_FINDITEMW, start, block.Address)
+    
+    def index(self, text):
+        '''返回文本等于text(区分大小写)的第一项的序号，没有时返回-1
+        
+        先以LVM_FINDITEM找出候选项再核对文本，不需要读取所有项；owner-data列表的父窗口不支持查找、
+        或忽略起始位置(返回的序号不再增加)时退回到读取所有项的文本。
+        '''
+        text = _native_text(text)
+        found = False
+        finished = False
+        index = -1
+        for _ in range(self.ItemCount): #最多核对ItemCount个候选项
+            next_index = self.find_item(text, index)
+            if next_index < 0:
+                finished = True
+                break
+            if next_index <= index: #父窗口忽略了起始位置或从头开始查找
+                break
+            index = next_index
+            found = True
+            if next(self._read_rows([index], [0]))[0] == text:
+                return index
+        if not (found and finished) and self.Style & commctrl.LVS_OWNERDATA:
+            return self.snapshot([0]).index(text)
+        return -1
 
     @property
     def Items(self):
@@ -521,11 +828,9 @@ class ListView(Control):
                 raise IndexError("key超出下标范围!")
             return ListViewItem(self, key)
         elif isinstance(key, six.string_types):
-            if(isinstance(key, six.text_type)):
-                key = key.encode('utf8')
-            for item in self:
-                if item.Text == key:
-                    return item
+            index = self.index(key)
+            if index >= 0:
+                return ListViewItem(self, index)
             raise ValueError("cannot find Listview item of text %s" %key)  
         raise TypeError('参数key=%s, 不是int或string' % key)    
 
@@ -538,6 +843,15 @@ class Window(Control, control.ControlContainer):
     '''
     Win32 Window类，实现Win32窗口常用属性。
     '''
+    
+    _property_costs = {
+        'TopMost': 1,
+        'Maximized': 2,
+        'Minimized': 2,
+        'OwnerWindow': 2,
+        'PopupWindow': 2,
+    }
+    
     def __init__(self, root=None, locator=None):
         '''Constructor
         
@@ -642,8 +956,8 @@ class Window(Control, control.ControlContainer):
             
     
     def _wait_for_disabled_or_invisible(self, timeout=60, interval=0.5):
-        tt = util.Timeout(timeout, interval)
-        tt.retry(lambda x: x, (self, ), (), lambda x: x.Enabled==False or x.Valid==False or x.Visible==False)
+        winevent.wait_for(lambda: self.Enabled==False or self.Valid==False or self.Visible==False,
+                          timeout, interval, [self.HWnd], winevent.DISAPPEAR_EVENTS)
         
     def close(self):
         '''关闭窗口
@@ -703,7 +1017,7 @@ class Window(Control, control.ControlContainer):
         '''
         if False == self.Valid:
             return 
-        self.waitForValue('Valid', False, timeout, interval, False)
+        winevent.wait_for(lambda: self.Valid==False, timeout, interval, [self.HWnd], winevent.DISAPPEAR_EVENTS)
         
     def waitForInvisible(self, timeout=10.0, interval=0.5):
         '''等待窗口消失
@@ -713,7 +1027,7 @@ class Window(Control, control.ControlContainer):
         '''
         if False == self.Visible:
             return 
-        self.waitForValue('Visible', False, timeout, interval, False)
+        winevent.wait_for(lambda: self.Visible==False, timeout, interval, [self.HWnd], winevent.DISAPPEAR_EVENTS)
 
 #class ShellTrayWnd(Control):
 #    """Tray Window"""
@@ -818,56 +1132,64 @@ class TrayNotifyBar(Control):
         else:
             qp = qpath.QPath("/ClassName='Shell_TrayWnd'/ClassName='TrayNotifyWnd'/ClassName='SysPager'/ClassName='ToolbarWindow32' && MaxDepth='5'")
         Control.__init__(self, locator=qp)
+        self._index = None
     
     @property
     def Items(self):
         """返回TrayNotifyBar的全部TrayNotifyIcon
         """
-        itemcount = win32gui.SendMessage(self.HWnd, commctrl.TB_BUTTONCOUNT, 0, 0)
-        tb = wintypes.TBBUTTON()
-        tbsize = ctypes.sizeof(wintypes.TBBUTTON)
-        td = wintypes.TRAYDATA()
-        tdsize = ctypes.sizeof(wintypes.TRAYDATA)
-        pm = util.ProcessMem(self.ProcessId, buffer_size=tbsize)
-        items = []
-        for i in range(itemcount):
-            win32gui.SendMessage(self.HWnd, commctrl.TB_GETBUTTON, i, pm.Buffer)
-            pm.read(ctypes.byref(tb), tbsize)
-            pmtmp = util.ProcessMem(self.ProcessId, remote_buffer=tb.dwData)
-            pmtmp.read(ctypes.byref(td), tdsize)
-            
-            isSeparator = tb.fsStyle & commctrl.TBSTYLE_SEP
-            isEnable = tb.fsState & commctrl.TBSTATE_ENABLED
-            if not isSeparator and isEnable:
-                items.append(_TrayIcon(tb, td, self))
+        return list(self.index(refresh=True))
+    
+    def index(self, refresh=False):
+        """返回托盘图标的索引
+        
+        索引在按钮个数不变时复用，refresh为True时重新读取全部图标。
         
-        return items
+        :rtype: TrayIconIndex
+        """
+        count = win32gui.SendMessage(self.HWnd, commctrl.TB_BUTTONCOUNT, 0, 0)
+        index = self._index
+        if refresh or index is None or index.ButtonCount != count:
+            index = self._index = TrayIconIndex(_read_tray_icons(self, count), count)
+        return index
     
-    def refresh(self):
-        """刷新通知区域
+    def refresh(self, stale_only=False):
+        """刷新通知区域：鼠标依次移过图标，系统会移除所属进程已退出的图标
+        
+        :type stale_only: bool
+        :param stale_only: 只移过所属进程已退出的图标
+        :return: 移过的图标个数
         """
-        width = self.BoundingRect.Width
-        height = self.BoundingRect.Height
+        index = self.index(refresh=True)
+        icons = index.stale() if stale_only else index.Icons
         hwnd = self.HWnd
-        row = height // 16
-        col = width // 16
-        itemCnt = row * col
-        for _ in range(itemCnt):
-            l,t,r,b = self.BoundingRect.All
-            for y in range(t,b,8):
-                for x in range(l,r,8):
-                    Mouse.postMove(hwnd, x, y)
-#                    win32api.SetCursorPos((x,y))
+        with self._property_scope():
+            for icon in reversed(icons): #从后往前移过，移除的图标不影响前面图标的位置
+                rect = icon.BoundingRect
+                if rect.Width > 0 and rect.Height > 0:
+                    Mouse.postMove(hwnd, (rect.Left + rect.Right) // 2, (rect.Top + rect.Bottom) // 2)
+        if icons:
             time.sleep(0.05)
+        self._index = None
+        return len(icons)
     
     def __getitem__(self, key):
-        if isinstance(key, six.string_types):
-            return None
+        """按进程ID(int)或提示文本(string)查找图标，没有时返回None
+        
+        先在已有的索引中查找并核对，找不到或图标已变化时重新读取一次全部图标。
+        """
+        if isinstance(key, (six.string_types, bytes)):
+            find, check = TrayIconIndex.by_tips, lambda icon: _tips_text(icon.Tips) == _tips_text(key)
         else:
-            for icon in self.Items:
-                if icon.ProcessId == key:
-                    return icon
-            return None
+            find, check = TrayIconIndex.by_pid, lambda icon: icon.ProcessId == key
+        cached = self._index
+        index = self.index()
+        icon = find(index, key)
+        if icon is not None and check(icon):
+            return icon
+        if index is cached: #复用的索引可能已过期
+            return find(self.index(refresh=True), key)
+        return None
     
 class TrayTaskBar(Control):
     """系统的任务栏区域(win7以上不可用)
@@ -881,29 +1203,12 @@ class TrayTaskBar(Control):
     def Items(self):
         """返回TrayTaskBar的全部TrayNotifyIcon
         """
-        itemcount = win32gui.SendMessage(self.HWnd, commctrl.TB_BUTTONCOUNT, 0, 0)
-        tb = wintypes.TBBUTTON()
-        tbsize = ctypes.sizeof(wintypes.TBBUTTON)
-        td = wintypes.TRAYDATA()
-        tdsize = ctypes.sizeof(wintypes.TRAYDATA)
-        pm = util.ProcessMem(self.ProcessId, buffer_size=tbsize)
-        items = []
-        for i in range(itemcount):
-            win32gui.SendMessage(self.HWnd, commctrl.TB_GETBUTTON, i, pm.Buffer)
-            pm.read(ctypes.byref(tb), tbsize)
-            pmtmp = util.ProcessMem(self.ProcessId, remote_buffer=tb.dwData)
-            pmtmp.read(ctypes.byref(td), tdsize)
-            isSeparator = tb.fsStyle & commctrl.TBSTYLE_SEP
-            isEnable = tb.fsState & commctrl.TBSTATE_ENABLED
-            if not isSeparator and isEnable:
-                items.append(_TrayIcon(tb, td, self))
-        
-        return items
+        return _read_tray_icons(self, win32gui.SendMessage(self.HWnd, commctrl.TB_BUTTONCOUNT, 0, 0))
     
     def __getitem__(self, key):
-        if isinstance(key, six.string_types):
+        if isinstance(key, (six.string_types, bytes)):
             for icon in self.Items:
-                if icon.Tips == key:
+                if _tips_text(icon.Tips) == _tips_text(key):
                     return icon
             return None
         else:
@@ -912,6 +1217,91 @@ class TrayTaskBar(Control):
                     return icon
             return None
         
+def _read_tray_icons(bar, count):
+    '''一次遍历读出工具栏中所有可用的托盘图标，各按钮共用同一块远程内存
+    
+    :param bar: TrayNotifyBar或TrayTaskBar
+    :param count: 按钮个数
+    :rtype: list
+    '''
+    hwnd = bar.HWnd
+    tb = wintypes.TBBUTTON()
+    td = wintypes.TRAYDATA()
+    arena = procmem.get_arena(bar.ProcessId)
+    icons = []
+    with arena.allocate(ctypes.sizeof(tb)) as block:
+        for i in range(count):
+            win32gui.SendMessage(hwnd, commctrl.TB_GETBUTTON, i, block.Address)
+            block.read_into(tb)
+            isSeparator = tb.fsStyle & commctrl.TBSTYLE_SEP
+            isEnable = tb.fsState & commctrl.TBSTATE_ENABLED
+            if not isSeparator and isEnable:
+                arena.read_at(tb.dwData, td)
+                icons.append(_TrayIcon(tb, td, bar))
+    return icons
+
+def _tips_text(tips):
+    '''将提示文本统一为unicode，_TrayIcon.Tips返回utf-8编码的字符串
+    '''
+    if isinstance(tips, bytes):
+        return tips.decode('utf-8', 'replace')
+    return tips
+
+class TrayIconIndex(object):
+    """托盘图标的索引，按进程ID、提示文本或所属窗口句柄查找，由TrayNotifyBar.index返回
+    """
+    def __init__(self, icons, button_count):
+        '''Constructor
+        
+        :param icons: _TrayIcon列表
+        :param button_count: 建立索引时工具栏的按钮个数
+        '''
+        self.Icons = icons
+        self.ButtonCount = button_count
+        self._pids = None
+        self._hwnds = {}
+        self._tips = None
+        for icon in icons:
+            self._hwnds.setdefault(icon._td.hwnd, icon)
+    
+    def __len__(self):
+        return len(self.Icons)
+    
+    def __iter__(self):
+        return iter(self.Icons)
+    
+    def by_pid(self, pid):
+        '''返回进程的第一个图标，没有时返回None
+        
+        第一次按进程ID查找时才读取各图标所属的进程。
+        '''
+        if self._pids is None:
+            self._pids = {}
+            for icon in self.Icons:
+                self._pids.setdefault(icon.OwnerProcessId, icon)
+        return self._pids.get(pid)
+    
+    def by_hwnd(self, hwnd):
+        '''返回所属窗口为hwnd的第一个图标，没有时返回None
+        '''
+        return self._hwnds.get(hwnd)
+    
+    def by_tips(self, tips):
+        '''返回提示文本为tips的第一个图标，没有时返回None
+        
+        第一次按提示文本查找时才读取各图标的提示文本，比较时统一为unicode。
+        '''
+        if self._tips is None:
+            self._tips = {}
+            for icon in self.Icons:
+                self._tips.setdefault(_tips_text(icon.Tips), icon)
+        return self._tips.get(_tips_text(tips))
+    
+    def stale(self):
+        '''返回所属进程已退出的图标列表
+        '''
+        return [icon for icon in self.Icons if not icon.OwnerProcessId]
+
 class _TrayIcon(control.Control):
     """通知栏或任务栏的项
     """
@@ -921,6 +1311,16 @@ class _TrayIcon(control.Control):
         self._tb = copy.deepcopy(tbButton)
         self._td = copy.deepcopy(trayData)
         self._notifybar = notifyBar
+        self._owner_pid = None
+    
+    @property
+    def OwnerProcessId(self):
+        """第一次读取时所属窗口的进程ID，窗口已销毁时为0
+        """
+        if self._owner_pid is None:
+            tid, pid = win32process.GetWindowThreadProcessId(self._td.hwnd)
+            self._owner_pid = pid if tid else 0
+        return self._owner_pid
 
     @property
     def BoundingRect(self):
@@ -930,15 +1330,13 @@ class _TrayIcon(control.Control):
         :return: util.Rectangle
         """
         barBoundingRect = self._notifybar.BoundingRect
-        rcsize = ctypes.sizeof(wintypes.RECT)
-        pm = util.ProcessMem(self._notifybar.ProcessId, buffer_size=rcsize)
         rc = wintypes.RECT()
-        
-        win32gui.SendMessage(self._notifybar.HWnd, 
-                             commctrl.TB_GETRECT, 
-                             self._tb.idCommand, 
-                             pm.Buffer)
-        pm.read(ctypes.byref(rc), rcsize)
+        with procmem.get_arena(self._notifybar.ProcessId).allocate(ctypes.sizeof(rc)) as block:
+            win32gui.SendMessage(self._notifybar.HWnd, 
+                                 commctrl.TB_GETRECT, 
+                                 self._tb.idCommand, 
+                                 block.Address)
+            block.read_into(rc)
         left = barBoundingRect.Left + rc.left
         top = barBoundingRect.Top + rc.top
         right = left + rc.right - rc.left
@@ -967,10 +1365,9 @@ class _TrayIcon(control.Control):
     def Tips(self):
         """图标提示
         """
-        pm = util.ProcessMem(self._notifybar.ProcessId, remote_buffer=self._tb.iString)
         # tips = ctypes.c_wchar_p('\0' * win32con.MAX_PATH)
         tips = ctypes.create_unicode_buffer(win32con.MAX_PATH)
-        pm.read(tips, win32con.MAX_PATH)
+        procmem.get_arena(self._notifybar.ProcessId).read_at(self._tb.iString, tips, win32con.MAX_PATH)
         from qt4c.util import myEncode
         if isinstance(tips.value, six.text_type):
             return myEncode(tips.value, 'utf-8', 'UNICODE')
@@ -1013,8 +1410,14 @@ class _TrayIcon(control.Control):
         
     def equal(self, other):
         if isinstance(other, _TrayIcon):
-            return self.ProcessId==other.ProcessId
+            return self.IdentityKey == other.IdentityKey
         return id(self)==other
+    
+    @property
+    def IdentityKey(self):
+        '''图标标识，与equal一致，按所属窗口和图标ID区分，同一进程的多个图标标识不同
+        '''
+        return (EnumIdentityType.TRAY_ICON, self._td.hwnd, self._td.uID)
  
  
 class ComboBox(Control):
@@ -1193,12 +1596,11 @@ class TreeViewItem(control.Control):
         
     @property
     def BoundingRect(self):              
-        rect_size = ctypes.sizeof(wintypes.RECT)
-        pmrect = ProcessMem(processId=self._pid, buffer_size=rect_size)
-        pmrect.write(ctypes.byref(ctypes.c_int(self.__item)), rect_size)
-        win32gui.SendMessage(self.HWnd, commctrl.TVM_GETITEMRECT, True, pmrect.Buffer)
         rect = wintypes.RECT()
-        pmrect.read(ctypes.byref(rect), rect_size)
+        with procmem.get_arena(self._pid).allocate(ctypes.sizeof(rect)) as block:
+            block.write(ctypes.c_int(self.__item))
+            win32gui.SendMessage(self.HWnd, commctrl.TVM_GETITEMRECT, True, block.Address)
+            block.read_into(rect)
         tvrect = win32gui.GetWindowRect(self.HWnd)
         return Rectangle((tvrect[0]+rect.left, tvrect[1]+rect.top, tvrect[0]+rect.right, tvrect[1]+rect.bottom))
 
@@ -1219,19 +1621,18 @@ class TreeViewItem(control.Control):
     
     @property
     def Text(self):
-        pmbuf = ProcessMem(processId=self._pid, buffer_size=win32con.MAX_PATH)
-        pmbuf.write(ctypes.c_char_p(six.b('\0') * win32con.MAX_PATH), win32con.MAX_PATH)                       
-        ptext = ctypes.c_char_p(six.b('\0') * win32con.MAX_PATH)
+        ptext = ctypes.create_string_buffer(win32con.MAX_PATH)
         tvi = wintypes.TVITEM()
-        tvi.mask = commctrl.TVIF_TEXT
-        tvi.pszText = pmbuf.Buffer
-        tvi.cchTextMax = win32con.MAX_PATH
-        tvi.hItem = self.__item
-        tvisize = ctypes.sizeof(wintypes.TVITEM)        
-        pmtvi = ProcessMem(processId=self._pid, buffer_size=tvisize)        
-        pmtvi.write(ctypes.byref(tvi), tvisize)        
-        win32gui.SendMessage(self.HWnd, commctrl.TVM_GETITEM, 0, pmtvi.Buffer)
-        pmbuf.read(ptext, win32con.MAX_PATH)    
+        arena = procmem.get_arena(self._pid)
+        with arena.allocate(win32con.MAX_PATH) as text_block, arena.allocate(ctypes.sizeof(tvi)) as tvi_block:
+            text_block.write(ptext)
+            tvi.mask = commctrl.TVIF_TEXT
+            tvi.pszText = text_block.Address
+            tvi.cchTextMax = win32con.MAX_PATH
+            tvi.hItem = self.__item
+            tvi_block.write(tvi)
+            win32gui.SendMessage(self.HWnd, commctrl.TVM_GETITEM, 0, tvi_block.Address)
+            text_block.read_into(ptext)
         return util.myEncode(ptext.value, 'utf-8', 'gbk') 
     
     @property
@@ -1393,7 +1794,8 @@ class Menu(Window):
         '''
         if root==None and locator==None:
             control.Control.__init__(self)
-            hwnd = Menu._timeout.retry(self.__findSysMenuWindow,(),(),lambda x: x != None)
+            hwnd = winevent.wait_for(self.__findSysMenuWindow, Menu._timeout.timeout, Menu._timeout.interval,
+                                     None, winevent.APPEAR_EVENTS)
             root = Control(root=hwnd)
         
         Window.__init__(self, root, locator)
@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+基于WinEvent的等待模块
+
+等待控件出现、消失、失效时不再每0.5秒重新查找一次，而是在窗口创建、显示、隐藏、销毁、
+名称或状态变化时才重新检查：
+
+    * WinEventHookSource在独立的消息循环线程中调用SetWinEventHook，接收窗口事件；
+      只在有等待者时安装钩子，最后一个等待者结束时卸载
+    * WaiterService只唤醒与事件窗口相关的等待者，由等待者在自己的线程中重新检查条件；
+      关注整个桌面的等待者指定了进程时只由这些进程的窗口事件唤醒，否则只由顶层窗口的创建和显示事件唤醒
+    * 两次检查至少间隔interval秒，期间的事件合并为一次检查，检查次数不会多于按interval轮询
+    * 为防止遗漏事件，等待者每隔safety_poll秒(不小于interval的4倍)也会检查一次
+    * 无法安装事件钩子时(如非Windows系统)，退回到按interval轮询
+
+使用示例::
+
+    from qt4c import winevent
+    ctrls = winevent.wait_for(lambda: qp.search(root), timeout=10, interval=0.5)
+'''
+
+import threading
+import time
+
+from testbase.util import Timeout
+from qt4c.exceptions import TimeoutError
+
+
+EVENT_OBJECT_CREATE = 0x8000
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_SHOW = 0x8002
+EVENT_OBJECT_HIDE = 0x8003
+EVENT_OBJECT_STATECHANGE = 0x800A
+EVENT_OBJECT_NAMECHANGE = 0x800C
+
+WATCHED_EVENTS = frozenset([EVENT_OBJECT_CREATE, EVENT_OBJECT_DESTROY, EVENT_OBJECT_SHOW,
+                            EVENT_OBJECT_HIDE, EVENT_OBJECT_STATECHANGE, EVENT_OBJECT_NAMECHANGE])
+APPEAR_EVENTS = frozenset([EVENT_OBJECT_CREATE, EVENT_OBJECT_SHOW, EVENT_OBJECT_NAMECHANGE,
+                           EVENT_OBJECT_STATECHANGE])
+DISAPPEAR_EVENTS = frozenset([EVENT_OBJECT_DESTROY, EVENT_OBJECT_HIDE, EVENT_OBJECT_STATECHANGE])
+DESKTOP_EVENTS = frozenset([EVENT_OBJECT_CREATE, EVENT_OBJECT_SHOW]) #scope和processes为None时只关注顶层窗口的这些事件
+SAFETY_POLL_RATIO = 4 #没有事件时检查的间隔至少是interval的几倍
+
+DEFAULT_SAFETY_POLL = 2.0 #收到事件之外，每隔多少秒检查一次条件
+
+
+class EventSource(object):
+    '''窗口事件源接口
+    '''
+
+    def start(self, callback):
+        '''开始接收事件
+
+        :param callback: 事件回调，参数为(event, hwnd)，可能在任意线程中调用
+        :rtype: bool
+        :return: 是否成功
+        '''
+        raise NotImplementedError("请在%s类中实现start" % type(self))
+
+    def stop(self):
+        '''停止接收事件
+        '''
+        raise NotImplementedError("请在%s类中实现stop" % type(self))
+
+
+class SyntheticEventSource(EventSource):
+    '''由调用方产生事件的事件源，用于测试
+    '''
+
+    def __init__(self, available=True):
+        self._available = available
+        self._callback = None
+
+    def start(self, callback):
+        if not self._available:
+            return False
+        self._callback = callback
+        return True
+
+    def stop(self):
+        self._callback = None
+
+    def emit(self, event, hwnd):
+        '''产生一个事件
+        '''
+        if self._callback is not None:
+            self._callback(event, hwnd)
+
+
+class WinEventHookSource(EventSource):
+    '''在独立线程中通过SetWinEventHook接收窗口事件
+    '''
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WM_QUIT = 0x0012
+
+    def __init__(self, events=WATCHED_EVENTS):
+        self._events = sorted(events)
+        self._thread = None
+        self._thread_id = None
+        self._started = threading.Event()
+        self._ok = False
+
+    def start(self, callback):
+        self._callback = callback
+        self._started = threading.Event()
+        self._ok = False
+        self._thread = threading.Thread(target=self._run, name="WinEventHook")
+        self._thread.daemon = True
+        self._thread.start()
+        self._started.wait(5)
+        return self._ok
+
+    def stop(self):
+        if self._thread_id is not None:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+            self._thread.join(5)
+            self._thread_id = None
+
+    def _run(self):
+        try:
+            import ctypes
+            from ctypes import wintypes
+            user32 = ctypes.windll.user32
+            WinEventProc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                              wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+            user32.SetWinEventHook.restype = wintypes.HANDLE
+            user32.SetWinEventHook.argtypes = [wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE, WinEventProc,
+                                               wintypes.DWORD, wintypes.DWORD, wintypes.DWORD]
+            callback = self._callback
+
+            def proc(hook, event, hwnd, id_object, id_child, thread_id, event_time):
+                if hwnd:
+                    callback(event, hwnd)
+            self._proc = WinEventProc(proc) #保持引用，避免回调被回收
+
+            hooks = []
+            for event in self._events: #每个事件单独挂钩，避免收到LOCATIONCHANGE等高频事件
+                hook = user32.SetWinEventHook(event, event, 0, self._proc, 0, 0, self.WINEVENT_OUTOFCONTEXT)
+                if hook:
+                    hooks.append(hook)
+            self._ok = len(hooks) == len(self._events)
+            if not self._ok:
+                for hook in hooks:
+                    user32.UnhookWinEvent(hook)
+                return
+            self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        except Exception:
+            self._ok = False
+            return
+        finally:
+            self._started.set()
+
+        msg = wintypes.MSG()
+        try:
+            while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            for hook in hooks:
+                user32.UnhookWinEvent(hook)
+
+
+def _win32_root_of(hwnd):
+    '''返回窗口所在的顶层窗口
+    '''
+    import ctypes
+    GA_ROOT = 2
+    return ctypes.windll.user32.GetAncestor(hwnd, GA_ROOT)
+
+def _win32_process_of(hwnd):
+    '''返回窗口所属的进程ID
+    '''
+    import win32process
+    return win32process.GetWindowThreadProcessId(hwnd)[1]
+
+
+class _Waiter(object):
+    __slots__ = ('events', 'hwnds', 'roots', 'processes', 'wake')
+
+    def __init__(self, events, hwnds, roots, processes):
+        self.events = events
+        self.hwnds = hwnds
+        self.roots = roots
+        self.processes = processes
+        self.wake = threading.Event()
+
+
+class WaiterService(object):
+    '''等待服务，收到窗口事件时唤醒相关的等待者
+    '''
+
+    def __init__(self, source=None, root_of=_win32_root_of, safety_poll=DEFAULT_SAFETY_POLL,
+                 process_of=_win32_process_of):
+        '''Constructor
+
+        :type source: EventSource
+        :param source: 事件源，默认为WinEventHookSource
+        :param root_of: 返回窗口所在顶层窗口的函数
+        :param safety_poll: 没有事件时检查条件的间隔秒数，每次等待时不小于其interval的SAFETY_POLL_RATIO倍
+        :param process_of: 返回窗口所属进程ID的函数
+        '''
+        self._source = source
+        self._root_of = root_of
+        self._process_of = process_of
+        self._safety_poll = safety_poll
+        self._lock = threading.Lock() #保护等待者列表，dispatch在事件源的线程中获取
+        self._source_lock = threading.Lock() #保护事件源的启停，停止时会等待事件源线程结束，不能持有self._lock
+        self._waiters = []
+        self._available = None
+        self._started = False
+        self.dispatched = 0
+        self.woken = 0
+
+    def _start_source(self):
+        '''启动事件源，返回事件源是否可用；调用时持有self._source_lock
+        '''
+        if not self._started and self._available is not False:
+            if self._source is None:
+                self._source = WinEventHookSource()
+            try:
+                self._started = bool(self._source.start(self.dispatch))
+            except Exception:
+                self._started = False
+            self._available = self._started
+        return self._started
+
+    def _stop_source(self):
+        '''停止事件源；调用时持有self._source_lock
+        '''
+        if self._started:
+            self._started = False
+            self._source.stop()
+
+    @property
+    def Available(self):
+        '''事件源是否可用，不可用时退回到轮询
+        '''
+        if self._available is None:
+            with self._source_lock:
+                if self._available is None:
+                    self._start_source()
+                    with self._lock:
+                        idle = not self._waiters
+                    if idle:
+                        self._stop_source()
+        return self._available
+
+    def stop(self):
+        '''停止事件源，之后的等待会重新启动事件源
+        '''
+        with self._source_lock:
+            self._stop_source()
+            self._available = None
+
+    def dispatch(self, event, hwnd):
+        '''处理一个窗口事件，唤醒关注该窗口的等待者
+        '''
+        with self._lock:
+            waiters = [w for w in self._waiters if event in w.events]
+            self.dispatched += 1
+        root = pid = None
+        for waiter in waiters:
+            if waiter.hwnds is None or hwnd not in waiter.hwnds:
+                if root is None:
+                    try:
+                        root = self._root_of(hwnd)
+                    except Exception:
+                        root = 0
+                if waiter.hwnds is not None:
+                    if root not in waiter.roots:
+                        continue
+                elif waiter.processes is None:
+                    if root != hwnd: #关注整个桌面且未指定进程时只关注顶层窗口
+                        continue
+                else:
+                    if pid is None:
+                        try:
+                            pid = self._process_of(root or hwnd)
+                        except Exception:
+                            pid = 0
+                    if pid not in waiter.processes:
+                        continue
+            waiter.wake.set()
+            self.woken += 1
+
+    def wait(self, check, timeout=10, interval=0.5, scope=None, events=WATCHED_EVENTS, processes=None):
+        '''等待check()返回真值
+
+        :param check: 检查函数，返回真值时等待结束；抛出的异常不会被捕获
+        :param timeout: 超时秒数
+        :param interval: 事件源不可用时的轮询间隔；事件源可用时，两次检查至少间隔interval秒，
+                         没有事件时每隔safety_poll秒(不小于interval的SAFETY_POLL_RATIO倍)检查一次
+        :param scope: 关注的窗口句柄列表，这些窗口及其所在顶层窗口中的事件会唤醒等待者；
+                      None表示关注整个桌面
+        :param events: 关注的事件
+        :param processes: scope为None时关注的进程ID列表，只有这些进程的窗口事件会唤醒等待者；
+                          None表示所有进程，此时只有顶层窗口的创建和显示事件会唤醒等待者
+        :return: check()的返回值
+        :raises TimeoutError: 超时
+        '''
+        hwnds = roots = None
+        events = frozenset(events)
+        if scope is not None:
+            hwnds = frozenset(scope)
+            roots = frozenset(self._root_of(hwnd) for hwnd in hwnds)
+            processes = None
+        elif processes is None:
+            events &= DESKTOP_EVENTS
+        else:
+            processes = frozenset(processes)
+        waiter = _Waiter(events, hwnds, roots, processes)
+
+        with self._source_lock:
+            available = self._start_source()
+            if available:
+                with self._lock:
+                    self._waiters.append(waiter)
+        if not available:
+            return Timeout(timeout, interval).retry(check, (), (), bool)
+
+        poll = max(self._safety_poll, interval * SAFETY_POLL_RATIO)
+        try:
+            start = time.time()
+            try_count = 0
+            while True:
+                waiter.wake.clear() #检查期间发生的事件会再次唤醒
+                try_count += 1
+                checked = time.time()
+                result = check()
+                if result:
+                    return result
+                remain = timeout - (time.time() - start)
+                if remain <= 0:
+                    if try_count > 1:
+                        raise TimeoutError("在%d秒里尝试了%d次" % (timeout, try_count))
+                    continue
+                waiter.wake.wait(min(remain, poll))
+                gap = interval - (time.time() - checked)
+                if gap > 0: #合并短时间内的多个事件
+                    time.sleep(min(gap, max(timeout - (time.time() - start), 0)))
+        finally:
+            with self._source_lock:
+                with self._lock:
+                    self._waiters.remove(waiter)
+                    idle = not self._waiters
+                if idle: #没有等待者时卸载钩子
+                    self._stop_source()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_service():
+    '''返回进程内共享的WaiterService
+    '''
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = WaiterService()
+    return _service
+
+def set_service(service):
+    '''替换进程内共享的WaiterService，如传入WaiterService(SyntheticEventSource(False))可关闭事件等待
+    '''
+    global _service
+    with _service_lock:
+        if _service is not None and _service is not service:
+            _service.stop()
+        _service = service
+
+def wait_for(check, timeout=10, interval=0.5, scope=None, events=WATCHED_EVENTS, processes=None):
+    '''等待check()返回真值，详见WaiterService.wait
+    '''
+    return get_service().wait(check, timeout, interval, scope, events, processes)
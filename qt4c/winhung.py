@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+无响应窗口登记模块
+
+读取Win32窗口标题要向窗口所在线程发送WM_GETTEXT消息，目标线程无响应时每次读取都要等到超时。
+HungWindowRegistry记录最近发送消息超时的窗口，在ttl秒内认为它仍无响应；系统判定为无响应
+(IsHungAppWindow)的窗口连同其线程一起登记，同一线程的其他窗口也视为无响应。QPath查找时登记的
+窗口的Caption/Text视为无法读取(不匹配)，不再等待超时；wincontrols.Control.Caption不使用登记，
+每次都读取，超时时返回空字符串。
+
+使用示例::
+
+    registry = winhung.get_registry()
+    if not registry.is_hung(hwnd, thread_id):
+        ...
+'''
+
+import ctypes
+import threading
+import time
+
+import win32con
+import winerror
+
+from qt4c import wintypes
+
+DEFAULT_TTL = 5.0 #超时记录的有效时间(秒)
+TEXT_TIMEOUT = 200 #每条读取文本的消息最多等待的时间(毫秒)
+
+
+_user32 = None
+
+def _get_user32():
+    global _user32
+    if _user32 is None:
+        _user32 = ctypes.WinDLL('user32', use_last_error=True)
+    return _user32
+
+def _is_hung_app_window(hwnd):
+    return bool(ctypes.windll.user32.IsHungAppWindow(hwnd))
+
+def send_message_timeout(hwnd, msg, wparam, lparam, timeout=TEXT_TIMEOUT):
+    '''以SMTO_ABORTIFHUNG发送消息，最多等待timeout毫秒
+
+    :rtype: tuple
+    :return: (消息返回值(失败时为None), 是否因超时或窗口无响应而失败)
+    '''
+    result = wintypes.ULONG_PTR(0)
+    ctypes.set_last_error(0)
+    if _get_user32().SendMessageTimeoutW(hwnd, msg, wparam, lparam, win32con.SMTO_ABORTIFHUNG, timeout,
+                                         ctypes.byref(result)):
+        return result.value, False
+    return None, ctypes.get_last_error() in (0, winerror.ERROR_TIMEOUT) #无响应的窗口立即返回，错误码可能为0
+
+
+class HungWindowRegistry(object):
+    '''按窗口句柄和线程ID记录无响应窗口，记录在ttl秒后失效
+    '''
+
+    def __init__(self, ttl=DEFAULT_TTL, clock=time.time, is_hung_app_window=_is_hung_app_window):
+        '''Constructor
+
+        :param ttl: 记录的有效时间(秒)
+        :param clock: 返回当前时间(秒)的函数
+        :param is_hung_app_window: 判断窗口是否已被系统判定为无响应的函数，为None时不检查
+        '''
+        self.ttl = ttl
+        self.enabled = True #为False时不登记也不判定任何窗口
+        self._clock = clock
+        self._is_hung_app_window = is_hung_app_window
+        self._windows = {}
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def record_timeout(self, hwnd, thread_id=None):
+        '''登记向窗口发送消息超时
+
+        只登记该窗口；系统也判定窗口无响应时才登记其线程，繁忙但未挂起的线程的其他窗口不受影响。
+
+        :param hwnd: 窗口句柄
+        :param thread_id: 窗口所在线程ID
+        '''
+        if not self.enabled:
+            return
+        if thread_id and not (self._is_hung_app_window is not None and self._is_hung_app_window(hwnd)):
+            thread_id = None
+        self._record(hwnd, thread_id)
+
+    def _record(self, hwnd, thread_id):
+        expires = self._clock() + self.ttl
+        with self._lock:
+            self._windows[hwnd] = expires
+            if thread_id:
+                self._threads[thread_id] = expires
+
+    def _recorded(self, table, key, now):
+        expires = table.get(key)
+        if expires is None:
+            return False
+        if expires > now:
+            return True
+        with self._lock:
+            if table.get(key) == expires:
+                del table[key]
+        return False
+
+    def is_hung(self, hwnd, thread_id=None):
+        '''窗口是否无响应：窗口或其线程有未失效的超时记录，或被系统判定为无响应
+
+        :param hwnd: 窗口句柄
+        :param thread_id: 窗口所在线程ID
+        :rtype: bool
+        '''
+        if not self.enabled:
+            return False
+        now = self._clock()
+        if self._recorded(self._windows, hwnd, now):
+            return True
+        if thread_id and self._recorded(self._threads, thread_id, now):
+            return True
+        if self._is_hung_app_window is not None and self._is_hung_app_window(hwnd):
+            self._record(hwnd, thread_id)
+            return True
+        return False
+
+    def clear(self):
+        '''清除所有记录
+        '''
+        with self._lock:
+            self._windows.clear()
+            self._threads.clear()
+
+    def __len__(self):
+        '''未失效的窗口记录个数
+        '''
+        now = self._clock()
+        return sum(1 for expires in list(self._windows.values()) if expires > now)
+
+
+_registry = HungWindowRegistry()
+
+def get_registry():
+    '''返回QPath查找共用的HungWindowRegistry
+    '''
+    return _registry
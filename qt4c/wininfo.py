@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+Win32窗口属性批量读取模块
+
+wincontrols.Control的ClassName、Style、ProcessId等属性每次读取都是一次单独的系统调用，BoundingRect
+每次还要重新获取DPI。WindowInfo由GetWindowInfo、GetWindowThreadProcessId和GetClassName一次读出
+这些属性。在scope()内，Win32控件的这些属性从按窗口句柄缓存的WindowInfo中读取，同一次操作(如一次
+点击)中多次读取同一窗口的属性只调用一次系统接口。
+
+使用示例::
+
+    with wininfo.scope():
+        rect = control.BoundingRect
+        if control.Visible and control.Enabled:
+            control.click()
+'''
+
+import contextlib
+import ctypes
+import locale
+import threading
+
+import six
+import win32con
+import win32gui
+import win32process
+import winerror
+
+from qt4c import util, wintypes
+
+FETCH_COST = 3 #读取一个WindowInfo的系统调用次数，与wincontrols.Control._property_costs可比
+
+#WindowInfo中的属性，QPath属性名(大写)到属性名
+FIELDS = dict((name.upper(), name) for name in
+              ('ClassName', 'Style', 'ExStyle', 'Visible', 'Enabled', 'ProcessId', 'ThreadId', 'BoundingRect'))
+
+
+def _signed(value):
+    '''与win32gui.GetWindowLong的返回值一致，转换为有符号32位整数
+    '''
+    return ctypes.c_int32(value).value
+
+
+def _decode_classname(text):
+    if six.PY2:
+        try:
+            return text.decode(locale.getdefaultlocale()[1])
+        except UnicodeDecodeError:
+            pass
+    return text
+
+
+class WindowInfo(object):
+    '''一次读取的窗口属性记录
+
+    Visible只在窗口本身有WS_VISIBLE样式时才需要再调用IsWindowVisible检查父窗口，BoundingRect第一次
+    使用时才获取DPI，这两个属性读取后同样缓存在记录中。
+    '''
+    __slots__ = ('HWnd', 'ClassName', 'Style', 'ExStyle', 'Enabled', 'ProcessId', 'ThreadId',
+                 '_rect', '_visible', '_bounding_rect')
+
+    def __init__(self, hwnd, classname, style, exstyle, process_id, thread_id, rect):
+        '''Constructor
+
+        :param hwnd: 窗口句柄
+        :param rect: 未按DPI缩放的窗口区域(left, top, right, bottom)
+        '''
+        self.HWnd = hwnd
+        self.ClassName = classname
+        self.Style = style
+        self.ExStyle = exstyle
+        self.Enabled = not (style & win32con.WS_DISABLED)
+        self.ProcessId = process_id
+        self.ThreadId = thread_id
+        self._rect = rect
+        self._visible = None
+        self._bounding_rect = None
+
+    @classmethod
+    def fetch(cls, hwnd):
+        '''读取窗口属性
+
+        :param hwnd: 窗口句柄
+        :rtype: WindowInfo
+        :raises win32gui.error: 窗口句柄无效
+        '''
+        info = wintypes.WINDOWINFO()
+        info.cbSize = ctypes.sizeof(wintypes.WINDOWINFO)
+        if not ctypes.windll.user32.GetWindowInfo(hwnd, ctypes.byref(info)):
+            raise win32gui.error(winerror.ERROR_INVALID_WINDOW_HANDLE, 'GetWindowInfo', '无效的窗口句柄')
+        thread_id, process_id = win32process.GetWindowThreadProcessId(hwnd)
+        classname = _decode_classname(win32gui.GetClassName(hwnd))
+        rect = info.rcWindow
+        return cls(hwnd, classname, _signed(info.dwStyle), _signed(info.dwExStyle), process_id, thread_id,
+                   (rect.left, rect.top, rect.right, rect.bottom))
+
+    @property
+    def Visible(self):
+        '''窗口及其各级父窗口是否都可见，与IsWindowVisible相同
+        '''
+        if self._visible is None:
+            if self.Style & win32con.WS_VISIBLE:
+                self._visible = win32gui.IsWindowVisible(self.HWnd) == 1
+            else:
+                self._visible = False
+        return self._visible
+
+    @property
+    def BoundingRect(self):
+        '''按DPI缩放后的窗口区域
+
+        :rtype: util.Rectangle
+        '''
+        if self._bounding_rect is None:
+            scale = util.getDpi()
+            self._bounding_rect = util.Rectangle([it * scale for it in self._rect])
+        return self._bounding_rect
+
+    def __repr__(self):
+        return '<WindowInfo HWnd=0x%X ClassName=%r Style=0x%X>' % (self.HWnd or 0, self.ClassName,
+                                                                   self.Style & 0xFFFFFFFF)
+
+
+class WindowInfoCache(object):
+    '''按窗口句柄缓存的WindowInfo
+    '''
+
+    def __init__(self, fetch=None):
+        '''Constructor
+
+        :param fetch: 读取WindowInfo的函数，默认为WindowInfo.fetch
+        '''
+        self._fetch = fetch or WindowInfo.fetch
+        self._infos = {}
+
+    def get(self, hwnd):
+        '''返回窗口的WindowInfo，没有缓存时读取
+        '''
+        info = self._infos.get(hwnd)
+        if info is None:
+            info = self._infos[hwnd] = self._fetch(hwnd)
+        return info
+
+    def peek(self, hwnd):
+        '''返回已缓存的WindowInfo，没有时返回None
+        '''
+        return self._infos.get(hwnd)
+
+    def clear(self):
+        self._infos.clear()
+
+    def __len__(self):
+        return len(self._infos)
+
+
+_local = threading.local()
+
+def current_cache():
+    '''返回当前线程scope()中的WindowInfoCache，不在scope()中时返回None
+    '''
+    return getattr(_local, 'cache', None)
+
+@contextlib.contextmanager
+def scope():
+    '''在with块内(只对当前线程)，Win32控件的窗口属性按窗口句柄只读取一次，嵌套时沿用最外层的缓存
+
+    块内读取的属性值不会随窗口变化而更新，只应包住一次操作。
+
+    :rtype: WindowInfoCache
+    '''
+    cache = current_cache()
+    if cache is not None:
+        yield cache
+        return
+    cache = _local.cache = WindowInfoCache()
+    try:
+        yield cache
+    finally:
+        _local.cache = None
+
+def worth_fetching(costs, keys):
+    '''按属性代价判断读取keys中的属性时，一次读出WindowInfo是否比逐个读取的系统调用更少
+
+    :param costs: 属性代价表，见qpathplan.get_property_costs
+    :param keys: 要读取的属性名(大写)，不在WindowInfo中的属性被忽略
+    :rtype: bool
+    '''
+    separate = 0
+    batched = FETCH_COST
+    for key in set(keys):
+        if key in FIELDS:
+            separate += costs.get(key, 1)
+            if key == 'VISIBLE':
+                batched += 1 #IsWindowVisible
+            elif key == 'BOUNDINGRECT':
+                batched += 2 #util.getDpi
+    return separate > batched
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+Win32 QPath条件下推模块
+
+对于MaxDepth为1的Win32定位符，部分精确匹配的属性可以直接交给系统API查找，
+不必枚举全部子窗口再在Python中逐个读取属性：
+
+    * ClassName：FindWindowEx按类名迭代
+    * ControlId：GetDlgItem，只需第一个匹配控件时直接返回，否则仅用于确认不存在
+
+Caption不下推：FindWindowEx比较的是窗口内部保存的文本，自己管理文本的控件(如编辑框、自绘窗口)
+的WM_GETTEXT结果可能不同。ProcessId/ThreadId也不下推：按进程的线程枚举顶层窗口后还要按Z序重排，
+代价高于枚举顶层窗口并逐个调用GetWindowThreadProcessId。
+
+下推得到的是候选窗口，QPath仍会在Python中对候选窗口匹配全部属性，因此下推只需保证
+不遗漏匹配的窗口，且候选窗口的顺序与Control.Children一致。无法下推时返回None，
+由QPath按原来的方式枚举子窗口。
+'''
+
+
+class PushdownPlan(object):
+    '''一级定位符可下推的条件
+    '''
+    __slots__ = ('classname', 'control_id', 'control_id_only')
+
+    def __init__(self):
+        self.classname = None
+        self.control_id = None
+        self.control_id_only = False
+
+    def __bool__(self):
+        return self.classname is not None or self.control_id is not None
+
+    __nonzero__ = __bool__
+
+
+def plan_step(step, at_desktop):
+    '''分析定位符中可以下推的属性
+
+    :type step: qpathplan.QPathStep
+    :param step: 定位符
+    :param at_desktop: 父窗口是否为桌面
+    :rtype: PushdownPlan
+    :return: 可下推的条件，没有可下推的属性时返回None
+    '''
+    if step.max_depth != 1:
+        return None
+    plan = PushdownPlan()
+    for predicate in step.predicates:
+        if predicate.operator != '=':
+            continue
+        if predicate.key == 'CLASSNAME' and predicate.value:
+            plan.classname = predicate.value
+        elif predicate.key == 'CONTROLID' and not at_desktop and predicate.int_value is not None:
+            plan.control_id = predicate.int_value
+            plan.control_id_only = len(step.predicates) == 1
+    if not plan:
+        return None
+    return plan
+
+
+def find_children(backend, parent, step, first_only=False):
+    '''返回可能匹配定位符的parent直接子窗口，顺序与wincontrols.Control.Children一致
+
+    :type backend: wintree.WindowBackend
+    :param backend: 窗口枚举后端
+    :param parent: 父窗口句柄
+    :type step: qpathplan.QPathStep
+    :param step: 定位符
+    :param first_only: 是否只需要第一个匹配的控件
+    :return: 候选窗口句柄列表，无法下推时返回None
+    '''
+    at_desktop = parent == backend.desktop_window()
+    plan = plan_step(step, at_desktop)
+    if plan is None:
+        return None
+
+    if plan.control_id is not None:
+        hwnd = backend.get_dlg_item(parent, plan.control_id)
+        if not hwnd:
+            return []
+        if first_only and plan.control_id_only:
+            return [hwnd]
+
+    if plan.classname is not None:
+        hwnds = []
+        hwnd = backend.find_window_ex(0 if at_desktop else parent, 0, plan.classname)
+        while hwnd:
+            hwnds.append(hwnd)
+            hwnd = backend.find_window_ex(0 if at_desktop else parent, hwnd, plan.classname)
+        return hwnds
+
+    return None
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+'''
+Win32窗口树快照模块
+
+EnumChildWindows返回的是全部子孙窗口，wincontrols.Control.Children每层都要枚举一次再逐个
+调用GetAncestor过滤出直接子窗口。WindowTreeSnapshot对一棵子树只枚举一次，在Python中
+建立父子关系，供QPath在多层查找时复用。
+
+窗口枚举通过WindowBackend接口完成，Win32WindowBackend为实际的user32实现，测试中可以
+替换为内存中的实现。
+'''
+
+import array
+import threading
+import time
+
+
+class WindowBackend(object):
+    '''窗口枚举后端接口
+    '''
+
+    def desktop_window(self):
+        '''返回桌面窗口句柄
+        '''
+        raise NotImplementedError("请在%s类中实现desktop_window" % type(self))
+
+    def top_level_windows(self):
+        '''按Z序返回全部顶层窗口句柄
+        '''
+        raise NotImplementedError("请在%s类中实现top_level_windows" % type(self))
+
+    def enum_descendants(self, hwnd):
+        '''返回hwnd的全部子孙窗口
+
+        :return: [(子孙窗口句柄, 父窗口句柄), ...]，父窗口总是排在子窗口之前
+        '''
+        raise NotImplementedError("请在%s类中实现enum_descendants" % type(self))
+
+    def is_window(self, hwnd):
+        '''窗口是否存在
+        '''
+        raise NotImplementedError("请在%s类中实现is_window" % type(self))
+
+    def find_window_ex(self, parent, after, classname=None, caption=None):
+        '''按Z序返回parent下after之后第一个类名和标题匹配的直接子窗口，对应FindWindowEx
+
+        :param parent: 父窗口句柄，0表示桌面
+        :param after: 从该子窗口之后开始查找，0表示从第一个子窗口开始
+        :return: 窗口句柄，找不到时返回0
+        '''
+        raise NotImplementedError("请在%s类中实现find_window_ex" % type(self))
+
+    def get_dlg_item(self, parent, control_id):
+        '''返回parent下控件ID为control_id的直接子窗口，对应GetDlgItem
+
+        :return: 窗口句柄，找不到时返回0
+        '''
+        raise NotImplementedError("请在%s类中实现get_dlg_item" % type(self))
+
+
+class Win32WindowBackend(WindowBackend):
+    '''基于user32的窗口枚举实现
+    '''
+
+    def desktop_window(self):
+        import win32gui
+        return int(win32gui.GetDesktopWindow())
+
+    def top_level_windows(self):
+        import win32gui
+        hwnds = []
+        win32gui.EnumWindows(self.__enum_callback, hwnds)
+        return hwnds
+
+    @staticmethod
+    def __enum_callback(hwnd, hwnds):
+        hwnds.append(hwnd)
+
+    def enum_descendants(self, hwnd):
+        import ctypes
+        import win32con
+        import win32gui
+        import winerror
+        hwnds = []
+        try:
+            win32gui.EnumChildWindows(hwnd, self.__enum_callback, hwnds)
+        except win32gui.error as e:
+            if e.winerror == 0 or e.winerror == winerror.ERROR_INVALID_WINDOW_HANDLE: #1400是无效窗口错误
+                pass
+            else:
+                raise e
+        get_ancestor = ctypes.windll.user32.GetAncestor
+        return [(child, get_ancestor(child, win32con.GA_PARENT)) for child in hwnds]
+
+    def is_window(self, hwnd):
+        import win32gui
+        return win32gui.IsWindow(hwnd) != 0
+
+    def find_window_ex(self, parent, after, classname=None, caption=None):
+        import ctypes
+        return ctypes.windll.user32.FindWindowExW(parent, after, _to_unicode(classname), _to_unicode(caption)) or 0
+
+    def get_dlg_item(self, parent, control_id):
+        import ctypes
+        return ctypes.windll.user32.GetDlgItem(parent, control_id) or 0
+
+
+def _to_unicode(s):
+    if isinstance(s, bytes):
+        return s.decode('utf8')
+    return s
+
+
+_default_backend = None
+
+def get_default_backend():
+    '''返回进程内共享的Win32WindowBackend
+    '''
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = Win32WindowBackend()
+    return _default_backend
+
+
+class EnumSnapshotPolicy(object):
+    '''快照的失效策略
+    '''
+    PER_SEARCH = 'PerSearch' #只在一次查找内有效，每次查找重新枚举
+    TTL = 'TTL'              #创建后ttl秒内有效，过期后在下一次查找时重新枚举
+    EXPLICIT = 'Explicit'    #一直有效，直到调用invalidate
+
+
+_NO_NODE = -1
+
+class WindowTreeSnapshot(object):
+    '''窗口树快照
+
+    节点以数组保存：句柄、父节点、第一个子节点、最后一个子节点、下一个兄弟节点，
+    子节点按枚举顺序排列，与wincontrols.Control.Children的顺序一致。
+    子树在第一次被查询时才枚举，桌面窗口只枚举顶层窗口，各顶层窗口的子孙在需要时再枚举。
+    '''
+
+    def __init__(self, backend=None, policy=EnumSnapshotPolicy.PER_SEARCH, ttl=1.0, clock=time.time):
+        '''Constructor
+
+        :type backend: WindowBackend
+        :param backend: 窗口枚举后端，默认使用Win32WindowBackend
+        :type policy: EnumSnapshotPolicy
+        :param policy: 失效策略
+        :param ttl: policy为EnumSnapshotPolicy.TTL时的有效秒数
+        :param clock: 计时函数
+        '''
+        self._backend = backend or get_default_backend()
+        self._policy = policy
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._desktop = None
+        self._reset()
+
+    def _reset(self):
+        self._hwnds = array.array('q')
+        self._parents = array.array('l')
+        self._first_child = array.array('l')
+        self._last_child = array.array('l')
+        self._next_sibling = array.array('l')
+        self._expanded = bytearray()
+        self._index = {}
+        self._created = self._clock()
+        self._valid = True
+        self.enum_count = 0
+
+    @property
+    def Policy(self):
+        '''失效策略
+        '''
+        return self._policy
+
+    def is_stale(self):
+        '''快照是否已失效
+        '''
+        if not self._valid:
+            return True
+        if self._policy == EnumSnapshotPolicy.TTL:
+            return self._clock() - self._created > self._ttl
+        return False
+
+    def ensure_fresh(self):
+        '''在一次查找开始前调用，按失效策略丢弃过期的窗口
+        '''
+        with self._lock:
+            if self._policy == EnumSnapshotPolicy.PER_SEARCH or self.is_stale():
+                self._reset()
+
+    def invalidate(self):
+        '''使快照失效，下一次查找时重新枚举
+        '''
+        with self._lock:
+            self._valid = False
+
+    def refresh(self):
+        '''丢弃已枚举的窗口
+        '''
+        with self._lock:
+            self._reset()
+
+    def _add_node(self, hwnd, parent):
+        idx = len(self._hwnds)
+        self._hwnds.append(hwnd)
+        self._parents.append(parent)
+        self._first_child.append(_NO_NODE)
+        self._last_child.append(_NO_NODE)
+        self._next_sibling.append(_NO_NODE)
+        self._expanded.append(0)
+        self._index[hwnd] = idx
+        if parent != _NO_NODE:
+            self._link(idx, parent)
+        return idx
+
+    def _link(self, idx, parent):
+        self._parents[idx] = parent
+        last = self._last_child[parent]
+        if last == _NO_NODE:
+            self._first_child[parent] = idx
+        else:
+            self._next_sibling[last] = idx
+        self._last_child[parent] = idx
+
+    def _is_orphan_root(self, child_idx, idx):
+        '''child_idx是否是之前单独查询时作为子树根加入的节点
+        '''
+        return child_idx != idx and self._parents[child_idx] == _NO_NODE
+
+    def _expand(self, idx):
+        hwnd = self._hwnds[idx]
+        self.enum_count += 1
+        if self._desktop is None:
+            self._desktop = self._backend.desktop_window()
+        if hwnd == self._desktop:
+            for child in self._backend.top_level_windows():
+                child_idx = self._index.get(child)
+                if child_idx is None:
+                    self._add_node(child, idx)
+                elif self._is_orphan_root(child_idx, idx):
+                    self._link(child_idx, idx)
+            self._expanded[idx] = 1
+            return
+        start = len(self._hwnds)
+        members = set([idx]) #本次枚举的子树中的节点
+        for child, parent in self._backend.enum_descendants(hwnd):
+            parent_idx = self._index.get(parent)
+            if parent_idx not in members: #枚举过程中窗口被移动，挂到子树根上
+                parent_idx = idx
+            child_idx = self._index.get(child)
+            if child_idx is None:
+                child_idx = self._add_node(child, parent_idx)
+            elif self._is_orphan_root(child_idx, idx): #之前单独查询过的子树，挂到真正的父节点上
+                self._link(child_idx, parent_idx)
+            elif self._parents[child_idx] not in members:
+                continue
+            members.add(child_idx)
+        self._expanded[idx] = 1
+        for child_idx in range(start, len(self._hwnds)): #EnumChildWindows已返回整棵子树
+            self._expanded[child_idx] = 1
+
+    def children(self, hwnd):
+        '''返回hwnd的直接子窗口句柄列表
+        '''
+        with self._lock:
+            idx = self._index.get(hwnd)
+            if idx is None:
+                idx = self._add_node(hwnd, _NO_NODE)
+            if not self._expanded[idx]:
+                self._expand(idx)
+            children = []
+            child = self._first_child[idx]
+            while child != _NO_NODE:
+                children.append(self._hwnds[child])
+                child = self._next_sibling[child]
+            return children
+
+    def parent(self, hwnd):
+        '''返回hwnd在快照中的父窗口句柄，不在快照中或是子树根时返回None
+        '''
+        idx = self._index.get(hwnd)
+        if idx is None or self._parents[idx] == _NO_NODE:
+            return None
+        return self._hwnds[self._parents[idx]]
+
+    def __contains__(self, hwnd):
+        return hwnd in self._index
+
+    def __len__(self):
+        return len(self._hwnds)
@@ -23,6 +23,21 @@ class RECT(ctypes.Structure):
         ('right', ctypes.c_long),
         ('bottom', ctypes.c_long)]
     
+class WINDOWINFO(ctypes.Structure):
+    """Contains window information, filled by GetWindowInfo
+    """
+    _fields_ = [
+        ('cbSize', ctypes.c_ulong),
+        ('rcWindow', RECT),
+        ('rcClient', RECT),
+        ('dwStyle', ctypes.c_ulong),
+        ('dwExStyle', ctypes.c_ulong),
+        ('dwWindowStatus', ctypes.c_ulong),
+        ('cxWindowBorders', ctypes.c_uint),
+        ('cyWindowBorders', ctypes.c_uint),
+        ('atomWindowType', ctypes.c_ushort),
+        ('wCreatorVersion', ctypes.c_ushort)]
+    
 class TBBUTTON(ctypes.Structure):
     """Contains information about a button in a system's traynotifybar."""
     _fields_ = [
@@ -121,6 +136,52 @@ class LVITEM64(ctypes.Structure):
         ('iPlaceholder4', ctypes.c_int),
         ]
     
+def _lvitemw_fields(pointer):
+    return [
+        ('mask', ctypes.c_uint),
+        ('iItem', ctypes.c_int),
+        ('iSubItem', ctypes.c_int),
+        ('state', ctypes.c_uint),
+        ('stateMask', ctypes.c_uint),
+        ('pszText', pointer),
+        ('cchTextMax', ctypes.c_int),
+        ('iImage', ctypes.c_int),
+        ('lParam', pointer),
+        ('iIndent', ctypes.c_int),
+        ('iGroupId', ctypes.c_int),
+        ('cColumns', ctypes.c_uint),
+        ('puColumns', pointer),
+        ('piColFmt', pointer),
+        ('iGroup', ctypes.c_int)]
+
+class LVITEMW32(ctypes.Structure):
+    """Unicode LVITEM in the layout of a 32-bit target process, pointers are remote addresses
+    """
+    _fields_ = _lvitemw_fields(ctypes.c_uint32)
+
+class LVITEMW64(ctypes.Structure):
+    """Unicode LVITEM in the layout of a 64-bit target process, pointers are remote addresses
+    """
+    _fields_ = _lvitemw_fields(ctypes.c_uint64)
+
+def _lvfindinfow_fields(pointer):
+    return [
+        ('flags', ctypes.c_uint),
+        ('psz', pointer),
+        ('lParam', pointer),
+        ('pt', ctypes.c_int * 2),
+        ('vkDirection', ctypes.c_uint)]
+
+class LVFINDINFOW32(ctypes.Structure):
+    """Unicode LVFINDINFO for LVM_FINDITEMW in the layout of a 32-bit target process
+    """
+    _fields_ = _lvfindinfow_fields(ctypes.c_uint32)
+
+class LVFINDINFOW64(ctypes.Structure):
+    """Unicode LVFINDINFO for LVM_FINDITEMW in the layout of a 64-bit target process
+    """
+    _fields_ = _lvfindinfow_fields(ctypes.c_uint64)
+    
 class TVITEM(ctypes.Structure):
     """
     """
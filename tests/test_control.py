@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''control模块单元测试
+'''
+
+import unittest
+
+from qt4c import control
+
+
+class FakeControl(control.Control):
+    '''记录创建次数、可以标记为失效的控件
+    '''
+    created = []
+
+    def __init__(self, root=None, locator=None):
+        self.root = root
+        self.locator = locator
+        self.stale = False
+        FakeControl.created.append(locator)
+
+    def _is_stale(self):
+        return self.stale
+
+
+class ControlContainerTest(unittest.TestCase):
+    '''ControlContainer测试用例
+    '''
+
+    def setUp(self):
+        FakeControl.created = []
+        self.container = control.ControlContainer()
+        self.container._memoize_controls = True
+        self.container.updateLocator({
+            'dialog': {'type': FakeControl, 'root': None, 'locator': 'dialog'},
+            'panel': {'type': FakeControl, 'root': '@dialog', 'locator': 'panel'},
+            'ok': {'type': FakeControl, 'root': '@panel', 'locator': 'ok'},
+            'other': {'type': FakeControl, 'locator': 'other'},
+        })
+
+    def test_memoize(self):
+        ok = self.container.Controls['ok']
+        self.assertEqual(FakeControl.created, ['dialog', 'panel', 'ok'])
+        self.assertTrue(ok.root.root is self.container.Controls['dialog'])
+        for _ in range(10):
+            self.assertTrue(self.container.Controls['ok'] is ok)
+        self.assertEqual(len(FakeControl.created), 3)
+
+    def test_stale(self):
+        ok = self.container.Controls['ok']
+        other = self.container.Controls['other']
+        ok.root.root.stale = True #dialog失效
+        FakeControl.created = []
+        self.assertFalse(self.container.Controls['ok'] is ok)
+        self.assertEqual(FakeControl.created, ['dialog', 'panel', 'ok'])
+        self.assertTrue(self.container.Controls['other'] is other)
+
+    def test_invalidate(self):
+        ok = self.container.Controls['ok']
+        dialog = self.container.Controls['dialog']
+        FakeControl.created = []
+        self.container.invalidate('panel') #依赖panel的ok同时失效
+        self.assertTrue(self.container.Controls['dialog'] is dialog)
+        self.assertFalse(self.container.Controls['ok'] is ok)
+        self.assertEqual(FakeControl.created, ['panel', 'ok'])
+        self.container.invalidate()
+        self.assertFalse(self.container.Controls['dialog'] is dialog)
+        self.container.updateLocator({'dialog': {'type': FakeControl, 'locator': 'dialog2'}})
+        self.assertEqual(self.container.Controls['ok'].root.root.locator, 'dialog2')
+
+    def test_disabled(self):
+        container = control.ControlContainer() #默认不缓存
+        container.updateLocator({'other': {'type': FakeControl, 'locator': 'other'}})
+        self.assertFalse(container.Controls['other'] is container.Controls['other'])
+        self.container._memoize_controls = False
+        self.assertFalse(self.container.Controls['other'] is self.container.Controls['other'])
+
+
+
+class LazyControl(control.Control):
+    '''读取IdentityKey时才查找的控件
+    '''
+
+    def __init__(self):
+        self.resolved = False
+        self.searches = 0
+
+    def _is_resolved(self):
+        return self.resolved
+
+    @property
+    def IdentityKey(self):
+        self.searches += 1
+        return ('Lazy', 1)
+
+
+class ControlHashTest(unittest.TestCase):
+    '''Control.__hash__测试用例
+    '''
+
+    def test_without_identity_key(self):
+        ctrl = FakeControl()
+        self.assertEqual(hash(ctrl), id(ctrl)) #未实现IdentityKey时按对象本身计算
+        self.assertEqual(len(set([ctrl, ctrl])), 1)
+
+    def test_unresolved(self):
+        ctrl = LazyControl()
+        self.assertEqual(hash(ctrl), id(ctrl)) #未定位时不读取IdentityKey
+        self.assertEqual(ctrl.searches, 0)
+        ctrl.resolved = True
+        self.assertEqual(hash(ctrl), id(ctrl)) #哈希值不随定位改变
+        other = LazyControl()
+        other.resolved = True
+        self.assertEqual(hash(other), hash(('Lazy', 1)))
+        self.assertEqual(other.searches, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
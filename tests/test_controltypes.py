@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.  
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below. 
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''controltypes模块单元测试
+'''
+
+import unittest
+
+from qt4c.controltypes import ControlTypeRegistry
+
+
+class _FakeEntryPoint(object):
+    def __init__(self, name, obj):
+        self.name = name
+        self._obj = obj
+
+    def load(self):
+        return self._obj
+
+
+class ControlTypeRegistryTest(unittest.TestCase):
+    '''ControlTypeRegistry测试用例
+    '''
+
+    def setUp(self):
+        self.scans = 0
+        self.entry_points = [_FakeEntryPoint('Html', 'HtmlControl')]
+        self.registry = ControlTypeRegistry(entry_point_loader=self._load)
+        self.registry.register_builtin('Win', 'WinControl')
+
+    def _load(self, group):
+        self.scans += 1
+        return list(self.entry_points)
+
+    def test_lazy_load_once(self):
+        self.assertEqual(self.scans, 0)
+        self.assertEqual(self.registry['Win'], 'WinControl')
+        self.assertEqual(self.registry['Html'], 'HtmlControl')
+        self.assertTrue('Html' in self.registry)
+        self.assertEqual(self.scans, 1)
+
+    def test_priority(self):
+        self.entry_points.append(_FakeEntryPoint('Win', 'PluginWinControl'))
+        self.assertEqual(self.registry['Win'], 'PluginWinControl')
+        self.registry.register('Win', 'MyWinControl')
+        self.assertEqual(self.registry['Win'], 'MyWinControl')
+        self.registry.unregister('Win')
+        self.assertEqual(self.registry['Win'], 'PluginWinControl')
+        self.assertEqual(self.scans, 1)
+
+    def test_refresh(self):
+        self.assertRaises(KeyError, self.registry.__getitem__, 'UIA')
+        self.entry_points.append(_FakeEntryPoint('UIA', 'UIAControl'))
+        self.registry.refresh()
+        self.assertEqual(self.registry['UIA'], 'UIAControl')
+        self.assertEqual(self.scans, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''locatorhint模块单元测试
+'''
+
+import unittest
+
+from qt4c.locatorhint import LocatorHintCache
+from qt4c.qpath import QPath
+
+
+class FakeNode(object):
+    '''带父节点和标识的内存控件
+    '''
+    visited = 0
+    next_id = 0
+
+    def __init__(self, classname, name='', children=()):
+        FakeNode.next_id += 1
+        self.id = FakeNode.next_id
+        self.ClassName = classname
+        self.Name = name
+        self.Parent = None
+        self._children = []
+        for child in children:
+            self.append(child)
+
+    def append(self, child):
+        child.Parent = self
+        self._children.append(child)
+
+    def remove(self, child):
+        child.Parent = None
+        self._children.remove(child)
+
+    @property
+    def Children(self):
+        FakeNode.visited += 1
+        return self._children
+
+    @property
+    def IdentityKey(self):
+        return ('Fake', self.id)
+
+
+class LocatorHintCacheTest(unittest.TestCase):
+    '''LocatorHintCache测试用例
+    '''
+
+    def setUp(self):
+        self.cache = LocatorHintCache(capacity=2)
+        self.ok = FakeNode('Button', 'ok')
+        self.dialog = FakeNode('Dialog', 'a', [FakeNode('Panel', children=[self.ok])])
+        self.root = FakeNode('Root', children=[FakeNode('Dialog', 'b'), self.dialog])
+        self.qpath = QPath("/ClassName='Dialog' && Name='a'/ClassName='Button' && MaxDepth='2'")
+        QPath.hint_cache = self.cache
+        FakeNode.visited = 0
+
+    def tearDown(self):
+        QPath.hint_cache = None
+
+    def search(self, qpath=None):
+        return (qpath or self.qpath).search(self.root, limit=2)
+
+    def test_hit(self):
+        self.assertEqual(self.search(), [self.ok])
+        self.assertEqual(len(self.cache), 1)
+        visited = FakeNode.visited
+        self.assertEqual(self.search(), [self.ok])
+        self.assertEqual(FakeNode.visited, visited) #不再遍历控件树
+        self.assertEqual((self.cache.hits, self.cache.misses, self.cache.stale), (1, 1, 0))
+        self.assertEqual(self.qpath.search(self.root), [self.ok]) #不指定limit时总是完整查找
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_stale(self):
+        self.search()
+        self.ok.Name = 'other'
+        self.assertEqual(self.search(), [self.ok]) #Name不在定位符中，提示仍有效
+        self.dialog.Name = 'c'
+        self.assertEqual(self.search(), [])
+        self.assertEqual((self.cache.hits, self.cache.stale), (1, 1))
+        self.dialog.Name = 'a'
+        self.search()
+        panel = self.ok.Parent
+        panel.remove(self.ok)
+        self.root.append(self.ok) #移出了Dialog
+        self.assertEqual(self.search(), [])
+        self.assertEqual(self.cache.stale, 2)
+
+    def test_not_stored(self):
+        self.dialog.append(FakeNode('Button', 'cancel'))
+        self.assertEqual(len(self.search()), 2) #找到多个控件时不记录
+        self.search(QPath("/ClassName='Dialog' && Instance='1'"))
+        self.search(QPath("/ClassName='Dialog' && Name='a'"))
+        self.assertEqual(len(self.cache), 1)
+
+    def test_capacity(self):
+        for name in ('a', 'b', 'a'):
+            self.search(QPath("/ClassName='Dialog' && Name='%s'" % name))
+        self.search(QPath("/ClassName='Root'"))
+        self.assertEqual(len(self.cache), 2)
+        self.search(QPath("/ClassName='Dialog' && Name='a'"))
+        self.assertEqual(self.cache.hits, 2)
+        self.assertRaises(ValueError, LocatorHintCache, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
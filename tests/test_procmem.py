@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''procmem模块单元测试
+'''
+
+import ctypes
+import unittest
+try:
+    from unittest import mock
+except:
+    import mock
+
+from qt4c import procmem
+from qt4c import wintypes
+
+
+class FakeMemoryBackend(procmem.MemoryBackend):
+    '''以本地bytearray模拟进程地址空间
+    '''
+    BASE = 0x10000
+
+    def __init__(self):
+        self.memory = bytearray()
+        self.alive = True
+        self.exited = set()
+        self.create_times = {}
+        self.handles = []
+        self.freed = []
+
+    def open_process(self, pid):
+        self.handles.append(pid)
+        return len(self.handles)
+
+    def close_handle(self, handle):
+        pass
+
+    def is_alive(self, handle):
+        return self.alive and self.handles[handle - 1] not in self.exited
+
+    def create_time(self, pid):
+        return self.create_times.get(pid, 1)
+
+    def alloc(self, handle, size):
+        address = self.BASE + len(self.memory)
+        self.memory.extend(bytearray(size))
+        return address
+
+    def free(self, handle, address):
+        self.freed.append(address)
+
+    def read(self, handle, address, local, size):
+        offset = address - self.BASE
+        ctypes.memmove(local, bytes(self.memory[offset:offset + size]), size)
+
+    def write(self, handle, address, local, size):
+        offset = address - self.BASE
+        self.memory[offset:offset + size] = ctypes.string_at(local, size)
+
+
+class ProcessArenaTest(unittest.TestCase):
+    '''ProcessArena测试用例
+    '''
+
+    def setUp(self):
+        self.backend = FakeMemoryBackend()
+        self.arena = procmem.ProcessArena(100, self.backend, slab_size=4096)
+
+    def test_slab_reuse(self):
+        with self.arena.allocate(16) as first:
+            pass
+        with self.arena.allocate(60) as second: #同一级大小复用归还的块
+            self.assertEqual(second.Address, first.Address)
+        with self.arena.allocate(100) as block:
+            self.assertEqual(block.Address, first.Address + 4096) #128字节级使用自己的slab
+            other = self.arena.allocate(100)
+            self.assertEqual(other.Address, block.Address + 128)
+            other.release()
+            other.release()
+        stats = self.arena.stats
+        self.assertEqual((stats.handles_opened, stats.remote_allocs), (1, 2))
+        self.assertEqual((stats.blocks_allocated, stats.blocks_reused, stats.blocks_in_use), (4, 1, 0))
+        self.assertEqual(stats.bytes_reserved, 8192)
+
+    def test_large_block(self):
+        with self.arena.allocate(5000) as block:
+            self.assertEqual(self.arena.stats.bytes_reserved, 8192) #按页对齐单独分配
+        with self.arena.allocate(8000) as other:
+            self.assertEqual(other.Address, block.Address)
+        self.assertEqual(self.arena.stats.remote_allocs, 1)
+
+    def test_read_write(self):
+        rect = wintypes.RECT(1, 2, 3, 4)
+        with self.arena.allocate(ctypes.sizeof(rect)) as block:
+            block.write(rect)
+            result = wintypes.RECT()
+            block.read_into(result)
+            self.assertEqual((result.left, result.bottom), (1, 4))
+            buf = bytearray(8)
+            block.read_into(memoryview(buf)[4:], 4, offset=4)
+            self.assertEqual(bytes(buf[4:]), ctypes.string_at(ctypes.addressof(rect), 8)[4:])
+            block.write(b'\xff' * 4, offset=12)
+            self.assertEqual(bytes(block.read(4, offset=12)), b'\xff' * 4)
+            self.assertRaises(ValueError, block.write, b'\0' * (block.Size + 1))
+            self.arena.write_at(block.Address, b'\x05\0\0\0')
+            value = ctypes.c_int()
+            self.arena.read_at(block.Address, value)
+            self.assertEqual(value.value, 5)
+        self.assertRaises(RuntimeError, block.read)
+
+    def test_close(self):
+        block = self.arena.allocate(16)
+        self.arena.allocate(10000)
+        self.arena.close()
+        self.assertEqual(len(self.backend.freed), 2)
+        block.release() #close之后归还不影响新的内存池
+        self.assertEqual(self.arena.stats.blocks_in_use, 0)
+        self.arena.allocate(16)
+        self.assertEqual(self.arena.stats.handles_opened, 2)
+        self.assertEqual(self.arena.stats.handles_closed, 1)
+
+
+class GetArenaTest(unittest.TestCase):
+    '''get_arena测试用例
+    '''
+
+    def setUp(self):
+        self.backend = FakeMemoryBackend()
+        patcher = mock.patch.object(procmem, '_default_backend', self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(procmem.close_all)
+
+    def test_process_exit(self):
+        arena = procmem.get_arena(100)
+        arena.allocate(16)
+        self.assertIs(procmem.get_arena(100), arena)
+        self.backend.alive = False
+        self.assertIsNot(procmem.get_arena(100), arena)
+        self.assertEqual(arena.stats.handles_closed, 1)
+
+    @mock.patch.object(procmem, 'SWEEP_INTERVAL', 0)
+    def test_sweep(self):
+        arena = procmem.get_arena(100)
+        arena.allocate(16)
+        procmem.get_arena(200)
+        self.backend.exited.add(100)
+        procmem.get_arena(200) #其他进程的请求也会关闭已退出进程的内存池
+        self.assertEqual(arena.stats.handles_closed, 1)
+        self.assertEqual(len(self.backend.freed), 1)
+        self.assertEqual(sorted(procmem._arenas), [(200, 1)])
+
+    def test_pid_reuse(self):
+        arena = procmem.get_arena(100)
+        self.backend.create_times[100] = 2 #进程ID被新进程复用
+        other = procmem.get_arena(100)
+        self.assertIsNot(other, arena)
+        self.assertIs(procmem.get_arena(100), other)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,9 +9,86 @@
 '''qpath模块单元测试
 '''
 
+import random
 import unittest
+try:
+    from unittest import mock
+except:
+    import mock
 
+from qt4c import control
+from qt4c import qpathparallel
 from qt4c.qpath import QPath
+from qt4c.wincontrols import Window
+from qt4c.wintree import WindowTreeSnapshot
+from tests.test_wintree import FakeWindowBackend
+from tests.test_locatorhint import FakeNode
+
+
+class FakeControl(object):
+    '''用于测试QPath查找的内存控件
+    '''
+    visited = []
+
+    def __init__(self, classname, name='', children=()):
+        self.ClassName = classname
+        self.Name = name
+        self._children = list(children)
+
+    @property
+    def Children(self):
+        FakeControl.visited.append(self)
+        return self._children
+
+    def __eq__(self, other):
+        return self is other
+
+    def __ne__(self, other):
+        return self is not other
+
+    __hash__ = object.__hash__
+
+
+class FakeLocatorControl(control.Control):
+    '''初始化时用QPath查找的控件
+    '''
+    def __init__(self, root=None, locator=None):
+        self._root = root
+        self._locator = locator
+        self._found = None
+
+    def _bind_prefetched(self):
+        found = self._locator._take_prefetched(self._root)
+        if found is not None and len(found) == 1:
+            self._found = found[0]
+
+    @property
+    def Children(self):
+        if self._found is None:
+            self._found = self._locator.search(self._root, limit=2)[0]
+        return self._found.Children
+
+
+class FakeLazyControl(FakeLocatorControl):
+    '''不使用预取结果的控件，如uiacontrols.Control
+    '''
+    _bind_prefetched = control.Control._bind_prefetched
+
+
+def make_random_tree(rnd, count):
+    nodes = [FakeControl('Root')]
+    for i in range(count):
+        node = FakeControl(rnd.choice(['Dialog', 'Button', 'Edit']), rnd.choice(['a', 'b', 'ok']))
+        rnd.choice(nodes)._children.append(node)
+        nodes.append(node)
+    return nodes[0]
+
+def make_tree():
+    return FakeControl('Root', children=[
+        FakeControl('Dialog', 'a', [FakeControl('Button', 'ok'), FakeControl('Button', 'cancel')]),
+        FakeControl('Dialog', 'b', [FakeControl('Button', 'ok', [FakeControl('Edit', 'x')])]),
+        FakeControl('Dialog', 'c', [FakeControl('Button', 'ok')]),
+    ])
 
 class TestQPath(unittest.TestCase):
     '''QPath类测试用例
@@ -35,5 +112,188 @@ class TestQPath(unittest.TestCase):
     def test_maxdepth(self):
         self.assertEqual(QPath('/UIType="UIA" /Text="消息" && MaxDepth="3"')._parsed_qpath, [{'UIType': ['=', 'UIA']}, {'MaxDepth': ['=', '3'], 'Text': ['=', '消息']}])
         
+
+class QPathSearchTest(unittest.TestCase):
+    '''QPath查找测试用例
+    '''
+
+    def setUp(self):
+        FakeControl.visited = []
+        self.root = make_tree()
+
+    def test_search(self):
+        controls = QPath("/ClassName='Dialog'/ClassName='Button' && Name='ok'").search(self.root)
+        self.assertEqual([c.Name for c in controls], ['ok', 'ok', 'ok'])
+
+    def test_limit(self):
+        qp = QPath("/ClassName='Button' && MaxDepth='2'")
+        controls = qp.search(self.root, limit=2)
+        self.assertEqual([c.Name for c in controls], ['ok', 'cancel'])
+        self.assertEqual(len(FakeControl.visited), 2) # root和第一个Dialog
+
+    def test_search_first(self):
+        qp = QPath("/ClassName='Dialog'/ClassName='Button'")
+        self.assertEqual(qp.search_first(self.root).Name, 'ok')
+        self.assertEqual(len(FakeControl.visited), 2)
+        self.assertEqual(QPath("/ClassName='Menu'").search_first(self.root), None)
+
+    def test_instance_early_exit(self):
+        controls = QPath("/ClassName='Dialog' && Instance='1'").search(self.root)
+        self.assertEqual([c.Name for c in controls], ['b'])
+        controls = QPath("/ClassName='Dialog' && Instance='-1'").search(self.root)
+        self.assertEqual([c.Name for c in controls], ['c'])
+
+    def test_remove_same_control(self):
+        qp = QPath("/ClassName='Dialog' && MaxDepth='3'/ClassName='Button' && MaxDepth='3'")
+        tree = FakeControl('Root', children=[FakeControl('Dialog', 'a', [FakeControl('Dialog', 'b', [FakeControl('Button', 'ok')])])])
+        self.assertEqual([c.Name for c in qp.search(tree)], ['ok']) #同一节点只返回一次
+
+    def test_error_path(self):
+        qp = QPath("/ClassName='Dialog'/ClassName='Button'/ClassName='Menu'")
+        self.assertEqual(qp.search(self.root), [])
+        self.assertEqual(qp.getErrorPath(), "ClassName = 'Menu'")
+
+    def test_snapshot(self):
+        backend = FakeWindowBackend({10: [11, 12], 11: [111, 112], 12: [121]})
+        snapshot = WindowTreeSnapshot(backend)
+        qp = QPath("/HWnd='111' && MaxDepth='3'")
+        controls = qp.search(Window(root=10), snapshot=snapshot)
+        self.assertEqual([c.HWnd for c in controls], [111])
+        controls = qp.search(Window(root=10), snapshot=snapshot)
+        self.assertEqual(backend.enum_calls, 2) #每次查找只枚举一次
+
+    def test_search_many(self):
+        qpaths = [QPath("/ClassName='Dialog'/ClassName='Button' && Name='ok'"),
+                  QPath("/ClassName='Edit' && MaxDepth='3'"),
+                  QPath("/ClassName='Dialog' && Instance='-1'"),
+                  QPath("/ClassName='Menu'")]
+        results = QPath.search_many(self.root, qpaths)
+        self.assertEqual([[c.Name for c in r] for r in results], [['ok', 'ok', 'ok'], ['x'], ['c'], []])
+        self.assertEqual(qpaths[3].getErrorPath(), "ClassName = 'Menu'")
+        self.assertEqual(qpaths[0].getErrorPath(), None)
+        FakeControl.visited = []
+        QPath.search_many(self.root, qpaths[:2])
+        self.assertEqual(len(FakeControl.visited), 8) #每个节点只枚举一次子控件
+
+    def test_search_many_equivalence(self):
+        rnd = random.Random(13)
+        for _ in range(40):
+            tree = make_random_tree(rnd, 40)
+            qpaths = []
+            for _ in range(4):
+                steps = []
+                for _ in range(rnd.randint(1, 3)):
+                    props = ["ClassName='%s'" % rnd.choice(['Dialog', 'Button', 'Edit'])]
+                    if rnd.random() < 0.3:
+                        props.append("Name='%s'" % rnd.choice(['a', 'b', 'ok']))
+                    if rnd.random() < 0.5:
+                        props.append("MaxDepth='%d'" % rnd.randint(1, 4))
+                    if rnd.random() < 0.2:
+                        props.append("Instance='%d'" % rnd.randint(0, 2))
+                    steps.append(' && '.join(props))
+                qpaths.append(QPath('/' + '/'.join(steps)))
+            expected = [qp.search(tree) for qp in qpaths]
+            self.assertEqual(QPath.search_many(tree, qpaths), expected)
+
+    def test_parallel_search(self):
+        pool = qpathparallel.WorkerPool(3)
+        rnd = random.Random(17)
+        try:
+            for _ in range(30):
+                tree = make_random_tree(rnd, 40)
+                steps = ["ClassName='%s' && MaxDepth='%d'" % (rnd.choice(['Dialog', 'Button']), rnd.randint(1, 3))
+                         for _ in range(rnd.randint(1, 3))]
+                if rnd.random() < 0.3:
+                    steps[-1] += " && Instance='%d'" % rnd.randint(-1, 1)
+                qp = QPath('/' + '/'.join(steps))
+                for limit in (None, 1):
+                    expected = qp.search(tree, limit)
+                    error_path = qp.getErrorPath()
+                    self.assertEqual(qp.search(tree, limit, parallel=pool), expected)
+                    self.assertEqual(qp.getErrorPath(), error_path)
+        finally:
+            pool.shutdown()
+
+    def test_resolve_all(self):
+        qp_dialog = QPath("/ClassName='Dialog' && Name='b'")
+        container = control.ControlContainer()
+        container.updateLocator({
+            'dialog': {'type': FakeLocatorControl, 'root': self.root, 'locator': qp_dialog},
+            'other': {'type': FakeLocatorControl, 'root': self.root, 'locator': QPath("/ClassName='Dialog' && Name='c'")},
+            'ok': {'type': FakeLocatorControl, 'root': '@dialog', 'locator': QPath("/ClassName='Button' && Name='ok'")},
+            'edit': {'type': FakeLocatorControl, 'root': '@dialog', 'locator': QPath("/ClassName='Edit' && MaxDepth='2'")},
+        })
+        controls = container.resolve_all()
+        self.assertEqual(sorted(controls), ['dialog', 'edit', 'ok', 'other'])
+        self.assertTrue(controls['ok']._root is controls['dialog'])
+        self.assertEqual(len(FakeControl.visited), 3) #每层一次遍历
+        self.assertEqual(controls['edit'].Children, [])
+        self.assertEqual(len(FakeControl.visited), 4) #使用预取的结果，只枚举Edit自身的子控件
+        self.assertEqual(qp_dialog.search(self.root)[0].Name, 'b')
+        self.assertEqual(len(FakeControl.visited), 5) #预取的结果只使用一次
+        qp_button = QPath("/ClassName='Button'")
+        container.updateLocator({'button': {'type': FakeLocatorControl, 'root': self.root, 'locator': qp_button},
+                                 'menu': {'type': FakeLocatorControl, 'root': self.root, 'locator': QPath("/ClassName='Menu'")}})
+        container.resolve_all(['button', 'menu'])
+        self.assertEqual(qp_button._prefetched, None) #多个结果未绑定，返回前丢弃
+        container.updateLocator({'loop': {'type': FakeLocatorControl, 'root': '@loop'}})
+        self.assertRaises(ValueError, container.resolve_all, ['loop'])
+
+    def test_resolve_all_lazy(self):
+        container = control.ControlContainer()
+        container.updateLocator({
+            'pane': {'type': FakeLazyControl, 'root': self.root, 'locator': QPath("/UIType='UIA' && Name='a'")},
+            'list': {'type': FakeLazyControl, 'root': self.root, 'locator': QPath("/UIType='UIA' && Name='b'")},
+        })
+        with mock.patch.object(QPath, 'search', return_value=[FakeControl('Pane')]) as search:
+            controls = container.resolve_all()
+            self.assertEqual(search.call_count, 0) #不能绑定预取结果的控件不参与批量查找
+            controls['pane'].Children
+            controls['list'].Children
+            self.assertEqual(search.call_count, 2) #每个定位符只查找一次
+
+
+class QPathResumeTest(unittest.TestCase):
+    '''QPath.search(resume=True)测试用例
+    '''
+
+    def setUp(self):
+        self.panel = FakeNode('Panel')
+        self.dialog = FakeNode('Dialog', children=[self.panel])
+        self.root = FakeNode('Root', children=[FakeNode('Dialog'), self.dialog])
+        self.qpath = QPath("/ClassName='Dialog'/ClassName='Panel'/ClassName='Button'")
+        FakeNode.visited = 0
+
+    def search(self):
+        return self.qpath.search(self.root, limit=2, resume=True)
+
+    def test_resume(self):
+        self.assertEqual(self.search(), [])
+        self.assertEqual(FakeNode.visited, 4)
+        self.assertEqual(self.search(), [])
+        self.assertEqual(FakeNode.visited, 5) #只枚举Panel的子控件
+        self.assertEqual(self.qpath.getErrorPath(), "ClassName = 'Button'")
+        button = FakeNode('Button')
+        self.panel.append(button)
+        self.assertEqual(self.search(), [button])
+        self.assertEqual(self.qpath._resume_state, None)
+
+    def test_invalid_prefix(self):
+        self.search()
+        self.dialog.remove(self.panel)
+        button = FakeNode('Button')
+        self.dialog.append(FakeNode('Panel', children=[button]))
+        visited = FakeNode.visited
+        self.assertEqual(self.search(), [button])
+        self.assertTrue(FakeNode.visited - visited >= 4) #前缀失效后完整查找
+
+    def test_full_interval(self):
+        self.search()
+        dialog = FakeNode('Dialog', children=[FakeNode('Panel', children=[FakeNode('Button')])])
+        self.root.append(dialog) #新出现的前缀只能由完整查找发现
+        results = [self.search() for _ in range(4)]
+        self.assertEqual([len(r) for r in results], [0, 0, 0, 1])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''qpathengine模块单元测试
+'''
+
+import unittest
+
+from qt4c import qpathplan
+from qt4c.qpathengine import QPathEngine, ObjectTreeProvider, TreeProvider, SearchContext, PropertyUnavailable
+
+
+class DictTreeProvider(TreeProvider):
+    '''节点为整数，子节点和属性保存在字典中的控件树
+    '''
+    def __init__(self, tree, properties):
+        self.tree = tree
+        self.properties = properties
+        self.reads = 0
+
+    def children(self, node, step=None):
+        return self.tree.get(node, [])
+
+    def get_property(self, node, key):
+        self.reads += 1
+        try:
+            return self.properties[node][key]
+        except KeyError:
+            raise PropertyUnavailable(key)
+
+    def identity(self, node):
+        return node
+
+    def parent(self, node):
+        for parent, children in self.tree.items():
+            if node in children:
+                return parent
+
+
+class Node(object):
+    def __init__(self, classname, children=()):
+        self.ClassName = classname
+        self.Children = list(children)
+
+
+def compile_steps(qpath):
+    return qpathplan.compile_qpath(qpath).steps
+
+
+class QPathEngineTest(unittest.TestCase):
+    '''QPathEngine测试用例
+    '''
+
+    def setUp(self):
+        self.provider = DictTreeProvider({0: [1, 2], 1: [3, 4], 2: [5], 5: [6]}, {
+            1: {'CLASSNAME': 'Dialog'}, 2: {'CLASSNAME': 'Dialog'},
+            3: {'CLASSNAME': 'Button', 'NAME': 'ok'}, 4: {'CLASSNAME': 'Button'},
+            5: {'CLASSNAME': 'Panel'}, 6: {'CLASSNAME': 'Button', 'NAME': 'ok'},
+        })
+        self.engine = QPathEngine(self.provider)
+
+    def test_search(self):
+        steps = compile_steps("/ClassName='Dialog'/ClassName='Button' && Name='ok' && MaxDepth='2'")
+        self.assertEqual(self.engine.search(0, steps), [3, 6])
+        self.assertEqual(self.engine.search(0, steps, limit=1), [3])
+        context = SearchContext()
+        self.assertEqual(self.engine.search(0, compile_steps("/ClassName='Dialog'/ClassName='Edit'"), context=context), [])
+        self.assertEqual(str(context.error_qpath[0]), "ClassName = 'Edit'")
+        self.assertEqual(self.engine.search(0, compile_steps("/Text='x'")), []) #属性不存在时不匹配
+
+    def test_validate_chain(self):
+        steps = compile_steps("/ClassName='Dialog'/ClassName='Button' && MaxDepth='2'")
+        self.assertEqual(self.engine.validate_chain(0, steps, [2, 6]), 6)
+        self.assertEqual(self.engine.validate_chain(0, steps, [1, 6]), None)
+        self.provider.properties[6]['CLASSNAME'] = 'Edit'
+        self.assertEqual(self.engine.validate_chain(0, steps, [2, 6]), None)
+
+    def test_search_many(self):
+        steps_list = [compile_steps("/ClassName='Dialog'/ClassName='Button' && MaxDepth='2'"),
+                      compile_steps("/ClassName='Panel' && MaxDepth='2'")]
+        results, error_paths = self.engine.search_many(0, steps_list)
+        self.assertEqual(results, [self.engine.search(0, steps) for steps in steps_list])
+        self.assertEqual(error_paths, [[], []])
+
+    def test_object_provider(self):
+        root = Node('Root', [Node('Dialog', [Node('Button')]), Node('Button')])
+        engine = QPathEngine(ObjectTreeProvider())
+        found = engine.search(root, compile_steps("/ClassName='Button' && MaxDepth='2'"))
+        self.assertEqual(found, [root.Children[0].Children[0], root.Children[1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''qpathparallel模块单元测试
+'''
+
+import threading
+import unittest
+
+from qt4c import qpathplan
+from qt4c.qpathengine import QPathEngine, ObjectTreeProvider
+from qt4c.qpathparallel import WorkerPool, ParallelQPathEngine, TaskCancelledError
+
+
+class Node(object):
+    def __init__(self, classname, children=()):
+        self.ClassName = classname
+        self.Children = list(children)
+
+
+class WorkerPoolTest(unittest.TestCase):
+    '''WorkerPool测试用例
+    '''
+
+    def setUp(self):
+        self.initialized = []
+        self.pool = WorkerPool(2, lambda: self.initialized.append(threading.current_thread().name))
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_submit(self):
+        tasks = [self.pool.submit(pow, 2, n) for n in range(10)]
+        self.assertEqual([task.result() for task in tasks], [2 ** n for n in range(10)])
+        self.assertRaises(ZeroDivisionError, self.pool.submit(divmod, 1, 0).result)
+        self.assertEqual(len(self.initialized), 2)
+
+    def test_cancel(self):
+        started = [threading.Event(), threading.Event()]
+        release = threading.Event()
+        def block(event):
+            event.set()
+            release.wait()
+        blockers = [self.pool.submit(block, event) for event in started]
+        for event in started:
+            event.wait()
+        pending = self.pool.submit(pow, 2, 2)
+        self.assertTrue(pending.cancel())
+        self.assertFalse(blockers[0].cancel()) #已开始执行的任务不能取消
+        release.set()
+        self.assertEqual(blockers[1].result(), None)
+        self.assertRaises(TaskCancelledError, pending.result)
+        self.assertRaises(ValueError, WorkerPool, 0)
+
+
+class ParallelQPathEngineTest(unittest.TestCase):
+    '''ParallelQPathEngine测试用例
+    '''
+
+    def test_search(self):
+        root = Node('Root', [Node('Dialog', [Node('Button'), Node('Panel', [Node('Button')])]),
+                             Node('Dialog', [Node('Button')])])
+        pool = WorkerPool(3)
+        try:
+            engine = ParallelQPathEngine(ObjectTreeProvider(), pool)
+            sequential = QPathEngine(ObjectTreeProvider())
+            for qpath in ["/ClassName='Dialog'/ClassName='Button' && MaxDepth='2'",
+                          "/ClassName='Button' && MaxDepth='3' && Instance='-1'",
+                          "/ClassName='Dialog' && Instance='1'/ClassName='Button'",
+                          "/ClassName='Dialog'/ClassName='Edit'"]:
+                steps = qpathplan.compile_qpath(qpath).steps
+                for limit in (None, 1):
+                    self.assertEqual(engine.search(root, steps, limit), sequential.search(root, steps, limit))
+        finally:
+            pool.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
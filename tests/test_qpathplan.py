@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.  
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below. 
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''qpathplan模块单元测试
+'''
+
+import unittest
+
+from qt4c import qpathplan
+from qt4c.qpathplan import QPathError, QPathPlanCache, compile_qpath
+
+
+class QPathPlanTest(unittest.TestCase):
+    '''QPathPlan编译测试用例
+    '''
+
+    def test_step_keys(self):
+        plan = compile_qpath("/ClassName='Dialog' && maxdepth='3' && Instance='-1' / UIType='UIA' && Name='ok'")
+        first, second = plan.steps
+        self.assertEqual(first.max_depth, 3)
+        self.assertEqual(first.instance, -1)
+        self.assertEqual(first.uitype, None)
+        self.assertEqual([p.key for p in first.predicates], ['CLASSNAME'])
+        self.assertEqual(second.uitype, 'UIA')
+        self.assertEqual(second.max_depth, 1)
+
+    def test_typed_values(self):
+        step = compile_qpath("/ControlId='0x64' && Visible='True' && Caption~='QQ\\d+'").steps[0]
+        ctrlid, visible, caption = step.predicates
+        self.assertTrue(ctrlid.match(100))
+        self.assertTrue(visible.match(True))
+        self.assertFalse(visible.match(False))
+        self.assertTrue(caption.match('QQ2020'))
+        self.assertFalse(caption.match(None))
+
+    def test_bad_bool(self):
+        predicate = compile_qpath("/Visible='yes'").steps[0].predicates[0]
+        self.assertRaises(QPathError, predicate.match, True)
+
+    def test_bad_maxdepth(self):
+        self.assertRaises(QPathError, compile_qpath, "/Name='a' && MaxDepth='0'")
+
+    def test_cache(self):
+        cache = QPathPlanCache(capacity=2)
+        plan = cache.get("/Name='a'")
+        self.assertTrue(cache.get("/Name='a'") is plan)
+        cache.get("/Name='b'")
+        cache.get("/Name='c'")
+        self.assertEqual(len(cache), 2)
+        self.assertFalse(cache.get("/Name='a'") is plan)
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+
+    def test_str(self):
+        plan = compile_qpath("| ClassName='Dialog' && Caption~='SaveAs' | ControlId='123'")
+        self.assertEqual(str(plan), "| ClassName = 'Dialog' && Caption ~= 'SaveAs'| ControlId = '123'")
+
+
+class _BaseControl(object):
+    _property_costs = {'ClassName': 1, 'Caption': 100}
+
+class _SubControl(_BaseControl):
+    _property_costs = {'Caption': 5}
+
+
+class PropertyCostTest(unittest.TestCase):
+    '''属性代价模型测试用例
+    '''
+
+    def test_order(self):
+        step = compile_qpath("/Caption~='x' && Width='1' && ClassName='Dialog'").steps[0]
+        self.assertEqual([p.key for p in step.ordered_predicates(_BaseControl)], ['CLASSNAME', 'WIDTH', 'CAPTION'])
+        self.assertEqual([p.key for p in step.ordered_predicates(_SubControl)], ['CLASSNAME', 'CAPTION', 'WIDTH'])
+
+    def test_exact_before_regex(self):
+        step = compile_qpath("/Name~='x' && Value='y'").steps[0]
+        self.assertEqual([p.key for p in step.ordered_predicates(_BaseControl)], ['VALUE', 'NAME'])
+
+    def test_register(self):
+        class _PluginControl(_BaseControl):
+            pass
+        step = compile_qpath("/Caption='x' && ClassName='Dialog'").steps[0]
+        self.assertEqual(step.ordered_predicates(_PluginControl)[0].key, 'CLASSNAME')
+        qpathplan.register_property_costs(_PluginControl, {'caption': 0})
+        self.assertEqual(step.ordered_predicates(_PluginControl)[0].key, 'CAPTION')
+        self.assertEqual(step.ordered_predicates(_BaseControl)[0].key, 'CLASSNAME')
+
+    def test_attribute_names(self):
+        self.assertEqual(qpathplan.get_attribute_names(_SubControl)['_PROPERTY_COSTS'], '_property_costs')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''qpathprofile模块单元测试
+'''
+
+import json
+import unittest
+
+from qt4c import qpathprofile
+from qt4c.qpath import QPath
+from tests.test_qpath import make_tree
+
+
+class QPathProfileTest(unittest.TestCase):
+    '''QPath查找统计测试用例
+    '''
+
+    def setUp(self):
+        self.root = make_tree()
+
+    def test_profile(self):
+        qp = QPath("/ClassName='Dialog' && Instance='1'/ClassName='Button' && Name='ok' && MaxDepth='2'")
+        self.assertEqual(qp.getProfile(), None)
+        controls = qp.search(self.root, profile=True)
+        self.assertEqual([c.Name for c in controls], ['ok'])
+        profile = qp.getProfile()
+        self.assertEqual(profile.found, 1)
+        self.assertFalse(profile.early_exit)
+        first, second = profile.steps
+        self.assertEqual((first.visited, first.matched, first.instance_selected), (2, 2, 1)) #Instance找到第2个后停止
+        self.assertEqual(first.fetches, {'CLASSNAME': 2})
+        self.assertEqual(first.sources, {'children': 1})
+        self.assertEqual((second.visited, second.matched, second.max_depth), (2, 1, 2))
+        self.assertEqual(second.fetches, {'CLASSNAME': 2, 'NAME': 1})
+        data = json.loads(profile.to_json())
+        self.assertEqual(data['steps'][1]['fetches'], {'CLASSNAME': 2, 'NAME': 1})
+        table = profile.format_table()
+        self.assertTrue('CLASSNAME:2, NAME:1' in table)
+        self.assertTrue('1/1' in table)
+
+    def test_early_exit(self):
+        qp = QPath("/ClassName='Menu'")
+        qp.search(self.root, profile=True)
+        self.assertEqual(qp.getProfile().error_path, "ClassName = 'Menu'")
+        qp = QPath("/ClassName='Dialog'")
+        qp.search(self.root, limit=1, profile=True)
+        self.assertTrue(qp.getProfile().early_exit)
+        self.assertEqual(qp.getProfile().steps[0].visited, 1)
+
+    def test_collect(self):
+        qp = QPath("/ClassName='Dialog'")
+        qp.search(self.root)
+        self.assertEqual(qp.getProfile(), None)
+        with qpathprofile.collect() as collector:
+            qp.search(self.root)
+            qp.search(self.root, limit=1)
+            QPath("/ClassName='Menu'").search(self.root)
+        qp.search(self.root)
+        self.assertEqual(len(collector.profiles), 3)
+        rows = dict((row[0], row[1:]) for row in collector.summary())
+        self.assertEqual(rows["/ClassName='Dialog'"][0], 2)
+        self.assertEqual(rows["/ClassName='Dialog'"][2], 4)
+        self.assertEqual(len(json.loads(collector.to_json())), 3)
+        self.assertTrue("/ClassName='Menu'" in collector.format_table())
+        self.assertEqual(len(collector.slowest(2)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
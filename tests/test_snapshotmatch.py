@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''snapshotmatch模块单元测试
+'''
+
+import random
+import unittest
+
+from qt4c import qpathplan
+from qt4c import snapshotmatch
+from qt4c import uisnapshot
+from qt4c.qpathengine import SearchContext
+
+
+def make_random_snapshot(rnd, count):
+    builder = uisnapshot.SnapshotBuilder()
+    builder.add(-1, 'Win', {'ClassName': 'Root'})
+    for node in range(1, count):
+        props = {'ClassName': rnd.choice(['Dialog', 'Button', 'Edit', 'button'])}
+        if rnd.random() < 0.5:
+            props['Name'] = rnd.choice(['ok', 'cancel', '1', 'True'])
+        builder.add(rnd.randrange(node), rnd.choice(['Win', 'Win', 'UIA']), props)
+    for node in rnd.sample(range(count), count // 10):
+        builder.link(node, rnd.randrange(count))
+    return builder.build()
+
+
+@unittest.skipUnless(snapshotmatch.is_available(), "需要安装NumPy")
+class VectorizedMatcherTest(unittest.TestCase):
+    '''VectorizedMatcher测试用例
+    '''
+
+    def test_equivalence(self):
+        rnd = random.Random(3)
+        predicates = ["ClassName='Button'", "ClassName~='^[bB]utton$'", "Name='ok'", "Name~='o'", "Name='1'"]
+        for _ in range(30):
+            snapshot = make_random_snapshot(rnd, rnd.randint(1, 60))
+            for _ in range(10):
+                steps = []
+                for _ in range(rnd.randint(1, 3)):
+                    items = [rnd.choice(predicates), "MaxDepth='%d'" % rnd.randint(1, 5)]
+                    if rnd.random() < 0.2:
+                        items.append("Instance='%d'" % rnd.randint(-2, 1))
+                    if rnd.random() < 0.2:
+                        items.append("UIType='%s'" % rnd.choice(['Win', 'UIA']))
+                    steps.append(" && ".join(items))
+                qpath = "/" + "/".join(steps)
+                limit = rnd.choice([None, 1])
+                results = []
+                for vectorized in (False, True):
+                    context = SearchContext()
+                    found = snapshot.search_indices(qpath, limit=limit, context=context,
+                                                    vectorized=vectorized)
+                    results.append((found, [str(step) for step in context.error_qpath]))
+                self.assertEqual(results[0], results[1], qpath)
+
+    def test_fallback(self):
+        builder = uisnapshot.SnapshotBuilder()
+        root = builder.add(-1, 'Win', {'ClassName': 'Root'})
+        builder.add(root, 'Win', {'ClassName': 'Item', 'Enabled': True})
+        builder.add(root, 'Win', {'ClassName': 'Item', 'Enabled': 'yes'})
+        snapshot = builder.build()
+        matcher = snapshotmatch.VectorizedMatcher(snapshot)
+        steps = qpathplan.compile_qpath("/Enabled='True'").steps
+        self.assertEqual(matcher.search(0, steps), [1])
+        steps = qpathplan.compile_qpath("/Enabled='yes'").steps
+        self.assertEqual(matcher.search(0, steps), None) #bool值与'yes'比较会抛出异常
+        self.assertEqual(matcher.fallbacks, 1)
+        self.assertRaises(qpathplan.QPathError, snapshot.search, "/Enabled='yes'", vectorized=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''uiabridge模块单元测试
+'''
+
+import unittest
+
+from qt4c.uiabridge import UIAElementBridge
+
+
+class FakeElement(object):
+    def __init__(self, client, hwnd):
+        self.client = client
+        self.hwnd = hwnd
+
+    @property
+    def CurrentNativeWindowHandle(self):
+        self.client.calls += 1
+        return self.hwnd
+
+
+class FakeUIAClient(object):
+    '''windows为{句柄: 线程ID}，模拟系统中存在的窗口
+    '''
+    def __init__(self):
+        self.windows = {}
+        self.calls = 0
+
+    def ElementFromHandle(self, hwnd):
+        self.calls += 1
+        return FakeElement(self, hwnd)
+
+    def window_identity(self, hwnd):
+        return self.windows.get(hwnd)
+
+
+class UIAElementBridgeTest(unittest.TestCase):
+    '''UIAElementBridge测试用例
+    '''
+
+    def setUp(self):
+        self.client = FakeUIAClient()
+        self.client.windows = {10: 1, 20: 1, 30: 2}
+        self.bridge = UIAElementBridge(self.client, capacity=2, window_identity=self.client.window_identity)
+
+    def test_element_from_handle(self):
+        element = self.bridge.element_from_handle(10)
+        self.assertTrue(self.bridge.element_from_handle(10) is element)
+        self.assertEqual(self.client.calls, 1)
+        self.assertEqual(self.bridge.handle_from_element(element), 10)
+        self.assertEqual(self.client.calls, 1)
+        self.assertEqual((self.bridge.hits, self.bridge.misses), (2, 1))
+
+    def test_handle_from_element(self):
+        element = FakeElement(self.client, 20)
+        self.assertEqual(self.bridge.handle_from_element(element), 20)
+        self.assertEqual(self.bridge.handle_from_element(element), 20)
+        self.assertTrue(self.bridge.element_from_handle(20) is element)
+        self.assertEqual(self.client.calls, 1)
+        self.assertEqual(self.bridge.handle_from_element(FakeElement(self.client, 0)), 0)
+        self.assertEqual(len(self.bridge), 1)
+
+    def test_validation(self):
+        element = self.bridge.element_from_handle(10)
+        self.client.windows[10] = 5 #句柄被其他线程的窗口复用
+        self.assertFalse(self.bridge.element_from_handle(10) is element)
+        del self.client.windows[10] #窗口已销毁
+        self.bridge.element_from_handle(10)
+        self.assertEqual(self.client.calls, 3)
+        self.assertEqual(len(self.bridge), 0)
+
+    def test_capacity(self):
+        first = self.bridge.element_from_handle(10)
+        self.bridge.element_from_handle(20)
+        self.bridge.element_from_handle(10)
+        self.bridge.element_from_handle(30) #淘汰最久未使用的20
+        self.assertEqual(len(self.bridge), 2)
+        self.assertTrue(self.bridge.element_from_handle(10) is first)
+        self.assertEqual(self.client.calls, 3)
+        self.bridge.element_from_handle(20)
+        self.assertEqual(self.client.calls, 4)
+        self.assertRaises(ValueError, UIAElementBridge, self.client, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
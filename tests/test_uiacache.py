@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''uiacache模块单元测试
+'''
+
+import unittest
+
+from qt4c.uiacache import UIACacheConfig, CachedElement
+
+
+class FakeUIAModule(object):
+    TreeScope_Element = 1
+    TreeScope_Children = 2
+    TreeScope_Descendants = 4
+    UIA_ProcessIdPropertyId = 30002
+    UIA_ControlTypePropertyId = 30003
+    UIA_LocalizedControlTypePropertyId = 30004
+    UIA_NamePropertyId = 30005
+    UIA_HasKeyboardFocusPropertyId = 30008
+    UIA_IsEnabledPropertyId = 30010
+    UIA_ClassNamePropertyId = 30012
+    UIA_NativeWindowHandlePropertyId = 30020
+    UIA_BoundingRectanglePropertyId = 30001
+
+
+class FakeCacheRequest(object):
+    def __init__(self):
+        self.properties = []
+        self.TreeScope = None
+        self.TreeFilter = None
+
+    def AddProperty(self, property_id):
+        self.properties.append(property_id)
+
+
+class FakeNode(object):
+    '''目标进程中的UI元素
+    '''
+    def __init__(self, properties, children=()):
+        self.properties = properties
+        self.children = list(children)
+
+
+class FakeElementArray(object):
+    def __init__(self, elements):
+        self._elements = elements
+        self.Length = len(elements)
+
+    def GetElement(self, i):
+        return self._elements[i]
+
+
+class FakeElement(object):
+    '''IUIAutomationElement，cache为BuildUpdatedCache时取回的属性和子元素
+    '''
+    calls = 0
+
+    def __init__(self, node, cache=None, cached_children=None):
+        self.node = node
+        self.cache = cache or {}
+        self.cached_children = cached_children
+
+    def BuildUpdatedCache(self, request):
+        FakeElement.calls += 1
+        return self._build(self.node, request)
+
+    @staticmethod
+    def _build(node, request):
+        cache = dict((pid, node.properties[pid]) for pid in request.properties)
+        children = None
+        if request.TreeScope & FakeUIAModule.TreeScope_Descendants:
+            children = [FakeElement._build(child, request) for child in node.children]
+        elif request.TreeScope & FakeUIAModule.TreeScope_Children:
+            children = [FakeElement(child, dict((pid, child.properties[pid]) for pid in request.properties))
+                        for child in node.children]
+        return FakeElement(node, cache, children)
+
+    def GetCachedPropertyValue(self, property_id):
+        return self.cache[property_id]
+
+    def GetCurrentPropertyValue(self, property_id):
+        FakeElement.calls += 1
+        return self.node.properties[property_id]
+
+    def GetCachedChildren(self):
+        if self.cached_children is None:
+            raise ValueError("子元素没有被缓存")
+        if not self.cached_children:
+            return None
+        return FakeElementArray(self.cached_children)
+
+
+class FakeUIAClient(object):
+    RawViewCondition = 'RawView'
+
+    def CreateCacheRequest(self):
+        return FakeCacheRequest()
+
+
+def make_node(name, children=()):
+    return FakeNode({
+        FakeUIAModule.UIA_NamePropertyId: name,
+        FakeUIAModule.UIA_ClassNamePropertyId: 'Item',
+        FakeUIAModule.UIA_ControlTypePropertyId: 50000,
+        FakeUIAModule.UIA_BoundingRectanglePropertyId: (0, 0, 10, 10),
+        FakeUIAModule.UIA_IsEnabledPropertyId: True,
+        FakeUIAModule.UIA_ProcessIdPropertyId: 100,
+        FakeUIAModule.UIA_HasKeyboardFocusPropertyId: False,
+    }, children)
+
+
+class CachedElementTest(unittest.TestCase):
+    '''CachedElement测试用例
+    '''
+
+    def setUp(self):
+        FakeElement.calls = 0
+        self.config = UIACacheConfig(FakeUIAClient(), FakeUIAModule)
+        self.node = make_node('root', [make_node('a', [make_node('a1')]), make_node('b')])
+
+    def test_properties(self):
+        element = CachedElement(self.config, FakeElement(self.node))
+        self.assertEqual(FakeElement.calls, 1)
+        self.assertEqual(element.get_property('Name'), 'root')
+        self.assertEqual(element.get_property('BoundingRect'), (0, 0, 10, 10))
+        self.assertEqual(FakeElement.calls, 1)
+        self.assertEqual(element.get_property('HasKeyboardFocus'), False) #未缓存的属性
+        self.assertEqual(FakeElement.calls, 2)
+
+    def test_children(self):
+        element = CachedElement(self.config, FakeElement(self.node))
+        children = element.children()
+        self.assertEqual([c.get_property('Name') for c in children], ['a', 'b'])
+        self.assertEqual(FakeElement.calls, 2)
+        element.children()
+        self.assertEqual(FakeElement.calls, 2)
+        self.assertEqual([c.get_property('Name') for c in children[0].children()], ['a1'])
+        self.assertEqual(children[1].children(), [])
+        self.assertEqual(FakeElement.calls, 4) #每个展开的元素一次跨进程调用
+
+    def test_subtree(self):
+        config = UIACacheConfig(FakeUIAClient(), FakeUIAModule, subtree=True)
+        element = CachedElement(config, FakeElement(self.node))
+        children = element.children()
+        self.assertEqual([c.get_property('Name') for c in children[0].children()], ['a1'])
+        self.assertEqual(children[0].children()[0].children(), [])
+        self.assertEqual(FakeElement.calls, 2)
+
+    def test_refresh(self):
+        element = CachedElement(self.config, FakeElement(self.node))
+        element.children()
+        self.node.properties[FakeUIAModule.UIA_NamePropertyId] = 'renamed'
+        self.node.children.append(make_node('c'))
+        self.assertEqual(element.get_property('Name'), 'root')
+        self.assertEqual(len(element.children()), 2)
+        element.refresh()
+        self.assertEqual(element.get_property('Name'), 'renamed')
+        self.assertEqual(len(element.children()), 3)
+
+    def test_config(self):
+        self.assertRaises(ValueError, UIACacheConfig, FakeUIAClient(), FakeUIAModule, ('Value',))
+        request = self.config.ChildrenRequest
+        self.assertEqual(request.TreeScope, FakeUIAModule.TreeScope_Element | FakeUIAModule.TreeScope_Children)
+        self.assertEqual(request.TreeFilter, 'RawView')
+        self.assertEqual(len(request.properties), len(self.config.Properties))
+
+
+if __name__ == '__main__':
+    unittest.main()
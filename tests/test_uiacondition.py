@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''uiacondition模块单元测试
+'''
+
+import random
+import unittest
+
+from qt4c import qpathplan
+from qt4c.uiacondition import ConditionTranslator
+
+
+class FakeUIAModule(object):
+    TreeScope_Element = 1
+    TreeScope_Children = 2
+    TreeScope_Descendants = 4
+    UIA_ProcessIdPropertyId = 30002
+    UIA_ControlTypePropertyId = 30003
+    UIA_LocalizedControlTypePropertyId = 30004
+    UIA_NamePropertyId = 30005
+    UIA_HasKeyboardFocusPropertyId = 30008
+    UIA_IsEnabledPropertyId = 30010
+    UIA_ClassNamePropertyId = 30012
+    UIA_NativeWindowHandlePropertyId = 30020
+
+
+CONTROL_TYPES = {50000: 'Button', 50020: 'Text', 50033: 'Pane'}
+
+
+class FakeElementArray(object):
+    def __init__(self, elements):
+        self._elements = elements
+        self.Length = len(elements)
+
+    def GetElement(self, i):
+        return self._elements[i]
+
+
+class FakeElement(object):
+    '''模拟IUIAutomationElement，properties为{属性ID: 值}
+    '''
+    def __init__(self, client, properties, children=()):
+        self.client = client
+        self.properties = properties
+        self.parent = None
+        self.children = list(children)
+        for child in self.children:
+            child.parent = self
+
+    def iter_descendants(self):
+        for child in self.children:
+            yield child
+            for elm in child.iter_descendants():
+                yield elm
+
+    def FindAllBuildCache(self, scope, condition, cache_request):
+        self.client.calls += 1
+        assert cache_request.TreeFilter == 'RawView'
+        elements = self.children if scope == FakeUIAModule.TreeScope_Children else self.iter_descendants()
+        return FakeElementArray([elm for elm in elements if self.client.evaluate(condition, elm)])
+
+
+class FakeCacheRequest(object):
+    TreeFilter = None
+
+
+class FakeUIAClient(object):
+    '''模拟IUIAutomation，统计跨进程调用次数
+    '''
+    RawViewCondition = 'RawView'
+
+    def __init__(self):
+        self.calls = 0
+
+    def CreatePropertyCondition(self, property_id, value):
+        return ('prop', property_id, value)
+
+    def CreateAndCondition(self, left, right):
+        return ('and', left, right)
+
+    def CreateCacheRequest(self):
+        return FakeCacheRequest()
+
+    def evaluate(self, condition, element):
+        if condition[0] == 'and':
+            return self.evaluate(condition[1], element) and self.evaluate(condition[2], element)
+        return element.properties.get(condition[1]) == condition[2]
+
+
+class FakeUIAControl(object):
+    '''以属性形式暴露FakeElement，用于在Python中匹配条件
+    '''
+    def __init__(self, element):
+        props = element.properties
+        self.Name = props[FakeUIAModule.UIA_NamePropertyId]
+        self.ClassName = props[FakeUIAModule.UIA_ClassNamePropertyId]
+        self.ControlType = CONTROL_TYPES[props[FakeUIAModule.UIA_ControlTypePropertyId]]
+        self.Enabled = props[FakeUIAModule.UIA_IsEnabledPropertyId]
+
+
+def python_search(root, step):
+    '''遍历子元素并在Python中匹配全部属性
+    '''
+    for child in root.children:
+        ctrl = FakeUIAControl(child)
+        if all(p.match(getattr(ctrl, p.name)) for p in step.predicates):
+            yield child
+
+
+class ConditionTranslatorTest(unittest.TestCase):
+    '''ConditionTranslator测试用例
+    '''
+
+    def setUp(self):
+        self.client = FakeUIAClient()
+        self.translator = ConditionTranslator(self.client, FakeUIAModule, CONTROL_TYPES)
+
+    def _step(self, qpath):
+        return qpathplan.compile_qpath(qpath).steps[0]
+
+    def test_translate(self):
+        step_condition = self.translator.translate(self._step(
+            "/Name='ok' && ControlType='Button' && ClassName~='Btn'"))
+        self.assertEqual(step_condition.condition, ('and', ('prop', 30005, 'ok'), ('prop', 30003, 50000)))
+        self.assertEqual(step_condition.scope, FakeUIAModule.TreeScope_Children)
+        self.assertEqual([p.key for p in step_condition.residual.predicates], ['CLASSNAME'])
+        step_condition = self.translator.translate(self._step("/Enabled='True' && ProcessId='0x10'"))
+        self.assertEqual(step_condition.condition, ('and', ('prop', 30010, True), ('prop', 30002, 16)))
+        self.assertEqual(step_condition.scope, FakeUIAModule.TreeScope_Children)
+
+    def test_not_translatable(self):
+        self.assertEqual(self.translator.translate(self._step("/Name~='ok'")), None)
+        self.assertEqual(self.translator.translate(self._step("/ControlType='Unknown' && Value='1'")), None)
+        self.assertEqual(self.translator.translate(self._step("/ProcessId='abc'")), None)
+        self.assertEqual(self.translator.translate(self._step("/Name='ok' && MaxDepth='3'")), None) #只下推子控件的查找
+
+    def test_translate_cached(self):
+        step = self._step("/Name='ok' && ClassName~='Btn'")
+        step_condition = self.translator.translate(step)
+        self.assertIs(self.translator.translate(step), step_condition)
+        self.assertIs(self.translator.find_all(FakeElement(self.client, {}), step)[1], step_condition.residual)
+        untranslatable = self._step("/Name~='ok'")
+        self.assertEqual(self.translator.translate(untranslatable), None)
+        self.assertEqual(self.translator.find_all(FakeElement(self.client, {}), untranslatable), None)
+        translator = ConditionTranslator(self.client, FakeUIAModule, CONTROL_TYPES, capacity=1)
+        translator.translate(step)
+        translator.translate(untranslatable)
+        self.assertIsNot(translator.translate(step), step_condition) #超出容量时淘汰
+
+    def test_random_equivalence(self):
+        rng = random.Random(0)
+        names = ['ok', 'cancel', 'item']
+
+        def build(level):
+            if level == 4:
+                return []
+            return [FakeElement(self.client, {
+                FakeUIAModule.UIA_NamePropertyId: rng.choice(names),
+                FakeUIAModule.UIA_ClassNamePropertyId: rng.choice(['Btn', 'Label']),
+                FakeUIAModule.UIA_ControlTypePropertyId: rng.choice(list(CONTROL_TYPES)),
+                FakeUIAModule.UIA_IsEnabledPropertyId: rng.random() < 0.7,
+            }, build(level + 1)) for _ in range(rng.randint(1, 4))]
+
+        qpaths = ["/Name='ok'", "/ControlType='Button' && Name~='^c'", "/Enabled='False' && ClassName='Label'"]
+        for _ in range(20):
+            tree = FakeElement(self.client, {}, build(0))
+            for root in [tree] + list(tree.iter_descendants()):
+                for qpath in qpaths:
+                    step = self._step(qpath)
+                    expected = list(python_search(root, step))
+                    elements, residual = self.translator.find_all(root, step)
+                    found = [elm for elm in elements
+                             if all(p.match(getattr(FakeUIAControl(elm), p.name)) for p in residual.predicates)]
+                    self.assertEqual(found, expected, qpath)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''uisnapshot模块单元测试
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from qt4c import uisnapshot
+from qt4c.qpathengine import ObjectTreeProvider, SearchContext
+
+
+class WinNode(object):
+    def __init__(self, classname, caption='', children=(), uia=None):
+        self.ClassName = classname
+        self.Caption = caption
+        self.Visible = True
+        self.Children = list(children)
+        self.uia = uia
+
+
+class UIANode(object):
+    def __init__(self, name, controltype='Pane', children=()):
+        self.Name = name
+        self.ControlType = controltype
+        self.Children = list(children)
+
+
+class FakeTreeProvider(ObjectTreeProvider):
+    def switch_uitype(self, node, uitype):
+        if uitype != 'UIA' or isinstance(node, UIANode):
+            return None
+        return [node.uia] if node.uia else []
+
+
+def capture(root, **kwds):
+    return uisnapshot.capture(root, provider=FakeTreeProvider(),
+                              control_types={'Win': WinNode, 'UIA': UIANode}, **kwds)
+
+
+class UISnapshotTest(unittest.TestCase):
+    '''UISnapshot测试用例
+    '''
+
+    def setUp(self):
+        panel = UIANode('mainpanel', children=[UIANode('ok', 'Button'), UIANode('cancel', 'Button')])
+        self.root = WinNode('Desktop', children=[
+            WinNode('Dialog', 'a', [WinNode('Button', 'ok'), WinNode('Edit')]),
+            WinNode('Dialog', 'b', [WinNode('Button', 'ok')], uia=UIANode('b', 'Window', [panel])),
+        ])
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_capture(self):
+        snapshot = capture(self.root)
+        self.assertEqual(len(snapshot), 6)
+        self.assertEqual(list(snapshot.Parents), [-1, 0, 1, 1, 0, 4])
+        node = snapshot.node(4)
+        self.assertEqual(node.ClassName, 'Dialog')
+        self.assertEqual(node['caption'], 'b')
+        self.assertEqual(node.UIType, 'Win')
+        self.assertEqual(node.to_dict(), {'ClassName': 'Dialog', 'Caption': 'b', 'Visible': True})
+        self.assertEqual([child.index for child in snapshot.node(1).Children], [2, 3])
+        self.assertRaises(AttributeError, getattr, node, 'Name')
+        self.assertEqual(len(capture(self.root, max_depth=1)), 3)
+        self.assertEqual(len(snapshot.Values), 10) #字符串和True各只保存一次
+
+    def test_save_load(self):
+        path = os.path.join(self.tempdir, 'tree.uisnap')
+        capture(self.root, uia_depth=1).save(path)
+        for use_mmap in (True, False):
+            with uisnapshot.UISnapshot.load(path, use_mmap) as snapshot:
+                self.assertEqual(snapshot._columns, {}) #各列在访问时才解码
+                self.assertEqual(len(snapshot), 10)
+                self.assertEqual(snapshot.node(9).Name, 'cancel')
+                self.assertEqual(snapshot.link(4), 6)
+                self.assertEqual(snapshot.to_bytes()[:8], uisnapshot.MAGIC)
+        self.assertRaises(ValueError, uisnapshot.UISnapshot, b'NOTSNAP!' + b'\0' * 8)
+
+    def test_search(self):
+        snapshot = capture(self.root, uia_depth=1)
+        found = snapshot.search("/ClassName='Dialog'/ClassName='Button' && Caption='ok'")
+        self.assertEqual([node.index for node in found], [2, 5])
+        self.assertEqual(len(snapshot.search("/ClassName='Dialog'/ClassName='Button'", limit=1)), 1)
+        found = snapshot.search("/Caption='b'/UIType='UIA' && ControlType='Button' && MaxDepth='3'")
+        self.assertEqual([node.Name for node in found], ['ok', 'cancel'])
+        self.assertEqual(snapshot.search("/Caption='a'/UIType='UIA' && Name='ok'"), [])
+        context = SearchContext()
+        self.assertEqual(snapshot.search("/ClassName='Dialog'/ClassName='List'", context=context), [])
+        self.assertEqual(str(context.error_qpath[0]), "ClassName = 'List'")
+
+    def test_builder(self):
+        builder = uisnapshot.SnapshotBuilder()
+        root = builder.add(-1, 'Win', {'ClassName': 'Root'})
+        builder.add(root, 'Win', {'ClassName': 'Item', 'ControlId': 1})
+        builder.add(root, 'Win', {'ClassName': 'Item', 'ControlId': 2, 'Enabled': True})
+        snapshot = builder.build()
+        self.assertEqual(snapshot.get(0, 'ControlId'), None)
+        self.assertEqual(snapshot.get(1, 'Enabled', 'missing'), 'missing')
+        self.assertIs(snapshot.get(2, 'Enabled'), True) #True与1分别保存
+        self.assertEqual(len(snapshot.search("/ControlId='1'")), 1)
+        self.assertRaises(ValueError, builder.add, 5, 'Win')
+
+    def test_diff(self):
+        old = capture(self.root)
+        self.assertFalse(old.diff(capture(self.root)))
+        dialog = self.root.Children[0]
+        dialog.Children[1].Caption = 'text'
+        dialog.Children.append(WinNode('Button', 'help'))
+        del self.root.Children[1].Children[0]
+        result = old.diff(capture(self.root))
+        self.assertEqual([(node.ClassName, node.Caption) for node in result.added], [('Button', 'help')])
+        self.assertEqual([node.index for node in result.removed], [5])
+        self.assertEqual([(old_node.index, changes) for old_node, _, changes in result.changed],
+                         [(3, {'Caption': ('', 'text')})])
+        self.assertIn("Caption: '' => 'text'", result.format())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,7 +15,8 @@ try:
 except:
     import mock
 
-from qt4c.wincontrols import Control
+from qt4c import wincontrols, wintypes
+from qt4c.wincontrols import Control, ListView, TrayNotifyBar
 import qt4c.util
 from qt4c.util import Rectangle
 
@@ -74,6 +75,18 @@ class ControlTest(unittest.TestCase):
         control = Control()
         self.assertEqual(control.Visible, True)
 
+    def test_identity(self):
+        control = Control(root=0x10)
+        self.assertEqual(control.IdentityKey, ('Win', 0x10))
+        self.assertEqual(hash(control), hash(Control(root=0x10)))
+        self.assertEqual(len(set([control, Control(root=0x10), Control(root=0x20)])), 2)
+
+    def test_unresolved_hash(self):
+        with mock.patch.object(Control, '_init_wndobj') as mockInit:
+            control = Control(root=0x10, locator="/ClassName='Button'")
+            self.assertEqual(hash(control), id(control)) #计算哈希值时不查找
+            self.assertFalse(mockInit.called)
+
     def test_rect(self):
         with mock.patch.object(Control, 'BoundingRect') as mock_rect:
             mock_rect.__get__ = mock.Mock(return_value=Rectangle((0, 0, 150, 100)))
@@ -82,5 +95,126 @@ class ControlTest(unittest.TestCase):
             self.assertEqual(control.Height, 100)
 
 
+class FakeListView(ListView):
+    '''文本保存在本地的ListView，find_item与LVM_FINDITEM一样不区分大小写
+    '''
+    rows = [('ok', 'a'), ('Cancel', 'b'), ('OK', 'c'), ('ok', 'd')]
+
+    def __init__(self):
+        ListView.__init__(self, root=0x10)
+        self.read = []
+
+    def _read_rows(self, rows, columns):
+        for row in rows:
+            self.read.append(row)
+            yield tuple(self.rows[row][column] for column in columns)
+
+    def find_item(self, text, start=-1):
+        for index in range(start + 1, len(self.rows)):
+            if self.rows[index][0].lower() == text.lower():
+                return index
+        return -1
+
+
+@mock.patch.object(ListView, 'ItemCount', new_callable=mock.PropertyMock, return_value=4)
+@mock.patch.object(ListView, 'ColumnCount', new_callable=mock.PropertyMock, return_value=2)
+class ListViewTest(unittest.TestCase):
+    '''ListView查找测试用例
+    '''
+
+    def test_snapshot(self, *mocks):
+        snapshot = FakeListView().snapshot()
+        self.assertEqual(snapshot.Columns, (0, 1))
+        self.assertEqual(list(snapshot), FakeListView.rows)
+        self.assertEqual(snapshot.index('OK'), 2)
+        self.assertEqual(snapshot.index('d', column=1), 3)
+        self.assertEqual(snapshot.index('none'), -1)
+        self.assertEqual(snapshot.text(1, 1), 'b')
+        self.assertRaises(ValueError, FakeListView().snapshot([1]).index, 'ok')
+
+    @mock.patch('win32gui.GetWindowLong', return_value=0)
+    def test_getitem(self, *mocks):
+        listview = FakeListView()
+        self.assertEqual(listview['OK'].item_index, 2)
+        self.assertEqual(listview.read, [0, 2]) #只读取LVM_FINDITEM找到的候选项
+        self.assertEqual(listview.index('cancel'), -1)
+        self.assertRaises(ValueError, listview.__getitem__, 'none')
+
+    @mock.patch('win32gui.GetWindowLong', return_value=0x1000) #LVS_OWNERDATA
+    def test_ownerdata(self, *mocks):
+        listview = FakeListView()
+        listview.find_item = lambda text, start=-1: -1 #父窗口不处理LVN_ODFINDITEM
+        with mock.patch('commctrl.LVS_OWNERDATA', 0x1000):
+            self.assertEqual(listview.index('Cancel'), 1)
+        self.assertEqual(listview.read, [0, 1, 2, 3])
+
+    @mock.patch('win32gui.GetWindowLong', return_value=0x1000) #LVS_OWNERDATA
+    def test_ownerdata_ignores_start(self, *mocks):
+        listview = FakeListView()
+        listview.find_item = lambda text, start=-1: 0 #父窗口总是返回第一个不区分大小写匹配的项
+        with mock.patch('commctrl.LVS_OWNERDATA', 0x1000):
+            self.assertEqual(listview.index('OK'), 2)
+        self.assertEqual(listview.read, [0, 0, 1, 2, 3])
+
+
+@mock.patch('win32gui.SendMessage', return_value=3) #TB_BUTTONCOUNT
+@mock.patch('win32process.GetWindowThreadProcessId',
+            side_effect=lambda hwnd: {0x10: (1, 100), 0x20: (2, 200)}.get(hwnd, (0, 0)))
+@mock.patch.object(TrayNotifyBar, 'HWnd', new_callable=mock.PropertyMock, return_value=0x50)
+class TrayNotifyBarTest(unittest.TestCase):
+    '''TrayNotifyBar索引与刷新测试用例
+    '''
+
+    def setUp(self):
+        patcher = mock.patch.object(wincontrols, '_read_tray_icons', side_effect=self.read_icons)
+        self.read = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read_icons(self, bar, count):
+        icons = []
+        for command, hwnd in enumerate((0x10, 0x20, 0x30)): #0x30所属的进程已退出
+            td = wintypes.TRAYDATA()
+            td.hwnd = hwnd
+            icons.append(wincontrols._TrayIcon(wintypes.TBBUTTON(idCommand=command), td, bar))
+        return icons
+
+    def test_identity(self, *mocks):
+        icons = self.read_icons(TrayNotifyBar(), 3)
+        icons.append(self.read_icons(TrayNotifyBar(), 3)[0])
+        icons[1]._td.hwnd = 0x10
+        icons[1]._td.uID = 2 #同一窗口(进程)的另一个图标
+        self.assertEqual(len(set(icon.IdentityKey for icon in icons)), 3)
+        self.assertTrue(icons[0] == icons[3])
+        self.assertFalse(icons[0] == icons[1])
+
+    def test_getitem(self, *mocks):
+        bar = TrayNotifyBar()
+        self.assertEqual(bar[200]._td.hwnd, 0x20)
+        self.assertEqual(bar[100]._td.hwnd, 0x10)
+        self.assertEqual(self.read.call_count, 1)
+        self.assertEqual(bar.index().by_hwnd(0x30).OwnerProcessId, 0)
+        self.assertEqual(bar[300], None) #找不到时重新读取一次
+        self.assertEqual(self.read.call_count, 2)
+
+    @mock.patch.object(wincontrols._TrayIcon, 'Tips',
+                       property(lambda self: {0x10: u'音量', 0x20: u'网络'}.get(self._td.hwnd, u'').encode('utf-8')))
+    def test_getitem_tips(self, mockHWnd, mockGetWindowThreadProcessId, *mocks):
+        bar = TrayNotifyBar()
+        self.assertEqual(bar[u'网络']._td.hwnd, 0x20)
+        self.assertEqual(bar[u'音量'.encode('utf-8')]._td.hwnd, 0x10)
+        self.assertEqual(self.read.call_count, 1) #提示文本与Tips返回的utf-8编码一致时不重新读取
+        self.assertEqual(mockGetWindowThreadProcessId.call_count, 0) #没有按进程查找时不读取所属进程
+
+    @mock.patch('time.sleep')
+    @mock.patch('qt4c.mouse.Mouse.postMove')
+    @mock.patch.object(wincontrols._TrayIcon, 'BoundingRect', new_callable=mock.PropertyMock,
+                       return_value=Rectangle((0, 0, 16, 16)))
+    def test_refresh_stale_only(self, mockBoundingRect, mockPostMove, *mocks):
+        bar = TrayNotifyBar()
+        self.assertEqual(bar.refresh(stale_only=True), 1)
+        mockPostMove.assert_called_once_with(0x50, 8, 8)
+        self.assertEqual(bar.refresh(), 3)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''winevent模块单元测试
+'''
+
+import threading
+import time
+import unittest
+
+from qt4c import winevent
+from qt4c.exceptions import TimeoutError
+from qt4c.winevent import WaiterService, SyntheticEventSource
+
+
+ROOTS = {10: 10, 11: 10, 12: 10, 20: 20, 21: 20}
+PIDS = {10: 1, 20: 2}
+
+
+class Condition(object):
+    '''可由测试线程改变结果的检查函数
+    '''
+    def __init__(self):
+        self.result = None
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.result
+
+
+class WaiterServiceTest(unittest.TestCase):
+    '''WaiterService测试用例
+    '''
+
+    def setUp(self):
+        self.source = SyntheticEventSource()
+        self.service = WaiterService(self.source, root_of=ROOTS.get, safety_poll=30, process_of=PIDS.get)
+
+    def start_waiter(self, check, **kwargs):
+        result = {}
+        def run():
+            try:
+                result['value'] = self.service.wait(check, **kwargs)
+            except TimeoutError as e:
+                result['error'] = e
+        thread = threading.Thread(target=run)
+        thread.start()
+        while not self.service._waiters:
+            time.sleep(0.001)
+        return thread, result
+
+    def test_wake_in_scope(self):
+        check = Condition()
+        thread, result = self.start_waiter(check, timeout=10, scope=[11])
+        self.source.emit(winevent.EVENT_OBJECT_CREATE, 21) #其他顶层窗口中的事件
+        self.source.emit(winevent.EVENT_OBJECT_CREATE, 12)
+        check.result = 'found'
+        self.source.emit(winevent.EVENT_OBJECT_SHOW, 12)
+        thread.join(5)
+        self.assertEqual(result, {'value': 'found'})
+        self.assertTrue(check.calls <= 3)
+        self.assertEqual(self.service.woken, 2)
+        self.assertEqual(self.service._waiters, [])
+
+    def test_events_filter(self):
+        check = Condition()
+        thread, _ = self.start_waiter(check, timeout=10, events=winevent.APPEAR_EVENTS)
+        self.source.emit(winevent.EVENT_OBJECT_DESTROY, 10)
+        self.assertEqual(self.service.woken, 0)
+        check.result = True
+        self.source.emit(winevent.EVENT_OBJECT_CREATE, 20) #scope为None时顶层窗口的事件会唤醒
+        thread.join(5)
+        self.assertEqual(self.service.woken, 1)
+
+    def test_desktop_scope(self):
+        check = Condition()
+        thread, _ = self.start_waiter(check, timeout=10)
+        self.source.emit(winevent.EVENT_OBJECT_CREATE, 21) #子窗口
+        self.source.emit(winevent.EVENT_OBJECT_STATECHANGE, 20)
+        self.assertEqual(self.service.woken, 0)
+        check.result = True
+        self.source.emit(winevent.EVENT_OBJECT_SHOW, 20)
+        thread.join(5)
+        self.assertEqual(self.service.woken, 1)
+
+    def test_coalesce(self):
+        check = Condition()
+        thread, result = self.start_waiter(check, timeout=0.5, interval=0.4, scope=[10])
+        deadline = time.time() + 0.3
+        while time.time() < deadline:
+            self.source.emit(winevent.EVENT_OBJECT_NAMECHANGE, 11)
+            time.sleep(0.001)
+        thread.join(5)
+        self.assertTrue('error' in result)
+        self.assertTrue(check.calls <= 3) #两次检查至少间隔interval
+
+    def test_processes(self):
+        check = Condition()
+        thread, _ = self.start_waiter(check, timeout=10, interval=0.05, processes=[2])
+        self.source.emit(winevent.EVENT_OBJECT_SHOW, 10) #其他进程的顶层窗口
+        self.assertEqual(self.service.woken, 0)
+        check.result = True
+        self.source.emit(winevent.EVENT_OBJECT_NAMECHANGE, 21) #指定进程时子窗口的事件也会唤醒
+        thread.join(5)
+        self.assertEqual(self.service.woken, 1)
+
+    def test_safety_poll(self):
+        check = Condition()
+        self.assertRaises(TimeoutError, self.service.wait, check, 0.3, 0.05, [10])
+        self.assertEqual(check.calls, 2) #没有事件时按safety_poll检查，而不是interval
+        service = WaiterService(self.source, root_of=ROOTS.get, safety_poll=0.01)
+        check = Condition()
+        self.assertRaises(TimeoutError, service.wait, check, 0.5, 0.05, [10])
+        self.assertTrue(check.calls <= 4) #safety_poll不小于interval的4倍
+
+    def test_hook_lifetime(self):
+        self.assertTrue(self.service.Available)
+        self.assertEqual(self.source._callback, None) #没有等待者时不保留钩子
+        check = Condition()
+        thread, _ = self.start_waiter(check, timeout=10)
+        self.assertNotEqual(self.source._callback, None)
+        check.result = True
+        self.source.emit(winevent.EVENT_OBJECT_CREATE, 20)
+        thread.join(5)
+        self.assertEqual(self.source._callback, None)
+
+    def test_timeout(self):
+        service = WaiterService(self.source, root_of=ROOTS.get, safety_poll=0.05)
+        check = Condition()
+        self.assertRaises(TimeoutError, service.wait, check, 0.2)
+        self.assertTrue(2 <= check.calls <= 10)
+        self.assertEqual(service.wait(lambda: 5, 0), 5)
+
+    def test_fallback(self):
+        service = WaiterService(SyntheticEventSource(available=False))
+        self.assertFalse(service.Available)
+        check = Condition()
+        self.assertRaises(TimeoutError, service.wait, check, 0.1, 0.02)
+        self.assertTrue(check.calls >= 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''winhung模块单元测试
+'''
+
+import unittest
+try:
+    from unittest import mock
+except:
+    import mock
+
+import win32gui
+
+from qt4c import qpath
+from qt4c import qpathengine
+from qt4c import winhung
+from qt4c.wincontrols import Control
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class HungWindowRegistryTest(unittest.TestCase):
+    '''HungWindowRegistry测试用例
+    '''
+
+    def test_ttl(self):
+        clock = FakeClock()
+        registry = winhung.HungWindowRegistry(ttl=2, clock=clock, is_hung_app_window=None)
+        registry.record_timeout(0x10, 800)
+        self.assertTrue(registry.is_hung(0x10))
+        self.assertFalse(registry.is_hung(0x20, 800)) #只是超时，不影响同一线程的其他窗口
+        self.assertEqual(len(registry), 1)
+        clock.now += 2
+        self.assertFalse(registry.is_hung(0x10, 800))
+        self.assertEqual(len(registry), 0)
+
+    def test_confirmed_thread(self):
+        hung = set([0x10])
+        registry = winhung.HungWindowRegistry(clock=FakeClock(), is_hung_app_window=lambda hwnd: hwnd in hung)
+        registry.record_timeout(0x10, 800)
+        self.assertTrue(registry.is_hung(0x20, 800)) #系统判定无响应后，同一线程的其他窗口
+        self.assertFalse(registry.is_hung(0x20, 900))
+
+    def test_hung_app_window(self):
+        hung = set([0x10])
+        registry = winhung.HungWindowRegistry(clock=FakeClock(), is_hung_app_window=lambda hwnd: hwnd in hung)
+        self.assertFalse(registry.is_hung(0x20, 900))
+        self.assertTrue(registry.is_hung(0x10, 800))
+        hung.clear()
+        self.assertTrue(registry.is_hung(0x30, 800)) #系统判定后按线程登记
+        registry.enabled = False
+        self.assertFalse(registry.is_hung(0x10, 800))
+        registry.enabled = True
+        registry.clear()
+        self.assertFalse(registry.is_hung(0x10, 800))
+
+
+@mock.patch('win32process.GetWindowThreadProcessId', return_value=(800, 4))
+class CaptionTest(unittest.TestCase):
+    '''无响应窗口读取标题的测试用例
+    '''
+
+    def setUp(self):
+        self.registry = winhung.HungWindowRegistry(is_hung_app_window=None)
+        patcher = mock.patch.object(winhung, '_registry', self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @mock.patch('qt4c.winhung.send_message_timeout', return_value=(None, True))
+    def test_timeout(self, mockSend, mockGetWindowThreadProcessId):
+        ctrl = Control(root=0x10)
+        self.assertEqual(ctrl.Caption, "")
+        self.assertEqual(ctrl.Caption, "") #Caption不使用登记，每次都读取
+        self.assertEqual(mockSend.call_count, 2)
+        self.assertEqual(len(self.registry), 0)
+
+    @mock.patch('qt4c.winhung.send_message_timeout', return_value=(None, True))
+    def test_search_records_timeout(self, mockSend, mockGetWindowThreadProcessId):
+        provider = qpath.ControlTreeProvider(qpath.QPath.CONTROL_TYPES)
+        self.assertRaises(qpathengine.PropertyUnavailable, provider.get_property, Control(root=0x10), 'CAPTION')
+        self.assertRaises(qpathengine.PropertyUnavailable, provider.get_property, Control(root=0x10), 'CAPTION')
+        self.assertEqual(mockSend.call_count, 1)
+        self.assertTrue(self.registry.is_hung(0x10))
+
+    @mock.patch('win32gui.IsWindow', return_value=False)
+    @mock.patch('qt4c.winhung.send_message_timeout', return_value=(None, False))
+    def test_invalid_window(self, mockSend, mockIsWindow, mockGetWindowThreadProcessId):
+        self.assertEqual(Control(root=0x10).Caption, "")
+        self.assertFalse(self.registry.is_hung(0x10))
+        provider = qpath.ControlTreeProvider(qpath.QPath.CONTROL_TYPES)
+        self.assertRaises(qpathengine.PropertyUnavailable, provider.get_property, Control(root=0x10), 'CAPTION')
+        self.assertFalse(self.registry.is_hung(0x10))
+
+    def test_search_destroyed_window(self, mockGetWindowThreadProcessId):
+        provider = qpath.ControlTreeProvider(qpath.QPath.CONTROL_TYPES)
+        mockGetWindowThreadProcessId.side_effect = win32gui.error(1400, 'GetWindowThreadProcessId', '无效的窗口句柄')
+        with mock.patch('qt4c.winhung.send_message_timeout') as mockSend:
+            #窗口已销毁时视为不匹配，Caption=''不会匹配到已销毁的窗口
+            self.assertRaises(qpathengine.PropertyUnavailable, provider.get_property, Control(root=0x10), 'CAPTION')
+            self.assertFalse(mockSend.called)
+
+    def test_search_skips_hung(self, mockGetWindowThreadProcessId):
+        provider = qpath.ControlTreeProvider(qpath.QPath.CONTROL_TYPES)
+        self.registry._is_hung_app_window = lambda hwnd: hwnd == 0x30
+        self.registry.record_timeout(0x30, 800) #同一线程的另一个窗口已被系统判定为无响应
+        self.registry._is_hung_app_window = None
+        with mock.patch('qt4c.winhung.send_message_timeout') as mockSend:
+            self.assertRaises(qpathengine.PropertyUnavailable, provider.get_property, Control(root=0x10), 'CAPTION')
+            self.assertFalse(mockSend.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''wininfo模块单元测试
+'''
+
+import unittest
+try:
+    from unittest import mock
+except:
+    import mock
+
+import win32con
+
+from qt4c import qpath
+from qt4c import qpathplan
+from qt4c import wininfo
+from qt4c.util import Rectangle
+from qt4c.wincontrols import Control
+
+
+def fake_get_window_info(hwnd, pinfo):
+    info = pinfo._obj
+    info.rcWindow.left, info.rcWindow.top, info.rcWindow.right, info.rcWindow.bottom = 10, 20, 110, 220
+    info.dwStyle = win32con.WS_POPUP | win32con.WS_DISABLED
+    info.dwExStyle = 0x80
+    return 1
+
+
+class WindowInfoTest(unittest.TestCase):
+    '''WindowInfo测试用例
+    '''
+
+    @mock.patch('ctypes.windll.user32.GetWindowInfo', side_effect=fake_get_window_info)
+    @mock.patch('win32process.GetWindowThreadProcessId', return_value=(800, 4))
+    @mock.patch('win32gui.GetClassName', return_value='Dialog')
+    @mock.patch('win32gui.IsWindowVisible')
+    @mock.patch('qt4c.util.getDpi', return_value=2)
+    def test_fetch(self, mockGetDpi, mockIsWindowVisible, *mocks):
+        info = wininfo.WindowInfo.fetch(0x10)
+        self.assertEqual((info.ClassName, info.ProcessId, info.ThreadId, info.ExStyle), ('Dialog', 4, 800, 0x80))
+        self.assertEqual(info.Style, -0x78000000) #与GetWindowLong一样是有符号数
+        self.assertFalse(info.Enabled)
+        self.assertFalse(info.Visible)
+        self.assertFalse(mockIsWindowVisible.called) #没有WS_VISIBLE时不需要检查父窗口
+        self.assertEqual(info.BoundingRect, Rectangle((20, 40, 220, 440)))
+        self.assertEqual(info.BoundingRect, Rectangle((20, 40, 220, 440)))
+        self.assertEqual(mockGetDpi.call_count, 1)
+
+    @mock.patch('ctypes.windll.user32.GetWindowInfo', return_value=0)
+    def test_fetch_invalid(self, mockGetWindowInfo):
+        self.assertRaises(Exception, wininfo.WindowInfo.fetch, 0x10)
+
+    def test_worth_fetching(self):
+        costs = qpathplan.get_property_costs(Control)
+        self.assertFalse(wininfo.worth_fetching(costs, ['CLASSNAME']))
+        self.assertFalse(wininfo.worth_fetching(costs, ['CLASSNAME', 'VISIBLE', 'CAPTION']))
+        self.assertTrue(wininfo.worth_fetching(costs, ['CLASSNAME', 'STYLE', 'VISIBLE', 'ENABLED']))
+
+
+class ScopeTest(unittest.TestCase):
+    '''scope及控件属性复用测试用例
+    '''
+
+    def setUp(self):
+        self.fetched = []
+        patcher = mock.patch.object(wininfo.WindowInfo, 'fetch', side_effect=self.fetch)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fetch(self, hwnd):
+        self.fetched.append(hwnd)
+        return wininfo.WindowInfo(hwnd, 'Button', win32con.WS_DISABLED, 0, 4, 800, (0, 0, 10, 10))
+
+    def test_scope(self):
+        ctrl = Control(root=0x10)
+        with wininfo.scope() as cache:
+            with wininfo.scope() as inner:
+                self.assertTrue(inner is cache)
+                self.assertEqual((ctrl.ClassName, ctrl.Enabled, ctrl.ProcessId, ctrl.ThreadId),
+                                 ('Button', False, 4, 800))
+            self.assertEqual(ctrl.Style, win32con.WS_DISABLED)
+            self.assertFalse(ctrl.Visible)
+        self.assertEqual(self.fetched, [0x10])
+        self.assertTrue(wininfo.current_cache() is None)
+
+    @mock.patch('win32process.GetWindowThreadProcessId', return_value=(800, 4))
+    def test_provider(self, mockGetWindowThreadProcessId):
+        provider = qpath.ControlTreeProvider(qpath.QPath.CONTROL_TYPES)
+        ctrl = Control(root=0x10)
+        step = qpathplan.compile_qpath("/ProcessId='4'").steps[0]
+        provider.ordered_predicates(ctrl, step)
+        self.assertEqual(provider.get_property(ctrl, 'PROCESSID'), 4)
+        self.assertEqual(self.fetched, []) #只匹配一个属性时逐个读取
+        step = qpathplan.compile_qpath("/ClassName='Button' && Enabled='False' && Style='0' && ThreadId='800'").steps[0]
+        provider.ordered_predicates(ctrl, step)
+        self.assertEqual([provider.get_property(ctrl, p.key) for p in step.predicates], ['Button', False, 0x08000000, 800])
+        self.assertEqual(self.fetched, [0x10])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''winpushdown模块单元测试
+'''
+
+import random
+import unittest
+
+from qt4c import qpathplan
+from qt4c.winpushdown import plan_step, find_children
+from qt4c.wintree import WindowBackend
+
+
+class SimulatedWindow(object):
+    def __init__(self, hwnd, parent, classname, caption='', control_id=0, tid=0, pid=0):
+        self.hwnd = hwnd
+        self.parent = parent
+        self.ClassName = classname
+        self.Caption = caption
+        self.ControlId = control_id
+        self.ThreadId = tid
+        self.ProcessId = pid
+
+
+class SimulatedWindowBackend(WindowBackend):
+    '''模拟user32行为的窗口后端，子窗口按Z序保存
+    '''
+    DESKTOP = 1
+
+    def __init__(self):
+        self.windows = {}
+        self.children = {self.DESKTOP: []}
+        self.calls = 0
+
+    def add(self, hwnd, parent, classname, caption='', control_id=0, tid=0, pid=0):
+        self.windows[hwnd] = SimulatedWindow(hwnd, parent, classname, caption, control_id, tid, pid)
+        self.children.setdefault(parent, []).append(hwnd)
+        self.children.setdefault(hwnd, [])
+
+    def direct_children(self, hwnd):
+        '''Control.Children的结果
+        '''
+        return list(self.children.get(hwnd, []))
+
+    def desktop_window(self):
+        return self.DESKTOP
+
+    def top_level_windows(self):
+        self.calls += 1
+        return self.direct_children(self.DESKTOP)
+
+    def find_window_ex(self, parent, after, classname=None, caption=None):
+        self.calls += 1
+        siblings = self.children[parent or self.DESKTOP]
+        start = siblings.index(after) + 1 if after else 0
+        for hwnd in siblings[start:]:
+            wnd = self.windows[hwnd]
+            if classname is not None and wnd.ClassName.upper() != classname.upper():
+                continue
+            if caption is not None and wnd.Caption != caption:
+                continue
+            return hwnd
+        return 0
+
+    def get_dlg_item(self, parent, control_id):
+        self.calls += 1
+        for hwnd in self.children[parent]:
+            if self.windows[hwnd].ControlId == control_id:
+                return hwnd
+        return 0
+
+
+def python_match(backend, parent, step):
+    '''QPath在Python中逐个匹配子窗口的结果
+    '''
+    result = []
+    for hwnd in backend.direct_children(parent):
+        wnd = backend.windows[hwnd]
+        if all(p.match(getattr(wnd, p.name)) for p in step.predicates):
+            result.append(hwnd)
+    return result
+
+
+class WinPushdownTest(unittest.TestCase):
+    '''winpushdown测试用例
+    '''
+
+    def setUp(self):
+        self.backend = SimulatedWindowBackend()
+        self.backend.add(10, 1, 'Shell_TrayWnd', 'tray', tid=5, pid=50)
+        self.backend.add(20, 1, 'IEFrame', 'page', tid=6, pid=60)
+        self.backend.add(30, 1, 'AssistWnd', '', tid=7, pid=60)
+        self.backend.add(40, 1, 'IEFrame', 'other', tid=6, pid=60)
+        self.backend.add(21, 20, 'Button', 'ok', control_id=1)
+        self.backend.add(22, 20, 'Button', 'cancel', control_id=2)
+        self.backend.add(23, 20, 'Static', 'ok', control_id=1)
+
+    def _step(self, qpath):
+        return qpathplan.compile_qpath(qpath).steps[0]
+
+    def test_plan(self):
+        plan = plan_step(self._step("/ClassName='IEFrame' && Caption='page' && Visible='True'"), True)
+        self.assertEqual(plan.classname, 'IEFrame')
+        self.assertEqual(plan_step(self._step("/ClassName='Button' && MaxDepth='2'"), False), None)
+        self.assertEqual(plan_step(self._step("/ClassName~='Button'"), False), None)
+        self.assertEqual(plan_step(self._step("/Caption='page'"), True), None) #FindWindowEx比较的文本可能与WM_GETTEXT不同
+        self.assertEqual(plan_step(self._step("/ProcessId='60'"), True), None)
+        self.assertEqual(plan_step(self._step("/ThreadId='6'"), True), None)
+
+    def test_classname(self):
+        step = self._step("/ClassName='IEFrame' && Visible='True'")
+        self.assertEqual(find_children(self.backend, 1, step), [20, 40])
+        step = self._step("/ClassName='IEFrame' && Caption='other'")
+        self.assertEqual(find_children(self.backend, 1, step), [20, 40]) #Caption仍由QPath匹配
+
+    def test_control_id(self):
+        step = self._step("/ControlId='1'")
+        self.assertEqual(find_children(self.backend, 20, step, first_only=True), [21])
+        self.assertEqual(find_children(self.backend, 20, step), None) #需要全部匹配时退回到枚举
+        self.assertEqual(find_children(self.backend, 20, self._step("/ControlId='3'")), [])
+        step = self._step("/ControlId='1' && ClassName='Static'")
+        self.assertEqual(find_children(self.backend, 20, step, first_only=True), [23])
+
+    def test_process_id(self):
+        step = self._step("/classname='AssistWnd' && processid='60'")
+        self.assertEqual(find_children(self.backend, 1, step), [30])
+        self.assertEqual(find_children(self.backend, 1, self._step("/ProcessId='60'")), None)
+
+    def test_fallback(self):
+        self.assertEqual(find_children(self.backend, 1, self._step("/Visible='True'")), None)
+
+    def test_random_equivalence(self):
+        rng = random.Random(0)
+        classes = ['Button', 'button', 'Static', 'Edit']
+        captions = ['', 'ok', 'cancel']
+        qpaths = ["/ClassName='Button'", "/ClassName='Button' && Caption='ok'", "/Caption='ok'",
+                  "/ControlId='2'", "/ControlId='2' && ClassName='Edit'", "/ProcessId='3'",
+                  "/ThreadId='4' && ClassName='Static'", "/ProcessId='2' && Caption~='o'"]
+        for _ in range(30):
+            backend = SimulatedWindowBackend()
+            hwnd = 100
+            parents = [1]
+            for _ in range(40):
+                hwnd += 1
+                parent = rng.choice(parents)
+                tid = rng.randint(1, 6)
+                backend.add(hwnd, parent, rng.choice(classes), rng.choice(captions),
+                            rng.randint(0, 3), tid, tid // 2)
+                parents.append(hwnd)
+            for qpath in qpaths:
+                step = self._step(qpath)
+                for parent in parents:
+                    expected = python_match(backend, parent, step)
+                    for first_only in (False, True):
+                        candidates = find_children(backend, parent, step, first_only)
+                        if candidates is None:
+                            continue
+                        found = [h for h in candidates if h in expected]
+                        if first_only:
+                            self.assertEqual(found[:1], expected[:1], qpath)
+                        else:
+                            self.assertEqual(found, expected, qpath)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#
+# Tencent is pleased to support the open source community by making QT4C available.
+# Copyright (C) 2020 THL A29 Limited, a Tencent company.  All rights reserved.
+# QT4C is licensed under the BSD 3-Clause License, except for the third-party components listed below.
+# A copy of the BSD 3-Clause License is included in this file.
+#
+
+'''wintree模块单元测试
+'''
+
+import unittest
+
+from qt4c.wintree import WindowBackend, WindowTreeSnapshot, EnumSnapshotPolicy
+
+
+class FakeWindowBackend(WindowBackend):
+    '''以字典描述窗口树的枚举后端
+    '''
+    DESKTOP = 1
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.enum_calls = 0
+
+    def desktop_window(self):
+        return self.DESKTOP
+
+    def top_level_windows(self):
+        self.enum_calls += 1
+        return list(self.tree.get(self.DESKTOP, []))
+
+    def enum_descendants(self, hwnd):
+        self.enum_calls += 1
+        result = []
+        def walk(parent):
+            for child in self.tree.get(parent, []):
+                result.append((child, parent))
+                walk(child)
+        walk(hwnd)
+        return result
+
+    def is_window(self, hwnd):
+        return True
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class WindowTreeSnapshotTest(unittest.TestCase):
+    '''WindowTreeSnapshot测试用例
+    '''
+
+    def setUp(self):
+        self.backend = FakeWindowBackend({
+            1: [10, 20],
+            10: [11, 12],
+            11: [111, 112],
+            20: [21],
+        })
+
+    def test_children(self):
+        snapshot = WindowTreeSnapshot(self.backend)
+        self.assertEqual(snapshot.children(1), [10, 20])
+        self.assertEqual(snapshot.children(10), [11, 12])
+        self.assertEqual(snapshot.children(11), [111, 112])
+        self.assertEqual(snapshot.children(112), [])
+        self.assertEqual(snapshot.children(20), [21])
+        self.assertEqual(snapshot.parent(111), 11)
+        self.assertEqual(snapshot.parent(1), None)
+        self.assertEqual(self.backend.enum_calls, 3) #桌面、10和20各枚举一次
+
+    def test_subtree_root(self):
+        snapshot = WindowTreeSnapshot(self.backend)
+        self.assertEqual(snapshot.children(11), [111, 112])
+        self.assertEqual(snapshot.children(111), [])
+        self.assertEqual(self.backend.enum_calls, 1)
+
+    def test_per_search(self):
+        snapshot = WindowTreeSnapshot(self.backend)
+        snapshot.children(10)
+        snapshot.ensure_fresh()
+        self.assertEqual(len(snapshot), 0)
+        self.backend.tree[10].append(13)
+        self.assertEqual(snapshot.children(10), [11, 12, 13])
+
+    def test_ttl(self):
+        clock = FakeClock()
+        snapshot = WindowTreeSnapshot(self.backend, EnumSnapshotPolicy.TTL, ttl=1.0, clock=clock)
+        snapshot.children(10)
+        self.backend.tree[10].append(13)
+        clock.now = 0.5
+        snapshot.ensure_fresh()
+        self.assertEqual(snapshot.children(10), [11, 12])
+        clock.now = 1.5
+        self.assertTrue(snapshot.is_stale())
+        snapshot.ensure_fresh()
+        self.assertEqual(snapshot.children(10), [11, 12, 13])
+
+    def test_explicit(self):
+        clock = FakeClock()
+        snapshot = WindowTreeSnapshot(self.backend, EnumSnapshotPolicy.EXPLICIT, clock=clock)
+        snapshot.children(10)
+        self.backend.tree[10].append(13)
+        clock.now = 100
+        snapshot.ensure_fresh()
+        self.assertEqual(snapshot.children(10), [11, 12])
+        snapshot.invalidate()
+        snapshot.ensure_fresh()
+        self.assertEqual(snapshot.children(10), [11, 12, 13])
+
+    def test_subtree_root_then_ancestor(self):
+        snapshot = WindowTreeSnapshot(self.backend, EnumSnapshotPolicy.EXPLICIT)
+        self.assertEqual(snapshot.children(11), [111, 112])
+        self.assertEqual(snapshot.children(10), [11, 12])
+        self.assertEqual(snapshot.children(1), [10, 20])
+        self.assertEqual(snapshot.parent(11), 10)
+        self.assertEqual(snapshot.parent(10), 1)
+        self.assertEqual(snapshot.children(11), [111, 112])
+
+    def test_reparented_window(self):
+        backend = FakeWindowBackend({})
+        backend.enum_descendants = lambda hwnd: [(11, 10), (99, 12345), (111, 11)]
+        snapshot = WindowTreeSnapshot(backend)
+        self.assertEqual(snapshot.children(10), [11, 99])
+        self.assertEqual(snapshot.children(11), [111])
+
+
+if __name__ == "__main__":
+    unittest.main()